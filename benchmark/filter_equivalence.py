@@ -0,0 +1,229 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import itertools
+import logging
+import re
+import sys
+import typing
+
+import numpy as np
+
+from benchmark.synthetic import SyntheticGenerator, PixelColumns
+from benchmark.mock_server import MessageBuffer, serialize_columns
+from stream.stream import Layout
+from stream.buffer_stream import BufferStream
+from model.pixel_data import PixelData
+from filter.filter import Filter
+from filter.filter_settings import FilterSettings, FilterType
+from filter.filter_expression import FilterExpressionError
+from core.point import Point
+from core.color import Color
+from core.messages import ServerMsg
+
+# constraints as entered in the filter view, every constraint is applied to every key
+SCALAR_CONSTRAINTS = ['==0', '!=0', '==1', '<500', '>=0.5', '<=0.25', '>2', '!=foo', '==diffuse', '!=DIFFUSE',
+                      '>-1', '<= 3']
+POINT2_CONSTRAINTS = [('>0.5', '', False), ('<0.5', '>=0.25', False), ('>=100', '', True), ('', '', False)]
+POINT3_CONSTRAINTS = [('>0.5', '', '', False), ('', '<0.5', '>0.5', False), ('<=500', '', '', True),
+                      ('', '', '!=0', False), ('', '', '', False)]
+COLOR3_CONSTRAINTS = [('>0.5', '', '', False), ('', '<0.5', '>0.25', False), ('>=0.1', '', '', True),
+                      ('', '', '', False)]
+# constraints the former filter silently did not match, the filter expression parser rejects them
+MALFORMED_CONSTRAINTS = ['0.5', '<foo', '', '>']
+# expressions comparing string literals with numbers or with ordering operators
+MALFORMED_EXPRESSIONS = ['"a" == 3', '"a" < 3', '3 >= "a"', '"a" != true', '"a" < "b"', 'not "a" > 3 or pathDepth > 1']
+
+
+def _legacy_expr(text : str) -> str:
+    # the former regex parsing of FilterSettings.get_expr
+    s = re.search('[<!=>]+', text)
+    return s.group(0) if s else ""
+
+
+def _legacy_value(text : str, scalar : bool):
+    # the former regex parsing of FilterSettings.get_value
+    s = re.search('[+-]?([0-9]*[.,])?[0-9]+', text)
+    if s:
+        return float(s.group(0))
+    return re.sub('[<!=>]+', '', text) if scalar else 0
+
+
+def _compare_value(val1, expr : str, val2, is_string : bool = False) -> bool:
+    if is_string:
+        if expr == "==":
+            return str(val1).lower() == str(val2).lower()
+        elif expr == "!=":
+            return str(val1).lower() != str(val2).lower()
+    else:
+        if expr == '>':
+            return val1 > val2
+        elif expr == '<':
+            return val1 < val2
+        elif expr == '==':
+            return val1 == val2
+        elif expr == '>=':
+            return val1 >= val2
+        elif expr == '<=':
+            return val1 <= val2
+        elif expr == '!=':
+            return val1 != val2
+    return False
+
+
+def _compare(entry, filter_settings : FilterSettings) -> bool:
+    f_type = filter_settings.get_type()
+    constraint = filter_settings.get_constraint()
+    try:
+        if f_type is FilterType.SCALAR:
+            value = _legacy_value(constraint[0], True)
+            return bool(_compare_value(entry, _legacy_expr(constraint[0]), value, isinstance(value, str)))
+        names = {FilterType.POINT2: ('x', 'y'), FilterType.POINT3: ('x', 'y', 'z'),
+                 FilterType.COLOR3: ('red', 'green', 'blue')}[f_type]
+        # a constraint set for all components applies its operator and value to all of them,
+        # the former get_value kept the values of the other components
+        texts = [constraint[0]] * len(names) if constraint[-1] else constraint[:len(names)]
+        # all components are checked, the former compare_point3 checked z in place of y
+        return all(_legacy_expr(text) == "" or bool(_compare_value(getattr(entry, name), _legacy_expr(text),
+                                                                   _legacy_value(text, False)))
+                   for name, text in zip(names, texts))
+    except (TypeError, ValueError, AttributeError):
+        # inputs which raised in the former filter match nothing
+        return False
+
+
+def reference_mask(filter_settings : FilterSettings, pixel_data : PixelData) -> np.ndarray:
+    """
+    Returns a boolean numpy array over all paths which is set for the paths satisfying the filter settings,
+    evaluated per path and intersection like the former Filter.filter on the constraints parsed by the former regexes.
+    Falsy user data values are skipped, point and color values are compared (the former filter raised on their
+    truth value)
+    """
+    search_key = filter_settings.get_text()
+    mask = np.zeros(len(pixel_data.paths), dtype=bool)
+    for row, path in enumerate(pixel_data.dict_paths.values()):
+        if search_key == "sampleIndex":
+            mask[row] = _compare(path.sample_idx, filter_settings)
+        elif search_key == "pathDepth":
+            mask[row] = _compare(path.path_depth, filter_settings)
+        elif search_key == "finalEstimate":
+            mask[row] = _compare(path.final_estimate, filter_settings)
+        else:
+            entries = [path.data.get(search_key, None)]
+            entries += [its.data.get(search_key, None) for its in path.intersections.values()]
+            mask[row] = any((isinstance(entry, (Point, Color)) or entry) and _compare(entry, filter_settings)
+                            for entry in entries if entry is not None)
+    return mask
+
+
+def _with_falsy_values(columns : PixelColumns, rng : np.random.Generator) -> PixelColumns:
+    # synthetic user data is rarely falsy, replace some scalars with zero and some strings with empty strings
+    for column in columns.path_user_data + columns.intersection_user_data:
+        if isinstance(column.values, list):
+            column.values = ['' if rng.random() < 0.2 else value for value in column.values]
+        elif column.values.ndim == 1:
+            column.values[rng.random(len(column.values)) < 0.2] = 0
+    return columns
+
+
+def synthetic_pixel(generator : SyntheticGenerator, x : int, y : int, sample_count : int) -> PixelData:
+    """
+    Returns the pixel data of a synthetic pixel as the client receives it
+    """
+    columns = _with_falsy_values(generator.pixel(x, y, sample_count), np.random.default_rng([x, y]))
+    messages = MessageBuffer()
+    messages.begin(ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_COLUMNS.value)
+    serialize_columns(messages, columns)
+    pixel_data = PixelData()
+    pixel_data.deserialize_columns(BufferStream(bytearray(messages.join(False)[Layout.SHORT.size:])))
+    return pixel_data
+
+
+def filter_settings(keys : typing.List[str]) -> typing.Iterator[FilterSettings]:
+    """
+    Yields the filter settings of all combinations of keys and constraints
+    """
+    constraints = [(FilterType.SCALAR, (c,)) for c in SCALAR_CONSTRAINTS]
+    constraints += [(FilterType.POINT2, c) for c in POINT2_CONSTRAINTS]
+    constraints += [(FilterType.POINT3, c) for c in POINT3_CONSTRAINTS]
+    constraints += [(FilterType.COLOR3, c) for c in COLOR3_CONSTRAINTS]
+    for idx, (key, (filter_type, constraint)) in enumerate(itertools.product(keys, constraints)):
+        yield FilterSettings.from_constraint(idx, key, filter_type, constraint)
+
+
+def check(pixel_data : PixelData) -> typing.Tuple[int, int]:
+    """
+    Compares the compiled filters with the per-element reference on all filter settings,
+    returns the number of checked filters and the number of mismatches
+    """
+    keys = ['sampleIndex', 'pathDepth', 'finalEstimate'] + pixel_data.user_data_index.keys()
+    checked = mismatches = 0
+    malformed = [(FilterType.SCALAR, text) for text in MALFORMED_CONSTRAINTS]
+    malformed += [(FilterType.EXPRESSION, text) for text in MALFORMED_EXPRESSIONS]
+    for filter_type, text in malformed:
+        checked += 1
+        try:
+            Filter().filter(FilterSettings.from_constraint(0, keys[0], filter_type, (text,)), pixel_data)
+            mismatches += 1
+            logging.error('malformed {} {!r} was accepted'.format(
+                'expression' if filter_type is FilterType.EXPRESSION else 'constraint', text))
+        except FilterExpressionError:
+            pass
+    for settings in filter_settings(keys):
+        expected = pixel_data.paths.sample_idx[reference_mask(settings, pixel_data)]
+        result = Filter().filter(settings, pixel_data)
+        checked += 1
+        if not np.array_equal(np.sort(expected), np.sort(result)):
+            mismatches += 1
+            logging.error('{} {}: {} paths selected, expected {}'.format(
+                settings.get_text(), settings.get_constraint(), len(result), len(expected)))
+    return checked, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checks that the compiled filters select the same paths '
+                                                 'as the per-element filter on synthetic pixels.')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--pixels', type=int, default=2, help='number of checked pixels')
+    parser.add_argument('--sample-count', type=int, default=300, help='number of paths per pixel')
+    parser.add_argument('--user-data-density', type=float, default=0.7,
+                        help='fraction of paths and intersections which have a value for each key')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    generator = SyntheticGenerator(seed=args.seed, path_user_data=10, intersection_user_data=10,
+                                   user_data_density=args.user_data_density)
+    checked = mismatches = 0
+    for x in range(args.pixels):
+        result = check(synthetic_pixel(generator, x, 0, args.sample_count))
+        checked += result[0]
+        mismatches += result[1]
+    print('{} of {} filters differ from the per-element filter'.format(mismatches, checked))
+    sys.exit(1 if mismatches > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,750 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+import typing
+
+import numpy as np
+
+from benchmark.synthetic import SyntheticGenerator, SyntheticMesh, PixelColumns, UserDataColumn
+from model.path_table import IntersectionFlag
+from model.pixel_data import PixelData
+from filter.filter_expression import FilterExpressionError, evaluate_paths
+from filter.filter_pushdown import deserialize_predicate
+from stream.stream import Layout
+from stream.buffer_stream import BufferStream
+from stream.socket_stream import SocketStream
+from stream.codec import CODECS, codec_capabilities
+from core.messages import ServerMsg, Capability, ShapeType, PROTOCOL_VERSION
+
+try:
+    import OpenEXR
+except ImportError:
+    OpenEXR = None
+
+
+class MessageBuffer(object):
+
+    """
+        MessageBuffer
+        Collects the messages of one response, each message is a list of byte strings and arrays.
+        Arrays are written as they are (packed, native byte order) without copying them into a buffer first.
+    """
+
+    def __init__(self):
+        self._messages = []
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def begin(self, msg : int):
+        self._messages.append((msg, []))
+
+    def write(self, data : typing.Union[bytes, np.ndarray]):
+        if isinstance(data, np.ndarray):
+            data = memoryview(np.ascontiguousarray(data).reshape(-1).view(np.uint8))
+        self._messages[-1][1].append(data)
+
+    def write_layout(self, layout : struct.Struct, *values):
+        self.write(layout.pack(*values))
+
+    def write_string(self, value : str):
+        raw_value = value.encode('utf-8')
+        self.write(Layout.UNSIGNED_LONG.pack(len(raw_value)))
+        self.write(raw_value)
+
+    def join(self, framed : bool) -> bytes:
+        """
+        Returns all messages, framed messages are preceded by the length of their body
+        """
+        parts = []
+        for msg, body in self._messages:
+            if framed:
+                parts.append(Layout.FRAME_HEADER.pack(msg, sum(len(data) for data in body)))
+            else:
+                parts.append(Layout.SHORT.pack(msg))
+            parts.extend(body)
+        return b''.join(parts)
+
+    def clear(self):
+        self._messages.clear()
+
+
+def serialize_scene(messages : MessageBuffer, meshes : typing.List[SyntheticMesh], heatmap : bool):
+    """
+    Writes the meshes of the scene, with their face colors if the scene is sent as heatmap
+    """
+    messages.write(Layout.BOOL.pack(heatmap))
+    if heatmap:
+        messages.write_string('plasma')
+        messages.write(Layout.BOOL.pack(True))
+        messages.write_string('synthetic heatmap')
+    messages.write(Layout.UNSIGNED_INT.pack(len(meshes)))
+    for mesh in meshes:
+        face_colors = mesh.face_colors if heatmap and mesh.face_colors is not None else np.empty((0, 3), np.float32)
+        messages.write(Layout.SHORT.pack(ShapeType.TriangleMesh.value))
+        messages.write(Layout.UNSIGNED_INT.pack(len(mesh.vertices)))
+        messages.write(mesh.vertices)
+        messages.write(Layout.UNSIGNED_INT.pack(len(mesh.triangles)))
+        messages.write(mesh.triangles)
+        messages.write(Layout.UNSIGNED_INT.pack(len(face_colors)))
+        messages.write(face_colors)
+        messages.write(Layout.COLOR4F.pack(*mesh.diffuse_color))
+        messages.write(Layout.COLOR4F.pack(*mesh.specular_color))
+
+
+def serialize_columns(messages : MessageBuffer, columns : PixelColumns):
+    """
+    Writes the paths in the columnar format, 4 byte fields first so that all arrays stay aligned
+    """
+    write = messages.write
+    write(Layout.PIXEL_COLUMNS.pack(columns.num_paths, columns.num_intersections))
+    for array in (columns.sample_idx, columns.path_depth, columns.intersection_count, columns.path_origin,
+                  columns.final_estimate, columns.depth_idx, columns.pos, columns.pos_ne, columns.li, columns.le,
+                  columns.has_final_estimate.view(np.uint8), columns.flags):
+        write(array)
+    _serialize_user_data_columns(messages, columns.path_user_data)
+    _serialize_user_data_columns(messages, columns.intersection_user_data)
+
+
+def _serialize_user_data_columns(messages : MessageBuffer, user_data : typing.List[UserDataColumn]):
+    messages.write(Layout.UNSIGNED_INT.pack(len(user_data)))
+    for column in user_data:
+        messages.write_string(column.key)
+        messages.write_string(column.type_identifier)
+        messages.write(column.valid.view(np.uint8))
+        if column.type_identifier == 's':
+            # string values are dictionary encoded
+            dictionary, indices = np.unique(np.asarray(column.values, dtype=object), return_inverse=True)
+            messages.write(Layout.UNSIGNED_INT.pack(len(dictionary)))
+            for value in dictionary:
+                messages.write_string(value)
+            messages.write(indices.astype(np.uint32))
+        elif column.type_identifier == '?':
+            messages.write(column.values.view(np.uint8))
+        else:
+            messages.write(column.values)
+
+
+def filter_columns(columns : PixelColumns, predicate : bytes) -> typing.Tuple[PixelColumns, tuple]:
+    """
+    Returns the paths satisfying the serialized predicate of a pixel request and the statistics of the rejected paths.
+    The predicate is evaluated like on the client, on the pixel data deserialized from the columnar response
+    """
+    messages = MessageBuffer()
+    messages.begin(ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_COLUMNS.value)
+    serialize_columns(messages, columns)
+    pixel_data = PixelData()
+    pixel_data.deserialize_columns(BufferStream(bytearray(messages.join(False)[Layout.SHORT.size:])))
+    rejected = ~evaluate_paths(deserialize_predicate(predicate), pixel_data)
+    final_estimate = columns.final_estimate[rejected & columns.has_final_estimate].sum(axis=0, dtype=np.float64)
+    statistics = (columns.num_paths, int(np.count_nonzero(rejected)),
+                  int(columns.intersection_count[rejected].sum(dtype=np.uint64)),
+                  int(columns.path_depth[rejected].sum(dtype=np.uint64)), *final_estimate.tolist())
+    return columns.select(~rejected), statistics
+
+
+def _user_data_rows(user_data : typing.List[UserDataColumn], num_rows : int) -> typing.List[typing.List[bytes]]:
+    """
+    Returns the encoded key, type and value of each user data item of each row
+    """
+    rows = [[] for _ in range(num_rows)]
+    for column in user_data:
+        key = Layout.UNSIGNED_LONG.pack(len(column.key)) + column.key.encode('utf-8')
+        for row, value in zip(np.flatnonzero(column.valid), column.values):
+            if column.type_identifier == 's':
+                raw_value = value.encode('utf-8')
+                data = Layout.UNSIGNED_LONG.pack(len(raw_value)) + raw_value
+            else:
+                data = struct.pack('=' + column.type_identifier, *np.atleast_1d(value).tolist())
+            rows[row].append(key + column.type_identifier.encode('ascii') + data)
+    return rows
+
+
+def serialize_rows(messages : MessageBuffer, columns : PixelColumns):
+    """
+    Writes the paths in the row format of protocol version 1
+    """
+    path_user_data = _user_data_rows(columns.path_user_data, columns.num_paths)
+    its_user_data = _user_data_rows(columns.intersection_user_data, columns.num_intersections)
+    parts = [Layout.UNSIGNED_INT.pack(columns.num_paths)]
+    for i in range(columns.num_paths):
+        parts.append(Layout.UNSIGNED_INT.pack(len(path_user_data[i])))
+        parts.extend(path_user_data[i])
+        parts.append(Layout.PATH_HEADER.pack(int(columns.sample_idx[i]), int(columns.path_depth[i]),
+                                             *columns.path_origin[i].tolist(),
+                                             bool(columns.has_final_estimate[i])))
+        if columns.has_final_estimate[i]:
+            parts.append(Layout.COLOR4F.pack(*columns.final_estimate[i].tolist()))
+        begin, end = int(columns.offsets[i]), int(columns.offsets[i+1])
+        parts.append(Layout.UNSIGNED_INT.pack(end - begin))
+        for j in range(begin, end):
+            flags = int(columns.flags[j])
+            parts.append(Layout.UNSIGNED_INT.pack(len(its_user_data[j])))
+            parts.extend(its_user_data[j])
+            has_pos = bool(flags & IntersectionFlag.HAS_POS)
+            parts.append(Layout.INTERSECTION_HEADER.pack(int(columns.depth_idx[j]), has_pos))
+            if has_pos:
+                parts.append(Layout.POINT3F.pack(*columns.pos[j].tolist()))
+            parts.append(Layout.BOOL.pack(bool(flags & IntersectionFlag.HAS_NE)))
+            if flags & IntersectionFlag.HAS_NE:
+                parts.append(Layout.POINT3F.pack(*columns.pos_ne[j].tolist()))
+                parts.append(Layout.BOOL.pack(bool(flags & IntersectionFlag.VISIBLE_NE)))
+            parts.append(Layout.BOOL.pack(bool(flags & IntersectionFlag.HAS_LI)))
+            if flags & IntersectionFlag.HAS_LI:
+                parts.append(Layout.COLOR4F.pack(*columns.li[j].tolist()))
+            parts.append(Layout.BOOL.pack(bool(flags & IntersectionFlag.HAS_LE)))
+            if flags & IntersectionFlag.HAS_LE:
+                parts.append(Layout.COLOR4F.pack(*columns.le[j].tolist()))
+    messages.write(b''.join(parts))
+
+
+class SphericalViewPlugin(object):
+
+    """
+        SphericalViewPlugin
+        Server side of the SphericalView plugin, answers with a constant environment image.
+        The image is only sent if OpenEXR is installed, otherwise the response is empty
+    """
+
+    ID = 66
+
+    def __init__(self):
+        self._size = (0, 0)
+
+    def deserialize(self, read : typing.Callable[[struct.Struct], tuple]):
+        x, y, z, sample_count, width, height = read(struct.Struct('=3fiii'))
+        size, = read(Layout.UNSIGNED_LONG)
+        integrator = read(struct.Struct('={}s'.format(size)))[0].decode('utf-8')
+        logging.info('SphericalView at ({}, {}, {}) with {} samples, {}x{} pixels, integrator {}'.format(
+            x, y, z, sample_count, width, height, integrator))
+        self._size = (max(width, 1), max(height, 1))
+
+    def serialize(self, messages : MessageBuffer):
+        data = self._render()
+        messages.begin(self.ID)
+        messages.write(Layout.INT.pack(len(data)))
+        messages.write(data)
+
+    def _render(self) -> bytes:
+        if OpenEXR is None:
+            return b''
+        width, height = self._size
+        channel = np.linspace(0.0, 1.0, width * height, dtype=np.float32).tobytes()
+        fd, filepath = tempfile.mkstemp(suffix='.exr')
+        os.close(fd)
+        try:
+            out = OpenEXR.OutputFile(filepath, OpenEXR.Header(width, height))
+            out.writePixels({'R': channel, 'G': channel, 'B': channel})
+            out.close()
+            with open(filepath, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(filepath)
+
+
+class MockServer(object):
+
+    """
+        MockServer
+        Pure Python implementation of the server side of the binary protocol.
+        Answers requests with the data of a SyntheticGenerator instead of a renderer,
+        so that clients can be tested and load tested without building the server library.
+        Handles one client at a time like the server library and negotiates the same capabilities,
+        except for shared memory. Rendering time is emulated with sample_time seconds per sample,
+        during which progressive pixel responses are sent in chunks.
+    """
+
+    # interval between progressive chunks, doubled after each chunk up to the maximum interval
+    CHUNK_INTERVAL = 0.025
+    MAX_CHUNK_INTERVAL = 1.0
+
+    def __init__(self,
+                 generator : SyntheticGenerator = None,
+                 address : str = 'localhost:0',
+                 compression_threshold : int = 1 << 16,
+                 sample_time : float = 0.0,
+                 image_path : str = ''):
+        self._generator = generator if generator is not None else SyntheticGenerator()
+        self._compression_threshold = compression_threshold
+        self._sample_time = sample_time
+        self._image_path = image_path
+        self._plugins = {SphericalViewPlugin.ID: SphericalViewPlugin()}
+        self._scene_hash = None
+        self._pixel_cache_invalid = False
+        self._thread = None
+        self._running = False
+        self._client = None
+
+        hostname, _, port = address.rpartition(':')
+        self._socket_path = SocketStream.unix_socket_path(address)
+        if self._socket_path is not None:
+            if os.path.exists(self._socket_path):
+                os.remove(self._socket_path)
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.bind(self._socket_path)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._socket.bind((hostname or 'localhost', int(port)))
+        self._socket.listen(1)
+        self._reset()
+
+    @property
+    def hostname(self) -> str:
+        """
+        Returns the hostname clients connect to, the unix: prefix followed by the path for Unix domain sockets
+        """
+        if self._socket_path is not None:
+            return SocketStream.UNIX_SOCKET_PREFIX + self._socket_path
+        return self._socket.getsockname()[0]
+
+    @property
+    def port(self) -> int:
+        """
+        Returns the port of the server, which is chosen by the operating system if port 0 was given
+        """
+        if self._socket_path is not None:
+            return 0
+        return self._socket.getsockname()[1]
+
+    @property
+    def generator(self) -> SyntheticGenerator:
+        return self._generator
+
+    def start(self) -> 'MockServer':
+        """
+        Serves clients in a background thread until the server is stopped
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name='MockServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Closes the connection to the current client and stops serving
+        """
+        self._running = False
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        client = self._client
+        if client is not None:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._socket_path is not None and os.path.exists(self._socket_path):
+            os.remove(self._socket_path)
+
+    def __enter__(self) -> 'MockServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def serve_forever(self):
+        """
+        Accepts clients one after another until a client sends quit or the server is stopped
+        """
+        self._running = True
+        while self._running:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                break
+            self._client = client
+            try:
+                self._serve(client)
+            except (ConnectionError, OSError) as e:
+                logging.info('Client disconnected: {}'.format(e))
+            finally:
+                self._client = None
+                client.close()
+
+    def _reset(self):
+        self._capabilities = Capability.NONE
+        self._codec = None
+        self._framed = False
+        self._pending = []
+        self._cancelled_request_id = 0
+        self._messages = MessageBuffer()
+
+    def _recv(self, size : int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._client.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('remote has disconnected')
+            data += chunk
+        return bytes(data)
+
+    def _read(self, layout : struct.Struct) -> tuple:
+        return layout.unpack(self._recv(layout.size))
+
+    def _serve(self, client : socket.socket):
+        """
+        Handles the requests of one client
+        """
+        self._reset()
+        client.sendall(Layout.SHORT.pack(ServerMsg.EMCA_HELLO.value))
+        msg, = self._read(Layout.SHORT)
+        if msg != ServerMsg.EMCA_HELLO.value:
+            raise ConnectionError('Did not receive hello message')
+
+        # offer newer protocol versions, clients which do not know the offer ignore it and stay at version 1
+        self._messages.begin(ServerMsg.EMCA_PROTOCOL_OFFER.value)
+        self._messages.begin(ServerMsg.EMCA_SUPPORTED_PLUGINS.value)
+        self._messages.write(Layout.UNSIGNED_INT.pack(len(self._plugins)))
+        for plugin_id in self._plugins:
+            self._messages.write(Layout.SHORT.pack(plugin_id))
+        self._flush()
+
+        handlers = {
+            ServerMsg.EMCA_PROTOCOL_OFFER: self._respond_protocol_offer,
+            ServerMsg.EMCA_REQUEST_RENDER_INFO: self._respond_render_info,
+            ServerMsg.EMCA_REQUEST_CAMERA: self._respond_camera,
+            ServerMsg.EMCA_REQUEST_SCENE: self._respond_scene,
+            ServerMsg.EMCA_REQUEST_RENDER_IMAGE: self._respond_render_image,
+            ServerMsg.EMCA_REQUEST_RENDER_PIXEL: self._respond_render_pixel,
+            ServerMsg.EMCA_CANCEL_RENDER_PIXEL: self._cancel_pixel_requests,
+        }
+
+        while self._running:
+            msg, = self._read(Layout.SHORT)
+            plugin = self._plugins.get(msg, None)
+            state = ServerMsg.get_server_msg(msg)
+            if plugin is not None:
+                plugin.deserialize(self._read)
+                plugin.serialize(self._messages)
+            elif state in handlers:
+                handlers[state]()
+            elif state is ServerMsg.EMCA_DISCONNECT or state is ServerMsg.EMCA_QUIT:
+                self._flush()
+                data = Layout.SHORT.pack(ServerMsg.EMCA_DISCONNECT.value)
+                if self._framed:
+                    data += Layout.UNSIGNED_LONG.pack(0)
+                client.sendall(data)
+                if state is ServerMsg.EMCA_QUIT:
+                    self._running = False
+                return
+            else:
+                logging.warning('Unknown message {} received'.format(msg))
+            self._respond_pixel_cache_invalidation()
+            self._flush()
+
+    def _flush(self):
+        """
+        Sends all collected messages, large responses are compressed with the negotiated codec
+        """
+        if not len(self._messages):
+            return
+        data = self._messages.join(self._framed)
+        self._messages.clear()
+        if self._codec is not None and len(data) >= self._compression_threshold:
+            compressed = self._codec.compress(data)
+            # incompressible data is sent as it is
+            if len(compressed) < len(data):
+                header = Layout.SHORT.pack(ServerMsg.EMCA_COMPRESSED.value)
+                if self._framed:
+                    header += Layout.UNSIGNED_LONG.pack(Layout.COMPRESSED_HEADER.size + len(compressed))
+                header += Layout.COMPRESSED_HEADER.pack(self._codec.ID, len(data), len(compressed))
+                self._client.sendall(header)
+                data = compressed
+        self._client.sendall(data)
+
+    def _respond_protocol_offer(self):
+        version, capabilities = self._read(struct.Struct('=HI'))
+        supported = Capability.COLUMNAR_PIXEL_DATA | Capability.FRAMED_MESSAGES | \
+                    Capability.PIPELINED_PIXEL_REQUESTS | Capability.PROGRESSIVE_PIXEL_DATA | \
+                    Capability.SCENE_HASH | Capability.PIXEL_CACHE_INVALIDATION | Capability.FILTER_PUSHDOWN | \
+                    codec_capabilities()
+        self._capabilities = Capability(capabilities) & supported
+        # the client skips responses to cancelled requests by their frame length
+        if not self._capabilities & Capability.FRAMED_MESSAGES:
+            self._capabilities &= ~(Capability.PIPELINED_PIXEL_REQUESTS | Capability.SHARED_MEMORY)
+        # chunks and the statistics of filtered responses are only available in the columnar format
+        if not self._capabilities & Capability.COLUMNAR_PIXEL_DATA:
+            self._capabilities &= ~(Capability.PROGRESSIVE_PIXEL_DATA | Capability.FILTER_PUSHDOWN)
+        # use the first codec supported by both sides
+        self._codec = next((codec for codec in CODECS.values() if self._capabilities & codec.CAPABILITY), None)
+        version = min(version, PROTOCOL_VERSION)
+        logging.info('Negotiated protocol version {} with capabilities {}'.format(version, self._capabilities))
+
+        # the accept message is the last unframed message, all following messages are framed if negotiated
+        self._messages.begin(ServerMsg.EMCA_PROTOCOL_ACCEPT.value)
+        self._messages.write(Layout.PROTOCOL_ACCEPT.pack(version, int(self._capabilities)))
+        self._flush()
+        self._framed = bool(self._capabilities & Capability.FRAMED_MESSAGES)
+
+    def _camera(self) -> bytes:
+        origin, direction, up, near_clip, far_clip, fov = self._generator.camera()
+        return struct.pack('=9f3f', *origin, *direction, *up, near_clip, far_clip, fov)
+
+    def _scene_hash_value(self) -> int:
+        """
+        Returns the hash of the meshes and the camera, 0 for scenes with heatmap data which can not be cached
+        """
+        if self._generator.has_heatmap:
+            return 0
+        if self._scene_hash is None:
+            scene_hash = hashlib.blake2b(self._camera(), digest_size=8)
+            for mesh in self._generator.meshes():
+                scene_hash.update(mesh.vertices.tobytes())
+                scene_hash.update(mesh.triangles.tobytes())
+            self._scene_hash = max(int.from_bytes(scene_hash.digest(), 'little'), 1)
+        return self._scene_hash
+
+    def _respond_render_info(self):
+        self._messages.begin(ServerMsg.EMCA_RESPONSE_RENDER_INFO.value)
+        self._messages.write_string(self._generator.renderer_name)
+        self._messages.write_string(self._generator.scene_name)
+        self._messages.write(Layout.UNSIGNED_INT.pack(self._generator.sample_count))
+        if self._capabilities & Capability.SCENE_HASH:
+            self._messages.write(Layout.UNSIGNED_LONG.pack(self._scene_hash_value()))
+
+    def _respond_camera(self):
+        self._messages.begin(ServerMsg.EMCA_RESPONSE_CAMERA.value)
+        self._messages.write(self._camera())
+
+    def _respond_scene(self):
+        self._messages.begin(ServerMsg.EMCA_RESPONSE_SCENE.value)
+        serialize_scene(self._messages, self._generator.meshes(), self._generator.has_heatmap)
+
+    def invalidate_pixel_cache(self):
+        """
+        Informs the client with the next response that previously rendered pixels are outdated
+        """
+        self._pixel_cache_invalid = True
+
+    def _respond_pixel_cache_invalidation(self):
+        if not self._pixel_cache_invalid:
+            return
+        self._pixel_cache_invalid = False
+        if self._capabilities & Capability.PIXEL_CACHE_INVALIDATION:
+            self._messages.begin(ServerMsg.EMCA_INVALIDATE_PIXEL_CACHE.value)
+
+    def _respond_render_image(self):
+        sample_count, = self._read(Layout.UNSIGNED_INT)
+        self._generator.sample_count = sample_count
+        # like the server, a new image invalidates the rendered pixels
+        self._pixel_cache_invalid = True
+        self._messages.begin(ServerMsg.EMCA_RESPONSE_RENDER_IMAGE.value)
+        self._messages.write_string(self._image_path)
+        # send heatmap data, if there is any
+        if self._generator.has_heatmap:
+            self._respond_scene()
+
+    @property
+    def _pipelined(self) -> bool:
+        return bool(self._capabilities & Capability.PIPELINED_PIXEL_REQUESTS)
+
+    def _is_cancelled(self, request_id : int) -> bool:
+        return request_id != 0 and request_id <= self._cancelled_request_id
+
+    def _cancel_pixel_requests(self):
+        # cancels all requests up to the given identifier, identifiers are increasing per connection
+        request_id, = self._read(Layout.UNSIGNED_INT)
+        self._cancelled_request_id = max(self._cancelled_request_id, request_id)
+        self._pending = [request for request in self._pending if not self._is_cancelled(request[0])]
+
+    def _receive_pending_pixel_requests(self):
+        """
+        Receives pixel requests and cancellations which already arrived without blocking,
+        anything else is left to the main loop
+        """
+        if not self._pipelined:
+            return
+        sizes = {ServerMsg.EMCA_REQUEST_RENDER_PIXEL.value: Layout.PIXEL_REQUEST.size,
+                 ServerMsg.EMCA_CANCEL_RENDER_PIXEL.value: Layout.CANCEL_REQUEST.size}
+        while True:
+            try:
+                header = self._client.recv(Layout.SHORT.size, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+                if len(header) < Layout.SHORT.size:
+                    return
+                msg, = Layout.SHORT.unpack(header)
+                if msg not in sizes:
+                    return
+                size = sizes[msg]
+                if msg == ServerMsg.EMCA_REQUEST_RENDER_PIXEL.value and self._filter_pushdown:
+                    # the length of the predicate follows the fixed size part of the request
+                    size += Layout.UNSIGNED_LONG.size
+                    data = self._client.recv(size, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+                    if len(data) < size:
+                        return
+                    size += Layout.UNSIGNED_LONG.unpack_from(data, size - Layout.UNSIGNED_LONG.size)[0]
+                # only consume complete messages
+                if len(self._client.recv(size, socket.MSG_PEEK | socket.MSG_DONTWAIT)) < size:
+                    return
+            except BlockingIOError:
+                return
+            self._read(Layout.SHORT)
+            if msg == ServerMsg.EMCA_REQUEST_RENDER_PIXEL.value:
+                self._pending.append(self._read_pixel_request())
+            else:
+                self._cancel_pixel_requests()
+
+    @property
+    def _filter_pushdown(self) -> bool:
+        return bool(self._capabilities & Capability.FILTER_PUSHDOWN)
+
+    def _read_pixel_request(self) -> tuple:
+        """
+        Reads the request identifier (only if pipelined), pixel, sample count and predicate (only with filter pushdown)
+        """
+        request = self._read(Layout.VEC3U)
+        if self._pipelined:
+            request += self._read(Layout.UNSIGNED_INT)
+        else:
+            request = (0,) + request
+        predicate = b''
+        if self._filter_pushdown:
+            size, = self._read(Layout.UNSIGNED_LONG)
+            predicate = self._recv(size) if size > 0 else b''
+        return request + (predicate,)
+
+    def _respond_render_pixel(self):
+        if not self._pipelined:
+            self._render_pixel(*self._read_pixel_request())
+            return
+        self._pending.append(self._read_pixel_request())
+        while self._pending:
+            request = self._pending.pop(0)
+            self._render_pixel(*request)
+            self._flush()
+            self._receive_pending_pixel_requests()
+
+    def _begin_pixel_response(self, msg : ServerMsg, request_id : int):
+        self._messages.begin(msg.value)
+        if self._pipelined:
+            self._messages.write(Layout.UNSIGNED_INT.pack(request_id))
+
+    def _render_pixel(self, request_id : int, x : int, y : int, sample_count : int, predicate : bytes = b''):
+        logging.info('Render pixel ({}, {}) with {} samples'.format(x, y, sample_count))
+        columns = self._generator.pixel(x, y, sample_count)
+        statistics = None
+        if predicate:
+            try:
+                columns, statistics = filter_columns(columns, predicate)
+            except FilterExpressionError as e:
+                # like the server, all paths are sent if the predicate can not be evaluated
+                logging.warning('Ignore predicate of pixel request {}: {}'.format(request_id, e))
+        sent = 0
+        if self._sample_time > 0.0:
+            progressive = bool(self._capabilities & Capability.PROGRESSIVE_PIXEL_DATA)
+            start = time.perf_counter()
+            end = start + sample_count * self._sample_time
+            interval = self.CHUNK_INTERVAL
+            while not self._is_cancelled(request_id):
+                now = time.perf_counter()
+                if now + interval >= end:
+                    time.sleep(max(end - now, 0.0))
+                    break
+                time.sleep(interval)
+                self._receive_pending_pixel_requests()
+                # send the completed paths in chunks, the final response contains the remaining paths
+                done = min(int((time.perf_counter() - start) / self._sample_time), sample_count)
+                if statistics is not None:
+                    # only the completed paths which satisfy the predicate are sent
+                    done = int(np.searchsorted(columns.sample_idx, done))
+                if progressive and done > sent and not self._is_cancelled(request_id):
+                    self._begin_pixel_response(ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_CHUNK, request_id)
+                    serialize_columns(self._messages, columns.slice(sent, done))
+                    self._flush()
+                    sent = done
+                    interval = min(2 * interval, self.MAX_CHUNK_INTERVAL)
+
+        # the request might have been cancelled while rendering, do not send data nobody is waiting for
+        self._receive_pending_pixel_requests()
+        if self._is_cancelled(request_id):
+            logging.info('Pixel request {} was cancelled'.format(request_id))
+        elif self._capabilities & Capability.COLUMNAR_PIXEL_DATA:
+            if statistics is not None:
+                self._begin_pixel_response(ServerMsg.EMCA_RESPONSE_FILTER_STATISTICS, request_id)
+                self._messages.write(Layout.FILTER_STATISTICS.pack(*statistics))
+            self._begin_pixel_response(ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_COLUMNS, request_id)
+            serialize_columns(self._messages, columns.slice(sent, columns.num_paths) if sent else columns)
+        else:
+            self._begin_pixel_response(ServerMsg.EMCA_RESPONSE_RENDER_PIXEL, request_id)
+            serialize_rows(self._messages, columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serves synthetic render data with the binary protocol of the '
+                                                 'EMCA server, e.g. to test or load test clients without a renderer.')
+    parser.add_argument('address', nargs='?', default='localhost:50013',
+                        help='address to listen on, hostname:port for TCP or unix:path for a Unix domain socket')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--meshes', type=int, default=4, help='number of meshes of the scene')
+    parser.add_argument('--mesh-resolution', type=int, default=32, help='number of rings of each sphere mesh')
+    parser.add_argument('--heatmap', action='store_true', help='send the scene as heatmap with face colors')
+    parser.add_argument('--max-depth', type=int, default=8, help='maximum number of intersections per path')
+    parser.add_argument('--path-user-data', type=int, default=2, help='number of user data keys per path')
+    parser.add_argument('--intersection-user-data', type=int, default=4,
+                        help='number of user data keys per intersection')
+    parser.add_argument('--user-data-density', type=float, default=1.0,
+                        help='fraction of paths and intersections which have a value for each key')
+    parser.add_argument('--sample-count', type=int, default=128, help='initial sample count of the render info')
+    parser.add_argument('--sample-time', type=float, default=0.0,
+                        help='emulated rendering time per sample in seconds')
+    parser.add_argument('--compression-threshold', type=int, default=1 << 16,
+                        help='responses of at least this many bytes are compressed')
+    parser.add_argument('--image', default='', help='path of the image returned for render image requests')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    generator = SyntheticGenerator(seed=args.seed,
+                                   num_meshes=args.meshes,
+                                   mesh_resolution=args.mesh_resolution,
+                                   heatmap=args.heatmap,
+                                   max_depth=args.max_depth,
+                                   path_user_data=args.path_user_data,
+                                   intersection_user_data=args.intersection_user_data,
+                                   user_data_density=args.user_data_density,
+                                   sample_count=args.sample_count)
+    server = MockServer(generator, args.address, args.compression_threshold, args.sample_time, args.image)
+    logging.info('Serving synthetic data on {}:{}'.format(server.hostname, server.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import typing
+
+import numpy as np
+
+from benchmark.synthetic import SyntheticGenerator, PixelColumns
+from benchmark.mock_server import MessageBuffer, serialize_columns, filter_columns
+from benchmark.transport import parse_address
+from stream.async_stream_client import AsyncStreamClient
+from stream.stream import Layout
+from stream.buffer_stream import BufferStream
+from model.pixel_data import PixelData
+from filter.filter_expression import compile_expression, evaluate_paths
+from filter.filter_pushdown import serialize_predicate, deserialize_predicate
+from core.messages import ServerMsg, Capability
+
+# expressions on the keys of the synthetic user data which the server evaluates exactly,
+# path<i>_<type> and its<i>_<type> with the types f, i, 3f, 4f, ?, d, 2i, 2f, 3i and s
+EXACT_EXPRESSIONS = [
+    # path conditions combined with conditions on intersections, path values are broadcast to the intersections
+    'path0_f > 0.5 and its.its0_f < 0.5',
+    'path0_f > 0.5 or its.its0_f < 0.5',
+    '(path9_s == "diffuse" or its.its9_s == "emitter") and pathDepth > 2',
+    'its.its1_i > 512 and not (path1_i < 100 or its.its5_d > 0.9)',
+    '["path4_?"] or its.depthIdx == 3 and its["its4_?"]',
+    'sampleIndex < 100 or its.pos.x > 0 and path2_3f.y < 0.5',
+    # negated conditions on intersection values are negated per intersection
+    'not its.its0_f > 0.5',
+    'not (its.its0_f > 0.5 and its.depthIdx == 1)',
+    'not its.visibleNE',
+    'not its["its4_?"]',
+    'not its.its9_s == "diffuse" and not path0_f < 0.5',
+    'not any(its.its1_i > 100)',
+    'not has(its.its5_d)',
+    # quantifiers, all is satisfied by paths without intersections
+    'all(its.its0_f > 0.5)',
+    'all(its.pos.x > 0) or path0_f > 0.9',
+    'not all(its.li.red > 0.1)',
+    'all(its.its9_s != "emitter") and path0_f > 0.2',
+    'any(its.depthIdx > 3)',
+    'has(its.its0_f) and has(path1_i)',
+    # components, truth values and constants
+    'its.its2_3f > 0.5',
+    'its.its3_4f.red > 0.5',
+    'path6_2i.y > 10 and path7_2f < 0.5',
+    'finalEstimate.r > 0.3',
+    'pathOrigin.z > 0',
+    'path0_f',
+    'its.its1_i',
+    'path9_s',
+    'its.its9_s != "DIFFUSE"',
+    'true',
+    'false',
+]
+
+# expressions with conditions the server does not evaluate (count, at and comparisons of two fields),
+# the server sends a superset of the paths satisfying them
+RELAXED_EXPRESSIONS = [
+    'count(its.its0_f > 0.5) >= 2',
+    'at(1, its.its0_f > 0.5)',
+    'not count(its.its0_f > 0.5) >= 2',
+    'path0_f > its.its0_f',
+    'not path0_f > its.its0_f',
+    'pathDepth > 3 and count(its.its1_i > 512) == 1',
+    'its.its0_f < 0.5 or at(2, its.pos.x > 0)',
+]
+
+
+def without_intersections(columns : PixelColumns, mask : np.ndarray) -> PixelColumns:
+    """
+    Returns the paths with the intersections of the paths of the given boolean mask removed,
+    like camera rays which leave the scene these paths have neither intersections nor a final estimate
+    """
+    its_mask = np.repeat(~mask, columns.intersection_count)
+    return PixelColumns(sample_idx=columns.sample_idx,
+                        path_depth=np.where(mask, 0, columns.path_depth).astype(columns.path_depth.dtype),
+                        intersection_count=np.where(mask, 0, columns.intersection_count).astype(
+                            columns.intersection_count.dtype),
+                        path_origin=columns.path_origin,
+                        final_estimate=columns.final_estimate,
+                        has_final_estimate=columns.has_final_estimate & ~mask,
+                        depth_idx=columns.depth_idx[its_mask],
+                        pos=columns.pos[its_mask],
+                        pos_ne=columns.pos_ne[its_mask],
+                        li=columns.li[its_mask],
+                        le=columns.le[its_mask],
+                        flags=columns.flags[its_mask],
+                        path_user_data=columns.path_user_data,
+                        intersection_user_data=[column.select(its_mask) for column in columns.intersection_user_data])
+
+
+def decode_columns(columns : PixelColumns) -> PixelData:
+    """
+    Returns the pixel data of the paths as the client receives them
+    """
+    messages = MessageBuffer()
+    messages.begin(ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_COLUMNS.value)
+    serialize_columns(messages, columns)
+    pixel_data = PixelData()
+    pixel_data.deserialize_columns(BufferStream(bytearray(messages.join(False)[Layout.SHORT.size:])))
+    return pixel_data
+
+
+def compare(text : str, exact : bool, selected : np.ndarray, pixel_data : PixelData,
+            predicate : bytes) -> typing.List[str]:
+    """
+    Compares the paths selected by the server with the evaluation of the decoded predicate and of the expression,
+    returns the found errors
+    """
+    expected = compile_expression(text)(pixel_data)
+    evaluated = evaluate_paths(deserialize_predicate(predicate), pixel_data) if predicate else \
+        np.ones(len(pixel_data.paths), dtype=bool)
+    errors = []
+    if not np.array_equal(selected, evaluated):
+        errors.append('{!r}: {} paths sent, the predicate selects {}'.format(
+            text, int(np.count_nonzero(selected)), int(np.count_nonzero(evaluated))))
+    if np.any(expected & ~evaluated):
+        errors.append('{!r}: the predicate rejects {} paths satisfying the expression'.format(
+            text, int(np.count_nonzero(expected & ~evaluated))))
+    elif exact and not np.array_equal(expected, evaluated):
+        errors.append('{!r}: the predicate selects {} paths, the expression {}'.format(
+            text, int(np.count_nonzero(evaluated)), int(np.count_nonzero(expected))))
+    return errors
+
+
+def check_mock(columns : PixelColumns, expressions : typing.List[typing.Tuple[str, bool]]) -> typing.List[str]:
+    """
+    Filters the paths with the mock server for each expression and compares the sent paths and statistics
+    """
+    pixel_data = decode_columns(columns)
+    errors = []
+    for text, exact in expressions:
+        predicate = serialize_predicate([compile_expression(text).root])
+        if not predicate:
+            errors += compare(text, exact, np.ones(columns.num_paths, dtype=bool), pixel_data, predicate)
+            continue
+        sent, statistics = filter_columns(columns, predicate)
+        selected = np.isin(columns.sample_idx, sent.sample_idx)
+        errors += compare(text, exact, selected, pixel_data, predicate)
+        rejected = ~selected
+        expected_statistics = (columns.num_paths, int(np.count_nonzero(rejected)),
+                               int(columns.intersection_count[rejected].sum()),
+                               int(columns.path_depth[rejected].sum()))
+        if statistics[:4] != expected_statistics or not np.allclose(
+                statistics[4:], columns.final_estimate[rejected & columns.has_final_estimate].sum(axis=0)):
+            errors.append('{!r}: statistics {} do not match the rejected paths'.format(text, statistics))
+    return errors
+
+
+async def check_server(address : str, pixels : typing.List[typing.Tuple[int, int]], sample_count : int,
+                       expressions : typing.List[typing.Tuple[str, bool]]) -> typing.List[str]:
+    """
+    Requests each pixel without and with the predicate of each expression from a running server
+    and compares the received paths and statistics with the local evaluation on the complete pixel data.
+    The server has to render the same paths for repeated requests of a pixel
+    """
+    hostname, port = parse_address(address)
+    errors = []
+    async with AsyncStreamClient(hostname, port) as client:
+        if not client.capabilities & Capability.FILTER_PUSHDOWN:
+            return ['{} does not support filter pushdown'.format(address)]
+        for x, y in pixels:
+            pixel_data = await client.request_render_pixel(x, y, sample_count)
+            sample_idx = pixel_data.paths.sample_idx
+            for text, exact in expressions:
+                predicate = serialize_predicate([compile_expression(text).root])
+                response = await client.request_render_pixel(x, y, sample_count, predicate=predicate)
+                selected = np.isin(sample_idx, response.paths.sample_idx)
+                errors += compare(text, exact, selected, pixel_data, predicate)
+                statistics = response.filter_statistics
+                if predicate and (statistics is None or statistics.total_paths != len(sample_idx) or
+                                  statistics.rejected_paths != len(sample_idx) - len(response.paths)):
+                    errors.append('{!r}: statistics {} do not match the rejected paths'.format(
+                        text, statistics.to_string() if statistics is not None else None))
+        await client.disconnect()
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checks that the predicates of pixel requests select the paths '
+                                                 'satisfying the filter expressions, on synthetic pixels filtered by '
+                                                 'the mock server or on the pixels of a running server.')
+    parser.add_argument('address', nargs='?',
+                        help='address of a running server, hostname:port for TCP or unix:path for a Unix domain '
+                             'socket, the synthetic pixels are checked if not given')
+    parser.add_argument('-e', '--expression', action='append', default=[],
+                        help='expression to check instead of the expressions on the synthetic data, '
+                             'the server may send a superset of the paths satisfying it')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic data')
+    parser.add_argument('--pixels', type=int, default=2, help='number of checked pixels')
+    parser.add_argument('--sample-count', type=int, default=500, help='number of paths per pixel')
+    parser.add_argument('--without-intersections', type=float, default=0.2,
+                        help='fraction of the synthetic paths without intersections')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.expression:
+        expressions = [(text, False) for text in args.expression]
+    else:
+        expressions = [(text, True) for text in EXACT_EXPRESSIONS] + [(text, False) for text in RELAXED_EXPRESSIONS]
+    pixels = [(x, 0) for x in range(args.pixels)]
+    if args.address:
+        errors = asyncio.run(check_server(args.address, pixels, args.sample_count, expressions))
+    else:
+        generator = SyntheticGenerator(seed=args.seed, path_user_data=10, intersection_user_data=10,
+                                       user_data_density=0.7)
+        errors = []
+        for x, y in pixels:
+            columns = generator.pixel(x, y, args.sample_count)
+            rng = np.random.default_rng([args.seed, x, y])
+            errors += check_mock(without_intersections(columns, rng.random(columns.num_paths) <
+                                                       args.without_intersections), expressions)
+    for error in errors:
+        logging.error(error)
+    print('{} errors in {} checked predicates'.format(len(errors), len(expressions) * len(pixels)))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
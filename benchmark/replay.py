@@ -0,0 +1,85 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import collections
+import logging
+import time
+
+from stream.replay_stream import ReplayStream
+from stream.socket_stream_client import SocketStreamClient
+from stream.capture import CaptureReader
+from model.headless_model import HeadlessModel
+from core.messages import ServerMsg, StateMsg
+
+
+def replay(filepath : str, real_time : bool = False, speed : float = 1.0) -> dict:
+    """
+    Replays the captured session through the SocketStreamClient into a HeadlessModel
+    and returns the elapsed time and the number of deserialized data packages by type
+    """
+    counts = collections.Counter()
+    model = HeadlessModel(lambda tpl: counts.update([tpl[0]]))
+    stream = ReplayStream(filepath, real_time, speed)
+    client = SocketStreamClient(stream.hostname, stream.port, stream=stream)
+    client.set_model(model)
+    is_connected, error_msg = client.connect_socket_stream(stream.hostname, stream.port)
+    if not is_connected:
+        raise RuntimeError(error_msg)
+    start = time.perf_counter()
+    # the client thread is run in this thread, it returns at the end of the capture
+    client.run()
+    return {'time': time.perf_counter() - start,
+            'received': stream.position,
+            'counts': counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays a captured session (see the capture_filepath option) '
+                                                 'through the client pipeline without a server.')
+    parser.add_argument('capture', help='capture file')
+    parser.add_argument('-n', '--repetitions', type=int, default=3, help='number of replays')
+    parser.add_argument('--real-time', action='store_true', help='replay with the captured timing')
+    parser.add_argument('--speed', type=float, default=1.0, help='speed factor of real time replays')
+    parser.add_argument('--messages', action='store_true', help='list the captured messages')
+    args = parser.parse_args()
+
+    # the end of the capture is reported as lost connection
+    logging.basicConfig(level=logging.CRITICAL)
+    if args.messages:
+        for timestamp, msg, offset in CaptureReader(args.capture).messages():
+            state = ServerMsg.get_server_msg(msg)
+            print('{:10.4f}s  offset {:12d}  {}'.format(timestamp, offset, state.name if state else msg))
+
+    for i in range(args.repetitions):
+        result = replay(args.capture, args.real_time, args.speed)
+        counts = ', '.join('{} {}'.format(state.name, count) for state, count in sorted(
+            result['counts'].items(), key=lambda item: item[0].value) if state is not StateMsg.CONNECT)
+        print('replay {}: {:7.3f}s  {:8.1f} MB  {:8.1f} MB/s  ({})'.format(
+            i, result['time'], result['received'] / 2**20, result['received'] / 2**20 / result['time'], counts))
+
+
+if __name__ == '__main__':
+    main()
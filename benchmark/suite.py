@@ -0,0 +1,484 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import fnmatch
+import functools
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import typing
+
+import numpy as np
+
+from benchmark.synthetic import SyntheticGenerator, PixelColumns
+from benchmark.mock_server import MessageBuffer, serialize_columns, serialize_rows, serialize_scene
+from stream.stream import Layout
+from stream.buffer_stream import BufferStream
+from stream.client_protocol import ClientProtocol
+from stream.codec import ZlibCodec
+from model.headless_model import HeadlessModel
+from model.pixel_data import PixelData
+from model.contribution_data import SampleContributionData
+from filter.filter import Filter
+from filter.filter_settings import FilterSettings, FilterType
+from detector.detector import Detector
+from core.messages import ServerMsg, Capability
+
+# version of the report format
+REPORT_VERSION = 1
+
+
+class Benchmark(object):
+
+    """
+        Benchmark
+        Measures one step of the client pipeline over several data sizes.
+        The setup function prepares the data of the given size and returns the function which is timed.
+        Functions faster than MIN_TIME are called repeatedly per measurement, the report holds the time per call
+    """
+
+    MIN_TIME = 0.05
+
+    def __init__(self, name : str, setup : typing.Callable[[int], typing.Callable[[], typing.Any]],
+                 sizes : typing.Tuple[int, ...], unit : str, description : str):
+        self._name = name
+        self._setup = setup
+        self._sizes = sizes
+        self._unit = unit
+        self._description = description
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def sizes(self) -> typing.Tuple[int, ...]:
+        """
+        Returns the data sizes the benchmark runs with by default, in the benchmark's unit
+        """
+        return self._sizes
+
+    @property
+    def unit(self) -> str:
+        return self._unit
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    def run(self, size : int, repeat : int) -> dict:
+        """
+        Runs the benchmark with the given data size and returns its entry of the report.
+        Benchmarks whose optional dependencies are not installed are reported as skipped
+        """
+        result = {'name': self._name, 'size': size, 'unit': self._unit}
+        try:
+            func = self._setup(size)
+            # warm up, which also reveals dependencies which are imported lazily
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        except ImportError as e:
+            result.update(status='skipped', reason=str(e))
+            return result
+        number = max(1, min(int(self.MIN_TIME / max(elapsed, 1e-9)), 10000))
+
+        times = []
+        gc_enabled = gc.isenabled()
+        try:
+            for _ in range(repeat):
+                gc.collect()
+                gc.disable()
+                start = time.perf_counter()
+                for _ in range(number):
+                    func()
+                times.append((time.perf_counter() - start) / number)
+                gc.enable()
+        finally:
+            if gc_enabled:
+                gc.enable()
+            else:
+                gc.disable()
+
+        result.update(status='ok',
+                      number=number,
+                      times=times,
+                      min=min(times),
+                      median=statistics.median(times),
+                      mean=statistics.mean(times),
+                      stdev=statistics.stdev(times) if len(times) > 1 else 0.0,
+                      throughput=size / min(times) if min(times) > 0.0 else None)
+        return result
+
+
+# registered benchmarks in the order they are run
+BENCHMARKS = []
+
+
+def benchmark(name : str, sizes : typing.Tuple[int, ...], unit : str = 'samples'):
+    """
+    Registers the decorated setup function as benchmark, its docstring is used as description
+    """
+    def register(setup : typing.Callable[[int], typing.Callable[[], typing.Any]]):
+        BENCHMARKS.append(Benchmark(name, setup, sizes, unit, ' '.join((setup.__doc__ or '').split())))
+        return setup
+    return register
+
+
+""" Synthetic data shared by the benchmarks """
+
+
+@functools.lru_cache(maxsize=None)
+def _generator(mesh_resolution : int = 32, heatmap : bool = False) -> SyntheticGenerator:
+    return SyntheticGenerator(seed=0, num_meshes=4, mesh_resolution=mesh_resolution, heatmap=heatmap,
+                              path_user_data=2, intersection_user_data=4)
+
+
+@functools.lru_cache(maxsize=4)
+def _pixel_columns(samples : int) -> PixelColumns:
+    return _generator().pixel(0, 0, samples)
+
+
+def _message_body(messages : MessageBuffer) -> bytearray:
+    """
+    Returns the body of the single unframed message in the buffer
+    """
+    return bytearray(messages.join(framed=False)[Layout.SHORT.size:])
+
+
+@functools.lru_cache(maxsize=4)
+def _pixel_body(samples : int, rows : bool = False) -> bytearray:
+    messages = MessageBuffer()
+    messages.begin(ServerMsg.EMCA_RESPONSE_RENDER_PIXEL.value)
+    if rows:
+        serialize_rows(messages, _pixel_columns(samples))
+    else:
+        serialize_columns(messages, _pixel_columns(samples))
+    return _message_body(messages)
+
+
+@functools.lru_cache(maxsize=2)
+def _pixel_data(samples : int) -> PixelData:
+    pixel_data = PixelData()
+    pixel_data.deserialize_columns(BufferStream(_pixel_body(samples)))
+    return pixel_data
+
+
+""" Benchmarks """
+
+
+@benchmark('stream_decode', sizes=(1000, 10000, 100000))
+def stream_decode(samples : int):
+    """
+    Decompresses and dispatches a framed, compressed columnar pixel response through the client protocol
+    """
+    capabilities = Capability.COLUMNAR_PIXEL_DATA | Capability.COMPRESSION_ZLIB | Capability.FRAMED_MESSAGES | \
+                   Capability.PIPELINED_PIXEL_REQUESTS
+    protocol = ClientProtocol(HeadlessModel(), lambda tpl: None, lambda data: None)
+    protocol.handle_message(ServerMsg.EMCA_PROTOCOL_ACCEPT.value,
+                            BufferStream(bytearray(Layout.PROTOCOL_ACCEPT.pack(2, int(capabilities)))))
+
+    messages = MessageBuffer()
+    messages.begin(ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_COLUMNS.value)
+    messages.write(Layout.UNSIGNED_INT.pack(1))
+    serialize_columns(messages, _pixel_columns(samples))
+    data = messages.join(framed=True)
+    codec = ZlibCodec()
+    compressed = codec.compress(data)
+    block = bytearray(Layout.COMPRESSED_HEADER.pack(codec.ID, len(data), len(compressed)) + compressed)
+    return lambda: protocol.handle_message(ServerMsg.EMCA_COMPRESSED.value, BufferStream(block))
+
+
+@benchmark('pixel_deserialize_columns', sizes=(1000, 10000, 100000))
+def pixel_deserialize_columns(samples : int):
+    """
+    Deserializes a columnar pixel response (protocol version 2) into PixelData
+    """
+    body = _pixel_body(samples)
+    return lambda: PixelData().deserialize_columns(BufferStream(body))
+
+
+@benchmark('pixel_deserialize_rows', sizes=(100, 1000, 10000))
+def pixel_deserialize_rows(samples : int):
+    """
+    Deserializes a row format pixel response (protocol version 1) into PixelData
+    """
+    body = _pixel_body(samples, rows=True)
+    return lambda: PixelData().deserialize(BufferStream(body))
+
+
+@benchmark('contribution_update', sizes=(1000, 10000, 100000))
+def contribution_update(samples : int):
+    """
+    Updates the sample contribution data (final estimates and depths) from PixelData
+    """
+    pixel_data = _pixel_data(samples)
+    contribution_data = SampleContributionData()
+    return lambda: contribution_data.update_pixel_data(pixel_data)
+
+
+@benchmark('filter_apply', sizes=(100, 1000, 10000))
+def filter_apply(samples : int):
+    """
+    Applies a path user data, an intersection user data and a path depth filter to PixelData
+    """
+    pixel_data = _pixel_data(samples)
+    path_filter = Filter()
+    for idx, (text, filter_type, constraint) in enumerate([
+            ('path0_f', FilterType.SCALAR, ('>0.25',)),
+            ('its2_3f', FilterType.POINT3, ('>0.1', '', '', True)),
+            ('pathDepth', FilterType.SCALAR, ('>=2',))]):
+        path_filter.filter(FilterSettings.from_constraint(idx, text, filter_type, constraint), pixel_data)
+    return lambda: path_filter.apply_filters(pixel_data)
+
+
+def _detector_setup(samples : int, default : bool):
+    contribution_data = SampleContributionData()
+    contribution_data.update_pixel_data(_pixel_data(samples))
+    detector = Detector()
+    detector.update_values(m=2, alpha=0.05, k=10, pre_filter=1.0, is_default=default, is_active=True)
+    return lambda: detector.run_outlier_detection(contribution_data.mean)
+
+
+@benchmark('detector_default', sizes=(1000, 10000, 100000))
+def detector_default(samples : int):
+    """
+    Detects outliers of the mean final estimates with the standard deviation based detector
+    """
+    return _detector_setup(samples, True)
+
+
+@benchmark('detector_esd', sizes=(1000, 10000, 100000))
+def detector_esd(samples : int):
+    """
+    Detects outliers of the mean final estimates with the generalized ESD test (requires scipy)
+    """
+    return _detector_setup(samples, False)
+
+
+def _hdr_image(width : int):
+    """
+    Returns a HDRImage with a synthetic square image loaded from a temporary EXR file
+    """
+    # Qt requires an application to create pixmaps, the offscreen platform does not need a display
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import OpenEXR
+    from PySide2.QtGui import QGuiApplication
+    from core.hdr_image import HDRImage
+    if QGuiApplication.instance() is None:
+        _hdr_image.application = QGuiApplication([])
+
+    rng = np.random.default_rng(0)
+    fd, filepath = tempfile.mkstemp(suffix='.exr')
+    os.close(fd)
+    try:
+        out = OpenEXR.OutputFile(filepath, OpenEXR.Header(width, width))
+        out.writePixels({channel: rng.exponential(0.5, width * width).astype(np.float32).tobytes()
+                         for channel in 'RGB'})
+        out.close()
+        image = HDRImage()
+        image.load_exr(filepath)
+    finally:
+        os.remove(filepath)
+    return image
+
+
+def _tonemap(image) -> typing.Callable[[], typing.Any]:
+    def run():
+        # changing the exposure invalidates the cached pixmap
+        image.exposure = 1.0 - image.exposure
+        if image.pixmap is None:
+            raise RuntimeError('Tonemapping failed')
+    return run
+
+
+@benchmark('hdr_tonemap', sizes=(256, 1024), unit='pixels per side')
+def hdr_tonemap(width : int):
+    """
+    Tonemaps an HDR image to an sRGB pixmap (requires OpenEXR, Pillow and PySide2)
+    """
+    return _tonemap(_hdr_image(width))
+
+
+@benchmark('hdr_falsecolor', sizes=(256, 1024), unit='pixels per side')
+def hdr_falsecolor(width : int):
+    """
+    Tonemaps an HDR image to a false color pixmap (requires OpenEXR, Pillow, matplotlib and PySide2)
+    """
+    image = _hdr_image(width)
+    image.falsecolor = True
+    return _tonemap(image)
+
+
+@benchmark('path_redraw', sizes=(100, 1000), unit='paths')
+def path_redraw(samples : int):
+    """
+    Rebuilds the vtk geometry of all paths of a pixel including next event estimations (requires vtk)
+    """
+    from renderer.path import Path
+    pixel_data = _pixel_data(samples)
+    paths = []
+    for row in range(len(pixel_data.paths)):
+        path = Path(row, pixel_data.path(row))
+        path.visible = True
+        path.show_ne = True
+        paths.append(path)
+
+    def run():
+        for path in paths:
+            path.redraw()
+    return run
+
+
+def _scene_body(mesh_resolution : int) -> bytearray:
+    messages = MessageBuffer()
+    messages.begin(ServerMsg.EMCA_RESPONSE_SCENE.value)
+    serialize_scene(messages, _generator(mesh_resolution).meshes(), False)
+    return _message_body(messages)
+
+
+@benchmark('scene_deserialize', sizes=(64, 256, 1024), unit='rings per mesh')
+def scene_deserialize(mesh_resolution : int):
+    """
+    Deserializes the triangle meshes of a scene response
+    """
+    body = _scene_body(mesh_resolution)
+    model = HeadlessModel()
+    return lambda: model.deserialize_scene_objects(BufferStream(body))
+
+
+@benchmark('mesh_construction', sizes=(64, 256, 1024), unit='rings per mesh')
+def mesh_construction(mesh_resolution : int):
+    """
+    Creates the vtk actors of the deserialized meshes of a scene (requires vtk)
+    """
+    from renderer.mesh import Mesh
+    model = HeadlessModel()
+    model.deserialize_scene_objects(BufferStream(_scene_body(mesh_resolution)))
+    meshes = model.mesh_data.meshes
+    return lambda: [Mesh(mesh_data) for mesh_data in meshes]
+
+
+""" Report """
+
+
+def run_benchmarks(patterns : typing.List[str] = None, repeat : int = 5, quick : bool = False,
+                   progress : typing.Callable[[dict], None] = None) -> dict:
+    """
+    Runs all benchmarks matching one of the name patterns (all if none are given) and returns the report.
+    Quick runs only use the smallest data size of each benchmark
+    """
+    results = []
+    for bench in BENCHMARKS:
+        if patterns and not any(fnmatch.fnmatch(bench.name, pattern) for pattern in patterns):
+            continue
+        for size in bench.sizes[:1] if quick else bench.sizes:
+            result = bench.run(size, repeat)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return {'version': REPORT_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'repeat': repeat,
+            'results': results}
+
+
+def compare_reports(report : dict, baseline : dict, tolerance : float) -> typing.List[dict]:
+    """
+    Compares the minimum times of both reports and returns the benchmarks
+    which are slower than the baseline by more than the given relative tolerance
+    """
+    baseline_times = {(result['name'], result['size']): result['min']
+                      for result in baseline['results'] if result['status'] == 'ok'}
+    regressions = []
+    for result in report['results']:
+        baseline_time = baseline_times.get((result['name'], result['size']), None)
+        if result['status'] != 'ok' or baseline_time is None:
+            continue
+        ratio = result['min'] / baseline_time if baseline_time > 0.0 else float('inf')
+        if ratio > 1.0 + tolerance:
+            regressions.append({'name': result['name'], 'size': result['size'],
+                                'baseline': baseline_time, 'min': result['min'], 'ratio': ratio})
+    return regressions
+
+
+def format_result(result : dict) -> str:
+    label = '{} [{} {}]'.format(result['name'], result['size'], result['unit'])
+    if result['status'] != 'ok':
+        return '{:48} skipped: {}'.format(label, result['reason'])
+    return '{:48} min: {:9.4f}s  median: {:9.4f}s  stdev: {:8.4f}s'.format(
+        label, result['min'], result['median'], result['stdev'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the headless benchmarks of the client pipeline on synthetic '
+                                                 'data and writes a JSON report, optionally compared to a baseline.')
+    parser.add_argument('patterns', nargs='*', help='only run benchmarks matching these names (wildcards allowed)')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of timed runs per benchmark and size')
+    parser.add_argument('-q', '--quick', action='store_true', help='only run the smallest data size')
+    parser.add_argument('-o', '--output', help='file the JSON report is written to')
+    parser.add_argument('-b', '--baseline', help='JSON report of a previous run to compare with')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.2,
+                        help='relative slowdown compared to the baseline which counts as regression')
+    parser.add_argument('-l', '--list', action='store_true', help='list the benchmarks and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for bench in BENCHMARKS:
+            print('{:28} {}'.format(bench.name, bench.description))
+        return
+
+    # the pipeline logs timings of its own, only the results are printed
+    logging.basicConfig(level=logging.WARNING)
+    report = run_benchmarks(args.patterns, args.repeat, args.quick, lambda result: print(format_result(result)))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        for regression in regressions:
+            print('regression: {} [{}] {:.4f}s -> {:.4f}s ({:+.0%})'.format(
+                regression['name'], regression['size'], regression['baseline'], regression['min'],
+                regression['ratio'] - 1.0))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+
+import numpy as np
+
+from model.path_table import IntersectionFlag
+
+
+class SyntheticMesh(object):
+
+    """
+        SyntheticMesh
+        Triangle mesh as the server sends it (vertices, triangle indices and optional face colors)
+    """
+
+    def __init__(self, vertices : np.ndarray, triangles : np.ndarray, face_colors : typing.Optional[np.ndarray],
+                 diffuse_color : typing.Tuple[float, ...], specular_color : typing.Tuple[float, ...]):
+        self.vertices = vertices
+        self.triangles = triangles
+        self.face_colors = face_colors
+        self.diffuse_color = diffuse_color
+        self.specular_color = specular_color
+
+
+class UserDataColumn(object):
+
+    """
+        UserDataColumn
+        Values of one user data key of all paths or intersections of a pixel,
+        rows without a value are marked invalid. String values are given as list.
+    """
+
+    def __init__(self, key : str, type_identifier : str, valid : np.ndarray, values : typing.Union[np.ndarray, list]):
+        self.key = key
+        self.type_identifier = type_identifier
+        self.valid = valid
+        self.values = values
+
+    def slice(self, begin : int, end : int, value_begin : int, value_end : int) -> 'UserDataColumn':
+        return UserDataColumn(self.key, self.type_identifier, self.valid[begin:end], self.values[value_begin:value_end])
+
+    def select(self, mask : np.ndarray) -> 'UserDataColumn':
+        keep = mask[self.valid]
+        if isinstance(self.values, list):
+            return UserDataColumn(self.key, self.type_identifier, self.valid[mask],
+                                  [value for value, k in zip(self.values, keep) if k])
+        return UserDataColumn(self.key, self.type_identifier, self.valid[mask], self.values[keep])
+
+
+class PixelColumns(object):
+
+    """
+        PixelColumns
+        Synthetic paths of one pixel in the columnar layout of the protocol.
+        Paths are stored in the order of their sample index,
+        the intersections of path i are located in [offsets[i], offsets[i+1]).
+    """
+
+    def __init__(self, **columns):
+        self.sample_idx = columns['sample_idx']
+        self.path_depth = columns['path_depth']
+        self.intersection_count = columns['intersection_count']
+        self.path_origin = columns['path_origin']
+        self.final_estimate = columns['final_estimate']
+        self.has_final_estimate = columns['has_final_estimate']
+        self.depth_idx = columns['depth_idx']
+        self.pos = columns['pos']
+        self.pos_ne = columns['pos_ne']
+        self.li = columns['li']
+        self.le = columns['le']
+        self.flags = columns['flags']
+        self.path_user_data = columns['path_user_data']
+        self.intersection_user_data = columns['intersection_user_data']
+        self.offsets = np.zeros(len(self.sample_idx)+1, dtype=np.int64)
+        np.cumsum(self.intersection_count, out=self.offsets[1:])
+
+    @property
+    def num_paths(self) -> int:
+        return len(self.sample_idx)
+
+    @property
+    def num_intersections(self) -> int:
+        return len(self.depth_idx)
+
+    @staticmethod
+    def _slice_user_data(columns : typing.List[UserDataColumn], begin : int, end : int) -> typing.List[UserDataColumn]:
+        result = []
+        for column in columns:
+            value_begin = int(np.count_nonzero(column.valid[:begin]))
+            value_end = value_begin + int(np.count_nonzero(column.valid[begin:end]))
+            result.append(column.slice(begin, end, value_begin, value_end))
+        return result
+
+    def slice(self, begin : int, end : int) -> 'PixelColumns':
+        """
+        Returns the paths [begin, end) with their intersections, used for progressive responses
+        """
+        its_begin, its_end = int(self.offsets[begin]), int(self.offsets[end])
+        return PixelColumns(sample_idx=self.sample_idx[begin:end],
+                            path_depth=self.path_depth[begin:end],
+                            intersection_count=self.intersection_count[begin:end],
+                            path_origin=self.path_origin[begin:end],
+                            final_estimate=self.final_estimate[begin:end],
+                            has_final_estimate=self.has_final_estimate[begin:end],
+                            depth_idx=self.depth_idx[its_begin:its_end],
+                            pos=self.pos[its_begin:its_end],
+                            pos_ne=self.pos_ne[its_begin:its_end],
+                            li=self.li[its_begin:its_end],
+                            le=self.le[its_begin:its_end],
+                            flags=self.flags[its_begin:its_end],
+                            path_user_data=self._slice_user_data(self.path_user_data, begin, end),
+                            intersection_user_data=self._slice_user_data(self.intersection_user_data,
+                                                                         its_begin, its_end))
+
+    def select(self, mask : np.ndarray) -> 'PixelColumns':
+        """
+        Returns the paths of the given boolean mask with their intersections, used for filtered responses
+        """
+        its_mask = np.repeat(mask, self.intersection_count)
+        return PixelColumns(sample_idx=self.sample_idx[mask],
+                            path_depth=self.path_depth[mask],
+                            intersection_count=self.intersection_count[mask],
+                            path_origin=self.path_origin[mask],
+                            final_estimate=self.final_estimate[mask],
+                            has_final_estimate=self.has_final_estimate[mask],
+                            depth_idx=self.depth_idx[its_mask],
+                            pos=self.pos[its_mask],
+                            pos_ne=self.pos_ne[its_mask],
+                            li=self.li[its_mask],
+                            le=self.le[its_mask],
+                            flags=self.flags[its_mask],
+                            path_user_data=[column.select(mask) for column in self.path_user_data],
+                            intersection_user_data=[column.select(its_mask)
+                                                    for column in self.intersection_user_data])
+
+
+# user data types of the protocol with their numpy type and number of components, strings are handled separately
+USER_DATA_TYPES = [('f', np.float32, 1), ('i', np.int32, 1), ('3f', np.float32, 3), ('4f', np.float32, 4),
+                   ('?', np.bool_, 1), ('d', np.float64, 1), ('2i', np.int32, 2), ('2f', np.float32, 2),
+                   ('3i', np.int32, 3), ('s', None, 1)]
+
+# distinct values of synthetic string user data
+USER_DATA_STRINGS = ['diffuse', 'conductor', 'dielectric', 'plastic', 'roughconductor', 'emitter']
+
+
+class SyntheticGenerator(object):
+
+    """
+        SyntheticGenerator
+        Generates a scene and the paths of pixels with configurable sizes in place of a renderer.
+        Data is generated with numpy in the columnar layout, so that pixels with millions of samples are cheap.
+        The paths of a pixel only depend on the seed and the pixel position.
+    """
+
+    def __init__(self,
+                 seed : int = 0,
+                 num_meshes : int = 4,
+                 mesh_resolution : int = 32,
+                 heatmap : bool = False,
+                 max_depth : int = 8,
+                 path_user_data : int = 2,
+                 intersection_user_data : int = 4,
+                 user_data_density : float = 1.0,
+                 sample_count : int = 128):
+        self._seed = seed
+        self._num_meshes = num_meshes
+        self._mesh_resolution = mesh_resolution
+        self._heatmap = heatmap
+        self._max_depth = max_depth
+        self._path_user_data = path_user_data
+        self._intersection_user_data = intersection_user_data
+        self._user_data_density = user_data_density
+        self._sample_count = sample_count
+        self._meshes = None
+
+    @property
+    def renderer_name(self) -> str:
+        return 'synthetic'
+
+    @property
+    def scene_name(self) -> str:
+        return 'synthetic-{}x{}'.format(self._num_meshes, self._mesh_resolution)
+
+    @property
+    def sample_count(self) -> int:
+        return self._sample_count
+
+    @sample_count.setter
+    def sample_count(self, sample_count : int):
+        self._sample_count = sample_count
+
+    @property
+    def has_heatmap(self) -> bool:
+        return self._heatmap
+
+    def camera(self) -> typing.Tuple[tuple, tuple, tuple, float, float, float]:
+        """
+        Returns the camera position, direction, up vector, near and far clip and the field of view
+        """
+        extent = float(self._num_meshes)
+        return (0.0, -3.0 * extent, extent), (0.0, 1.0, -0.3), (0.0, 0.0, 1.0), 0.1, 20.0 * extent, 45.0
+
+    def _sphere(self, center : np.ndarray, radius : float) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns vertices and triangles of a UV sphere with the configured resolution
+        """
+        n = max(self._mesh_resolution, 3)
+        theta, phi = np.meshgrid(np.linspace(0.0, np.pi, n+1), np.linspace(0.0, 2.0 * np.pi, 2*n, endpoint=False),
+                                 indexing='ij')
+        vertices = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], axis=-1)
+        vertices = (vertices.reshape(-1, 3) * radius + center).astype(np.float32)
+        rows, columns = np.meshgrid(np.arange(n), np.arange(2*n), indexing='ij')
+        a = rows * 2*n + columns
+        b = rows * 2*n + (columns + 1) % (2*n)
+        c, d = a + 2*n, b + 2*n
+        triangles = np.concatenate([np.stack([a, c, b], axis=-1).reshape(-1, 3),
+                                    np.stack([b, c, d], axis=-1).reshape(-1, 3)]).astype(np.uint32)
+        return vertices, triangles
+
+    def meshes(self) -> typing.List[SyntheticMesh]:
+        """
+        Returns the meshes of the scene, with face colors if the scene has heatmap data
+        """
+        if self._meshes is None:
+            rng = np.random.default_rng(self._seed)
+            self._meshes = []
+            for i in range(self._num_meshes):
+                center = np.array([2.0 * i - (self._num_meshes - 1), 0.0, 0.0])
+                vertices, triangles = self._sphere(center, 0.8)
+                face_colors = None
+                if self._heatmap:
+                    face_colors = rng.exponential(1.0, (len(triangles), 3)).astype(np.float32)
+                color = tuple(float(v) for v in rng.random(3)) + (1.0,)
+                self._meshes.append(SyntheticMesh(vertices, triangles, face_colors, color, (0.2, 0.2, 0.2, 1.0)))
+        return self._meshes
+
+    def _user_data(self, rng : np.random.Generator, prefix : str, count : int,
+                   num_rows : int) -> typing.List[UserDataColumn]:
+        columns = []
+        for i in range(count):
+            type_identifier, dtype, components = USER_DATA_TYPES[i % len(USER_DATA_TYPES)]
+            if self._user_data_density < 1.0:
+                valid = rng.random(num_rows) < self._user_data_density
+            else:
+                valid = np.ones(num_rows, dtype=bool)
+            num_values = int(np.count_nonzero(valid))
+            shape = (num_values,) if components == 1 else (num_values, components)
+            if dtype is None:
+                indices = rng.integers(0, len(USER_DATA_STRINGS), num_values)
+                values = [USER_DATA_STRINGS[j] for j in indices]
+            elif dtype is np.bool_:
+                values = rng.random(shape) < 0.5
+            elif np.issubdtype(dtype, np.integer):
+                values = rng.integers(0, 1024, shape, dtype=dtype)
+            else:
+                values = rng.random(shape, dtype=np.float64).astype(dtype)
+            columns.append(UserDataColumn('{}{}_{}'.format(prefix, i, type_identifier), type_identifier, valid, values))
+        return columns
+
+    def pixel(self, x : int, y : int, sample_count : int) -> PixelColumns:
+        """
+        Returns the paths of sample_count samples of the given pixel
+        """
+        rng = np.random.default_rng([self._seed, x, y, sample_count])
+        n = sample_count
+        origin = np.array(self.camera()[0], dtype=np.float32)
+
+        intersection_count = rng.integers(1, self._max_depth + 1, n, dtype=np.uint32)
+        offsets = np.zeros(n+1, dtype=np.int64)
+        np.cumsum(intersection_count, out=offsets[1:])
+        m = int(offsets[-1])
+        # intersections of each path are numbered from 1 to the path depth
+        depth_idx = (np.arange(m, dtype=np.int64) - np.repeat(offsets[:-1], intersection_count) + 1).astype(np.uint32)
+
+        extent = float(self._num_meshes)
+        pos = (rng.random((m, 3), dtype=np.float32) - 0.5) * np.float32(2.0 * extent)
+        pos_ne = (rng.random((m, 3), dtype=np.float32) - 0.5) * np.float32(2.0 * extent)
+        li = rng.exponential(0.5, (m, 4)).astype(np.float32)
+        le = np.zeros((m, 4), dtype=np.float32)
+        has_ne = rng.random(m) < 0.8
+        visible_ne = has_ne & (rng.random(m) < 0.5)
+        has_le = rng.random(m) < 0.1
+        le[has_le] = rng.exponential(2.0, (int(np.count_nonzero(has_le)), 4))
+        pos_ne[~has_ne] = 0.0
+        li[:, 3] = 1.0
+        le[has_le, 3] = 1.0
+        flags = np.full(m, int(IntersectionFlag.HAS_POS | IntersectionFlag.HAS_LI), dtype=np.uint8)
+        flags[has_ne] |= np.uint8(IntersectionFlag.HAS_NE)
+        flags[visible_ne] |= np.uint8(IntersectionFlag.VISIBLE_NE)
+        flags[has_le] |= np.uint8(IntersectionFlag.HAS_LE)
+
+        # the final estimate is the estimate of the first intersection
+        final_estimate = li[offsets[:-1]].copy()
+
+        return PixelColumns(sample_idx=np.arange(n, dtype=np.uint32),
+                            path_depth=intersection_count.copy(),
+                            intersection_count=intersection_count,
+                            path_origin=np.repeat(origin[np.newaxis], n, axis=0),
+                            final_estimate=final_estimate,
+                            has_final_estimate=np.ones(n, dtype=bool),
+                            depth_idx=depth_idx,
+                            pos=pos,
+                            pos_ne=pos_ne,
+                            li=li,
+                            le=le,
+                            flags=flags,
+                            path_user_data=self._user_data(rng, 'path', self._path_user_data, n),
+                            intersection_user_data=self._user_data(rng, 'its', self._intersection_user_data, m))
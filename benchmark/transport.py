@@ -0,0 +1,94 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from stream.async_stream_client import AsyncStreamClient
+from model.headless_model import HeadlessModel
+from model.mesh_data import MeshData
+from core.messages import Capability
+
+
+def parse_address(address : str):
+    """
+    Returns hostname and port of an address given as hostname:port or unix:path
+    """
+    if address.startswith('unix:'):
+        return address, 0
+    hostname, _, port = address.rpartition(':')
+    return hostname or 'localhost', int(port)
+
+
+def scene_size(model : HeadlessModel) -> int:
+    """
+    Returns the number of bytes of the vertices and triangle indices of the received scene as sent by the server
+    """
+    size = 0
+    for mesh in model.mesh_data.meshes:
+        if isinstance(mesh, MeshData):
+            size += (mesh.vertex_count + mesh.triangle_count) * 3 * 4
+    return size
+
+
+async def benchmark_scene(address : str, repetitions : int) -> dict:
+    """
+    Requests the scene repeatedly and returns the negotiated capabilities and the measured times
+    """
+    hostname, port = parse_address(address)
+    async with AsyncStreamClient(hostname, port) as client:
+        times = []
+        for i in range(repetitions):
+            start = time.perf_counter()
+            await client.request_scene_data()
+            times.append(time.perf_counter() - start)
+        return {'address': address,
+                'capabilities': client.capabilities,
+                'size': scene_size(client.model),
+                'times': times}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the time to load the scene of a running EMCA server '
+                                                 'via TCP, Unix domain sockets and shared memory.')
+    parser.add_argument('addresses', nargs='+',
+                        help='server addresses, hostname:port for TCP or unix:path for a Unix domain socket')
+    parser.add_argument('-n', '--repetitions', type=int, default=5, help='number of scene requests per server')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    for address in args.addresses:
+        result = asyncio.run(benchmark_scene(address, args.repetitions))
+        shared_memory = bool(result['capabilities'] & Capability.SHARED_MEMORY)
+        best = min(result['times'])
+        print('{:<32} shared memory: {:<5} scene: {:8.1f} MB  best: {:7.3f}s  mean: {:7.3f}s  {:8.1f} MB/s'.format(
+            result['address'], str(shared_memory), result['size'] / 2**20, best,
+            sum(result['times']) / len(result['times']), result['size'] / 2**20 / best))
+
+
+if __name__ == '__main__':
+    main()
@@ -28,6 +28,8 @@ import typing
 from PySide2.QtCore import QObject
 from PySide2.QtCore import Slot
 from core.messages import StateMsg
+from core.profiler import profiler
+from core.memory import memory_budget
 from controller.controller_stream import ControllerSocketStream
 from controller.controller_detector import ControllerDetector
 from controller.controller_filter import ControllerFilter
@@ -73,6 +75,11 @@ class Controller(QObject):
         # initialize plugin buttons
         self._view.view_emca.add_plugins(self._model.plugins_handler.plugins)
 
+        # account the data held by the views and plugins for the memory budget
+        memory_budget.register('render image', lambda: self._view.view_render_image.hdr_image.nbytes)
+        memory_budget.register('plugins', lambda: self._model.plugins_handler.nbytes,
+                               lambda nbytes: self._model.plugins_handler.release_memory())
+
     @property
     def detector(self) -> ControllerDetector:
         """
@@ -113,6 +120,7 @@ class Controller(QObject):
         # set scene renderer to plugins
         self._model.plugins_handler.set_scene_renderer(self._view.view_render_scene.scene_renderer)
         scene_renderer.set_controller(self)
+        memory_budget.register('traced paths', lambda: scene_renderer.nbytes)
 
     @Slot(tuple, name='handle_state_msg')
     def handle_state_msg(self, tpl : typing.Tuple[StateMsg, typing.Any]):
@@ -141,15 +149,27 @@ class Controller(QObject):
             if len(pixel_data.dict_paths) == 0:
                 self._view.view_popup.error_no_sample_idx_set("")
                 return None
-            self._view.view_render_scene.load_traced_paths(pixel_data)
-            self._view.view_filter.init_data(pixel_data)
-            self._view.enable_filter(True)
-            self._view.view_pixel_data.enable_view(True)
-            self._model.plugins_handler.init_data(pixel_data)
-            if self._model.final_estimate_data.update_pixel_data(self._model.pixel_data):
-                self._view.view_rgb_plot.plot_final_estimate(self._model.final_estimate_data)
-                self._view.view_lum_plot.plot_final_estimate(self._model.final_estimate_data)
-                self._view.view_depth_plot.plot_final_estimate(self._model.final_estimate_data)
+            with profiler.span('handle_state_msg DATA_PIXEL', 'controller', paths=len(pixel_data.paths)):
+                with profiler.span('model.enforce_memory_budget', 'model'):
+                    # the actors of the previous paths are replaced anyway, release them before accounting
+                    self._view.view_render_scene.clear_traced_paths()
+                    self._model.enforce_memory_budget()
+                with profiler.span('view_render_scene.load_traced_paths', 'view'):
+                    self._view.view_render_scene.load_traced_paths(pixel_data)
+                with profiler.span('view_filter.init_data', 'view'):
+                    self._view.view_filter.init_data(pixel_data)
+                self._view.enable_filter(True)
+                self._view.view_pixel_data.enable_view(True)
+                self._model.plugins_handler.init_data(pixel_data)
+                with profiler.span('final_estimate_data.update_pixel_data', 'model'):
+                    updated = self._model.final_estimate_data.update_pixel_data(self._model.pixel_data)
+                if updated:
+                    with profiler.span('view_rgb_plot.plot_final_estimate', 'view'):
+                        self._view.view_rgb_plot.plot_final_estimate(self._model.final_estimate_data)
+                    with profiler.span('view_lum_plot.plot_final_estimate', 'view'):
+                        self._view.view_lum_plot.plot_final_estimate(self._model.final_estimate_data)
+                    with profiler.span('view_depth_plot.plot_final_estimate', 'view'):
+                        self._view.view_depth_plot.plot_final_estimate(self._model.final_estimate_data)
             logging.info("process pixel data runtime: {}s".format(time.time() - start))
         elif msg is StateMsg.DATA_NOT_VALID:
             logging.error("Data is not valid!")
@@ -212,22 +232,29 @@ class Controller(QObject):
         """
 
         if add_item:
-            # add item to current indices array and update
-            new_indices = np.unique(np.append(self._model.current_path_indices, indices))
+            # add item to current indices array and update,
+            # the union is built on masks over the path rows which yields the indices in ascending order
+            pixel_data = self._model.pixel_data
+            new_indices = pixel_data.sample_indices(pixel_data.path_mask(self._model.current_path_indices)
+                                                    | pixel_data.path_mask(indices))
         else:
             # just replace the whole indices array
             new_indices = indices
 
         # mark scatter plot
-        self._view.view_rgb_plot.update_path_indices(new_indices)
-        self._view.view_lum_plot.update_path_indices(new_indices)
-        self._view.view_depth_plot.update_path_indices(new_indices)
+        with profiler.span('view_plots.update_path_indices', 'view', paths=len(new_indices)):
+            self._view.view_rgb_plot.update_path_indices(new_indices)
+            self._view.view_lum_plot.update_path_indices(new_indices)
+            self._view.view_depth_plot.update_path_indices(new_indices)
         # draw 3d paths
-        self._view.view_render_scene.update_path_indices(new_indices)
+        with profiler.span('view_render_scene.update_path_indices', 'view', paths=len(new_indices)):
+            self._view.view_render_scene.update_path_indices(new_indices)
         # update all plugins
-        self._model.plugins_handler.update_path_indices(new_indices)
+        with profiler.span('plugins.update_path_indices', 'plugin', paths=len(new_indices)):
+            self._model.plugins_handler.update_path_indices(new_indices)
         # update render data view
-        self._view.view_pixel_data.show_path_data(new_indices, self._model.pixel_data)
+        with profiler.span('view_pixel_data.show_path_data', 'view', paths=len(new_indices)):
+            self._view.view_pixel_data.show_path_data(new_indices, self._model.pixel_data)
         # deselect path if no longer contained in the indices
         if self._model._current_path_index is not None and self._model._current_path_index not in new_indices:
             self.select_path(None)
@@ -292,4 +319,5 @@ class Controller(QObject):
         self._view.view_render_scene.close()
         self._view.view_render_scene_options.close()
         self._view.view_filter.close()
+        self._view.view_diagnostics.close()
         self._view.close()
@@ -26,6 +26,7 @@
 import typing
 
 from filter.filter_settings import FilterSettings
+from filter.filter_expression import FilterExpressionError
 from PySide2.QtCore import Slot
 from core.messages import StateMsg
 import logging
@@ -66,6 +67,16 @@ class ControllerFilter(object):
                 xs = self._model.filter.apply_filters(pixel_data)
                 self._controller_main.update_path(xs, False)
 
+    def pushdown_predicate(self) -> bytes:
+        """
+        Returns the predicate of the enabled filters which the server evaluates before sending the paths of a pixel,
+        empty unless filtering and server side filtering are enabled in the filter view
+        :return: bytes
+        """
+        if not self._view.view_filter.is_active() or not self._view.view_filter.is_server_side():
+            return b''
+        return self._model.filter.pushdown_predicate()
+
     @Slot(bool, name='add_filter')
     def add_filter(self, clicked):
         """
@@ -76,12 +87,17 @@ class ControllerFilter(object):
         idx = self._view.view_filter.stackedWidget.currentIndex()
         if not self._view.view_filter.is_line_edit_empty(idx):
             fs = FilterSettings(self._view.view_filter)
-            self._view.view_filter.add_filter_to_view(fs)
             pixel_data = self._model.pixel_data
-            xs = self._model.filter.filter(fs, pixel_data)
+            try:
+                xs = self._model.filter.filter(fs, pixel_data)
+            except FilterExpressionError as e:
+                logging.error("Invalid filter expression: {}".format(e))
+                self._view.view_popup.error_invalid_filter_expression(str(e))
+                return
             if xs is None:
                 logging.error("Issue with filter ...")
                 return
+            self._view.view_filter.add_filter_to_view(fs)
             self._controller_main.update_path(xs, False)
 
     @Slot(bool, name='apply_filters')
@@ -98,6 +114,16 @@ class ControllerFilter(object):
         else:
             pass
 
+    def toggle_filter(self, idx : int, enabled : bool):
+        """
+        Enables or disables the filter with the given index and updates the filtered render data
+        :param idx: filter index
+        :param enabled: boolean
+        :return:
+        """
+        xs = self._model.filter.toggle_filter(idx, enabled)
+        self._controller_main.update_path(xs, False)
+
     @Slot(bool, name='clear_filter')
     def clear_filter(self, clicked):
         """
@@ -26,7 +26,8 @@
 import typing
 from model.model import Model
 from stream.socket_stream_client import SocketStreamClient
-from core.messages import StateMsg
+from stream.async_stream_bridge import AsyncStreamBridge
+from core.messages import StateMsg, Capability
 from PySide2.QtCore import QPoint, Slot
 import logging
 from view.view_main.pixel_icon import PixelIcon
@@ -55,8 +56,15 @@ class ControllerSocketStream(object):
         # setup socket stream client
         hostname = self._view.view_connect.hostname
         port = self._view.view_connect.port
-        # init socket stream with default values hostname:port
-        self._sstream_client = SocketStreamClient(hostname, port)
+        # init socket stream with default values hostname:port,
+        # the asyncio transport requires a server supporting protocol version 2
+        auto_reconnect = model.options_data.auto_reconnect
+        if model.options_data.asyncio_transport:
+            self._sstream_client = AsyncStreamBridge(hostname, port, auto_reconnect)
+        else:
+            self._sstream_client = SocketStreamClient(hostname, port, auto_reconnect)
+            # sessions are captured for offline replay if a capture file is configured
+            self._sstream_client.set_capture_filepath(model.options_data.capture_filepath)
         self._sstream_client.set_callback(parent.handle_state_msg)
         self._sstream_client.set_model(model)
 
@@ -88,6 +96,8 @@ class ControllerSocketStream(object):
         if self._sstream_client.is_connected():
             logging.info('Requesting Disconnect ...')
             self._sstream_client.request_disconnect()
+        else:
+            self._sstream_client.cancel_reconnect()
 
     def connect_socket_stream(self, hostname : str, port : int) -> bool:
         """
@@ -116,24 +126,30 @@ class ControllerSocketStream(object):
         Requests the render image from the server (sends start render call)
         """
         sample_count = self._model.render_info.sample_count
+        # servers supporting the invalidation hint report if the new image changes the rendered pixels
+        if not self._sstream_client.capabilities & Capability.PIXEL_CACHE_INVALIDATION:
+            self._model.invalidate_pixel_cache()
         self._sstream_client.request_render_image(sample_count)
 
     def request_camera_data(self):
         """
-        Requests the camera data
+        Requests the camera data, unless it is available in the scene cache
         """
-        self._sstream_client.request_camera_data()
+        if not self._model.load_cached_camera():
+            self._sstream_client.request_camera_data()
 
     def request_scene_data(self):
         """
-        Requests the scene data
+        Requests the scene data, unless it is available in the scene cache
         """
-        self._sstream_client.request_scene_data()
+        if not self._model.load_cached_scene():
+            self._sstream_client.request_scene_data()
 
-    def request_render_pixel(self, pixel : QPoint):
+    def request_render_pixel(self, pixel : QPoint, use_cache : bool = False):
         """
         Sends the selected pixel position to the server
-        and requests the render data of this pixel
+        and requests the render data of this pixel.
+        If use_cache is set, recently received pixels are loaded from the pixel cache instead
         """
 
         # check if client is connected, if not inform user
@@ -147,8 +163,16 @@ class ControllerSocketStream(object):
         hdr_image = self._view.view_render_image._graphics_view.hdr_image
         pixel_icon = PixelIcon(hdr_image.get_pixel_color(pixel), pixel)
         sample_count = self._model.render_info.sample_count
+        # servers supporting filter pushdown only send the paths satisfying the enabled filters
+        predicate = b''
+        if self._sstream_client.capabilities & Capability.FILTER_PUSHDOWN:
+            predicate = self._controller_main.filter.pushdown_predicate()
         self._view.view_emca.update_pixel_hist(pixel_icon)
-        self._sstream_client.request_render_pixel(pixel, sample_count)
+        if use_cache and self._model.load_cached_pixel(pixel.x(), pixel.y(), sample_count, predicate):
+            # responses to previous requests would replace the cached pixel
+            self._sstream_client.cancel_render_pixel()
+            return None
+        self._sstream_client.request_render_pixel(pixel, sample_count, predicate=predicate)
 
     def request_plugin(self, plugin_id : int):
         """
@@ -166,3 +190,5 @@ class ControllerSocketStream(object):
         # handle disconnect from server if socket connection is still active
         if self._sstream_client.is_connected():
             self._sstream_client.close()
+        else:
+            self._sstream_client.cancel_reconnect()
@@ -32,6 +32,7 @@ from PySide2.QtCore import QPoint
 from PySide2.QtGui import QColor, QPixmap
 from enum import Enum
 import array
+import io
 import numpy as np
 import matplotlib.pyplot as plt
 import logging
@@ -90,6 +91,20 @@ class HDRImage(object):
             logging.error(e)
             return False
 
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the pixmap and of exr files loaded from memory in bytes
+        """
+        nbytes = 0
+        if self._pixmap is not None:
+            nbytes += self._pixmap.width() * self._pixmap.height() * self._pixmap.depth() // 8
+        if isinstance(self._filepath, io.BytesIO):
+            nbytes += self._filepath.getbuffer().nbytes
+        elif isinstance(self._filepath, bytes):
+            nbytes += len(self._filepath)
+        return nbytes
+
     def is_pixmap_set(self) -> bool:
         return self._pixmap is not None
 
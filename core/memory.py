@@ -0,0 +1,180 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import logging
+import typing
+
+
+def format_size(nbytes : int) -> str:
+    """
+    Returns the given number of bytes as human readable string
+    """
+    size = float(nbytes)
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024.0:
+            return '{:.1f} {}'.format(size, unit)
+        size /= 1024.0
+    return '{:.1f} GiB'.format(size)
+
+
+class MemoryConsumer(object):
+
+    """
+        MemoryConsumer
+        Reports the memory of one data structure and optionally releases it if the budget is exceeded.
+        The release callback is given the number of bytes which should be freed, it may free more
+    """
+
+    def __init__(self, name : str,
+                 nbytes : typing.Callable[[], int],
+                 release : typing.Optional[typing.Callable[[int], None]] = None):
+        self._name = name
+        self._nbytes = nbytes
+        self._release = release
+
+    @property
+    def name(self) -> str:
+        """
+        Returns the name of the data structure
+        """
+        return self._name
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the current memory of the data structure in bytes
+        """
+        try:
+            return int(self._nbytes())
+        except Exception as e:
+            logging.error('Memory accounting of {} failed: {}'.format(self._name, e))
+            return 0
+
+    @property
+    def evictable(self) -> bool:
+        """
+        Returns true if the data can be released (caches which are recreated on demand)
+        """
+        return self._release is not None
+
+    def release(self, nbytes : int):
+        """
+        Releases at least nbytes of the data of the consumer if possible
+        """
+        if self._release is not None:
+            self._release(nbytes)
+
+
+class MemoryBudget(object):
+
+    """
+        MemoryBudget
+        Accounts the memory of the registered data structures (pixel data, scene, images, render actors, plugin caches).
+        Once the total exceeds the budget, the evictable caches are released, largest first, until the data fits.
+        Data which can not be released, e.g. the pixel data, has to be downsampled by its owner.
+    """
+
+    def __init__(self, budget : int = 0):
+        self._budget = budget
+        self._consumers = {}
+
+    @property
+    def budget(self) -> int:
+        """
+        Returns the memory budget in bytes, zero if unlimited
+        """
+        return self._budget
+
+    @budget.setter
+    def budget(self, budget : int):
+        self._budget = max(0, int(budget))
+
+    def register(self, name : str,
+                 nbytes : typing.Callable[[], int],
+                 release : typing.Optional[typing.Callable[[int], None]] = None):
+        """
+        Registers a data structure, nbytes returns its current size and release frees (at least) the given bytes if set.
+        A consumer of the same name is replaced
+        """
+        self._consumers[name] = MemoryConsumer(name, nbytes, release)
+
+    def unregister(self, name : str):
+        """
+        Removes the data structure of the given name from the accounting
+        """
+        self._consumers.pop(name, None)
+
+    def usage(self) -> typing.Dict[str, int]:
+        """
+        Returns a dict {name : bytes} of all registered data structures
+        """
+        return {name: consumer.nbytes for name, consumer in self._consumers.items()}
+
+    def total(self) -> int:
+        """
+        Returns the memory of all registered data structures in bytes
+        """
+        return sum(self.usage().values())
+
+    def exceeded(self) -> int:
+        """
+        Returns the number of bytes by which the budget is exceeded, zero if the data fits or the budget is unlimited
+        """
+        if self._budget <= 0:
+            return 0
+        return max(0, self.total() - self._budget)
+
+    def release(self, required : int = 0) -> int:
+        """
+        Releases evictable data structures, largest first, until the accounted data
+        and the additionally required bytes fit into the budget. Returns the number of released bytes
+        """
+        if self._budget <= 0:
+            return 0
+        usage = self.usage()
+        total = sum(usage.values())
+        released = 0
+        evictable = sorted((consumer for consumer in self._consumers.values() if consumer.evictable),
+                           key=lambda consumer: usage[consumer.name], reverse=True)
+        for consumer in evictable:
+            if total - released + required <= self._budget:
+                break
+            if usage[consumer.name] == 0:
+                continue
+            consumer.release(total - released + required - self._budget)
+            freed = usage[consumer.name] - consumer.nbytes
+            logging.info('Released {} of {}'.format(format_size(freed), consumer.name))
+            released += freed
+        return released
+
+    def to_string(self) -> str:
+        """
+        Returns the memory of all registered data structures as string
+        """
+        return ', '.join('{} = {}'.format(name, format_size(nbytes)) for name, nbytes in self.usage().items())
+
+
+# memory accounting shared by the model, the views and the plugins, the budget is configured in the options
+memory_budget = MemoryBudget()
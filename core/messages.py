@@ -23,7 +23,11 @@
     SOFTWARE.
 """
 
-from enum import Enum
+from enum import Enum, IntFlag
+
+# highest version of the binary protocol supported by this client
+PROTOCOL_VERSION = 2
+
 
 class StateMsg(Enum):
     DISCONNECT          = 0
@@ -47,6 +51,10 @@ class ServerMsg(Enum):
     # connection management (0x000x)
     EMCA_HELLO                 = 0x0001
     EMCA_SUPPORTED_PLUGINS     = 0x0002
+    EMCA_PROTOCOL_OFFER        = 0x0003
+    EMCA_PROTOCOL_ACCEPT       = 0x0004
+    EMCA_COMPRESSED            = 0x0005
+    EMCA_SHARED_MEMORY         = 0x0006
     EMCA_DISCONNECT            = 0x000E
     EMCA_QUIT                  = 0x000F
 
@@ -56,6 +64,7 @@ class ServerMsg(Enum):
     EMCA_REQUEST_RENDER_PIXEL  = 0x0013
     EMCA_REQUEST_CAMERA        = 0x0014
     EMCA_REQUEST_SCENE         = 0x0015
+    EMCA_CANCEL_RENDER_PIXEL   = 0x0016
 
     # responses to the client (0x002x)
     EMCA_RESPONSE_RENDER_INFO  = 0x0021
@@ -63,6 +72,10 @@ class ServerMsg(Enum):
     EMCA_RESPONSE_RENDER_PIXEL = 0x0023
     EMCA_RESPONSE_CAMERA       = 0x0024
     EMCA_RESPONSE_SCENE        = 0x0025
+    EMCA_RESPONSE_RENDER_PIXEL_COLUMNS = 0x0026
+    EMCA_RESPONSE_RENDER_PIXEL_CHUNK   = 0x0027
+    EMCA_INVALIDATE_PIXEL_CACHE        = 0x0028
+    EMCA_RESPONSE_FILTER_STATISTICS    = 0x0029
 
     @staticmethod
     def get_server_msg(flag):
@@ -70,6 +83,10 @@ class ServerMsg(Enum):
             # connection management (0x000x)
             0x0001: ServerMsg.EMCA_HELLO,
             0x0002: ServerMsg.EMCA_SUPPORTED_PLUGINS,
+            0x0003: ServerMsg.EMCA_PROTOCOL_OFFER,
+            0x0004: ServerMsg.EMCA_PROTOCOL_ACCEPT,
+            0x0005: ServerMsg.EMCA_COMPRESSED,
+            0x0006: ServerMsg.EMCA_SHARED_MEMORY,
             0x000E: ServerMsg.EMCA_DISCONNECT,
             0x000F: ServerMsg.EMCA_QUIT,
 
@@ -79,16 +96,35 @@ class ServerMsg(Enum):
             0x0013: ServerMsg.EMCA_REQUEST_RENDER_PIXEL,
             0x0014: ServerMsg.EMCA_REQUEST_CAMERA,
             0x0015: ServerMsg.EMCA_REQUEST_SCENE,
+            0x0016: ServerMsg.EMCA_CANCEL_RENDER_PIXEL,
 
             # responses to the client (0x002x)
             0x0021: ServerMsg.EMCA_RESPONSE_RENDER_INFO,
             0x0022: ServerMsg.EMCA_RESPONSE_RENDER_IMAGE,
             0x0023: ServerMsg.EMCA_RESPONSE_RENDER_PIXEL,
             0x0024: ServerMsg.EMCA_RESPONSE_CAMERA,
-            0x0025: ServerMsg.EMCA_RESPONSE_SCENE
+            0x0025: ServerMsg.EMCA_RESPONSE_SCENE,
+            0x0026: ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_COLUMNS,
+            0x0027: ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_CHUNK,
+            0x0028: ServerMsg.EMCA_INVALIDATE_PIXEL_CACHE,
+            0x0029: ServerMsg.EMCA_RESPONSE_FILTER_STATISTICS
         }.get(flag, None)
 
 
+class Capability(IntFlag):
+    # optional protocol features, negotiated after the handshake (bitmask)
+    NONE                       = 0x0000
+    COLUMNAR_PIXEL_DATA        = 0x0001
+    COMPRESSION_ZLIB           = 0x0002
+    FRAMED_MESSAGES            = 0x0004
+    PIPELINED_PIXEL_REQUESTS   = 0x0008
+    PROGRESSIVE_PIXEL_DATA     = 0x0010
+    SHARED_MEMORY              = 0x0020
+    SCENE_HASH                 = 0x0040
+    PIXEL_CACHE_INVALIDATION   = 0x0080
+    FILTER_PUSHDOWN            = 0x0100
+
+
 class ShapeType(Enum):
     TriangleMesh    = 0
     SphereMesh      = 1
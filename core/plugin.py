@@ -129,6 +129,20 @@ class Plugin(QWidget):
         which will connect this function with the controller
         """
 
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the data the plugin holds in bytes, used for the memory budget.
+        Plugins caching own data should overwrite this function
+        """
+        return 0
+
+    def release_memory(self):
+        """
+        Will be called if the memory budget is exceeded.
+        Plugins caching data which can be recreated on demand should release it here
+        """
+
     @abc.abstractmethod
     def apply_theme(self, theme):
         """
@@ -0,0 +1,228 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+import typing
+
+
+class Span(object):
+
+    """
+        Span
+        Measures the time of one stage of the pipeline from entering until leaving the context
+    """
+
+    __slots__ = ('_profiler', '_name', '_category', '_args', '_start')
+
+    def __init__(self, profiler : 'Profiler', name : str, category : str, args : dict):
+        self._profiler = profiler
+        self._name = name
+        self._category = category
+        self._args = args
+        self._start = 0
+
+    def __enter__(self) -> 'Span':
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._profiler.add_span(self._name, self._category, self._start, time.perf_counter_ns(), **self._args)
+
+
+class _NullSpan(object):
+
+    """
+        Span which measures nothing, used while the profiler is disabled
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class StageStatistics(object):
+
+    """
+        StageStatistics
+        Number of spans and their durations (in seconds) of one stage
+    """
+
+    def __init__(self, name : str, category : str):
+        self.name = name
+        self.category = category
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, duration : float):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.last = duration
+
+
+class Profiler(object):
+
+    """
+        Profiler
+        Collects spans around the stages of the pipeline (sending requests, receiving, decoding, views, plugins)
+        in a ring buffer, which keeps the most recent spans. Spans can be summarized per stage
+        and exported as Chrome trace (chrome://tracing, Perfetto).
+        The profiler is disabled by default, spans are then not measured at all.
+        Spans record the thread they were measured in, so overlapping stages of different threads stay apart.
+    """
+
+    DEFAULT_CAPACITY = 100000
+
+    def __init__(self, capacity : int = DEFAULT_CAPACITY):
+        self._enabled = False
+        # name, category, start, end (perf_counter_ns), thread identifier, arguments
+        self._spans = collections.deque(maxlen=capacity)
+        # start times of spans which begin and end in different places, e.g. a request and its response
+        self._marks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled : bool):
+        self._enabled = enabled
+        if not enabled:
+            self._marks.clear()
+
+    @property
+    def capacity(self) -> int:
+        return self._spans.maxlen
+
+    def span(self, name : str, category : str = '', **args) -> typing.Union[Span, _NullSpan]:
+        """
+        Returns a context manager measuring the enclosed stage, which does nothing while the profiler is disabled
+        """
+        if not self._enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def add_span(self, name : str, category : str, start : int, end : int, **args):
+        """
+        Adds a span measured by the caller, start and end are given in nanoseconds of time.perf_counter_ns
+        """
+        if self._enabled:
+            self._spans.append((name, category, start, end, threading.get_ident(), args))
+
+    @staticmethod
+    def now() -> int:
+        return time.perf_counter_ns()
+
+    def mark(self, key : typing.Hashable):
+        """
+        Remembers the current time as start of a span which is completed by span_since
+        """
+        if self._enabled:
+            with self._lock:
+                self._marks[key] = time.perf_counter_ns()
+
+    def span_since(self, key : typing.Hashable, name : str, category : str = '', **args):
+        """
+        Adds a span from the time of the given mark until now, nothing is added if there is no such mark
+        """
+        if not self._enabled:
+            return
+        with self._lock:
+            start = self._marks.pop(key, None)
+        if start is not None:
+            self.add_span(name, category, start, time.perf_counter_ns(), **args)
+
+    def spans(self) -> typing.List[tuple]:
+        """
+        Returns a copy of the recorded spans, oldest first
+        """
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._marks.clear()
+
+    def statistics(self) -> typing.List[StageStatistics]:
+        """
+        Returns the statistics of all recorded stages in the order of their first span
+        """
+        stages = {}
+        for name, category, start, end, _, _ in self.spans():
+            stage = stages.get(name, None)
+            if stage is None:
+                stage = stages.setdefault(name, StageStatistics(name, category))
+            stage.add((end - start) * 1e-9)
+        return list(stages.values())
+
+    def chrome_trace(self) -> dict:
+        """
+        Returns the recorded spans in the Chrome trace event format (complete events in microseconds)
+        """
+        pid = os.getpid()
+        events = []
+        for name, category, start, end, tid, args in self.spans():
+            event = {'name': name, 'cat': category or 'emca', 'ph': 'X', 'pid': pid, 'tid': tid,
+                     'ts': start / 1000.0, 'dur': (end - start) / 1000.0}
+            if args:
+                event['args'] = args
+            events.append(event)
+        threads = {event['tid'] for event in events}
+        for thread in threading.enumerate():
+            if thread.ident in threads:
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread.ident,
+                               'args': {'name': thread.name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, filepath : str):
+        """
+        Writes the recorded spans as Chrome trace JSON file
+        """
+        with open(filepath, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+# profiler shared by all stages of the client, enabled in the diagnostics view or by the EMCA_PROFILE variable
+profiler = Profiler()
+profiler.enabled = os.environ.get('EMCA_PROFILE', '') not in ('', '0')
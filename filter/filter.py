@@ -23,6 +23,9 @@
     SOFTWARE.
 """
 
+from filter.filter_predicate import FilterPredicate
+from filter.filter_expression import compile_expression
+from filter.filter_pushdown import serialize_predicate, pushdown_condition
 from filter.filter_settings import FilterType
 import logging
 import time
@@ -37,21 +40,41 @@ class Filter(object):
         Filter
         Filters the Render data set depending on user added data.
         (bool, float, point2i, point2f, point3i, point3f, color4f)
-        All paths which satisfy the constraints will be displayed
+        All paths which satisfy the constraints of all enabled filters will be displayed.
+        Each filter is compiled into a FilterPredicate or FilterExpression which is evaluated over whole columns.
+        The paths satisfying a filter are kept as boolean mask aligned with the rows of the path table,
+        for each path the number of enabled filters it does not satisfy is counted.
+        Adding, deleting and toggling a filter only updates these counts.
     """
 
     def __init__(self):
+        # filter index -> (filter settings, compiled predicate, path mask)
         self._filters = {}
-        self._paths = set()
+        self._disabled = set()
+        # number of enabled filters each path does not satisfy
+        self._rejected = np.zeros(0, dtype=np.int32)
+        self._pixel_data = None
+        self._generation = None
 
     def path_indices(self):
         """
-        Returns a numpy array containing all paths indices which satisfy the filter constraints
+        Returns a numpy array containing all paths indices which satisfy the filter constraints,
+        the indices are sorted without sorting them again
         :return:
         """
-        xs = np.array(list(self._paths), dtype=np.int32)
-        xs.sort()
-        return xs
+        if self._pixel_data is None or len(self._filters) == len(self._disabled):
+            return np.zeros(0, dtype=np.int64)
+        return self._pixel_data.sample_indices(self._rejected == 0)
+
+    def path_mask(self):
+        """
+        Returns a boolean numpy array over the path rows of the filtered pixel data,
+        which is set for all paths satisfying the filter constraints
+        :return:
+        """
+        if len(self._filters) == len(self._disabled):
+            return np.zeros(len(self._rejected), dtype=bool)
+        return self._rejected == 0
 
     def clear_all(self):
         """
@@ -59,7 +82,10 @@ class Filter(object):
         :return:
         """
         self._filters.clear()
-        self._paths.clear()
+        self._disabled.clear()
+        self._rejected = np.zeros(0, dtype=np.int32)
+        self._pixel_data = None
+        self._generation = None
 
     def delete_filter(self, index):
         """
@@ -69,209 +95,89 @@ class Filter(object):
         :param index: row index of QListWidget
         :return: numpy array with path indices
         """
-        del self._filters[index]
-        self._paths.clear()
-        for f_key, f in self._filters.items():
-            self._paths |= f[1]
+        filter_settings, predicate, mask = self._filters.pop(index)
+        if index in self._disabled:
+            self._disabled.remove(index)
+        else:
+            self._rejected -= ~mask
         return self.path_indices()
 
-    def apply_filters(self, pixel_data : PixelData):
+    def toggle_filter(self, index, enabled : bool):
         """
-        Applies all active filters to a new Render data set.
+        Enables or disables a filter without deleting it.
         Returns a numpy array containing all path indices which satisfy the filter constraints
-        :param pixel_data:
+        :param index: row index of QListWidget
+        :param enabled: boolean
         :return: numpy array with path indices
         """
-        # apply filters to new data and update sets of path ids
-        self._paths.clear()
-        if len(self._filters) > 0:
-            for key, f in self._filters.items():
-                self.filter(f[0], pixel_data)
+        if index in self._filters and enabled == (index in self._disabled):
+            mask = self._filters[index][2]
+            if enabled:
+                self._disabled.remove(index)
+                self._rejected += ~mask
+            else:
+                self._disabled.add(index)
+                self._rejected -= ~mask
         return self.path_indices()
 
-    def filter(self, filter_settings, pixel_data : PixelData):
+    def apply_filters(self, pixel_data : PixelData):
         """
-        Applies a filter item with filter_settings to the Render data
+        Applies all active filters to a new Render data set.
+        The compiled predicates of the filters are reused, only their evaluation is repeated.
         Returns a numpy array containing all path indices which satisfy the filter constraints
-        :param filter_settings:
         :param pixel_data:
         :return: numpy array with path indices
         """
         start = time.time()
-        xs = set()
-        search_key = filter_settings.get_text()
-
-        if search_key == "sampleIndex":
-            for path_key, path in pixel_data.dict_paths.items():
-                if self.compare(path.sample_idx, filter_settings):
-                    xs.add(path_key)
-        elif search_key == "pathDepth":
-            for path_key, path in pixel_data.dict_paths.items():
-                if self.compare(path.path_depth, filter_settings):
-                    xs.add(path_key)
-        elif search_key == "finalEstimate":
-            for path_key, path in pixel_data.dict_paths.items():
-                if self.compare(path.final_estimate, filter_settings):
-                    xs.add(path_key)
-        else:
-            for path_key, path in pixel_data.dict_paths.items():
-                entry = path.data.get(search_key, None)
-                if entry:
-                    if self.compare(entry, filter_settings):
-                        xs.add(path_key)
-                for its_key, its in path.intersections.items():
-                    entry = its.data.get(search_key, None)
-                    if entry:
-                        if self.compare(entry, filter_settings):
-                            xs.add(path_key)
-
-        # add filter and its set of keys,
-        # has to be updated if new pixel data is requested
-        self._filters[filter_settings.get_idx()] = (filter_settings, xs)
-        if len(self._paths) > 0:
-            self._paths &= xs
-        else:
-            self._paths |= xs
-        logging.info('filtered items in: {}s'.format(time.time() - start))
+        self._pixel_data = pixel_data
+        self._generation = pixel_data.generation
+        self._rejected = np.zeros(len(pixel_data.paths), dtype=np.int32)
+        for index, (filter_settings, predicate, mask) in self._filters.items():
+            mask = predicate(pixel_data)
+            self._filters[index] = (filter_settings, predicate, mask)
+            if index not in self._disabled:
+                self._rejected += ~mask
+        logging.info('applied filters in: {}s'.format(time.time() - start))
         return self.path_indices()
 
-    def compare(self, entry, filter_settings):
+    def filter(self, filter_settings, pixel_data : PixelData):
         """
-        Compares the render data value and data type with the user entered value.
-        Returns true if the render data entry value satisfy the user entered value.
-        :param entry: render data value
+        Applies a filter item with filter_settings to the Render data
+        Returns a numpy array containing all path indices which satisfy the filter constraints.
+        Raises a FilterExpressionError if the filter expression can not be parsed
         :param filter_settings:
-        :return: true or false
-        """
-
-        f_type = filter_settings.get_type()
-        expr = filter_settings.get_expr()
-        value = filter_settings.get_value()
-        if f_type is FilterType.SCALAR:
-            if isinstance(value, str):
-                return self.compare_value(entry, expr, value, True)
-            return self.compare_value(entry, expr, value)
-        elif f_type is FilterType.POINT2:
-            return self.compare_point2(entry,
-                                       expr[0], expr[1],
-                                       value[0], value[1])
-        elif f_type is FilterType.POINT3:
-            return self.compare_point3(entry,
-                                       expr[0], expr[1], expr[2],
-                                       value[0], value[1], value[2])
-        elif f_type is FilterType.COLOR3:
-            return self.compare_color(entry,
-                                      expr[0], expr[1], expr[2],
-                                      value[0], value[1], value[2])
-
-    @staticmethod
-    def compare_value(val1, expr, val2, is_string=False):
-        """
-        Checks which compare expression is used and compares depending on the expression the values
-        Returns true if val1 satisfy the entered expression
-        :param val1: value left
-        :param expr: expression
-        :param val2: value right
-        :param is_string set if value is a string
-        :return: true or false
+        :param pixel_data:
+        :return: numpy array with path indices
         """
-        if is_string:
-            if expr == "==":
-                return str(val1).lower() == str(val2).lower()
-            elif expr == "!=":
-                return str(val1).lower() != str(val2).lower()
+        if filter_settings.get_type() is FilterType.EXPRESSION:
+            predicate = compile_expression(filter_settings.get_constraint()[0])
         else:
-            if expr == '>':
-                return val1 > val2
-            elif expr == '<':
-                return val1 < val2
-            elif expr == '==':
-                return val1 == val2
-            elif expr == '>=':
-                return val1 >= val2
-            elif expr == '<=':
-                return val1 <= val2
-            elif expr == '!=':
-                return val1 != val2
-        return False
-
-    def compare_point2(self, point2, expr_x, expr_y, x, y):
-        """
-        Compares a point2 with given expressions expr_x, expr_y and two values x and y.
-        Returns true if the values of point2 satisfy x and y
-        :param point2: point2
-        :param expr_x: Expression for point.x
-        :param expr_y: Expression for point.y
-        :param x:
-        :param y:
-        :return: true or false
-        """
-        x_val = True
-        y_val = True
-
-        if expr_x != "":
-            x_val = self.compare_value(point2.x, expr_x, x)
-
-        if expr_y != "":
-            y_val = self.compare_value(point2.y, expr_y, y)
-
-        return x_val and y_val
-
-    def compare_point3(self, point3, expr_x, expr_y, expr_z, x, y, z):
-        """
-        Compares a point3 with given expressions expr_x, expr_y, expr_z and three values x, y and z
-        Returns true if the values of point3 satisfy x,y and z
-        :param point3: point3
-        :param expr_x: Expression for point.x
-        :param expr_y: Expression for point.y
-        :param expr_z: Expression for point.z
-        :param x:
-        :param y:
-        :param z:
-        :return: true or false
-        """
-        x_val = True
-        y_val = True
-        z_val = True
-
-        if expr_x != "":
-            x_val = self.compare_value(point3.x, expr_x, x)
+            predicate = FilterPredicate(filter_settings)
 
-        if expr_y != "":
-            y_val = self.compare_value(point3.y, expr_y, y)
+        # masks of other data are outdated
+        if pixel_data is not self._pixel_data or pixel_data.generation != self._generation:
+            self.apply_filters(pixel_data)
 
-        if expr_z != "":
-            y_val = self.compare_value(point3.z, expr_z, z)
-
-        return x_val and y_val and z_val
+        start = time.time()
+        index = filter_settings.get_idx()
+        if index in self._filters:
+            self.delete_filter(index)
+        mask = predicate(pixel_data)
+        self._filters[index] = (filter_settings, predicate, mask)
+        self._rejected += ~mask
+        logging.info('filtered items in: {}s'.format(time.time() - start))
+        return self.path_indices()
 
-    def compare_color(self, color, expr_r, expr_g, expr_b, r, g, b):
+    def pushdown_predicate(self) -> bytes:
         """
-        Compares a color class with given expressions and compare values.
-        Returns true of the color type satisfy all values (r,g,b).
-        :param color: colo3f
-        :param expr_r:
-        :param expr_g:
-        :param expr_b:
-        :param r: red
-        :param g: green
-        :param b: blue
-        :return: true or false
+        Returns the serialized predicate of all enabled filters, which the server evaluates before sending the paths.
+        Filters the server can not evaluate are left out, the received paths are filtered by the client as well.
+        Empty if the server has to send all paths
+        :return: bytes
         """
-        red = True
-        green = True
-        blue = True
-
-        if expr_r != "":
-            red = self.compare_value(color.red, expr_r, r)
-
-        if expr_g != "":
-            green = self.compare_value(color.green, expr_g, g)
-
-        if expr_b != "":
-            blue = self.compare_value(color.blue, expr_b, b)
-
-        return red and green and blue
+        conditions = [pushdown_condition(filter_settings) for index, (filter_settings, predicate, mask)
+                      in self._filters.items() if index not in self._disabled]
+        return serialize_predicate([condition for condition in conditions if condition is not None])
 
     def to_string(self):
         """
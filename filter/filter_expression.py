@@ -0,0 +1,832 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import re
+import typing
+import functools
+import numpy as np
+
+from core.point import Point2f, Point2i, Point3f, Point3i
+from core.color import Color4f
+from filter.filter_settings import FilterSettings, FilterType
+from model.pixel_data import PixelData
+
+
+class FilterExpressionError(Exception):
+
+    """
+        FilterExpressionError
+        Raised if a filter expression can not be parsed
+    """
+
+
+# maps the entered compare expression onto the numpy comparison
+COMPARE_OPERATORS = {
+    '>':    np.greater,
+    '<':    np.less,
+    '==':   np.equal,
+    '>=':   np.greater_equal,
+    '<=':   np.less_equal,
+    '!=':   np.not_equal,
+}
+
+# component names of the point and color types in the order they are stored in a column
+WRAPPER_COMPONENTS = {
+    Point2f:    ('x', 'y'),
+    Point2i:    ('x', 'y'),
+    Point3f:    ('x', 'y', 'z'),
+    Point3i:    ('x', 'y', 'z'),
+    Color4f:    ('red', 'green', 'blue', 'alpha'),
+}
+
+# component names compared by the point and color filters
+FILTER_COMPONENTS = {
+    FilterType.POINT2:  ('x', 'y'),
+    FilterType.POINT3:  ('x', 'y', 'z'),
+    FilterType.COLOR3:  ('red', 'green', 'blue'),
+}
+
+# level of an operand, values either belong to the paths or to the intersections of the paths
+PATH = 0
+INTERSECTION = 1
+
+# short names of the color components
+COMPONENT_ALIASES = {'r': 'red', 'g': 'green', 'b': 'blue', 'a': 'alpha'}
+
+# fields of the path and intersection tables as (values, validity mask or None, component names)
+PATH_FIELDS = {
+    'sampleIndex':      lambda data: (data.paths.sample_idx, None, ()),
+    'pathDepth':        lambda data: (data.paths.path_depth, None, ()),
+    'pathOrigin':       lambda data: (data.paths.path_origin, None, WRAPPER_COMPONENTS[Point3f]),
+    'finalEstimate':    lambda data: (data.paths.final_estimate, data.paths.has_final_estimate,
+                                      WRAPPER_COMPONENTS[Color4f]),
+}
+
+INTERSECTION_FIELDS = {
+    'depthIdx':         lambda data: (data.intersections.depth_idx, None, ()),
+    'pos':              lambda data: (data.intersections.pos, data.intersections.has_pos,
+                                      WRAPPER_COMPONENTS[Point3f]),
+    'posNE':            lambda data: (data.intersections.pos_ne, data.intersections.has_ne,
+                                      WRAPPER_COMPONENTS[Point3f]),
+    'visibleNE':        lambda data: (data.intersections.visible_ne, data.intersections.has_ne, ()),
+    'li':               lambda data: (data.intersections.li, data.intersections.has_li,
+                                      WRAPPER_COMPONENTS[Color4f]),
+    'le':               lambda data: (data.intersections.le, data.intersections.has_le,
+                                      WRAPPER_COMPONENTS[Color4f]),
+}
+
+# operator with swapped operands, used if the literal is on the left side
+FLIPPED_OPERATORS = {'>': '<', '<': '>', '>=': '<=', '<=': '>=', '==': '==', '!=': '!='}
+
+TOKEN_REGEX = re.compile(r'''
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op>==|!=|<=|>=|<|>|=|\(|\)|\[|\]|,|\.|-)
+    )''', re.VERBOSE)
+
+KEYWORDS = ('and', 'or', 'not', 'true', 'false')
+
+
+class EvaluationContext(object):
+
+    """
+        EvaluationContext
+        Pixel data an expression is evaluated on, the CSR helpers are computed once per evaluation
+    """
+
+    def __init__(self, pixel_data : PixelData):
+        self._pixel_data = pixel_data
+        self._path_rows = None
+
+    @property
+    def pixel_data(self) -> PixelData:
+        return self._pixel_data
+
+    @property
+    def num_paths(self) -> int:
+        return len(self._pixel_data.paths)
+
+    @property
+    def num_intersections(self) -> int:
+        return len(self._pixel_data.intersections)
+
+    @property
+    def path_rows(self) -> np.ndarray:
+        """
+        Returns the path row of each intersection
+        """
+        if self._path_rows is None:
+            self._path_rows = self._pixel_data.intersections.path_rows
+        return self._path_rows
+
+    def num_rows(self, level : int) -> int:
+        return self.num_paths if level == PATH else self.num_intersections
+
+
+class Operand(object):
+
+    """
+        Operand
+        Values of one operand over all paths or intersections.
+        A user data key may have been sent with different types, each of its columns is one part (values, valid, components).
+        The component names of points and colors are kept if a single component is selected.
+        Boolean results are operands with a single boolean part
+    """
+
+    def __init__(self, level : int, parts : typing.List[typing.Tuple[np.ndarray, np.ndarray, tuple]]):
+        self._level = level
+        self._parts = parts
+
+    @staticmethod
+    def from_mask(level : int, mask : np.ndarray) -> 'Operand':
+        return Operand(level, [(mask, np.ones(len(mask), dtype=bool), ())])
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    @property
+    def parts(self) -> typing.List[typing.Tuple[np.ndarray, np.ndarray, tuple]]:
+        return self._parts
+
+    def to_level(self, level : int, context : EvaluationContext) -> 'Operand':
+        """
+        Returns the operand on the given level, path values are repeated for each intersection of the path
+        """
+        if level == self._level:
+            return self
+        if level == PATH:
+            raise FilterExpressionError('intersection values have to be quantified with any, all, count or at')
+        path_rows = context.path_rows
+        return Operand(INTERSECTION, [(values[path_rows], valid[path_rows], components)
+                                      for values, valid, components in self._parts])
+
+    def valid(self, context : EvaluationContext) -> np.ndarray:
+        """
+        Returns a mask of all rows having a value
+        """
+        mask = np.zeros(context.num_rows(self._level), dtype=bool)
+        for values, valid, components in self._parts:
+            mask |= valid
+        return mask
+
+    def mask(self, context : EvaluationContext) -> np.ndarray:
+        """
+        Returns the truth value of each row, numbers are true if they are non-zero, strings if they are not empty
+        """
+        mask = np.zeros(context.num_rows(self._level), dtype=bool)
+        for values, valid, components in self._parts:
+            if values.dtype == object:
+                truth = np.array([bool(value) for value in values], dtype=bool)
+            elif values.ndim > 1:
+                truth = np.any(values != 0, axis=1)
+            else:
+                truth = values != 0
+            mask |= truth & valid
+        return mask
+
+
+def compare_literal(values : np.ndarray, valid : np.ndarray, components : tuple, operator, value) -> np.ndarray:
+    """
+    Returns a boolean numpy array which is set for all valid rows of a column satisfying the comparison with a literal
+    """
+    if isinstance(value, str) or values.dtype == object:
+        if not isinstance(value, str) or values.dtype != object:
+            # strings only differ from numbers
+            return valid.copy() if operator is np.not_equal else np.zeros(len(valid), dtype=bool)
+        # strings are compared case-insensitive, each distinct string only once
+        mask = np.zeros(len(valid), dtype=bool)
+        distinct, inverse = np.unique(values[valid], return_inverse=True)
+        matches = np.array([operator(str(v).lower(), value.lower()) for v in distinct], dtype=bool)
+        mask[valid] = matches[inverse.reshape(-1)]
+        return mask
+    if len(components) > 0:
+        # point and color components are compared with their own precision,
+        # all components have to satisfy the constraint
+        result = operator(values, value)
+        return (np.all(result, axis=1) if result.ndim > 1 else result) & valid
+    # scalars are compared as python numbers
+    return operator(values.astype(np.float64), value) & valid
+
+
+class Node(object):
+
+    """
+        Node
+        Node of the abstract syntax tree of a filter expression
+    """
+
+    def evaluate(self, context : EvaluationContext) -> typing.Any:
+        raise NotImplementedError()
+
+    def mask(self, context : EvaluationContext) -> Operand:
+        """
+        Evaluates the node as condition
+        """
+        value = self.evaluate(context)
+        if isinstance(value, Operand):
+            return Operand.from_mask(value.level, value.mask(context))
+        return Operand.from_mask(PATH, np.full(context.num_paths, bool(value)))
+
+
+class Literal(Node):
+
+    def __init__(self, value : typing.Union[bool, float, str]):
+        self._value = value
+
+    @property
+    def value(self) -> typing.Union[bool, float, str]:
+        return self._value
+
+    def evaluate(self, context : EvaluationContext) -> typing.Union[bool, float, str]:
+        return self._value
+
+
+class Field(Node):
+
+    """
+        Field
+        Path or intersection field or user data key, optionally restricted to one component of points and colors
+    """
+
+    def __init__(self, level : int, key : str, component : typing.Optional[str] = None):
+        self._level = level
+        self._key = key
+        self._component = COMPONENT_ALIASES.get(component, component)
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def component(self) -> typing.Optional[str]:
+        return self._component
+
+    def evaluate(self, context : EvaluationContext) -> Operand:
+        data = context.pixel_data
+        fields = PATH_FIELDS if self._level == PATH else INTERSECTION_FIELDS
+        table = data.path_user_data if self._level == PATH else data.intersection_user_data
+        if self._key in fields:
+            values, valid, components = fields[self._key](data)
+            if valid is None:
+                valid = np.ones(len(values), dtype=bool)
+            parts = [(values, valid, components)]
+        else:
+            parts = [(column.values, column.valid, WRAPPER_COMPONENTS.get(column.type.wrapper, ()))
+                     for column in table.columns_of(self._key)]
+
+        if self._component is not None:
+            # parts without the component do not have a value
+            parts = [(values[:, components.index(self._component)], valid, (self._component,))
+                     for values, valid, components in parts if self._component in components]
+        return Operand(self._level, parts)
+
+    def compare(self, context : EvaluationContext, expr : str, value : typing.Union[bool, float]) -> typing.Optional[Operand]:
+        """
+        Compares the user data of the field with a number using the user data index of the pixel.
+        Returns None for table fields and point or color components, which are compared by evaluating the field
+        """
+        fields = PATH_FIELDS if self._level == PATH else INTERSECTION_FIELDS
+        if self._key in fields or self._component is not None:
+            return None
+        data = context.pixel_data
+        table = data.path_user_data if self._level == PATH else data.intersection_user_data
+        index = data.user_data_index
+        mask = np.zeros(context.num_rows(self._level), dtype=bool)
+        if index.entry(self._key) is None:
+            return Operand.from_mask(self._level, mask)
+        for column in table.columns_of(self._key):
+            sorted_column = index.sorted_column(column) if index.is_sortable(column) else None
+            if sorted_column is not None:
+                mask |= sorted_column.mask(expr, value)
+            else:
+                mask |= compare_literal(column.values, column.valid, WRAPPER_COMPONENTS.get(column.type.wrapper, ()),
+                                        COMPARE_OPERATORS[expr], value)
+        return Operand.from_mask(self._level, mask)
+
+
+class Compare(Node):
+
+    """
+        Compare
+        Compares an operand with a literal or with another operand
+    """
+
+    def __init__(self, left : Node, expr : str, right : Node):
+        literals = [node.value for node in (left, right) if isinstance(node, Literal)]
+        if any(isinstance(value, str) for value in literals) and expr not in ('==', '!='):
+            raise FilterExpressionError('strings can only be compared with == and !=')
+        if len(literals) == 2 and isinstance(literals[0], str) != isinstance(literals[1], str):
+            raise FilterExpressionError('strings can not be compared with numbers')
+        if isinstance(left, Literal) and not isinstance(right, Literal):
+            left, right, expr = right, left, FLIPPED_OPERATORS[expr]
+        self._left = left
+        self._expr = expr
+        self._right = right
+
+    @property
+    def left(self) -> Node:
+        return self._left
+
+    @property
+    def expr(self) -> str:
+        return self._expr
+
+    @property
+    def right(self) -> Node:
+        return self._right
+
+    def evaluate(self, context : EvaluationContext) -> Operand:
+        if isinstance(self._left, Field) and isinstance(self._right, Literal) and not isinstance(self._right.value, str):
+            operand = self._left.compare(context, self._expr, self._right.value)
+            if operand is not None:
+                return operand
+
+        operator = COMPARE_OPERATORS[self._expr]
+        left = self._left.evaluate(context)
+        right = self._right.evaluate(context)
+
+        if not isinstance(left, Operand):
+            if isinstance(left, str):
+                # strings are compared case-insensitive like string values
+                left, right = left.lower(), right.lower()
+            return Operand.from_mask(PATH, np.full(context.num_paths, bool(operator(left, right))))
+
+        if not isinstance(right, Operand):
+            mask = np.zeros(context.num_rows(left.level), dtype=bool)
+            for values, valid, components in left.parts:
+                mask |= compare_literal(values, valid, components, operator, right)
+            return Operand.from_mask(left.level, mask)
+
+        level = max(left.level, right.level)
+        left = left.to_level(level, context)
+        right = right.to_level(level, context)
+        mask = np.zeros(context.num_rows(level), dtype=bool)
+        for values_l, valid_l, components_l in left.parts:
+            for values_r, valid_r, components_r in right.parts:
+                if values_l.dtype == object or values_r.dtype == object or values_l.ndim != values_r.ndim \
+                        or values_l.shape[1:] != values_r.shape[1:]:
+                    continue
+                result = operator(values_l, values_r)
+                if result.ndim > 1:
+                    result = np.all(result, axis=1)
+                mask |= result & valid_l & valid_r
+        return Operand.from_mask(level, mask)
+
+
+class And(Node):
+
+    def __init__(self, nodes : typing.List[Node]):
+        self._nodes = nodes
+
+    @property
+    def nodes(self) -> typing.List[Node]:
+        return self._nodes
+
+    def evaluate(self, context : EvaluationContext) -> Operand:
+        operands = [node.mask(context) for node in self._nodes]
+        level = max(operand.level for operand in operands)
+        mask = np.ones(context.num_rows(level), dtype=bool)
+        for operand in operands:
+            mask &= operand.to_level(level, context).parts[0][0]
+        return Operand.from_mask(level, mask)
+
+
+class Or(Node):
+
+    def __init__(self, nodes : typing.List[Node]):
+        self._nodes = nodes
+
+    @property
+    def nodes(self) -> typing.List[Node]:
+        return self._nodes
+
+    def evaluate(self, context : EvaluationContext) -> Operand:
+        operands = [node.mask(context) for node in self._nodes]
+        level = max(operand.level for operand in operands)
+        mask = np.zeros(context.num_rows(level), dtype=bool)
+        for operand in operands:
+            mask |= operand.to_level(level, context).parts[0][0]
+        return Operand.from_mask(level, mask)
+
+
+class Not(Node):
+
+    def __init__(self, node : Node):
+        self._node = node
+
+    @property
+    def node(self) -> Node:
+        return self._node
+
+    def evaluate(self, context : EvaluationContext) -> Operand:
+        operand = self._node.mask(context)
+        return Operand.from_mask(operand.level, ~operand.parts[0][0])
+
+
+class Quantifier(Node):
+
+    """
+        Quantifier
+        Reduces the intersections of each path to one path value:
+        any(cond), all(cond), count(cond), at(depth, value) and has(field)
+    """
+
+    def __init__(self, name : str, node : Node, depth : typing.Optional[int] = None):
+        self._name = name
+        self._node = node
+        self._depth = depth
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def node(self) -> Node:
+        return self._node
+
+    def evaluate(self, context : EvaluationContext) -> Operand:
+        if self._name == 'has':
+            operand = self._node.evaluate(context)
+            return Operand.from_mask(operand.level, operand.valid(context))
+        if self._name == 'at':
+            return self._evaluate_at(context)
+
+        operand = self._node.mask(context)
+        mask = operand.parts[0][0]
+        if operand.level == PATH:
+            if self._name == 'count':
+                return Operand(PATH, [(mask.astype(np.int64), np.ones(len(mask), dtype=bool), ())])
+            return operand
+
+        count = np.bincount(context.path_rows[mask], minlength=context.num_paths)
+        if self._name == 'any':
+            return Operand.from_mask(PATH, count > 0)
+        elif self._name == 'all':
+            # paths without intersections satisfy all()
+            return Operand.from_mask(PATH, count == context.pixel_data.intersections.counts)
+        return Operand(PATH, [(count, np.ones(len(count), dtype=bool), ())])
+
+    def _evaluate_at(self, context : EvaluationContext) -> Operand:
+        operand = self._node.evaluate(context)
+        if not isinstance(operand, Operand):
+            return self._node.mask(context)
+        if operand.level == PATH:
+            return operand
+        rows = np.flatnonzero(context.pixel_data.intersections.depth_idx == self._depth)
+        path_rows = context.path_rows[rows]
+        parts = []
+        for values, valid, components in operand.parts:
+            path_values = np.zeros((context.num_paths,)+values.shape[1:], dtype=values.dtype)
+            path_valid = np.zeros(context.num_paths, dtype=bool)
+            path_values[path_rows] = values[rows]
+            path_valid[path_rows] = valid[rows]
+            parts.append((path_values, path_valid, components))
+        return Operand(PATH, parts)
+
+
+class Parser(object):
+
+    """
+        Parser
+        Recursive descent parser of the filter expression grammar:
+            expression  := and ('or' and)*
+            and         := not ('and' not)*
+            not         := 'not' not | compare
+            compare     := operand (('==' | '!=' | '<' | '<=' | '>' | '>=') operand)?
+            operand     := number | string | 'true' | 'false' | '(' expression ')' | function | field
+            function    := ('any' | 'all' | 'count' | 'has') '(' expression ')' | 'at' '(' integer ',' expression ')'
+            field       := ['its' ('.' name | '[' string ']') | name | '[' string ']'] ['.' component]
+        The constraints of the filter view are the right-hand side of a comparison:
+            constraint  := ('==' | '!=' | '<' | '<=' | '>' | '>=') (number | string | text)
+        where text is any unquoted string starting with a name, e.g. '!=diffuse'
+    """
+
+    def __init__(self, text : str):
+        self._text = text
+        self._tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = TOKEN_REGEX.match(text, pos)
+            if match is None:
+                pos = len(text) - len(text[pos:].lstrip())
+                raise FilterExpressionError('unexpected character {!r} at {}'.format(text[pos], pos))
+            kind = match.lastgroup
+            self._tokens.append((kind, match.group(kind), match.start(kind)))
+            pos = match.end()
+        self._pos = 0
+
+    def _peek(self, offset : int = 0) -> typing.Tuple[typing.Optional[str], typing.Optional[str], int]:
+        if self._pos + offset < len(self._tokens):
+            return self._tokens[self._pos + offset]
+        return None, None, len(self._text)
+
+    def _accept(self, kind : str, value : typing.Optional[str] = None) -> typing.Optional[str]:
+        token_kind, token_value, token_pos = self._peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self._pos += 1
+            return token_value
+        return None
+
+    def _expect(self, kind : str, value : typing.Optional[str] = None) -> str:
+        token_value = self._accept(kind, value)
+        if token_value is None:
+            token_kind, found, pos = self._peek()
+            raise FilterExpressionError('expected {} at {}, found {}'.format(
+                repr(value) if value is not None else kind, pos, repr(found) if found is not None else 'end'))
+        return token_value
+
+    def parse(self) -> Node:
+        node = self._parse_or()
+        self._expect_end()
+        return node
+
+    def parse_constraint(self) -> typing.Tuple[str, typing.Union[float, str]]:
+        """
+        Parses a constraint of the filter view and returns its operator and value
+        """
+        token_kind, expr, pos = self._peek()
+        if token_kind != 'op' or (expr not in COMPARE_OPERATORS and expr != '='):
+            raise FilterExpressionError('expected comparison operator at {}, found {}'.format(
+                pos, repr(expr) if expr is not None else 'end'))
+        self._pos += 1
+        expr = '==' if expr == '=' else expr
+        token_kind, value, pos = self._peek()
+        if token_kind == 'number' or token_kind == 'string' or (token_kind == 'op' and value == '-'):
+            value = self._parse_operand().value
+            self._expect_end()
+        elif token_kind == 'name':
+            # unquoted text is compared as string
+            value = self._text[pos:].strip()
+        else:
+            raise FilterExpressionError('expected value at {}, found {}'.format(
+                pos, repr(value) if value is not None else 'end'))
+        if isinstance(value, str) and expr not in ('==', '!='):
+            raise FilterExpressionError('strings can only be compared with == and !=')
+        return expr, value
+
+    def _expect_end(self):
+        token_kind, value, pos = self._peek()
+        if token_kind is not None:
+            raise FilterExpressionError('unexpected {!r} at {}'.format(value, pos))
+
+    def _parse_or(self) -> Node:
+        nodes = [self._parse_and()]
+        while self._accept('name', 'or'):
+            nodes.append(self._parse_and())
+        return nodes[0] if len(nodes) == 1 else Or(nodes)
+
+    def _parse_and(self) -> Node:
+        nodes = [self._parse_not()]
+        while self._accept('name', 'and'):
+            nodes.append(self._parse_not())
+        return nodes[0] if len(nodes) == 1 else And(nodes)
+
+    def _parse_not(self) -> Node:
+        if self._accept('name', 'not'):
+            return Not(self._parse_not())
+        return self._parse_compare()
+
+    def _parse_compare(self) -> Node:
+        left = self._parse_operand()
+        token_kind, value, pos = self._peek()
+        if token_kind == 'op' and (value in COMPARE_OPERATORS or value == '='):
+            self._pos += 1
+            right = self._parse_operand()
+            return Compare(left, '==' if value == '=' else value, right)
+        return left
+
+    def _parse_operand(self) -> Node:
+        token_kind, value, pos = self._peek()
+        if token_kind == 'number' or (token_kind == 'op' and value == '-'):
+            sign = -1.0 if self._accept('op', '-') else 1.0
+            return Literal(sign * float(self._expect('number')))
+        elif token_kind == 'string':
+            self._pos += 1
+            return Literal(re.sub(r'\\(.)', r'\1', value[1:-1]))
+        elif self._accept('op', '('):
+            node = self._parse_or()
+            self._expect('op', ')')
+            return node
+        elif token_kind == 'name' and value in ('true', 'false'):
+            self._pos += 1
+            return Literal(value == 'true')
+        elif token_kind == 'name' and self._peek(1)[1] == '(':
+            return self._parse_function()
+        elif (token_kind == 'name' and value not in KEYWORDS) or (token_kind == 'op' and value == '['):
+            return self._parse_field()
+        raise FilterExpressionError('unexpected {} at {}'.format(repr(value) if value is not None else 'end', pos))
+
+    def _parse_function(self) -> Node:
+        name = self._expect('name')
+        self._expect('op', '(')
+        depth = None
+        if name == 'at':
+            token_kind, value, pos = self._peek()
+            if token_kind != 'number' or not value.isdigit():
+                raise FilterExpressionError('expected depth index at {}'.format(pos))
+            depth = int(self._expect('number'))
+            self._expect('op', ',')
+        elif name not in ('any', 'all', 'count', 'has'):
+            raise FilterExpressionError('unknown function {!r}'.format(name))
+        node = self._parse_or()
+        self._expect('op', ')')
+        if name == 'has' and not isinstance(node, Field):
+            raise FilterExpressionError('has expects a field')
+        return Quantifier(name, node, depth)
+
+    def _parse_key(self) -> str:
+        if self._accept('op', '['):
+            value = self._expect('string')
+            self._expect('op', ']')
+            return re.sub(r'\\(.)', r'\1', value[1:-1])
+        return self._expect('name')
+
+    def _parse_field(self) -> Node:
+        level = PATH
+        if self._peek()[1] == 'its' and self._peek(1)[1] in ('.', '['):
+            self._pos += 1
+            self._accept('op', '.')
+            level = INTERSECTION
+        key = self._parse_key()
+        component = None
+        if self._accept('op', '.'):
+            component = self._expect('name')
+            if COMPONENT_ALIASES.get(component, component) not in ('x', 'y', 'z', 'red', 'green', 'blue', 'alpha'):
+                raise FilterExpressionError('unknown component {!r}'.format(component))
+        return Field(level, key, component)
+
+
+class FilterExpression(object):
+
+    """
+        FilterExpression
+        Compiled filter expression, e.g. 'any(its.roughness < 0.1) and pathDepth >= 4 and not finalEstimate.r > 10'.
+        Unqualified names refer to path fields and path user data, names prefixed with its. to intersection fields
+        and intersection user data. Evaluating the expression yields a boolean mask over all paths,
+        conditions on intersections which are not quantified are satisfied if any intersection of the path satisfies them.
+    """
+
+    def __init__(self, text : str):
+        self._text = text
+        self._root = Parser(text).parse()
+
+    @property
+    def text(self) -> str:
+        """
+        Returns the source text of the expression
+        """
+        return self._text
+
+    @property
+    def root(self) -> Node:
+        """
+        Returns the root node of the abstract syntax tree
+        """
+        return self._root
+
+    def __call__(self, pixel_data : PixelData) -> np.ndarray:
+        """
+        Returns a boolean numpy array which is set for all paths (rows of the path table) satisfying the expression
+        """
+        return evaluate_paths(self._root, pixel_data)
+
+
+def evaluate_paths(root : Node, pixel_data : PixelData) -> np.ndarray:
+    """
+    Evaluates a condition on the given pixel data and returns a boolean numpy array over all paths,
+    a condition on intersections is satisfied by a path if any of its intersections satisfies it
+    """
+    context = EvaluationContext(pixel_data)
+    operand = root.mask(context)
+    mask = operand.parts[0][0]
+    if operand.level == INTERSECTION:
+        return np.bincount(context.path_rows[mask], minlength=context.num_paths) > 0
+    return mask
+
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(text : str) -> FilterExpression:
+    """
+    Returns the compiled filter expression of the given text, compiled expressions are cached
+    """
+    return FilterExpression(text)
+
+
+def field_name(key : str, level : int = PATH) -> str:
+    """
+    Returns the expression text referring to the given user data key
+    """
+    name = key if re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', key) and key not in KEYWORDS \
+        else '[{}]'.format(_quote(key))
+    if level == INTERSECTION:
+        return 'its.'+name if not name.startswith('[') else 'its'+name
+    return name
+
+
+def _quote(string : str) -> str:
+    return '"{}"'.format(string.replace('\\', '\\\\').replace('"', '\\"'))
+
+
+@functools.lru_cache(maxsize=256)
+def parse_constraint(text : str) -> typing.Optional[typing.Tuple[str, typing.Union[float, str]]]:
+    """
+    Returns the operator and value of a constraint entered in the filter view, e.g. ('>', 0.5) for '>0.5'
+    or ('!=', 'diffuse') for '!=diffuse'. None if the text is empty, raises a FilterExpressionError if it is malformed
+    """
+    if text.strip() == "":
+        return None
+    return Parser(text).parse_constraint()
+
+
+def settings_terms(filter_settings : FilterSettings) -> typing.List[typing.Tuple[typing.Optional[str], str, typing.Any]]:
+    """
+    Returns the parsed constraints of the filter view as (component, operator, value).
+    Scalar filters have a single term without component and require a constraint,
+    point and color components without a constraint are left out
+    """
+    f_type = filter_settings.get_type()
+    constraint = filter_settings.get_constraint()
+    if f_type is FilterType.SCALAR:
+        term = parse_constraint(constraint[0])
+        if term is None:
+            raise FilterExpressionError('expected comparison operator at 0, found end')
+        return [(None,) + term]
+    components = FILTER_COMPONENTS[f_type]
+    # the last entry is set if the first constraint applies to all components
+    texts = [constraint[0]] * len(components) if constraint[-1] else constraint[:len(components)]
+    terms = [(component, parse_constraint(text)) for component, text in zip(components, texts)]
+    return [(component,) + term for component, term in terms if term is not None]
+
+
+def settings_condition(filter_settings : FilterSettings) -> Node:
+    """
+    Returns the condition of the constraints entered in the filter view.
+    Like the filter settings, the condition matches a user data key on paths and on any of their intersections
+    """
+    if filter_settings.get_type() is FilterType.EXPRESSION:
+        return compile_expression(filter_settings.get_constraint()[0]).root
+
+    key = filter_settings.get_text()
+    terms = settings_terms(filter_settings)
+
+    def condition(level : int) -> Node:
+        if len(terms) == 0:
+            return Quantifier('has', Field(level, key))
+        nodes = [Compare(Field(level, key, component), expr, Literal(value)) for component, expr, value in terms]
+        return nodes[0] if len(nodes) == 1 else And(nodes)
+
+    if key in PATH_FIELDS:
+        return condition(PATH)
+    return Or([condition(PATH), Quantifier('any', condition(INTERSECTION))])
+
+
+def settings_expression(filter_settings : FilterSettings) -> str:
+    """
+    Returns the filter expression text of the constraints entered in the filter view, see settings_condition
+    """
+    if filter_settings.get_type() is FilterType.EXPRESSION:
+        return filter_settings.get_constraint()[0]
+
+    key = filter_settings.get_text()
+    terms = settings_terms(filter_settings)
+
+    def condition(level : int) -> str:
+        if len(terms) == 0:
+            return 'has({})'.format(field_name(key, level))
+        return ' and '.join('{}{} {} {}'.format(field_name(key, level), '.'+component if component is not None else '',
+                                                expr, _quote(value) if isinstance(value, str) else repr(float(value)))
+                            for component, expr, value in terms)
+
+    if key in PATH_FIELDS:
+        return condition(PATH)
+    return '({}) or any({})'.format(condition(PATH), condition(INTERSECTION))
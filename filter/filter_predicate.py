@@ -0,0 +1,183 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+import numpy as np
+
+from core.color import Color4f
+from filter.filter_settings import FilterSettings, FilterType
+from filter.filter_expression import COMPARE_OPERATORS, WRAPPER_COMPONENTS, settings_terms
+from model.pixel_data import PixelData
+from model.user_data import UserDataColumn
+from model.user_data_index import UserDataIndex
+
+
+class FilterPredicate(object):
+
+    """
+        FilterPredicate
+        Filter settings compiled into a predicate over the columns of a pixel data set.
+        The constraints are parsed once by the filter expression parser, evaluating the predicate compares whole columns at once
+        and yields a boolean mask over all paths.
+        Like the per-element filter it replaces, falsy user data values (0, 0.0, False and empty strings)
+        never satisfy a filter. Deliberate differences: all three point3 components are checked
+        (the per-element filter checked the z constraint in place of the y constraint), point and color
+        user data is compared instead of raising, and inputs which raised before match nothing.
+    """
+
+    def __init__(self, filter_settings : FilterSettings):
+        self._key = filter_settings.get_text()
+        self._type = filter_settings.get_type()
+        # components without a constraint are not constrained
+        self._terms = settings_terms(filter_settings)
+        self._is_string = self._type is FilterType.SCALAR and isinstance(self._terms[0][2], str)
+        if self._is_string:
+            self._terms = [(None, self._terms[0][1], self._terms[0][2].lower())]
+
+    @property
+    def key(self) -> str:
+        """
+        Returns the path field or user data key the predicate is evaluated on
+        """
+        return self._key
+
+    def __call__(self, pixel_data : PixelData) -> np.ndarray:
+        """
+        Returns a boolean numpy array which is set for all paths (rows of the path table) satisfying the predicate
+        """
+        paths = pixel_data.paths
+        if self._key == "sampleIndex":
+            return self.evaluate(paths.sample_idx, np.ones(len(paths), dtype=bool), None)
+        elif self._key == "pathDepth":
+            return self.evaluate(paths.path_depth, np.ones(len(paths), dtype=bool), None)
+        elif self._key == "finalEstimate":
+            # paths without a final estimate are compared as None
+            mask = self.evaluate(paths.final_estimate, paths.has_final_estimate, Color4f)
+            mask[~paths.has_final_estimate] = self.evaluate_none()
+            return mask
+
+        mask = np.zeros(len(paths), dtype=bool)
+        index = pixel_data.user_data_index
+        entry = index.entry(self._key)
+        if entry is None:
+            return mask
+
+        for column in pixel_data.path_user_data.columns_of(self._key):
+            mask |= self._evaluate_column(index, column)
+        columns = pixel_data.intersection_user_data.columns_of(self._key)
+        if len(columns) > 0:
+            matches = np.zeros(len(pixel_data.intersections), dtype=bool)
+            for column in columns:
+                matches |= self._evaluate_column(index, column)
+            mask[pixel_data.intersections.path_rows[matches]] = True
+        return mask
+
+    @staticmethod
+    def truthy(column : UserDataColumn) -> np.ndarray:
+        """
+        Returns a boolean numpy array which is set for all valid rows of a column whose value is not falsy.
+        Falsy scalars (0, 0.0, False) and empty strings are not filtered, points and colors are always kept
+        """
+        values = column.values
+        if values.ndim != 1:
+            return column.valid
+        if values.dtype == object:
+            return column.valid & (values != '')
+        return column.valid & (values != 0)
+
+    def _evaluate_column(self, index : UserDataIndex, column : UserDataColumn) -> np.ndarray:
+        name, expr, value = self._terms[0] if len(self._terms) > 0 else (None, "", None)
+        valid = self.truthy(column)
+        if self._type is FilterType.SCALAR and not self._is_string and expr in COMPARE_OPERATORS \
+                and index.is_sortable(column):
+            sorted_column = index.sorted_column(column)
+            if sorted_column is not None:
+                return sorted_column.mask(expr, value) & valid
+        return self.evaluate(column.values, valid, column.type.wrapper)
+
+    def evaluate(self, values : np.ndarray, valid : np.ndarray, wrapper : typing.Optional[type]) -> np.ndarray:
+        """
+        Returns a boolean numpy array which is set for all valid rows of a column satisfying the predicate.
+        Values is a numpy array of shape (rows,) or (rows, components), wrapper the point or color type of a value
+        """
+        if self._is_string:
+            return self._evaluate_string(values, valid, wrapper)
+
+        if self._type is FilterType.SCALAR:
+            name, expr, value = self._terms[0]
+            operator = COMPARE_OPERATORS.get(expr, None)
+            if operator is None or values.ndim != 1 or values.dtype == object:
+                # strings only differ from numbers
+                if operator is np.not_equal and values.dtype == object:
+                    return valid.copy()
+                return np.zeros(len(valid), dtype=bool)
+            # scalars are compared as python numbers
+            return operator(values.astype(np.float64), value) & valid
+
+        # point and color components are compared with their own precision
+        mask = valid.copy()
+        components = WRAPPER_COMPONENTS.get(wrapper, ())
+        for name, expr, value in self._terms:
+            operator = COMPARE_OPERATORS.get(expr, None)
+            if operator is None or name not in components:
+                return np.zeros(len(valid), dtype=bool)
+            mask &= operator(values[:, components.index(name)], value)
+        return mask
+
+    def evaluate_none(self) -> bool:
+        """
+        Returns true if a missing value (None) satisfies the predicate
+        """
+        name, expr, value = self._terms[0] if len(self._terms) > 0 else (None, "", None)
+        if self._is_string:
+            return self._compare_string('none', expr, value)
+        if self._type is FilterType.SCALAR:
+            return expr == '!='
+        # a missing point or color only satisfies a filter without any constraint
+        return len(self._terms) == 0
+
+    @staticmethod
+    def _compare_string(string : str, expr : str, value : str) -> bool:
+        if expr == "==":
+            return string == value
+        elif expr == "!=":
+            return string != value
+        return False
+
+    def _evaluate_string(self, values : np.ndarray, valid : np.ndarray, wrapper : typing.Optional[type]) -> np.ndarray:
+        name, expr, value = self._terms[0]
+        mask = np.zeros(len(valid), dtype=bool)
+        if expr != "==" and expr != "!=":
+            return mask
+        # the string representation is computed once per distinct value
+        if values.ndim == 1:
+            distinct, inverse = np.unique(values[valid], return_inverse=True)
+            strings = [str(v) if values.dtype == object else str(v.item()) for v in distinct]
+        else:
+            distinct, inverse = np.unique(values[valid], axis=0, return_inverse=True)
+            strings = [str(wrapper(*v)) for v in distinct]
+        matches = np.array([self._compare_string(s.lower(), expr, value) for s in strings], dtype=bool)
+        mask[valid] = matches[inverse.reshape(-1)]
+        return mask
@@ -0,0 +1,184 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+from enum import IntEnum
+
+from filter.filter_expression import FilterExpressionError, Node, Literal, Field, Compare, And, Or, Not, Quantifier, \
+    PATH, INTERSECTION, PATH_FIELDS, settings_condition, settings_terms
+from filter.filter_settings import FilterSettings, FilterType
+from stream.buffer_stream import BufferStream
+from stream.stream import Layout
+
+
+class Opcode(IntEnum):
+    # instructions of a pushed down predicate, evaluated per path on a stack of path or intersection values
+    CONST   = 0x01  # bool
+    COMPARE = 0x02  # field, operator, literal kind, number (double) or string
+    TRUTH   = 0x03  # field
+    HAS     = 0x04  # field
+    AND     = 0x05
+    OR      = 0x06
+    NOT     = 0x07
+    ANY     = 0x08
+    ALL     = 0x09
+
+
+# operators and components are sent as their index, fields as level, key and component
+OPERATORS = ('==', '!=', '<', '<=', '>', '>=')
+COMPONENTS = ('x', 'y', 'z', 'red', 'green', 'blue', 'alpha')
+NO_COMPONENT = 0xFF
+
+# kind of the literal of a comparison
+NUMBER = 0
+STRING = 1
+
+
+def _pack_string(value : str) -> bytes:
+    raw_value = value.encode('utf-8')
+    return Layout.UNSIGNED_LONG.pack(len(raw_value)) + raw_value
+
+
+def _pack_field(field : Field) -> bytes:
+    component = COMPONENTS.index(field.component) if field.component is not None else NO_COMPONENT
+    return Layout.UNSIGNED_CHAR.pack(field.level) + _pack_string(field.key) + Layout.UNSIGNED_CHAR.pack(component)
+
+
+def _pack_const(value : bool) -> bytes:
+    return Layout.UNSIGNED_CHAR.pack(Opcode.CONST) + Layout.BOOL.pack(value)
+
+
+TRUE = _pack_const(True)
+FALSE = _pack_const(False)
+
+
+def _serialize(node : Node, positive : bool) -> bytes:
+    """
+    Returns the instructions of a condition in postfix order.
+    Conditions the server can not evaluate (count, at and comparisons of two fields) are replaced by a constant
+    which does not reject any path, true unless the condition is negated.
+    Thereby the server sends a superset of the paths satisfying the condition
+    """
+    if isinstance(node, Literal):
+        return _pack_const(bool(node.value))
+    elif isinstance(node, Field):
+        return Layout.UNSIGNED_CHAR.pack(Opcode.TRUTH) + _pack_field(node)
+    elif isinstance(node, Compare) and isinstance(node.left, Field) and isinstance(node.right, Literal):
+        value = node.right.value
+        operator = Layout.UNSIGNED_CHAR.pack(OPERATORS.index(node.expr))
+        if isinstance(value, str):
+            literal = Layout.UNSIGNED_CHAR.pack(STRING) + _pack_string(value)
+        else:
+            literal = Layout.UNSIGNED_CHAR.pack(NUMBER) + Layout.DOUBLE.pack(float(value))
+        return Layout.UNSIGNED_CHAR.pack(Opcode.COMPARE) + _pack_field(node.left) + operator + literal
+    elif isinstance(node, (And, Or)):
+        opcode = Layout.UNSIGNED_CHAR.pack(Opcode.AND if isinstance(node, And) else Opcode.OR)
+        # constants which do not change the result are left out
+        neutral = TRUE if isinstance(node, And) else FALSE
+        instructions = [i for i in (_serialize(child, positive) for child in node.nodes) if i != neutral]
+        if len(instructions) == 0:
+            return neutral
+        return instructions[0] + b''.join(i + opcode for i in instructions[1:])
+    elif isinstance(node, Not):
+        return _serialize(node.node, not positive) + Layout.UNSIGNED_CHAR.pack(Opcode.NOT)
+    elif isinstance(node, Quantifier) and node.name == 'has':
+        return Layout.UNSIGNED_CHAR.pack(Opcode.HAS) + _pack_field(node.node)
+    elif isinstance(node, Quantifier) and node.name in ('any', 'all'):
+        opcode = Opcode.ANY if node.name == 'any' else Opcode.ALL
+        return _serialize(node.node, positive) + Layout.UNSIGNED_CHAR.pack(opcode)
+    return _pack_const(positive)
+
+
+def serialize_predicate(conditions : typing.List[Node]) -> bytes:
+    """
+    Returns the predicate the server evaluates on each path of a pixel request, the conjunction of the given conditions.
+    Like filter expressions, each condition on intersections is satisfied by a path if any of its intersections does.
+    Empty if no path is rejected by the predicate
+    """
+    any_opcode = Layout.UNSIGNED_CHAR.pack(Opcode.ANY)
+    instructions = [i + any_opcode for i in (_serialize(condition, True) for condition in conditions) if i != TRUE]
+    if len(instructions) == 0:
+        return b''
+    return instructions[0] + b''.join(i + Layout.UNSIGNED_CHAR.pack(Opcode.AND) for i in instructions[1:])
+
+
+def pushdown_condition(filter_settings : FilterSettings) -> typing.Optional[Node]:
+    """
+    Returns the condition of a filter which is evaluated by the server, None if the filter is only evaluated by the client.
+    Filters entered in the filter view compare strings with the string representation of any value
+    and missing final estimates with None, the server only evaluates the numeric filters of the other keys
+    """
+    if filter_settings.get_type() is not FilterType.EXPRESSION:
+        key = filter_settings.get_text()
+        if any(isinstance(value, str) for component, expr, value in settings_terms(filter_settings)) \
+                or (key in PATH_FIELDS and key not in ('sampleIndex', 'pathDepth')):
+            return None
+    return settings_condition(filter_settings)
+
+
+def _read_field(stream : BufferStream) -> Field:
+    level = stream.read_uchar()
+    key = stream.read_string()
+    component = stream.read_uchar()
+    if level not in (PATH, INTERSECTION) or (component != NO_COMPONENT and component >= len(COMPONENTS)):
+        raise FilterExpressionError('invalid field {!r} in predicate'.format(key))
+    return Field(level, key, COMPONENTS[component] if component != NO_COMPONENT else None)
+
+
+def deserialize_predicate(data : bytes) -> Node:
+    """
+    Returns the condition of a serialized predicate, raises a FilterExpressionError if the predicate is malformed
+    """
+    stream = BufferStream(bytearray(data))
+    stack = []
+    try:
+        while stream.remaining > 0:
+            opcode = stream.read_uchar()
+            if opcode == Opcode.CONST:
+                stack.append(Literal(stream.read_bool()))
+            elif opcode == Opcode.COMPARE:
+                field = _read_field(stream)
+                expr = OPERATORS[stream.read_uchar()]
+                value = stream.read_string() if stream.read_uchar() == STRING else stream.read_double()
+                stack.append(Compare(field, expr, Literal(value)))
+            elif opcode == Opcode.TRUTH:
+                stack.append(_read_field(stream))
+            elif opcode == Opcode.HAS:
+                stack.append(Quantifier('has', _read_field(stream)))
+            elif opcode == Opcode.AND or opcode == Opcode.OR:
+                right = stack.pop()
+                left = stack.pop()
+                stack.append(And([left, right]) if opcode == Opcode.AND else Or([left, right]))
+            elif opcode == Opcode.NOT:
+                stack.append(Not(stack.pop()))
+            elif opcode == Opcode.ANY or opcode == Opcode.ALL:
+                stack.append(Quantifier('any' if opcode == Opcode.ANY else 'all', stack.pop()))
+            else:
+                raise FilterExpressionError('unknown instruction {} in predicate'.format(opcode))
+    except (IndexError, RuntimeError, UnicodeDecodeError) as e:
+        raise FilterExpressionError('malformed predicate: {}'.format(e))
+    if len(stack) != 1:
+        raise FilterExpressionError('malformed predicate: {} results'.format(len(stack)))
+    return stack[0]
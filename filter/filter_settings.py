@@ -23,7 +23,6 @@
     SOFTWARE.
 """
 
-import re
 from enum import Enum
 
 
@@ -32,6 +31,7 @@ class FilterType(Enum):
     POINT2 = 1
     POINT3 = 2
     COLOR3 = 3
+    EXPRESSION = 4
 
 
 class FilterSettings(object):
@@ -67,6 +67,23 @@ class FilterSettings(object):
                                 view.leExpG.text(),
                                 view.leExpB.text(),
                                 view.cbColor.isChecked())
+        elif idx == 4:
+            self._type = FilterType.EXPRESSION
+            self._constraint = (view.leExpression.text(),)
+
+    @classmethod
+    def from_constraint(cls, idx : int, text : str, filter_type : FilterType, constraint : tuple) -> 'FilterSettings':
+        """
+        Creates filter settings without the filter view, the constraint holds the entered texts
+        in the same order as the view, e.g. ('>0.5',) for scalars or ('>1', '<2', False) for points.
+        Filter expressions hold the expression text, e.g. ('any(its.roughness < 0.1) and pathDepth >= 4',)
+        """
+        settings = cls.__new__(cls)
+        settings._idx = idx
+        settings._text = text
+        settings._type = filter_type
+        settings._constraint = constraint
+        return settings
 
     def get_idx(self):
         """
@@ -91,90 +108,11 @@ class FilterSettings(object):
 
     def get_constraint(self):
         """
-        Returns the constraint
-        :return: string
+        Returns the constraint, the entered texts are parsed by settings_terms of the filter expressions
+        :return: tuple
         """
         return self._constraint
 
-    @staticmethod
-    def get_expr_from_string(regex_expr, string):
-        """
-        Returns a expr from a string depending on the given regex expression
-        :param regex_expr: regex expression
-        :param string: string
-        :return:
-        """
-        s = re.search(regex_expr, string)
-        if s:
-            return s.group(0)
-        else:
-            return ""
-
-    def get_expr(self):
-        """
-        Returns the entered expression symbol
-        :return:
-        """
-        regex_expr = '[<!=>]+'
-        if self._type is FilterType.SCALAR:
-            return self.get_expr_from_string(regex_expr, self._constraint[0])
-        elif self._type is FilterType.POINT2:
-            x = self.get_expr_from_string(regex_expr, self._constraint[0])
-            if self._constraint[2]:
-                return x, x
-            y = self.get_expr_from_string(regex_expr, self._constraint[1])
-            return x, y
-        elif self._type is FilterType.POINT3 or self._type is FilterType.COLOR3:
-            x = self.get_expr_from_string(regex_expr, self._constraint[0])
-            if self._constraint[3]:
-                return x, x, x
-            y = self.get_expr_from_string(regex_expr, self._constraint[1])
-            z = self.get_expr_from_string(regex_expr, self._constraint[2])
-            return x, y, z
-
-    def get_value(self):
-        """
-        Returns the entered value
-        :return:
-        """
-        regex_value = '[+-]?([0-9]*[.,])?[0-9]+'
-        if self._type is FilterType.SCALAR:
-            expr = self.get_expr_from_string(regex_value, self._constraint[0])
-            if expr != "":
-                return float(expr)
-            return re.sub('[<!=>]+', '', self._constraint[0])
-        elif self._type is FilterType.POINT2:
-            expr_x = self.get_expr_from_string(regex_value, self._constraint[0])
-            expr_y = self.get_expr_from_string(regex_value, self._constraint[1])
-            if expr_x != "" and expr_y != "":
-                return float(expr_x), float(expr_y)
-            elif expr_x != "" and expr_y == "":
-                return float(expr_x), 0
-            elif expr_x == "" and expr_y != "":
-                return 0, float(expr_y)
-            else:
-                return 0, 0
-        elif self._type is FilterType.POINT3 or self._type is FilterType.COLOR3:
-            expr_x = self.get_expr_from_string(regex_value, self._constraint[0])
-            expr_y = self.get_expr_from_string(regex_value, self._constraint[1])
-            expr_z = self.get_expr_from_string(regex_value, self._constraint[2])
-            if expr_x != "" and expr_y != "" and expr_z != "":
-                return float(expr_x), float(expr_y), float(expr_z)
-            elif expr_x != "" and expr_y != "" and expr_z == "":
-                return float(expr_x), float(expr_y), 0
-            elif expr_x != "" and expr_y == "" and expr_z != "":
-                return float(expr_x), 0, float(expr_z)
-            elif expr_x == "" and expr_y != "" and expr_z != "":
-                return 0, float(expr_y), float(expr_z)
-            elif expr_x == "" and expr_y == "" and expr_z != "":
-                return 0, 0, float(expr_z)
-            elif expr_x != "" and expr_y == "" and expr_z == "":
-                return float(expr_x), 0, 0
-            elif expr_x == "" and expr_y != "" and expr_z == "":
-                return 0, float(expr_y), 0
-            else:
-                return 0, 0, 0
-
     def to_string(self):
         """
         Returns a string with class information
@@ -28,7 +28,6 @@ import logging
 import time
 import typing
 
-from model.path_data import PathData
 from model.pixel_data import PixelData
 
 
@@ -58,24 +57,20 @@ class SampleContributionData(object):
 
             # collect final estimates of all paths,
             # if one final estimate is not set take [-1,-1,-1, 1] as value
-            estimates = []
-            depths = []
-            for path in pixel_data.dict_paths.values():
-                depths.append(path.intersection_count)
-                if path.final_estimate is None:
-                    logging.info('no final estimate set on server')
-                    estimates.append([-1, -1, -1, 1])
-                    continue
-                estimates.append(path.final_estimate)
-
-            rgb_values = np.array(estimates)
+            paths = pixel_data.paths
+            if not np.all(paths.has_final_estimate):
+                logging.info('no final estimate set on server')
+            rgb_values = np.where(paths.has_final_estimate[:, np.newaxis],
+                                  paths.final_estimate,
+                                  np.array([-1, -1, -1, 1], dtype=np.float32))
+            depths = pixel_data.intersections.counts
 
             # get r,g,b values final estimate
             self._red   = rgb_values[:, 0]
             self._green = rgb_values[:, 1]
             self._blue  = rgb_values[:, 2]
 
-            self._depth = np.array(depths)
+            self._depth = depths
 
             # compute the mean of all rgb values
             self._mean = np.mean(rgb_values, axis=1)
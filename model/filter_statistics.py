@@ -0,0 +1,104 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import numpy as np
+from stream.stream import Stream, Layout
+
+
+class FilterStatistics(object):
+
+    """
+        FilterStatistics
+        Aggregates of the paths of a pixel which the server did not send, because they do not satisfy
+        the predicate of the pixel request (filter pushdown)
+    """
+
+    def __init__(self):
+        self._total_paths = 0
+        self._rejected_paths = 0
+        self._rejected_intersections = 0
+        self._rejected_path_depth_sum = 0
+        self._rejected_final_estimate_sum = np.zeros(4, dtype=np.float64)
+
+    def deserialize(self, stream : Stream):
+        """
+        Deserialize the filter statistics from the socket stream
+        """
+        values = stream.read_layout(Layout.FILTER_STATISTICS)
+        self._total_paths, self._rejected_paths, self._rejected_intersections, self._rejected_path_depth_sum = values[:4]
+        self._rejected_final_estimate_sum = np.array(values[4:], dtype=np.float64)
+
+    @property
+    def total_paths(self) -> int:
+        """
+        Returns the number of paths of the pixel including the rejected paths
+        """
+        return self._total_paths
+
+    @property
+    def rejected_paths(self) -> int:
+        """
+        Returns the number of paths which were not sent
+        """
+        return self._rejected_paths
+
+    @property
+    def rejected_intersections(self) -> int:
+        """
+        Returns the number of intersections of the paths which were not sent
+        """
+        return self._rejected_intersections
+
+    @property
+    def rejected_path_depth_sum(self) -> int:
+        """
+        Returns the sum of the path depths of the paths which were not sent
+        """
+        return self._rejected_path_depth_sum
+
+    @property
+    def rejected_final_estimate_sum(self) -> np.ndarray:
+        """
+        Returns the sum of the final estimates (r, g, b, a) of the paths which were not sent
+        """
+        return self._rejected_final_estimate_sum
+
+    @property
+    def rejected_mean_path_depth(self) -> float:
+        """
+        Returns the mean path depth of the paths which were not sent
+        """
+        return self._rejected_path_depth_sum / self._rejected_paths if self._rejected_paths > 0 else 0.0
+
+    def to_string(self) -> str:
+        """
+        Returns a string containing information about the class
+        """
+        return 'rejected {} of {} paths with {} intersections, ' \
+               'mean path depth = {:.3}, final estimate sum = {}'.format(self._rejected_paths,
+                                                                         self._total_paths,
+                                                                         self._rejected_intersections,
+                                                                         self.rejected_mean_path_depth,
+                                                                         self._rejected_final_estimate_sum[:3])
@@ -0,0 +1,209 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+
+from stream.stream import Stream
+from model.render_info import RenderInfo
+from model.camera_data import CameraData
+from model.mesh_data import ShapeData
+from model.pixel_data import PixelData
+from model.filter_statistics import FilterStatistics
+from core.messages import StateMsg
+import logging
+
+
+class HeadlessModel(object):
+
+    """
+        HeadlessModel
+        Model without Qt dependencies for scripts and batch analysis.
+        Deserializes the data from the stream like the Model of the GUI,
+        but informs an optional callback function instead of emitting Qt signals.
+        There are no client side plugins, plugin messages of the server are ignored.
+    """
+
+    def __init__(self, callback : typing.Optional[typing.Callable[[tuple], None]] = None):
+        self._callback = callback
+        self._render_info = RenderInfo()
+        self._camera_data = CameraData()
+        self._mesh_data = ShapeData()
+        self._scene_info = {}
+        self._pixel_data = PixelData()
+        self._filter_statistics = None
+        self._pixels = {}
+        self._server_side_supported_plugins = []
+
+    def set_callback(self, callback : typing.Callable[[tuple], None]):
+        """
+        Sets the callback function which is informed about deserialized data
+        """
+        self._callback = callback
+
+    def _send_state_msg(self, tpl : tuple):
+        if self._callback is not None:
+            self._callback(tpl)
+
+    @property
+    def plugins_handler(self) -> None:
+        """
+        Returns None, plugins are only available in the GUI
+        """
+        return None
+
+    @property
+    def server_side_supported_plugins(self) -> typing.List[int]:
+        return self._server_side_supported_plugins
+
+    @property
+    def render_info(self) -> RenderInfo:
+        """
+        Returns the Render Info
+        """
+        return self._render_info
+
+    @property
+    def camera_data(self) -> CameraData:
+        """
+        Returns the Camera Data
+        """
+        return self._camera_data
+
+    @property
+    def mesh_data(self) -> ShapeData:
+        """
+        Returns the Mesh Data
+        """
+        return self._mesh_data
+
+    @property
+    def scene_info(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the scene info of the last scene response (heatmap settings)
+        """
+        return self._scene_info
+
+    @property
+    def pixel_data(self) -> PixelData:
+        """
+        Returns the gathered information of one pixel
+        """
+        return self._pixel_data
+
+    @pixel_data.setter
+    def pixel_data(self, new_pixel_data : PixelData):
+        """
+        Set function for Render data
+        """
+        self._pixel_data = new_pixel_data
+
+    @property
+    def pixels(self) -> typing.Dict[typing.Tuple[int, int], PixelData]:
+        """
+        Returns the gathered information of all pixels of a batch, keyed by pixel position
+        """
+        return self._pixels
+
+    def add_pixel_data(self, x : int, y : int, pixel_data : PixelData):
+        """
+        Adds the gathered information of one pixel of a batch
+        """
+        self._pixels[(x, y)] = pixel_data
+        self._send_state_msg((StateMsg.DATA_PIXEL, pixel_data))
+
+    def deserialize_supported_plugins(self, stream : Stream):
+        """
+        Deserialize list of supported plugin keys
+        """
+        num_plugins = stream.read_uint()
+        self._server_side_supported_plugins = [stream.read_short() for i in range(num_plugins)]
+        self._send_state_msg((StateMsg.SUPPORTED_PLUGINS, self._server_side_supported_plugins))
+
+    def deserialize_render_info(self, stream : Stream, scene_hash : bool = False):
+        """
+        Deserialize the Render Info data
+        """
+        self._render_info.deserialize(stream, scene_hash)
+        self._send_state_msg((StateMsg.DATA_INFO, self._render_info))
+
+    def deserialize_camera(self, stream : Stream):
+        """
+        Deserialize the Camera data
+        """
+        self._camera_data.deserialize(stream)
+        self._send_state_msg((StateMsg.DATA_CAMERA, self._camera_data))
+
+    def deserialize_scene_objects(self, stream : Stream):
+        """
+        Deserialize Mesh data (3D Scene objects), the meshes of previous responses are replaced
+        """
+        scene_info = {'has_heatmap': stream.read_bool()}
+        if scene_info['has_heatmap']:
+            scene_info['colormap'] = stream.read_string()
+            scene_info['show_colorbar'] = stream.read_bool()
+            scene_info['colorbar_label'] = stream.read_string()
+        self._scene_info = scene_info
+
+        mesh_data = ShapeData()
+        num_meshes = stream.read_uint()
+        for i in range(num_meshes):
+            mesh_data.deserialize(stream)
+        self._mesh_data = mesh_data
+        logging.info('loaded scene with {} meshes'.format(num_meshes))
+        self._send_state_msg((StateMsg.DATA_SCENE_INFO, scene_info))
+
+    def deserialize_filter_statistics(self, stream : Stream):
+        """
+        Deserialize the statistics of the paths the server rejected with the predicate of the pixel request,
+        they are added to the pixel data once its response is complete
+        """
+        self._filter_statistics = FilterStatistics()
+        self._filter_statistics.deserialize(stream)
+
+    def deserialize_pixel_data(self, stream : Stream, columns : bool = False, append : bool = False,
+                               pixel : typing.Optional[typing.Tuple[int, int, int, bytes]] = None):
+        """
+        Deserialize Pixel data.
+        If columns is set, the data was sent as columnar pixel response (protocol version 2).
+        If append is set, the data is a further chunk of a progressive pixel response and is added to the current data.
+        The requested pixel is given once the response is complete, the headless model does not cache pixels
+        """
+        if append:
+            chunk = PixelData()
+            chunk.deserialize_columns(stream)
+            self._pixel_data.append(chunk)
+        elif columns:
+            self._pixel_data.deserialize_columns(stream)
+        else:
+            self._pixel_data.deserialize(stream)
+        if pixel is not None:
+            self._pixel_data.filter_statistics = self._filter_statistics
+            self._filter_statistics = None
+        self._send_state_msg((StateMsg.DATA_PIXEL, self._pixel_data))
+
+    def invalidate_pixel_cache(self):
+        """
+        Called if the server reports that rendered pixels are outdated, the headless model does not cache pixels
+        """
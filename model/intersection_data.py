@@ -25,8 +25,8 @@
 
 from core.point import Point3f
 from core.color import Color4f
-from stream.stream import Stream
-from model.user_data import UserData
+from model.path_table import IntersectionTable
+from model.user_data import UserData, UserDataTable
 
 import typing
 
@@ -38,74 +38,62 @@ class IntersectionData(UserData):
         Represents one intersection point of a traced path through the scene.
         Holds information about the intersection, more precisely the intersection position, the intersection index,
         if a next event estimation was set, if a intersection position was set and current estimate information at this point.
+        The values are read on demand from a row of the intersection table.
     """
 
-    def __init__(self, stream : Stream):
-        super().__init__(stream)
-
-        self._depth_idx = stream.read_uint()
-
-        # position
-        self._pos = None
-        if stream.read_bool():
-            self._pos = stream.read_point3f()
-
-        # next event estimation position
-        self._pos_ne = None
-        self._visible_ne = None
-        if stream.read_bool():
-            self._pos_ne = stream.read_point3f()
-            self._visible_ne = stream.read_bool()
-
-        # the incident radiance estimate of the entire path evaluated up to this point
-        self._li = None
-        if stream.read_bool():
-            self._li = stream.read_color4f()
-
-        # emission
-        self._le = None
-        if stream.read_bool():
-            self._le = stream.read_color4f()
+    def __init__(self, table : IntersectionTable, user_data : UserDataTable, row : int):
+        super().__init__(user_data, row)
+        self._table = table
+        self._row = row
 
     @property
     def depth_idx(self) -> typing.Optional[int]:
         """
         Returns the current depth index (intersection index)
         """
-        return self._depth_idx
+        return int(self._table.depth_idx[self._row])
 
     @property
     def is_ne_visible(self) -> typing.Optional[bool]:
         """
         Returns if the next estimation is occluded
         """
-        return self._visible_ne
+        if not self._table.has_ne[self._row]:
+            return None
+        return bool(self._table.visible_ne[self._row])
 
     @property
     def pos(self) -> typing.Optional[Point3f]:
         """
         Returns the intersection position
         """
-        return self._pos
+        if not self._table.has_pos[self._row]:
+            return None
+        return self._table.pos[self._row].view(Point3f)
 
     @property
     def pos_ne(self) -> typing.Optional[Point3f]:
         """
         Returns the position of the next event estimation
         """
-        return self._pos_ne
+        if not self._table.has_ne[self._row]:
+            return None
+        return self._table.pos_ne[self._row].view(Point3f)
 
     @property
     def li(self) -> typing.Optional[Color4f]:
         """
         Returns the current estimate at this intersection / path position
         """
-        return self._li
+        if not self._table.has_li[self._row]:
+            return None
+        return self._table.li[self._row].view(Color4f)
 
     @property
     def le(self) -> typing.Optional[Color4f]:
         """
         Returns the emission at this intersection / path position
         """
-        return self._le
-
+        if not self._table.has_le[self._row]:
+            return None
+        return self._table.le[self._row].view(Color4f)
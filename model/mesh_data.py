@@ -63,10 +63,13 @@ class MeshData(object):
         self._vertices = np.array(stream.read_float_array(self._vertex_count*3), dtype=np.float32, copy=False)
 
         self._triangle_count = stream.read_uint()
-        triangle_indices = np.array(stream.read_uint_array(self._triangle_count*3), dtype=np.uint32, copy=False)
-        # vtk needs to know for each face that it has 3 vertices and they need to be 64bit signed ints
-        self._triangles = np.array(np.concatenate([np.full([self._triangle_count, 1], 3, dtype=np.uint32),
-                            triangle_indices.reshape([self._triangle_count, 3])], axis=1).flatten(), 'q')
+        triangle_indices = stream.read_uint_array(self._triangle_count*3).reshape([self._triangle_count, 3])
+        # vtk needs to know for each face that it has 3 vertices and they need to be 64bit signed ints,
+        # the cells are filled in place to avoid concatenating and flattening temporary arrays
+        cells = np.empty([self._triangle_count, 4], dtype='q')
+        cells[:, 0] = 3
+        cells[:, 1:] = triangle_indices
+        self._triangles = cells.reshape(-1)
 
         self._face_color_count = stream.read_uint()
         # face colors are optional
@@ -77,6 +80,24 @@ class MeshData(object):
         self._diffuse_color = stream.read_color4f()
         self._specular_color = stream.read_color4f()
 
+    @classmethod
+    def from_arrays(cls, vertices : np.ndarray, triangles : np.ndarray, face_colors : typing.Optional[np.ndarray],
+                    diffuse_color : Color4f, specular_color : Color4f) -> 'MeshData':
+        """
+        Creates a Mesh object from existing arrays without copying them,
+        triangles are given in the cell layout of vtk (3 followed by the three vertex indices as int64)
+        """
+        mesh = cls()
+        mesh._vertex_count = len(vertices) // 3
+        mesh._vertices = vertices
+        mesh._triangle_count = len(triangles) // 4
+        mesh._triangles = triangles
+        if face_colors is not None:
+            mesh._face_color_count = len(face_colors) // 3
+            mesh._face_colors = face_colors
+        mesh._diffuse_color = diffuse_color
+        mesh._specular_color = specular_color
+        return mesh
 
     @property
     def shape_type(self):
@@ -120,6 +141,16 @@ class MeshData(object):
         """
         return self._triangles
 
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the vertex, triangle and face color arrays in bytes
+        """
+        nbytes = self._vertices.nbytes + self._triangles.nbytes
+        if self._face_colors is not None:
+            nbytes += self._face_colors.nbytes
+        return nbytes
+
     @property
     def specular_color(self) -> Color4f:
         """
@@ -171,6 +202,19 @@ class SphereData(object):
         self._diffuse_color = stream.read_color4f()
         self._specular_color = stream.read_color4f()
 
+    @classmethod
+    def from_values(cls, center : Point3f, radius : float,
+                    diffuse_color : Color4f, specular_color : Color4f) -> 'SphereData':
+        """
+        Creates a Sphere object from the given values
+        """
+        sphere = cls()
+        sphere._center = center
+        sphere._radius = radius
+        sphere._diffuse_color = diffuse_color
+        sphere._specular_color = specular_color
+        return sphere
+
     @property
     def shape_type(self):
         return ShapeType.SphereMesh
@@ -250,6 +294,13 @@ class ShapeData(object):
         """
         return len(self._meshes)
 
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of all mesh arrays in bytes, spheres are negligible
+        """
+        return sum(mesh.nbytes for mesh in self._meshes if isinstance(mesh, MeshData))
+
     @property
     def meshes(self) -> typing.List[typing.Union[MeshData, SphereData]]:
         """
@@ -33,9 +33,13 @@ from model.camera_data import CameraData
 from model.mesh_data import ShapeData
 from model.pixel_data import PixelData
 from model.contribution_data import SampleContributionData
+from model.scene_cache import SceneCache
+from model.pixel_cache import PixelCache
+from model.filter_statistics import FilterStatistics
 from PySide2.QtCore import Signal
 from PySide2.QtCore import QObject
 from core.messages import StateMsg
+from core.memory import memory_budget, format_size
 from filter.filter import Filter
 from detector.detector import Detector
 import numpy as np
@@ -71,6 +75,17 @@ class Model(QObject):
         self._pixel_data = PixelData()
         self._final_estimate_data = SampleContributionData()
 
+        # camera and scene objects are cached on disk by the scene hash of the render info
+        self._scene_cache = SceneCache() if self._options.scene_cache else None
+        # scene hash of the currently loaded camera and scene objects
+        self._camera_hash = None
+        self._scene_hash = None
+
+        # recently received pixels are served from memory, e.g. when selected in the pixel history
+        self._pixel_cache = PixelCache(self._options.pixel_cache_size << 20)
+        # statistics of the paths rejected by the server, received before the final response of a filtered pixel
+        self._filter_statistics = None
+
         # Model also holds refs to filter and detector
         self._filter = Filter()
         self._detector = Detector()
@@ -83,6 +98,14 @@ class Model(QObject):
         self._server_side_supported_plugins = []
         self._controller = None
 
+        # memory accounting of the loaded data, the budget is configured in MiB
+        memory_budget.budget = self._options.memory_budget << 20
+        memory_budget.register('pixel data', lambda: self._pixel_data.nbytes)
+        memory_budget.register('scene data', lambda: self._mesh_data.nbytes)
+        # the cached copy of the current pixel shares its tables, they are accounted as pixel data only
+        memory_budget.register('pixel cache', lambda: self._pixel_cache.unshared_nbytes(self._pixel_data),
+                               lambda nbytes: self._pixel_cache.release(nbytes, self._pixel_data))
+
     def set_callback(self, callback):
         """
         Set / Connect Qt signal callback to controllers msg handler
@@ -170,6 +193,13 @@ class Model(QObject):
         """
         return self._pixel_data
 
+    @property
+    def pixel_cache(self) -> PixelCache:
+        """
+        Returns the cache of recently received pixels
+        """
+        return self._pixel_cache
+
     @property
     def final_estimate_data(self) -> SampleContributionData:
         """
@@ -222,6 +252,27 @@ class Model(QObject):
         self._current_path_index = None
         self._current_intersection_index = None
 
+    def enforce_memory_budget(self) -> int:
+        """
+        Releases evictable caches and drops the intersections of paths
+        until all accounted data fits into the memory budget.
+        The intersections of the currently selected paths are kept if possible.
+        Returns the number of paths whose intersections were dropped
+        """
+        exceeded = memory_budget.exceeded()
+        if exceeded == 0:
+            return 0
+        logging.warning('Memory budget of {} exceeded by {}: {}'.format(format_size(memory_budget.budget),
+                                                                       format_size(exceeded),
+                                                                       memory_budget.to_string()))
+        memory_budget.release()
+        other_nbytes = memory_budget.total() - self._pixel_data.nbytes
+        dropped = self._pixel_data.drop_intersections(memory_budget.budget - other_nbytes, self._current_path_indices)
+        if dropped > 0:
+            logging.warning('Dropped the intersections of {} of {} paths, pixel data = {}'.format(
+                dropped, len(self._pixel_data.paths), format_size(self._pixel_data.nbytes)))
+        return dropped
+
     def deserialize_supported_plugins(self, stream : Stream):
         """
         Deserialize list of supported plugin keys
@@ -244,16 +295,95 @@ class Model(QObject):
         self._render_info.serialize(stream)
         #logging.info('serialize render info in: {:.3}s'.format(time.time() - start))
 
-    def deserialize_render_info(self, stream : Stream):
+    def deserialize_render_info(self, stream : Stream, scene_hash : bool = False):
         """
         Deserialize the Render Info data and informs the controller about it
         Reads data from the socket stream
         """
         start = time.time()
-        self._render_info.deserialize(stream)
+        identity = self._render_identity()
+        self._render_info.deserialize(stream, scene_hash)
+        # without a scene hash the server might render a different scene under the same name
+        if self._render_identity() != identity or self._render_info.scene_hash is None:
+            self._pixel_cache.clear()
         #logging.info('deserialize render info in: {:.3}s'.format(time.time() - start))
         self.sendStateMsgSig.emit((StateMsg.DATA_INFO, self._render_info))
 
+    def _render_identity(self) -> tuple:
+        return self._render_info.renderer_name, self._render_info.scene_name, self._render_info.scene_hash
+
+    def load_cached_pixel(self, x : int, y : int, sample_count : int, predicate : bytes = b'') -> bool:
+        """
+        Loads the pixel data from the pixel cache and informs the controller about it.
+        Pixels requested with a predicate (filter pushdown) are cached separately.
+        Returns false if the pixel has to be requested from the server
+        """
+        pixel_data = self._pixel_cache.load((x, y, sample_count, predicate, self._render_identity()))
+        if pixel_data is None:
+            return False
+        logging.info('loaded pixel ({},{}) from pixel cache'.format(x, y))
+        self._pixel_data.assign(pixel_data)
+        self.sendStateMsgSig.emit((StateMsg.DATA_PIXEL, self._pixel_data))
+        return True
+
+    def invalidate_pixel_cache(self):
+        """
+        Removes all cached pixels, called if the server reports that rendered pixels are outdated
+        """
+        if len(self._pixel_cache) > 0:
+            logging.info('Invalidated {} cached pixels'.format(len(self._pixel_cache)))
+        self._pixel_cache.clear()
+
+    def load_cached_camera(self) -> bool:
+        """
+        Loads the camera data of the current scene hash from the scene cache and informs the controller about it.
+        Returns false if the camera data has to be requested from the server
+        """
+        scene_hash = self._render_info.scene_hash
+        if scene_hash is None:
+            return False
+        # the camera is unchanged since the last connection
+        if scene_hash == self._camera_hash:
+            return True
+        if self._scene_cache is None:
+            return False
+        camera_data = self._scene_cache.load_camera(scene_hash)
+        if camera_data is None:
+            return False
+        logging.info('loaded camera from scene cache')
+        self._camera_data = camera_data
+        self._camera_hash = scene_hash
+        self.sendStateMsgSig.emit((StateMsg.DATA_CAMERA, self._camera_data))
+        return True
+
+    def load_cached_scene(self) -> bool:
+        """
+        Loads the scene objects of the current scene hash from the scene cache and informs the controller about them.
+        Returns false if the scene data has to be requested from the server
+        """
+        scene_hash = self._render_info.scene_hash
+        if scene_hash is None:
+            return False
+        # the scene is unchanged since the last connection
+        if scene_hash == self._scene_hash:
+            return True
+        if self._scene_cache is None:
+            return False
+        start = time.time()
+        meshes = self._scene_cache.load_scene(scene_hash)
+        if meshes is None:
+            return False
+
+        # scenes with heatmap data are never cached
+        self.sendStateMsgSig.emit((StateMsg.DATA_SCENE_INFO, {'has_heatmap': False}))
+        self._mesh_data.clear()
+        for mesh in meshes:
+            self._mesh_data.meshes.append(mesh)
+            self.sendStateMsgSig.emit((StateMsg.DATA_MESH, mesh))
+        self._scene_hash = scene_hash
+        logging.info('loaded scene with {} meshes from scene cache in: {:.3}s'.format(len(meshes), time.time() - start))
+        return True
+
     def deserialize_camera(self, stream : Stream):
         """
         Deserialize the Camera data and informs the controller about it
@@ -261,6 +391,9 @@ class Model(QObject):
         #start = time.time()
         self._camera_data.deserialize(stream)
         #logging.info('deserialize camera data in: {:.3}s'.format(time.time() - start))
+        self._camera_hash = self._render_info.scene_hash
+        if self._scene_cache is not None and self._camera_hash is not None:
+            self._scene_cache.store_camera(self._camera_hash, self._camera_data)
         self.sendStateMsgSig.emit((StateMsg.DATA_CAMERA, self._camera_data))
 
     def deserialize_scene_objects(self, stream : Stream):
@@ -281,6 +414,7 @@ class Model(QObject):
 
         self.sendStateMsgSig.emit((StateMsg.DATA_SCENE_INFO, scene_info))
 
+        first = self._mesh_data.mesh_count
         num_meshes = stream.read_uint()
         for i in range(num_meshes):
             #start = time.time()
@@ -292,13 +426,43 @@ class Model(QObject):
         if has_heatmap_data: # send a signal to update the max value
             self.sendStateMsgSig.emit((StateMsg.DATA_SCENE_INFO, None))
 
+        # the scene hash is only reported for scenes without heatmap data
+        self._scene_hash = self._render_info.scene_hash
+        if self._scene_cache is not None and self._scene_hash is not None:
+            self._scene_cache.store_scene(self._scene_hash, self._mesh_data.meshes[first:])
+
         logging.info('loaded scene with {} meshes in: {:.3}s'.format(num_meshes, time.time() - start))
 
-    def deserialize_pixel_data(self, stream : Stream):
+    def deserialize_filter_statistics(self, stream : Stream):
+        """
+        Deserialize the statistics of the paths the server rejected with the predicate of the pixel request,
+        they are added to the pixel data once its response is complete
+        """
+        self._filter_statistics = FilterStatistics()
+        self._filter_statistics.deserialize(stream)
+        logging.info('server side filter {}'.format(self._filter_statistics.to_string()))
+
+    def deserialize_pixel_data(self, stream : Stream, columns : bool = False, append : bool = False,
+                               pixel : typing.Optional[typing.Tuple[int, int, int, bytes]] = None):
         """
-        Deserialize Pixel data and informs the controller about it
+        Deserialize Pixel data and informs the controller about it.
+        If columns is set, the data was sent as columnar pixel response (protocol version 2).
+        If append is set, the data is a further chunk of a progressive pixel response and is added to the current data.
+        The requested pixel (x, y, sample count, predicate) is given once the response is complete,
+        it is stored in the pixel cache
         """
         #start = time.time()
-        self._pixel_data.deserialize(stream)
+        if append:
+            chunk = PixelData()
+            chunk.deserialize_columns(stream)
+            self._pixel_data.append(chunk)
+        elif columns:
+            self._pixel_data.deserialize_columns(stream)
+        else:
+            self._pixel_data.deserialize(stream)
+        if pixel is not None:
+            self._pixel_data.filter_statistics = self._filter_statistics
+            self._filter_statistics = None
+            self._pixel_cache.store((*pixel, self._render_identity()), self._pixel_data.copy())
         #logging.info('deserialize render data in: {:.3}s'.format(time.time() - start))
         self.sendStateMsgSig.emit((StateMsg.DATA_PIXEL, self._pixel_data))
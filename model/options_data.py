@@ -88,6 +88,60 @@ class OptionsConfig(object):
     def auto_image_load(self, value : bool):
         self._config['Options']['auto_rendered_image_load'] = str(value)
 
+    @property
+    def asyncio_transport(self) -> bool:
+        return self._config['Options'].get('asyncio_transport', 'False') == 'True'
+
+    @asyncio_transport.setter
+    def asyncio_transport(self, value : bool):
+        self._config['Options']['asyncio_transport'] = str(value)
+
+    @property
+    def auto_reconnect(self) -> bool:
+        return self._config['Options'].get('auto_reconnect', 'True') == 'True'
+
+    @auto_reconnect.setter
+    def auto_reconnect(self, value : bool):
+        self._config['Options']['auto_reconnect'] = str(value)
+
+    @property
+    def scene_cache(self) -> bool:
+        return self._config['Options'].get('scene_cache', 'True') == 'True'
+
+    @scene_cache.setter
+    def scene_cache(self, value : bool):
+        self._config['Options']['scene_cache'] = str(value)
+
+    @property
+    def memory_budget(self) -> int:
+        """
+        Returns the memory budget of the loaded data in MiB, zero if unlimited
+        """
+        return int(self._config['Options'].get('memory_budget', '0'))
+
+    @memory_budget.setter
+    def memory_budget(self, value : int):
+        self._config['Options']['memory_budget'] = str(value)
+
+    @property
+    def pixel_cache_size(self) -> int:
+        """
+        Returns the maximum memory of the cached pixel responses in MiB, zero disables the cache
+        """
+        return int(self._config['Options'].get('pixel_cache_size', '256'))
+
+    @pixel_cache_size.setter
+    def pixel_cache_size(self, value : int):
+        self._config['Options']['pixel_cache_size'] = str(value)
+
+    @property
+    def capture_filepath(self) -> typing.Optional[str]:
+        return self._config['Options'].get('capture_filepath')
+
+    @capture_filepath.setter
+    def capture_filepath(self, filepath : str):
+        self._config['Options']['capture_filepath'] = filepath
+
     @property
     def last_hostname(self) -> str:
         return self._config['Last'].get('hostname', 'localhost')
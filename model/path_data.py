@@ -26,88 +26,131 @@
 from core.color import Color4f
 from core.point import Point3f
 import typing
-from stream.stream import Stream
+from collections.abc import Mapping
 from model.intersection_data import IntersectionData
-from model.user_data import UserData
+from model.path_table import PathTable, IntersectionTable
+from model.user_data import UserData, UserDataTable
+
+
+class IntersectionMapping(Mapping):
+
+    """
+        IntersectionMapping
+        Read-only dict {depth_idx : IntersectionData} over the intersection rows of one path.
+        IntersectionData objects are created on access.
+    """
+
+    def __init__(self, table : IntersectionTable, user_data : UserDataTable, begin : int, end : int):
+        self._table = table
+        self._user_data = user_data
+        self._begin = begin
+        self._end = end
+        self._rows = None
+
+    def _row_of(self) -> typing.Dict[int, int]:
+        if self._rows is None:
+            depth_indices = self._table.depth_idx[self._begin:self._end].tolist()
+            self._rows = dict(zip(depth_indices, range(self._begin, self._end)))
+        return self._rows
+
+    def __getitem__(self, depth_idx : int) -> IntersectionData:
+        return IntersectionData(self._table, self._user_data, self._row_of()[depth_idx])
+
+    def __iter__(self):
+        return iter(self._row_of())
+
+    def __len__(self) -> int:
+        return self._end - self._begin
+
+    def values(self):
+        for row in range(self._begin, self._end):
+            yield IntersectionData(self._table, self._user_data, row)
+
 
 class PathData(UserData):
 
     """
         PathData
-        Represents one traced path with added user data
+        Represents one traced path with added user data.
+        The values are read on demand from a row of the path table.
     """
 
-    def __init__(self, stream : Stream):
-        super().__init__(stream)
-        self._sample_idx = stream.read_uint()
-        self._path_depth = stream.read_uint()
-        self._path_origin = stream.read_point3f()
+    def __init__(self,
+                 table : PathTable, user_data : UserDataTable,
+                 intersections : IntersectionTable, intersection_user_data : UserDataTable,
+                 row : int):
+        super().__init__(user_data, row)
+        self._table = table
+        self._intersections = intersections
+        self._intersection_user_data = intersection_user_data
+        self._row = row
 
-        self._final_estimate = None
-        if stream.read_bool():
-            self._final_estimate = stream.read_color4f()
-
-        self._dict_intersections = {}
-        self._intersection_count = stream.read_uint()
-        for i in range(0, self._intersection_count):
-            intersection = IntersectionData(stream)
-            self._dict_intersections[intersection.depth_idx] = intersection
+    @property
+    def row(self) -> int:
+        """
+        Returns the row of this path within the path table
+        """
+        return self._row
 
     @property
-    def final_estimate(self) -> Color4f:
+    def final_estimate(self) -> typing.Optional[Color4f]:
         """
         Returns the Final Estimate value of this path
         """
-        return self._final_estimate
+        if not self._table.has_final_estimate[self._row]:
+            return None
+        return self._table.final_estimate[self._row].view(Color4f)
 
     @property
     def sample_idx(self) -> int:
         """
         Returns the samples index which indicates the path index
         """
-        return self._sample_idx
+        return int(self._table.sample_idx[self._row])
 
     @property
     def path_origin(self) -> Point3f:
         """
         Returns the path origin
         """
-        return self._path_origin
+        return self._table.path_origin[self._row].view(Point3f)
 
     @property
     def path_depth(self) -> int:
         """
         Returns the path depth (amount of bounces and containing vertices)
         """
-        return self._path_depth
+        return int(self._table.path_depth[self._row])
 
     @property
-    def intersections(self) -> typing.Dict[int, IntersectionData]:
+    def intersections(self) -> typing.Mapping[int, IntersectionData]:
         """
         Returns the a dict containing all path vertices
         """
-        return self._dict_intersections
+        offsets = self._intersections.offsets
+        return IntersectionMapping(self._intersections, self._intersection_user_data,
+                                   int(offsets[self._row]), int(offsets[self._row+1]))
 
     @property
     def intersection_count(self) -> int:
         """
         Returns the amount of vertices (intersections)
         """
-        return self._intersection_count
+        offsets = self._intersections.offsets
+        return int(offsets[self._row+1]) - int(offsets[self._row])
 
     def valid_depth(self) -> bool:
         """
         Checks if the path depth is valid
         """
-        return self._path_depth is not None
+        return self.path_depth is not None
 
     def to_string(self) -> str:
         return "SampleIdx = {}\n" \
                "PathDepth = {}\n" \
                "PathOrigin = {}\n" \
                "FinalEstimate = {}\n" \
-               "ShowPath = {}\n" \
                "Intersections = {}\n" \
-               "IntersectionCount = {}".format(self._sample_idx, self._path_depth, self._path_origin,
-                                               self._final_estimate, self._dict_intersections,
-                                               self._intersection_count)
+               "IntersectionCount = {}".format(self.sample_idx, self.path_depth, self.path_origin,
+                                               self.final_estimate, dict(self.intersections),
+                                               self.intersection_count)
@@ -0,0 +1,293 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+import numpy as np
+from enum import IntFlag
+
+
+class PathTable(object):
+
+    """
+        PathTable
+        Stores the per-path information of all paths traced through one pixel as contiguous columns.
+        Row i of each column belongs to the i-th received path.
+    """
+
+    def __init__(self,
+                 sample_idx : np.ndarray = None,
+                 path_depth : np.ndarray = None,
+                 path_origin : np.ndarray = None,
+                 final_estimate : np.ndarray = None,
+                 has_final_estimate : np.ndarray = None):
+        self._sample_idx = sample_idx if sample_idx is not None else np.zeros(0, dtype=np.uint32)
+        self._path_depth = path_depth if path_depth is not None else np.zeros(0, dtype=np.uint32)
+        self._path_origin = path_origin if path_origin is not None else np.zeros((0, 3), dtype=np.float32)
+        self._final_estimate = final_estimate if final_estimate is not None else np.zeros((0, 4), dtype=np.float32)
+        self._has_final_estimate = has_final_estimate if has_final_estimate is not None else np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._sample_idx)
+
+    @property
+    def sample_idx(self) -> np.ndarray:
+        """
+        Returns the sample index of each path (uint32)
+        """
+        return self._sample_idx
+
+    @property
+    def path_depth(self) -> np.ndarray:
+        """
+        Returns the path depth of each path (uint32)
+        """
+        return self._path_depth
+
+    @property
+    def path_origin(self) -> np.ndarray:
+        """
+        Returns the origin of each path (float32, n x 3)
+        """
+        return self._path_origin
+
+    @property
+    def final_estimate(self) -> np.ndarray:
+        """
+        Returns the final estimate of each path (float32, n x 4), rows without an estimate are zero
+        """
+        return self._final_estimate
+
+    @property
+    def has_final_estimate(self) -> np.ndarray:
+        """
+        Returns a mask of all paths for which the server provided a final estimate
+        """
+        return self._has_final_estimate
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of all columns in bytes
+        """
+        return self._sample_idx.nbytes + self._path_depth.nbytes + self._path_origin.nbytes \
+            + self._final_estimate.nbytes + self._has_final_estimate.nbytes
+
+    @staticmethod
+    def concatenate(tables : typing.List['PathTable']) -> 'PathTable':
+        """
+        Returns a new table containing the rows of all given tables
+        """
+        return PathTable(np.concatenate([t.sample_idx for t in tables]),
+                         np.concatenate([t.path_depth for t in tables]),
+                         np.concatenate([t.path_origin for t in tables]),
+                         np.concatenate([t.final_estimate for t in tables]),
+                         np.concatenate([t.has_final_estimate for t in tables]))
+
+
+class IntersectionFlag(IntFlag):
+
+    """
+        IntersectionFlag
+        Bits of the per-intersection flags of the columnar pixel response
+    """
+
+    HAS_POS     = 0x01
+    HAS_NE      = 0x02
+    VISIBLE_NE  = 0x04
+    HAS_LI      = 0x08
+    HAS_LE      = 0x10
+
+
+class IntersectionTable(object):
+
+    """
+        IntersectionTable
+        Stores all intersections of all paths of one pixel as contiguous columns (CSR layout).
+        The intersections of path i are located in the rows offsets[i] to offsets[i+1].
+        Optional fields are accompanied by a mask, unset rows are zero.
+    """
+
+    def __init__(self,
+                 offsets : np.ndarray = None,
+                 depth_idx : np.ndarray = None,
+                 pos : np.ndarray = None,
+                 has_pos : np.ndarray = None,
+                 pos_ne : np.ndarray = None,
+                 has_ne : np.ndarray = None,
+                 visible_ne : np.ndarray = None,
+                 li : np.ndarray = None,
+                 has_li : np.ndarray = None,
+                 le : np.ndarray = None,
+                 has_le : np.ndarray = None):
+        self._offsets = offsets if offsets is not None else np.zeros(1, dtype=np.uint32)
+        self._depth_idx = depth_idx if depth_idx is not None else np.zeros(0, dtype=np.uint32)
+        self._pos = pos if pos is not None else np.zeros((0, 3), dtype=np.float32)
+        self._has_pos = has_pos if has_pos is not None else np.zeros(0, dtype=bool)
+        self._pos_ne = pos_ne if pos_ne is not None else np.zeros((0, 3), dtype=np.float32)
+        self._has_ne = has_ne if has_ne is not None else np.zeros(0, dtype=bool)
+        self._visible_ne = visible_ne if visible_ne is not None else np.zeros(0, dtype=bool)
+        self._li = li if li is not None else np.zeros((0, 4), dtype=np.float32)
+        self._has_li = has_li if has_li is not None else np.zeros(0, dtype=bool)
+        self._le = le if le is not None else np.zeros((0, 4), dtype=np.float32)
+        self._has_le = has_le if has_le is not None else np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._depth_idx)
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        Returns the row offsets of each path (uint32, number of paths + 1)
+        """
+        return self._offsets
+
+    @property
+    def counts(self) -> np.ndarray:
+        """
+        Returns the number of intersections of each path
+        """
+        return np.diff(self._offsets)
+
+    @property
+    def path_rows(self) -> np.ndarray:
+        """
+        Returns the path row of each intersection
+        """
+        return np.repeat(np.arange(len(self._offsets)-1), self.counts)
+
+    @property
+    def depth_idx(self) -> np.ndarray:
+        """
+        Returns the depth index of each intersection (uint32)
+        """
+        return self._depth_idx
+
+    @property
+    def pos(self) -> np.ndarray:
+        """
+        Returns the intersection positions (float32, m x 3)
+        """
+        return self._pos
+
+    @property
+    def has_pos(self) -> np.ndarray:
+        return self._has_pos
+
+    @property
+    def pos_ne(self) -> np.ndarray:
+        """
+        Returns the next event estimation positions (float32, m x 3)
+        """
+        return self._pos_ne
+
+    @property
+    def has_ne(self) -> np.ndarray:
+        return self._has_ne
+
+    @property
+    def visible_ne(self) -> np.ndarray:
+        """
+        Returns if the next event estimation was visible (not occluded)
+        """
+        return self._visible_ne
+
+    @property
+    def li(self) -> np.ndarray:
+        """
+        Returns the incident radiance estimates (float32, m x 4)
+        """
+        return self._li
+
+    @property
+    def has_li(self) -> np.ndarray:
+        return self._has_li
+
+    @property
+    def le(self) -> np.ndarray:
+        """
+        Returns the emission at each intersection (float32, m x 4)
+        """
+        return self._le
+
+    @property
+    def has_le(self) -> np.ndarray:
+        return self._has_le
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of all columns in bytes
+        """
+        return self._offsets.nbytes + self.row_nbytes * len(self)
+
+    @property
+    def row_nbytes(self) -> int:
+        """
+        Returns the memory of one intersection row in bytes
+        """
+        return sum(column.itemsize * int(np.prod(column.shape[1:], dtype=np.int64))
+                   for column in (self._depth_idx, self._pos, self._has_pos, self._pos_ne, self._has_ne,
+                                  self._visible_ne, self._li, self._has_li, self._le, self._has_le))
+
+    def select_paths(self, mask : np.ndarray) -> 'IntersectionTable':
+        """
+        Returns a new table which only contains the intersections of the paths set in the mask,
+        all other paths keep their row but have no intersections
+        """
+        counts = np.where(mask, self.counts, 0)
+        offsets = np.zeros(len(counts)+1, dtype=np.uint32)
+        np.cumsum(counts, out=offsets[1:])
+        rows = np.repeat(mask, self.counts)
+        return IntersectionTable(offsets,
+                                 self._depth_idx[rows],
+                                 self._pos[rows],
+                                 self._has_pos[rows],
+                                 self._pos_ne[rows],
+                                 self._has_ne[rows],
+                                 self._visible_ne[rows],
+                                 self._li[rows],
+                                 self._has_li[rows],
+                                 self._le[rows],
+                                 self._has_le[rows])
+
+    @staticmethod
+    def concatenate(tables : typing.List['IntersectionTable']) -> 'IntersectionTable':
+        """
+        Returns a new table containing the rows of all given tables, the offsets are shifted accordingly
+        """
+        offsets = [tables[0].offsets]
+        for t in tables[1:]:
+            offsets.append(t.offsets[1:] + offsets[-1][-1])
+        return IntersectionTable(np.concatenate(offsets).astype(np.uint32, copy=False),
+                                 np.concatenate([t.depth_idx for t in tables]),
+                                 np.concatenate([t.pos for t in tables]),
+                                 np.concatenate([t.has_pos for t in tables]),
+                                 np.concatenate([t.pos_ne for t in tables]),
+                                 np.concatenate([t.has_ne for t in tables]),
+                                 np.concatenate([t.visible_ne for t in tables]),
+                                 np.concatenate([t.li for t in tables]),
+                                 np.concatenate([t.has_li for t in tables]),
+                                 np.concatenate([t.le for t in tables]),
+                                 np.concatenate([t.has_le for t in tables]))
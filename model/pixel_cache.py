@@ -0,0 +1,127 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import collections
+import threading
+import typing
+from model.pixel_data import PixelData
+
+
+class PixelCache(object):
+
+    """
+        PixelCache
+        In-memory LRU cache of complete pixel responses, keyed by the pixel, its sample count and the render identity.
+        The cache is bounded by the memory of the cached pixel data, the least recently used pixels are evicted first.
+        Pixels are stored by the receiving thread and loaded by the main thread.
+    """
+
+    def __init__(self, max_size : int = 256 << 20):
+        self._max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def max_size(self) -> int:
+        """
+        Returns the maximum memory of all cached pixels in bytes, zero disables the cache
+        """
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, max_size : int):
+        with self._lock:
+            self._max_size = max_size
+            self._evict()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of all cached pixels in bytes
+        """
+        return self._size
+
+    def unshared_nbytes(self, pixel_data : PixelData) -> int:
+        """
+        Returns the memory of all cached pixels in bytes without the tables shared with the given pixel data
+        """
+        with self._lock:
+            return self._size - sum(cached.shared_nbytes(pixel_data) for cached, _ in self._entries.values())
+
+    def _evict(self):
+        while self._entries and self._size > self._max_size:
+            _, (pixel_data, nbytes) = self._entries.popitem(last=False)
+            self._size -= nbytes
+
+    def store(self, key : typing.Hashable, pixel_data : PixelData):
+        """
+        Stores the pixel data under the given key, pixels larger than the cache are not stored
+        """
+        nbytes = pixel_data.nbytes
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            if nbytes > self._max_size:
+                return
+            self._entries[key] = (pixel_data, nbytes)
+            self._size += nbytes
+            self._evict()
+
+    def load(self, key : typing.Hashable) -> typing.Optional[PixelData]:
+        """
+        Returns the pixel data of the given key and marks it as recently used, None if it is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def release(self, nbytes : int, pixel_data : typing.Optional[PixelData] = None) -> int:
+        """
+        Evicts the least recently used pixels until at least nbytes are freed and returns the freed bytes.
+        Tables shared with the given pixel data stay in memory, they do not count as freed
+        """
+        freed = 0
+        with self._lock:
+            while self._entries and freed < nbytes:
+                _, (cached, size) = self._entries.popitem(last=False)
+                self._size -= size
+                freed += size - (cached.shared_nbytes(pixel_data) if pixel_data is not None else 0)
+        return freed
+
+    def clear(self):
+        """
+        Removes all cached pixels
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -24,12 +24,49 @@
 """
 
 import typing
-from stream.stream import Stream
+import threading
+from collections.abc import Mapping
+from stream.stream import Stream, Layout
 from model.path_data import PathData
+from model.path_table import PathTable, IntersectionTable, IntersectionFlag
+from model.user_data import UserDataSchema, UserDataTable
+from model.user_data_index import UserDataIndex
+from model.filter_statistics import FilterStatistics
 import numpy as np
 import logging
 
 
+class PathMapping(Mapping):
+
+    """
+        PathMapping
+        Read-only dict {sample_idx : PathData} over the path table of the pixel data.
+        PathData objects are created on access.
+    """
+
+    def __init__(self, pixel_data : 'PixelData'):
+        self._pixel_data = pixel_data
+
+    def __getitem__(self, sample_idx : int) -> PathData:
+        row = self._pixel_data.path_row(sample_idx)
+        if row is None:
+            raise KeyError(sample_idx)
+        return self._pixel_data.path(row)
+
+    def __iter__(self):
+        return iter(self._pixel_data.paths.sample_idx.tolist())
+
+    def __len__(self) -> int:
+        return len(self._pixel_data.paths)
+
+    def __contains__(self, sample_idx) -> bool:
+        return self._pixel_data.path_row(sample_idx) is not None
+
+    def values(self):
+        for row in range(len(self._pixel_data.paths)):
+            yield self._pixel_data.path(row)
+
+
 class PixelData(object):
 
     """
@@ -37,46 +74,405 @@ class PixelData(object):
         Represents information about one pixel.
         The data is computed on the server side in the pixel re-rendering step.
         Containing all information about all traced paths through this pixel with all user added information.
+        Paths and intersections are stored column-wise in a PathTable and an IntersectionTable,
+        PathData and IntersectionData objects are only created as views on access.
+        If the memory budget is exceeded, the intersections of some paths are dropped and only their path row is kept.
     """
 
+    # value of unset optional fields
+    _NO_POINT3F = (0.0, 0.0, 0.0)
+    _NO_COLOR4F = (0.0, 0.0, 0.0, 0.0)
+
     def __init__(self):
-        # {sample_index / path_index : PathData}
-        self._dict_paths = {}  # ordered dict (since Python 3.7)
+        self._paths = PathTable()
+        self._intersections = IntersectionTable()
+        self._path_user_data = UserDataTable()
+        self._intersection_user_data = UserDataTable()
+        # paths whose intersections were dropped to fit into the memory budget
+        self._dropped = np.zeros(0, dtype=bool)
+        # sorted sample indices and their rows, used to look up rows by sample index
+        self._sorted_sample_idx = None
+        self._sorted_rows = None
+        # increased whenever the tables are replaced, row aligned data of other objects is outdated then
+        self._generation = 0
+        # inverted index of the user data, built on first use
+        self._user_data_index = None
+        # aggregates of the paths the server did not send due to the predicate of the request
+        self._filter_statistics = None
+        self._dict_paths = PathMapping(self)
+        # the tables are replaced by the receiving thread and downsampled by the main thread
+        self._lock = threading.RLock()
+
+    def _set_tables(self, paths : PathTable, intersections : IntersectionTable,
+                    path_user_data : UserDataTable, intersection_user_data : UserDataTable,
+                    dropped : typing.Optional[np.ndarray] = None):
+        with self._lock:
+            self._paths = paths
+            self._intersections = intersections
+            self._path_user_data = path_user_data
+            self._intersection_user_data = intersection_user_data
+            self._dropped = dropped if dropped is not None else np.zeros(len(paths), dtype=bool)
+            self._sorted_sample_idx = None
+            self._sorted_rows = None
+            self._generation += 1
+            self._user_data_index = None
 
     def deserialize(self, stream : Stream):
         """
         Deserialize a DataView object from the socket stream
         """
+        self._filter_statistics = None
         sample_count = stream.read_uint()
-        self._dict_paths.clear()
         logging.info("SampleCount: {}".format(sample_count))
+
+        no_point = self._NO_POINT3F
+        no_color = self._NO_COLOR4F
+
+        path_user_data = UserDataSchema()
+        path_headers = []
+        final_estimates = []
+        intersection_counts = []
+        intersection_user_data = UserDataSchema()
+        intersection_flags = []
+        intersection_values = []
+
         # deserialize the amount of paths which were traced through the selected pixel
         for sample in range(sample_count):
-            path_data = PathData(stream)
-            # append deserialized path to dict
-            self._dict_paths[path_data.sample_idx] = path_data
+            path_user_data.deserialize(stream, sample)
+            header = stream.read_layout(Layout.PATH_HEADER)
+            path_headers.append(header)
+            final_estimates.append(stream.read_layout(Layout.COLOR4F) if header[5] else no_color)
+
+            intersection_count = stream.read_uint()
+            intersection_counts.append(intersection_count)
+            for i in range(intersection_count):
+                intersection_user_data.deserialize(stream, len(intersection_flags))
+
+                # every optional field is announced by a bool flag which is decoded together with the preceding field
+                depth_idx, has_pos = stream.read_layout(Layout.INTERSECTION_HEADER)
+                if has_pos:
+                    *pos, has_ne = stream.read_layout(Layout.POINT3F_FLAG)
+                else:
+                    pos, has_ne = no_point, stream.read_bool()
+                visible_ne = False
+                if has_ne:
+                    *pos_ne, visible_ne, has_li = stream.read_layout(Layout.NEXT_EVENT)
+                else:
+                    pos_ne, has_li = no_point, stream.read_bool()
+                if has_li:
+                    *li, has_le = stream.read_layout(Layout.COLOR4F_FLAG)
+                else:
+                    li, has_le = no_color, stream.read_bool()
+                le = stream.read_layout(Layout.COLOR4F) if has_le else no_color
+
+                intersection_flags.append((depth_idx, has_pos, has_ne, visible_ne, has_li, has_le))
+                intersection_values.append((*pos, *pos_ne, *li, *le))
+
+        headers = np.array(path_headers, dtype=np.float64).reshape([sample_count, 6])
+        paths = PathTable(sample_idx=headers[:, 0].astype(np.uint32),
+                          path_depth=headers[:, 1].astype(np.uint32),
+                          path_origin=headers[:, 2:5].astype(np.float32),
+                          final_estimate=np.array(final_estimates, dtype=np.float32).reshape([sample_count, 4]),
+                          has_final_estimate=headers[:, 5].astype(bool))
+
+        num_intersections = len(intersection_flags)
+        offsets = np.zeros(sample_count+1, dtype=np.uint32)
+        np.cumsum(intersection_counts, out=offsets[1:])
+        flags = np.array(intersection_flags, dtype=np.uint32).reshape([num_intersections, 6])
+        values = np.array(intersection_values, dtype=np.float32).reshape([num_intersections, 14])
+        intersections = IntersectionTable(offsets=offsets,
+                                          depth_idx=flags[:, 0].copy(),
+                                          pos=values[:, 0:3].copy(),
+                                          has_pos=flags[:, 1].astype(bool),
+                                          pos_ne=values[:, 3:6].copy(),
+                                          has_ne=flags[:, 2].astype(bool),
+                                          visible_ne=flags[:, 3].astype(bool),
+                                          li=values[:, 6:10].copy(),
+                                          has_li=flags[:, 4].astype(bool),
+                                          le=values[:, 10:14].copy(),
+                                          has_le=flags[:, 5].astype(bool))
+
+        self._set_tables(paths, intersections,
+                         path_user_data.build(sample_count),
+                         intersection_user_data.build(num_intersections))
+
+    def deserialize_columns(self, stream : Stream):
+        """
+        Deserialize the columnar pixel response (protocol version 2) from the socket stream.
+        All fixed size fields are sent as contiguous arrays and mapped directly into the tables.
+        """
+        sample_count, num_intersections = stream.read_layout(Layout.PIXEL_COLUMNS)
+        logging.info("SampleCount: {}".format(sample_count))
+        self._filter_statistics = None
+
+        offsets = np.zeros(sample_count+1, dtype=np.uint32)
+        sample_idx = stream.read_array(np.uint32, sample_count)
+        path_depth = stream.read_array(np.uint32, sample_count)
+        np.cumsum(stream.read_array(np.uint32, sample_count), out=offsets[1:])
+        path_origin = stream.read_array(np.float32, (sample_count, 3))
+        final_estimate = stream.read_array(np.float32, (sample_count, 4))
+
+        depth_idx = stream.read_array(np.uint32, num_intersections)
+        pos = stream.read_array(np.float32, (num_intersections, 3))
+        pos_ne = stream.read_array(np.float32, (num_intersections, 3))
+        li = stream.read_array(np.float32, (num_intersections, 4))
+        le = stream.read_array(np.float32, (num_intersections, 4))
+
+        has_final_estimate = stream.read_array(np.bool_, sample_count)
+        flags = stream.read_array(np.uint8, num_intersections)
+
+        paths = PathTable(sample_idx=sample_idx,
+                          path_depth=path_depth,
+                          path_origin=path_origin,
+                          final_estimate=final_estimate,
+                          has_final_estimate=has_final_estimate)
+        intersections = IntersectionTable(offsets=offsets,
+                                          depth_idx=depth_idx,
+                                          pos=pos,
+                                          has_pos=(flags & IntersectionFlag.HAS_POS) != 0,
+                                          pos_ne=pos_ne,
+                                          has_ne=(flags & IntersectionFlag.HAS_NE) != 0,
+                                          visible_ne=(flags & IntersectionFlag.VISIBLE_NE) != 0,
+                                          li=li,
+                                          has_li=(flags & IntersectionFlag.HAS_LI) != 0,
+                                          le=le,
+                                          has_le=(flags & IntersectionFlag.HAS_LE) != 0)
+        path_user_data = UserDataTable.deserialize(stream, sample_count)
+        intersection_user_data = UserDataTable.deserialize(stream, num_intersections)
+
+        self._set_tables(paths, intersections, path_user_data, intersection_user_data)
+
+    def append(self, pixel_data : 'PixelData'):
+        """
+        Appends the paths of the given pixel data, used for progressive pixel responses
+        """
+        with self._lock:
+            self._set_tables(PathTable.concatenate([self._paths, pixel_data.paths]),
+                             IntersectionTable.concatenate([self._intersections, pixel_data.intersections]),
+                             UserDataTable.concatenate([self._path_user_data, pixel_data.path_user_data]),
+                             UserDataTable.concatenate([self._intersection_user_data,
+                                                        pixel_data.intersection_user_data]),
+                             np.concatenate([self._dropped, pixel_data.dropped]))
+
+    def copy(self) -> 'PixelData':
+        """
+        Returns a new pixel data sharing the tables of this one, the tables themselves are never modified
+        """
+        pixel_data = PixelData()
+        pixel_data.assign(self)
+        return pixel_data
+
+    def assign(self, pixel_data : 'PixelData'):
+        """
+        Replaces the data with the tables of the given pixel data
+        """
+        with pixel_data._lock:
+            self._set_tables(pixel_data.paths, pixel_data.intersections,
+                             pixel_data.path_user_data, pixel_data.intersection_user_data,
+                             pixel_data.dropped)
+            self._filter_statistics = pixel_data.filter_statistics
 
     @property
-    def dict_paths(self) -> typing.Dict[int, PathData]:
+    def nbytes(self) -> int:
+        """
+        Returns the memory of all tables in bytes
+        """
+        nbytes = self._paths.nbytes + self._intersections.nbytes \
+            + self._path_user_data.nbytes + self._intersection_user_data.nbytes
+        user_data_index = self._user_data_index
+        return nbytes + (user_data_index.nbytes if user_data_index is not None else 0)
+
+    def shared_nbytes(self, pixel_data : 'PixelData') -> int:
+        """
+        Returns the memory of the tables which are shared with the given pixel data in bytes
+        """
+        tables = (self._paths, self._intersections, self._path_user_data, self._intersection_user_data)
+        others = (pixel_data.paths, pixel_data.intersections, pixel_data.path_user_data,
+                  pixel_data.intersection_user_data)
+        return sum(table.nbytes for table, other in zip(tables, others) if table is other)
+
+    def drop_intersections(self, max_nbytes : int, keep_indices : typing.Optional[np.ndarray] = None) -> int:
+        """
+        Drops the intersections (and their user data) of paths until the pixel data fits into max_nbytes.
+        The intersections of the paths in keep_indices (sample indices) are kept first,
+        followed by the remaining paths in the order of their sample index.
+        All paths keep their row, e.g. their final estimate. Returns the number of paths whose intersections were dropped
+        """
+        with self._lock:
+            nbytes = self.nbytes
+            num_intersections = len(self._intersections)
+            if nbytes <= max_nbytes or num_intersections == 0:
+                return 0
+            counts = self._intersections.counts
+            intersection_nbytes = (nbytes - self._paths.nbytes - self._path_user_data.nbytes
+                                   - self._intersections.offsets.nbytes) / num_intersections
+            max_intersections = (max_nbytes - (nbytes - intersection_nbytes * num_intersections)) // intersection_nbytes
+
+            if self._sorted_sample_idx is None:
+                self._update_sorted_sample_idx()
+            order = self._sorted_rows
+            if keep_indices is not None and len(keep_indices) > 0:
+                keep_rows = self.path_rows(keep_indices)
+                keep_rows = np.unique(keep_rows[keep_rows >= 0])
+                order = np.concatenate([keep_rows, order[~np.isin(order, keep_rows)]])
+            kept = np.zeros(len(counts), dtype=bool)
+            kept[order[np.cumsum(counts[order]) <= max_intersections]] = True
+            # paths without intersections are not affected
+            kept |= counts == 0
+            if np.all(kept):
+                return 0
+
+            rows = np.repeat(kept, counts)
+            self._set_tables(self._paths,
+                             self._intersections.select_paths(kept),
+                             self._path_user_data,
+                             self._intersection_user_data.take(rows),
+                             self._dropped | ~kept)
+            return int(np.count_nonzero(~kept))
+
+    @property
+    def paths(self) -> PathTable:
+        """
+        Returns the column-wise path data of all traced paths
+        """
+        return self._paths
+
+    @property
+    def intersections(self) -> IntersectionTable:
+        """
+        Returns the column-wise intersection data of all traced paths
+        """
+        return self._intersections
+
+    @property
+    def path_user_data(self) -> UserDataTable:
+        """
+        Returns the column-wise user data of all paths
+        """
+        return self._path_user_data
+
+    @property
+    def intersection_user_data(self) -> UserDataTable:
+        """
+        Returns the column-wise user data of all intersections
+        """
+        return self._intersection_user_data
+
+    @property
+    def user_data_index(self) -> UserDataIndex:
+        """
+        Returns the inverted index of the user data, it is built once per loaded pixel
+        """
+        with self._lock:
+            if self._user_data_index is None:
+                self._user_data_index = UserDataIndex(self._path_user_data, self._intersections,
+                                                      self._intersection_user_data)
+            return self._user_data_index
+
+    @property
+    def filter_statistics(self) -> typing.Optional[FilterStatistics]:
+        """
+        Returns the aggregates of the paths the server rejected with the predicate of the request,
+        None if all paths were sent
+        """
+        return self._filter_statistics
+
+    @filter_statistics.setter
+    def filter_statistics(self, filter_statistics : typing.Optional[FilterStatistics]):
+        self._filter_statistics = filter_statistics
+
+    @property
+    def generation(self) -> int:
+        """
+        Returns a counter which is increased whenever the tables are replaced
+        """
+        return self._generation
+
+    @property
+    def dropped(self) -> np.ndarray:
+        """
+        Returns a mask of all paths whose intersections were dropped to fit into the memory budget
+        """
+        return self._dropped
+
+    @property
+    def dict_paths(self) -> typing.Mapping[int, PathData]:
         """
         Returns a dict containing all traced paths through the pixel
         """
         return self._dict_paths
 
+    def path(self, row : int) -> PathData:
+        """
+        Returns a view of the path stored in the given table row
+        """
+        return PathData(self._paths, self._path_user_data,
+                        self._intersections, self._intersection_user_data,
+                        row)
+
+    def _update_sorted_sample_idx(self):
+        sample_idx = self._paths.sample_idx
+        if np.all(sample_idx[1:] > sample_idx[:-1]):
+            # the server sends the paths ordered by their sample index
+            self._sorted_rows = np.arange(len(sample_idx))
+        else:
+            self._sorted_rows = np.argsort(sample_idx, kind='stable')
+        self._sorted_sample_idx = sample_idx[self._sorted_rows]
+
+    def path_rows(self, indices : np.ndarray) -> np.ndarray:
+        """
+        Returns the table rows of the given sample indices, unknown indices are mapped to -1
+        """
+        if self._sorted_sample_idx is None:
+            self._update_sorted_sample_idx()
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(self._sorted_sample_idx) == 0:
+            return np.full(indices.shape, -1, dtype=np.int64)
+        positions = np.searchsorted(self._sorted_sample_idx, indices)
+        positions = np.minimum(positions, len(self._sorted_sample_idx)-1)
+        found = self._sorted_sample_idx[positions] == indices
+        return np.where(found, self._sorted_rows[positions], -1)
+
+    def path_mask(self, indices : np.ndarray) -> np.ndarray:
+        """
+        Returns a boolean mask over the path rows which is set for the given sample indices
+        """
+        rows = self.path_rows(indices)
+        mask = np.zeros(len(self._paths), dtype=bool)
+        mask[rows[rows >= 0]] = True
+        return mask
+
+    def sample_indices(self, mask : np.ndarray) -> np.ndarray:
+        """
+        Returns the sample indices of all rows set in the given mask in ascending order
+        """
+        with self._lock:
+            if self._sorted_sample_idx is None:
+                self._update_sorted_sample_idx()
+            return self._sorted_sample_idx[mask[self._sorted_rows]].astype(np.int64)
+
+    def path_row(self, sample_idx : int) -> typing.Optional[int]:
+        """
+        Returns the table row of the given sample index or None if there is no such path
+        """
+        row = int(self.path_rows(np.array([sample_idx]))[0])
+        return row if row >= 0 else None
+
     def get_indices(self) -> np.ndarray:
         """
         Returns all path indices as numpy array
         """
-        return np.array(list(self._dict_paths.keys()))
+        return self._paths.sample_idx.astype(np.int64)
 
     def to_string(self) -> str:
         """
         Returns a string with class information
         """
-        return 'number of paths = {}'.format(len(self._dict_paths))
+        return 'number of paths = {}'.format(len(self._paths))
 
     def clear(self):
         """
         Clears the data
         """
-        self._dict_paths.clear()
+        self._filter_statistics = None
+        self._set_tables(PathTable(), IntersectionTable(), UserDataTable(), UserDataTable())
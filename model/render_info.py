@@ -23,6 +23,7 @@
     SOFTWARE.
 """
 
+import typing
 from stream.stream import Stream
 
 
@@ -38,16 +39,19 @@ class RenderInfo(object):
         self._renderer_name = None
         self._scene_name = None
         self._sample_count = None
+        self._scene_hash = None
 
-    def deserialize(self, stream : Stream):
+    def deserialize(self, stream : Stream, scene_hash : bool = False):
         """
         Deserialize a Render Info object from the socket stream
         :param stream: SocketStream
+        :param scene_hash: the server sends the scene hash (negotiated capability)
         :return:
         """
         self._renderer_name = self.str_or_not_set(stream.read_string())
         self._scene_name = self.str_or_not_set(stream.read_string())
         self._sample_count = stream.read_uint()
+        self._scene_hash = (stream.read_ulong() or None) if scene_hash else None
 
     @staticmethod
     def str_or_not_set(s : str) -> str:
@@ -73,6 +77,14 @@ class RenderInfo(object):
         """
         return self._scene_name
 
+    @property
+    def scene_hash(self) -> typing.Optional[int]:
+        """
+        Returns the content hash of the scene and camera,
+        None if the server does not provide it or the scene can not be cached (heatmap data)
+        """
+        return self._scene_hash
+
     @property
     def sample_count(self) -> int:
         """
@@ -0,0 +1,145 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import os
+import pickle
+import tempfile
+import typing
+import logging
+
+from model.scene_file import read_scene_file, write_scene_file
+
+
+class SceneCache(object):
+
+    """
+        SceneCache
+        Disk cache of the deserialized camera and scene objects,
+        keyed by the scene hash the server reports in the render info.
+        Scene objects are stored in the binary scene file format and opened as memory map.
+        Files are replaced atomically and the least recently used entries are evicted
+        once the cache exceeds its maximum size.
+    """
+
+    def __init__(self, directory : typing.Optional[str] = None, max_size : int = 4 << 30):
+        if directory is None:
+            cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            directory = os.path.join(cache_home, 'emca', 'scenes')
+        self._directory = directory
+        self._max_size = max_size
+
+    @property
+    def directory(self) -> str:
+        """
+        Returns the directory of the cache files
+        """
+        return self._directory
+
+    def _filepath(self, scene_hash : int, kind : str) -> str:
+        return os.path.join(self._directory, '{:016x}.{}'.format(scene_hash, kind))
+
+    @staticmethod
+    def _read_pickle(filepath : str) -> typing.Any:
+        with open(filepath, 'rb') as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def _write_pickle(f : typing.BinaryIO, data : typing.Any):
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, scene_hash : int, kind : str, read : typing.Callable[[str], typing.Any]) -> typing.Any:
+        filepath = self._filepath(scene_hash, kind)
+        try:
+            data = read(filepath)
+            # mark as recently used for the eviction
+            os.utime(filepath)
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error('Loading cache file {} failed: {}'.format(filepath, e))
+            return None
+
+    def _store(self, scene_hash : int, kind : str, data : typing.Any,
+               write : typing.Callable[[typing.BinaryIO, typing.Any], None]):
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            fd, tmp_filepath = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    write(f, data)
+                os.replace(tmp_filepath, self._filepath(scene_hash, kind))
+            except BaseException:
+                os.unlink(tmp_filepath)
+                raise
+        except Exception as e:
+            logging.error('Writing scene cache failed: {}'.format(e))
+            return
+        self._evict()
+
+    def _evict(self):
+        """
+        Removes the least recently used files until the cache fits into its maximum size
+        """
+        entries = []
+        with os.scandir(self._directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        for mtime, file_size, filepath in sorted(entries):
+            if size <= self._max_size:
+                break
+            try:
+                os.unlink(filepath)
+            except OSError:
+                pass
+            size -= file_size
+
+    def load_camera(self, scene_hash : int) -> typing.Any:
+        """
+        Returns the cached camera data of the scene or None
+        """
+        return self._load(scene_hash, 'camera', self._read_pickle)
+
+    def store_camera(self, scene_hash : int, camera_data : typing.Any):
+        """
+        Stores the camera data of the scene
+        """
+        self._store(scene_hash, 'camera', camera_data, self._write_pickle)
+
+    def load_scene(self, scene_hash : int) -> typing.Optional[typing.List[typing.Any]]:
+        """
+        Returns the cached list of scene objects (meshes and spheres) or None,
+        the arrays of the meshes point into the memory mapped scene file
+        """
+        return self._load(scene_hash, 'emcascene', read_scene_file)
+
+    def store_scene(self, scene_hash : int, meshes : typing.List[typing.Any]):
+        """
+        Stores the list of scene objects (meshes and spheres)
+        """
+        self._store(scene_hash, 'emcascene', meshes, write_scene_file)
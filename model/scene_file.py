@@ -0,0 +1,122 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import struct
+import typing
+
+import numpy as np
+
+from core.color import Color4f
+from core.point import Point3f
+from core.messages import ShapeType
+from model.mesh_data import MeshData, SphereData
+
+# binary scene file: header, one record per shape and the contiguous array blocks of all meshes.
+# Blocks are aligned, so that they can be used as arrays of the memory mapped file without copying.
+MAGIC = b'EMCASCN\0'
+VERSION = 1
+ALIGNMENT = 64
+
+# magic, version, shape count
+HEADER = struct.Struct('=8sII')
+# shape type, vertex count, triangle count, face color count,
+# offsets of the vertex, triangle and face color blocks, diffuse color, specular color,
+# sphere center and radius
+SHAPE_RECORD = struct.Struct('=h2xIIIQQQ4f4f3ff')
+
+
+def _align(offset : int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_scene_file(f : typing.BinaryIO, meshes : typing.List[typing.Union[MeshData, SphereData]]):
+    """
+    Writes the scene objects to the binary file.
+    Triangles are stored in the cell layout of vtk (3 followed by the three vertex indices as int64),
+    so that they can be handed to the renderer as they are
+    """
+    blocks = []
+    records = []
+    offset = _align(HEADER.size + SHAPE_RECORD.size * len(meshes))
+    for mesh in meshes:
+        if mesh.shape_type is ShapeType.TriangleMesh:
+            arrays = [np.ascontiguousarray(mesh.vertices, np.float32),
+                      np.ascontiguousarray(mesh.triangles, np.int64)]
+            face_color_count = 0
+            if mesh.face_colors is not None:
+                arrays.append(np.ascontiguousarray(mesh.face_colors, np.float32))
+                face_color_count = len(arrays[-1]) // 3
+            offsets = []
+            for array in arrays:
+                offsets.append(offset)
+                blocks.append((offset, array))
+                offset = _align(offset + array.nbytes)
+            offsets += [0] * (3 - len(offsets))
+            records.append(SHAPE_RECORD.pack(ShapeType.TriangleMesh.value, mesh.vertex_count, mesh.triangle_count,
+                                             face_color_count, *offsets, *mesh.diffuse_color, *mesh.specular_color,
+                                             0.0, 0.0, 0.0, 0.0))
+        else:
+            records.append(SHAPE_RECORD.pack(ShapeType.SphereMesh.value, 0, 0, 0, 0, 0, 0,
+                                             *mesh.diffuse_color, *mesh.specular_color, *mesh.center, mesh.radius))
+
+    f.write(HEADER.pack(MAGIC, VERSION, len(meshes)))
+    position = HEADER.size
+    for record in records:
+        f.write(record)
+        position += len(record)
+    for offset, array in blocks:
+        f.write(bytes(offset - position))
+        f.write(memoryview(array).cast('B'))
+        position = offset + array.nbytes
+
+
+def read_scene_file(filepath : str) -> typing.List[typing.Union[MeshData, SphereData]]:
+    """
+    Opens the binary scene file as memory map and returns the scene objects.
+    The arrays of the meshes point into the mapped file (copy on write), so the file is read by the renderer
+    """
+    data = np.memmap(filepath, dtype=np.uint8, mode='c')
+    magic, version, shape_count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('{} is not an EMCA scene file of version {}'.format(filepath, VERSION))
+
+    def block(offset : int, dtype : np.dtype, count : int) -> np.ndarray:
+        return data[offset:offset + count * np.dtype(dtype).itemsize].view(dtype)
+
+    meshes = []
+    for i in range(shape_count):
+        record = SHAPE_RECORD.unpack_from(data, HEADER.size + i * SHAPE_RECORD.size)
+        shape_type, vertex_count, triangle_count, face_color_count = record[0:4]
+        vertices_offset, triangles_offset, face_colors_offset = record[4:7]
+        diffuse_color = Color4f(*record[7:11])
+        specular_color = Color4f(*record[11:15])
+        if shape_type == ShapeType.TriangleMesh.value:
+            face_colors = block(face_colors_offset, np.float32, face_color_count * 3) if face_color_count > 0 else None
+            meshes.append(MeshData.from_arrays(block(vertices_offset, np.float32, vertex_count * 3),
+                                               block(triangles_offset, np.int64, triangle_count * 4),
+                                               face_colors, diffuse_color, specular_color))
+        elif shape_type == ShapeType.SphereMesh.value:
+            meshes.append(SphereData.from_values(Point3f(*record[15:18]), record[18], diffuse_color, specular_color))
+    return meshes
@@ -23,8 +23,349 @@
     SOFTWARE.
 """
 
+import sys
 import typing
-from stream.stream import Stream
+from core.point import Point2f, Point2i, Point3f, Point3i
+from core.color import Color4f
+from stream.stream import Stream, Layout
+import numpy as np
+
+
+class UserDataType(object):
+
+    """
+        UserDataType
+        Describes how a user data type of the binary protocol is read and stored column-wise.
+    """
+
+    def __init__(self, dtype : typing.Any, components : int, layout : typing.Optional[Layout], wrapper : typing.Optional[type]):
+        self._dtype = dtype
+        self._components = components
+        self._layout = layout
+        self._wrapper = wrapper
+
+    @property
+    def dtype(self) -> typing.Any:
+        """
+        Returns the numpy dtype of the column
+        """
+        return self._dtype
+
+    @property
+    def components(self) -> int:
+        """
+        Returns the number of components of one value
+        """
+        return self._components
+
+    @property
+    def layout(self) -> typing.Optional[Layout]:
+        """
+        Returns the struct layout of one value or None for strings
+        """
+        return self._layout
+
+    @property
+    def wrapper(self) -> typing.Optional[type]:
+        """
+        Returns the point or color type of a value or None for scalars
+        """
+        return self._wrapper
+
+
+# maps the type identifier of the binary protocol onto the column type
+USER_DATA_TYPES = {
+    b'?':   UserDataType(np.bool_,   1, Layout.BOOL,     None),
+    b'f':   UserDataType(np.float32, 1, Layout.FLOAT,    None),
+    b'd':   UserDataType(np.float64, 1, Layout.DOUBLE,   None),
+    b'i':   UserDataType(np.int32,   1, Layout.INT,      None),
+    b'2i':  UserDataType(np.int32,   2, Layout.POINT2I,  Point2i),
+    b'2f':  UserDataType(np.float32, 2, Layout.POINT2F,  Point2f),
+    b'3i':  UserDataType(np.int32,   3, Layout.POINT3I,  Point3i),
+    b'3f':  UserDataType(np.float32, 3, Layout.POINT3F,  Point3f),
+    b'4f':  UserDataType(np.float32, 4, Layout.COLOR4F,  Color4f),
+    b's':   UserDataType(object,     1, None,            None),
+}
+
+
+class UserDataColumn(object):
+
+    """
+        UserDataColumn
+        Holds the values of one user data key over all rows (paths or intersections) of a response.
+        Rows without a value for the key are marked invalid.
+    """
+
+    def __init__(self, key : str, type_identifier : bytes, values : np.ndarray, valid : np.ndarray):
+        self._key = key
+        self._type_identifier = type_identifier
+        self._type = USER_DATA_TYPES[type_identifier]
+        self._values = values
+        self._valid = valid
+        self._nbytes = None
+
+    @property
+    def key(self) -> str:
+        """
+        Returns the user data key
+        """
+        return self._key
+
+    @property
+    def type_identifier(self) -> bytes:
+        """
+        Returns the type identifier of the binary protocol
+        """
+        return self._type_identifier
+
+    @property
+    def type(self) -> UserDataType:
+        """
+        Returns the type description of the column
+        """
+        return self._type
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        Returns the values as numpy array of shape (rows,) or (rows, components)
+        """
+        return self._values
+
+    @property
+    def valid(self) -> np.ndarray:
+        """
+        Returns a boolean numpy array which is set for all rows having a value
+        """
+        return self._valid
+
+    def __len__(self) -> int:
+        return len(self._valid)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the column in bytes, including the distinct strings of string columns
+        """
+        if self._nbytes is None:
+            nbytes = self._values.nbytes + self._valid.nbytes
+            if self._type.layout is None:
+                strings = {id(value): value for value in self._values[self._valid]}
+                nbytes += sum(sys.getsizeof(value) for value in strings.values())
+            self._nbytes = nbytes
+        return self._nbytes
+
+    def take(self, rows : np.ndarray) -> 'UserDataColumn':
+        """
+        Returns a new column containing the given rows (indices or boolean mask)
+        """
+        return UserDataColumn(self._key, self._type_identifier, self._values[rows], self._valid[rows])
+
+    def value(self, row : int) -> typing.Any:
+        """
+        Returns the value of the given row or None if the row has no value
+        """
+        if not self._valid[row]:
+            return None
+        value = self._values[row]
+        wrapper = self._type.wrapper
+        if wrapper is not None:
+            return wrapper(*value)
+        if self._type.layout is None:
+            return value
+        return value.item()
+
+
+class UserDataTable(object):
+
+    """
+        UserDataTable
+        Column-wise user data of all paths or all intersections of a response.
+    """
+
+    def __init__(self, columns : typing.Optional[typing.List[UserDataColumn]] = None, num_rows : int = 0):
+        self._columns = columns if columns is not None else []
+        self._num_rows = num_rows
+
+    @property
+    def columns(self) -> typing.List[UserDataColumn]:
+        """
+        Returns all user data columns in the order of their first appearance
+        """
+        return self._columns
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of all columns in bytes
+        """
+        return sum(column.nbytes for column in self._columns)
+
+    def take(self, rows : np.ndarray) -> 'UserDataTable':
+        """
+        Returns a new table containing the given rows (boolean mask) of all columns
+        """
+        return UserDataTable([column.take(rows) for column in self._columns], int(np.count_nonzero(rows)))
+
+    def keys(self) -> typing.List[str]:
+        """
+        Returns all user data keys
+        """
+        return list(dict.fromkeys(column.key for column in self._columns))
+
+    def columns_of(self, key : str) -> typing.List[UserDataColumn]:
+        """
+        Returns the columns of the given key, the same key may have been sent with different types
+        """
+        return [column for column in self._columns if column.key == key]
+
+    @staticmethod
+    def deserialize(stream : Stream, num_rows : int) -> 'UserDataTable':
+        """
+        Deserializes the user data columns of a columnar pixel response from the socket stream.
+        Each column holds its key, type identifier, validity mask and the values of all valid rows.
+        String values are dictionary encoded (distinct strings followed by the dictionary index of each valid row).
+        """
+        columns = []
+        num_columns = stream.read_uint()
+        for i in range(num_columns):
+            key = stream.read_string()
+            type_identifier = stream.read_string().encode("utf-8")
+            user_data_type = USER_DATA_TYPES.get(type_identifier, None)
+            if user_data_type is None:
+                raise Exception('unknown type '+type_identifier.decode("utf-8"))
+            valid = stream.read_array(np.bool_, num_rows)
+            num_values = int(np.count_nonzero(valid))
+            if user_data_type.layout is None:
+                dictionary = np.empty(stream.read_uint(), dtype=object)
+                dictionary[:] = [stream.read_string() for j in range(len(dictionary))]
+                values = np.full(num_rows, None, dtype=object)
+                values[valid] = dictionary[stream.read_array(np.uint32, num_values)]
+            else:
+                shape = [num_rows] if user_data_type.components == 1 else [num_rows, user_data_type.components]
+                values = np.zeros(shape, dtype=user_data_type.dtype)
+                values[valid] = stream.read_array(user_data_type.dtype, tuple([num_values]+shape[1:]))
+            columns.append(UserDataColumn(key, type_identifier, values, valid))
+        return UserDataTable(columns, num_rows)
+
+    @staticmethod
+    def concatenate(tables : typing.List['UserDataTable']) -> 'UserDataTable':
+        """
+        Returns a new table containing the rows of all given tables.
+        Columns are matched by key and type, rows of tables without the column are invalid
+        """
+        columns = {}
+        for table in tables:
+            for column in table.columns:
+                columns.setdefault((column.key, column.type_identifier), column)
+
+        num_rows = sum(len(table) for table in tables)
+        result = []
+        for (key, type_identifier), first in columns.items():
+            values = []
+            valid = []
+            for table in tables:
+                column = next((c for c in table.columns_of(key) if c.type_identifier == type_identifier), None)
+                if column is None:
+                    values.append(np.zeros((len(table),)+first.values.shape[1:], dtype=first.values.dtype))
+                    if first.type.layout is None:
+                        values[-1][:] = None
+                    valid.append(np.zeros(len(table), dtype=bool))
+                else:
+                    values.append(column.values)
+                    valid.append(column.valid)
+            result.append(UserDataColumn(key, type_identifier, np.concatenate(values), np.concatenate(valid)))
+        return UserDataTable(result, num_rows)
+
+    def row_data(self, row : int) -> typing.Dict[str, typing.Any]:
+        """
+        Returns a dict {key : value} with all user data of the given row
+        """
+        data = {}
+        for column in self._columns:
+            if column.valid[row]:
+                data[column.key] = column.value(row)
+        return data
+
+
+class UserDataSchema(object):
+
+    """
+        UserDataSchema
+        Builds the user data table of one response while deserializing it.
+        Keys and type identifiers are interned, so every (key, type) pair is resolved only once per response.
+    """
+
+    def __init__(self):
+        # raw key -> decoded key
+        self._keys = {}
+        # (raw key, type identifier) -> index of the column
+        self._column_ids = {}
+        self._column_keys = []
+        self._column_types = []
+        self._column_rows = []
+        self._column_values = []
+
+    def _column_id(self, raw_key : bytes, type_identifier : bytes) -> int:
+        user_data_type = USER_DATA_TYPES.get(type_identifier, None)
+        if user_data_type is None:
+            raise Exception('unknown type '+type_identifier.decode("utf-8"))
+        key = self._keys.get(raw_key, None)
+        if key is None:
+            key = self._keys[raw_key] = raw_key.decode("utf-8")
+        column_id = len(self._column_keys)
+        self._column_ids[(raw_key, type_identifier)] = column_id
+        self._column_keys.append(key)
+        self._column_types.append(type_identifier)
+        self._column_rows.append([])
+        self._column_values.append([])
+        return column_id
+
+    def deserialize(self, stream : Stream, row : int):
+        """
+        Deserializes the user data of one path or intersection from the socket stream
+        """
+        num_items = stream.read_layout(Layout.UNSIGNED_INT)[0]
+        for i in range(num_items):
+            key_len = stream.read_layout(Layout.UNSIGNED_LONG)[0]
+            raw_key = bytes(stream.read(key_len))
+            type_identifier = bytes(stream.read(1))
+            if b'0' < type_identifier <= b'9':
+                type_identifier += bytes(stream.read(1))
+
+            column_id = self._column_ids.get((raw_key, type_identifier), None)
+            if column_id is None:
+                column_id = self._column_id(raw_key, type_identifier)
+
+            layout = USER_DATA_TYPES[type_identifier].layout
+            self._column_rows[column_id].append(row)
+            if layout is None:
+                self._column_values[column_id].append(stream.read_string())
+            else:
+                self._column_values[column_id].append(stream.read_layout(layout))
+
+    def build(self, num_rows : int) -> UserDataTable:
+        """
+        Returns the user data table of all deserialized rows
+        """
+        columns = []
+        for key, type_identifier, rows, values in zip(self._column_keys, self._column_types,
+                                                      self._column_rows, self._column_values):
+            user_data_type = USER_DATA_TYPES[type_identifier]
+            valid = np.zeros(num_rows, dtype=bool)
+            valid[rows] = True
+            if user_data_type.layout is None:
+                column = np.full(num_rows, None, dtype=object)
+                column[rows] = values
+            else:
+                shape = [num_rows] if user_data_type.components == 1 else [num_rows, user_data_type.components]
+                column = np.zeros(shape, dtype=user_data_type.dtype)
+                column[rows] = np.array(values, dtype=user_data_type.dtype).reshape([len(rows)]+shape[1:])
+            columns.append(UserDataColumn(key, type_identifier, column, valid))
+        return UserDataTable(columns, num_rows)
 
 
 class UserData(object):
@@ -34,46 +375,19 @@ class UserData(object):
         Handles general data types which can be added by the user during the path tracing algorithm,
         in order to debug the system.
         Supported data types boolean, float, double, integer, point2i, point2f, point3i, point3f, color4f and vectors
+        The values are read on demand from a row of the user data table.
     """
 
-    def __init__(self, stream : Stream):
-        # handle default data types
-        self._data = {}
-
-        num_items = stream.read_uint()
-        for i in range(num_items):
-            key = stream.read_string()
-            type_identifier = stream.read_char()
-            if ord(type_identifier) > ord('0') and ord(type_identifier) <= ord('9'):
-                type_identifier = type_identifier+stream.read_char()
-            type_identifier = type_identifier.decode("utf-8")
-
-            if type_identifier == '?':
-                self._data[key] = stream.read_bool()
-            elif type_identifier == 'f':
-                self._data[key] = stream.read_float()
-            elif type_identifier == 'd':
-                self._data[key] = stream.read_double()
-            elif type_identifier == 'i':
-                self._data[key] = stream.read_int()
-            elif type_identifier == '2i':
-                self._data[key] = stream.read_point2i()
-            elif type_identifier == '2f':
-                self._data[key] = stream.read_point2f()
-            elif type_identifier == '3i':
-                self._data[key] = stream.read_point3i()
-            elif type_identifier == '3f':
-                self._data[key] = stream.read_point3f()
-            elif type_identifier == '4f':
-                self._data[key] = stream.read_color4f()
-            elif type_identifier == 's':
-                self._data[key] = stream.read_string()
-            else:
-                raise Exception('unknown type '+type_identifier)
+    def __init__(self, table : UserDataTable, row : int):
+        self._user_data_table = table
+        self._user_data_row = row
+        self._data = None
 
     @property
     def data(self) -> typing.Dict[str, typing.Any]:
         """
         Returns a data dict with set information
         """
+        if self._data is None:
+            self._data = self._user_data_table.row_data(self._user_data_row)
         return self._data
@@ -0,0 +1,214 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+import threading
+import numpy as np
+
+from model.path_table import IntersectionTable
+from model.user_data import UserDataColumn, UserDataTable
+
+
+class KeyEntry(object):
+
+    """
+        KeyEntry
+        Rows of the paths and intersections carrying one user data key
+    """
+
+    def __init__(self, key : str, path_rows : np.ndarray, intersection_rows : np.ndarray, example : typing.Any):
+        self._key = key
+        self._path_rows = path_rows
+        self._intersection_rows = intersection_rows
+        self._example = example
+
+    @property
+    def key(self) -> str:
+        """
+        Returns the user data key
+        """
+        return self._key
+
+    @property
+    def path_rows(self) -> np.ndarray:
+        """
+        Returns the sorted rows of all paths carrying the key, either on the path itself or on one of its intersections
+        """
+        return self._path_rows
+
+    @property
+    def intersection_rows(self) -> np.ndarray:
+        """
+        Returns the sorted rows of all intersections carrying the key
+        """
+        return self._intersection_rows
+
+    @property
+    def example(self) -> typing.Any:
+        """
+        Returns the first value of the key, its type determines how the key is filtered
+        """
+        return self._example
+
+
+class SortedColumn(object):
+
+    """
+        SortedColumn
+        Valid values of a numeric scalar column sorted ascending (as float64) with their rows,
+        comparisons with a value are answered by a binary search.
+        NaN values are not sorted, they only satisfy !=
+    """
+
+    def __init__(self, column : UserDataColumn):
+        rows = np.flatnonzero(column.valid)
+        values = column.values[rows].astype(np.float64)
+        order = np.argsort(values, kind='stable')
+        self._values = values[order]
+        self._rows = rows[order]
+        self._num_rows = len(column)
+        # argsort moves NaN values to the end
+        self._num_ordered = len(self._values) - int(np.count_nonzero(np.isnan(self._values)))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the sorted values and their rows in bytes
+        """
+        return self._values.nbytes + self._rows.nbytes
+
+    def rows(self, expr : str, value : float) -> typing.Optional[np.ndarray]:
+        """
+        Returns the rows whose value satisfies the comparison with value or None for unknown expressions
+        """
+        ordered = self._values[:self._num_ordered]
+        if expr == '>':
+            return self._rows[np.searchsorted(ordered, value, side='right'):self._num_ordered]
+        elif expr == '>=':
+            return self._rows[np.searchsorted(ordered, value, side='left'):self._num_ordered]
+        elif expr == '<':
+            return self._rows[:np.searchsorted(ordered, value, side='left')]
+        elif expr == '<=':
+            return self._rows[:np.searchsorted(ordered, value, side='right')]
+        elif expr == '==' or expr == '!=':
+            begin = np.searchsorted(ordered, value, side='left')
+            end = np.searchsorted(ordered, value, side='right')
+            if expr == '==':
+                return self._rows[begin:end]
+            return np.concatenate([self._rows[:begin], self._rows[end:]])
+        return None
+
+    def mask(self, expr : str, value : float) -> np.ndarray:
+        """
+        Returns a boolean numpy array over all rows of the column which is set for rows satisfying the comparison
+        """
+        mask = np.zeros(self._num_rows, dtype=bool)
+        rows = self.rows(expr, value)
+        if rows is not None:
+            mask[rows] = True
+        return mask
+
+
+class UserDataIndex(object):
+
+    """
+        UserDataIndex
+        Inverted index of the user data of one pixel, maps each user data key onto the paths and intersections carrying it.
+        The index is built once per loaded pixel. Numeric scalar columns compared more than once are sorted,
+        further comparisons with them are answered by a binary search.
+    """
+
+    def __init__(self, path_user_data : UserDataTable, intersections : IntersectionTable,
+                 intersection_user_data : UserDataTable):
+        self._entries = {}
+        self._sorted_columns = {}
+        self._lock = threading.Lock()
+
+        keys = path_user_data.keys()
+        keys += [key for key in intersection_user_data.keys() if key not in keys]
+        intersection_path_rows = intersections.path_rows if len(intersection_user_data.columns) > 0 else None
+        for key in keys:
+            path_columns = path_user_data.columns_of(key)
+            intersection_columns = intersection_user_data.columns_of(key)
+            path_rows = self._rows(path_columns, len(path_user_data))
+            intersection_rows = self._rows(intersection_columns, len(intersection_user_data))
+            if len(intersection_rows) > 0:
+                path_rows = np.union1d(path_rows, intersection_path_rows[intersection_rows])
+            example = next((column.value(int(np.argmax(column.valid)))
+                            for column in path_columns + intersection_columns if np.any(column.valid)), None)
+            self._entries[key] = KeyEntry(key, path_rows, intersection_rows, example)
+
+    @staticmethod
+    def _rows(columns : typing.List[UserDataColumn], num_rows : int) -> np.ndarray:
+        if len(columns) == 1:
+            return np.flatnonzero(columns[0].valid)
+        valid = np.zeros(num_rows, dtype=bool)
+        for column in columns:
+            valid |= column.valid
+        return np.flatnonzero(valid)
+
+    def keys(self) -> typing.List[str]:
+        """
+        Returns all user data keys, path keys first, in the order of their first appearance
+        """
+        return list(self._entries.keys())
+
+    def entry(self, key : str) -> typing.Optional[KeyEntry]:
+        """
+        Returns the index entry of the given key or None if no path carries the key
+        """
+        return self._entries.get(key, None)
+
+    @staticmethod
+    def is_sortable(column : UserDataColumn) -> bool:
+        """
+        Returns true if the values of the column can be sorted, i.e. the column holds numeric scalars
+        """
+        return column.values.ndim == 1 and column.values.dtype != object
+
+    def sorted_column(self, column : UserDataColumn) -> typing.Optional[SortedColumn]:
+        """
+        Returns the sorted values of a numeric scalar column of the indexed user data.
+        Sorting costs more than one scan of the column, so None is returned on the first request
+        and the values are only sorted once the column is compared again
+        """
+        with self._lock:
+            # the entry keeps the column alive, so its id is not reused
+            entry = self._sorted_columns.get(id(column), None)
+            if entry is None:
+                self._sorted_columns[id(column)] = (column, None)
+                return None
+            if entry[1] is None:
+                entry = self._sorted_columns[id(column)] = (column, SortedColumn(column))
+            return entry[1]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the index in bytes
+        """
+        nbytes = sum(entry.path_rows.nbytes + entry.intersection_rows.nbytes for entry in self._entries.values())
+        return nbytes + sum(sorted_column.nbytes for column, sorted_column in self._sorted_columns.values()
+                             if sorted_column is not None)
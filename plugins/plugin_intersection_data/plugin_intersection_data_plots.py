@@ -23,13 +23,8 @@
     SOFTWARE.
 """
 
-import numpy as np
-
 from core.plugin import Plugin
 
-from core.point import Point2f
-from core.color import Color4f
-
 from model.pixel_data import PixelData
 
 from core.pyside2_uic import loadUi
@@ -148,49 +143,39 @@ class IntersectionData(Plugin):
         path_data = paths.get(item.idx, None)
 
         if path_data:
-            intersections = path_data.intersections
+            intersections = self._pixel_data.intersections
+            begin = int(intersections.offsets[path_data.row])
+            end = int(intersections.offsets[path_data.row+1])
+            depth_idx = intersections.depth_idx[begin:end]
             plot_data_dict = {}
-            for its_idx, its in intersections.items():
-                for key, value in its.data.items():
-                    if plot_data_dict.get(key, None) is None:
-
-                        if isinstance(value, Point2f):
-                            plot_type = '3d'
-                        elif isinstance(value, Color4f):
-                            plot_type = 'rgb'
-                        elif np.shape(value) == () or np.shape(value) == (1,):
-                            plot_type = '2d'
-                        else:
-                            # skip value of unknown type
-                            continue
-                        plot_data_dict[key] = {'its':[],'value':[],'type':plot_type}
-
-                    plot_data_dict[key]['its'].append(its_idx)
-                    plot_data_dict[key]['value'].append(value)
-
-                # Add a plot of the intersection estimate (if available)
-                if its.li is not None:
-                    key = 'Estimate'
-                    if plot_data_dict.get(key, None) is None:
-                        plot_type = 'rgb'
-                        plot_data_dict[key] = {'its':[],'value':[],'type':plot_type}
-                    plot_data_dict[key]['its'].append(its_idx)
-                    plot_data_dict[key]['value'].append(its.li)
-
-                # Add a plot of the emission (if available)
-                if its.le is not None:
-                    key = 'Emission'
-                    if plot_data_dict.get(key, None) is None:
-                        plot_type = 'rgb'
-                        plot_data_dict[key] = {'its':[],'value':[],'type':plot_type}
-                    plot_data_dict[key]['its'].append(its_idx)
-                    plot_data_dict[key]['value'].append(its.le)
-
+            for column in self._pixel_data.intersection_user_data.columns:
+                if plot_data_dict.get(column.key, None) is not None:
+                    continue
+                if column.type_identifier == b'2f':
+                    plot_type = '3d'
+                elif column.type_identifier == b'4f':
+                    plot_type = 'rgb'
+                elif column.type_identifier in (b'?', b'f', b'd', b'i'):
+                    plot_type = '2d'
+                else:
+                    # skip value of unknown type
+                    continue
+                valid = column.valid[begin:end]
+                if not valid.any():
+                    continue
+                plot_data_dict[column.key] = {'its':depth_idx[valid],'value':column.values[begin:end][valid],'type':plot_type}
+
+            # Add a plot of the intersection estimate (if available)
+            has_li = intersections.has_li[begin:end]
+            if has_li.any():
+                plot_data_dict['Estimate'] = {'its':depth_idx[has_li],'value':intersections.li[begin:end][has_li],'type':'rgb'}
+
+            # Add a plot of the emission (if available)
+            has_le = intersections.has_le[begin:end]
+            if has_le.any():
+                plot_data_dict['Emission'] = {'its':depth_idx[has_le],'value':intersections.le[begin:end][has_le],'type':'rgb'}
 
             for key in plot_data_dict.keys():
-                plot_data_dict[key]['its']   = np.array(plot_data_dict[key]['its'])
-                plot_data_dict[key]['value'] = np.array(plot_data_dict[key]['value'])
-
                 if plot_data_dict[key]['type'] == '2d':
                     PlotListItem(key, self.listPlotNames, plot_data_dict, 0.75, path_data.path_depth+0.25, self._its_data_plot_2d, 0)
                 elif plot_data_dict[key]['type'] == '3d':
@@ -54,6 +54,10 @@ class SphericalView(Plugin):
         self._spherical_view = ViewSphericalViewImage(self)
         self.hdrImage.addWidget(self._spherical_view)
 
+    @property
+    def nbytes(self):
+        return self._spherical_view.hdr_image.nbytes
+
     def apply_theme(self, theme):
         pass
 
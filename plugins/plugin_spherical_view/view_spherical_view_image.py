@@ -88,6 +88,10 @@ class ViewSphericalViewImage(QWidget):
     def update_hightlights(self):
         self._graphics_view.update_highlights()
 
+    @property
+    def hdr_image(self):
+        return self._graphics_view.hdr_image
+
     @property
     def is_btn_enabled(self):
         return self._is_btn_enabled
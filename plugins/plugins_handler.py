@@ -136,6 +136,20 @@ class PluginsHandler(object):
         for _, value in self._plugins_view_container.items():
             value.select_intersection(path_idx, its_idx)
 
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the data held by all plugins in bytes
+        """
+        return sum(value.plugin.nbytes for value in self._plugins_view_container.values())
+
+    def release_memory(self):
+        """
+        Informs all plugins to release their cached data
+        """
+        for _, value in self._plugins_view_container.items():
+            value.plugin.release_memory()
+
     def get_plugin_by_id(self, plugin_id : int):
         """
         Returns the corresponding tool given the flag (unique_tool_id),
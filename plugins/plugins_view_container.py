@@ -33,6 +33,7 @@ from PySide2.QtCore import Slot
 import logging
 import typing
 from core.plugin import Plugin
+from core.profiler import profiler
 
 from model.pixel_data import PixelData
 
@@ -173,7 +174,8 @@ class PluginsViewContainer(QWidget):
         Render data will be set within Plugins,
         to provide them with the current render data set from the selected pixel
         """
-        self._plugin.init_pixel_data(pixel_data)
+        with profiler.span('{}.init_pixel_data'.format(self._plugin.name), 'plugin'):
+            self._plugin.init_pixel_data(pixel_data)
 
     def prepare_new_data(self):
         """
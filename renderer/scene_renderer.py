@@ -123,6 +123,14 @@ class SceneRenderer(object):
             'colorbar': has_face_colors
         }
 
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the traced path actors in bytes,
+        the mesh actors share their arrays with the scene data
+        """
+        return sum(path.nbytes for path in self._paths.values())
+
     @property
     def path_options(self) -> typing.Dict[str, typing.Any]:
         return self._path_options
@@ -70,6 +70,17 @@ class Shape(vtk.vtkActor):
     def mapper(self) -> vtk.vtkPolyDataMapper:
         return self._mapper
 
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory of the rendered poly data in bytes
+        """
+        poly_data = self._mapper.GetInput()
+        if poly_data is None:
+            return 0
+        # vtk reports the memory in kibibytes
+        return poly_data.GetActualMemorySize() << 10
+
     @property
     def opacity(self) -> float:
         """
@@ -0,0 +1,67 @@
+/*
+    EMCA - Explorer of Monte Carlo based Alorithms (Shared Server Library)
+    comes with an Apache License 2.0
+    (c) Christoph Kreisl 2020
+    (c) Lukas Ruppert 2021
+
+	Licensed to the Apache Software Foundation (ASF) under one
+	or more contributor license agreements.  See the NOTICE file
+	distributed with this work for additional information
+	regarding copyright ownership.  The ASF licenses this file
+	to you under the Apache License, Version 2.0 (the
+	"License"); you may not use this file except in compliance
+	with the License.  You may obtain a copy of the License at
+
+	http://www.apache.org/licenses/LICENSE-2.0
+
+	Unless required by applicable law or agreed to in writing,
+	software distributed under the License is distributed on an
+	"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+	KIND, either express or implied.  See the License for the
+	specific language governing permissions and limitations
+	under the License.
+*/
+
+#ifndef INCLUDE_EMCA_CODEC_H_
+#define INCLUDE_EMCA_CODEC_H_
+
+#include "platform.h"
+
+#include <cstdint>
+#include <vector>
+
+EMCA_NAMESPACE_BEGIN
+
+// compression codec for large messages, negotiated via its capability bit
+class Codec {
+public:
+    virtual ~Codec() = default;
+
+    /// identifier of the codec in the header of compressed messages
+    virtual uint8_t getId() const = 0;
+    /// capability bit announcing support for this codec
+    virtual uint32_t getCapability() const = 0;
+    /// compresses size bytes of data into out (replacing its content)
+    virtual void compress(const char* data, size_t size, std::vector<char>& out) const = 0;
+};
+
+#ifdef EMCA_WITH_ZLIB
+class ZlibCodec final : public Codec {
+public:
+    ZlibCodec(int level=1) : m_level(level) {}
+
+    uint8_t getId() const override { return 1; }
+    uint32_t getCapability() const override;
+    void compress(const char* data, size_t size, std::vector<char>& out) const override;
+
+private:
+    int m_level;
+};
+#endif
+
+/// returns all codecs available in this build, ordered by preference
+const std::vector<const Codec*>& getAvailableCodecs();
+
+EMCA_NAMESPACE_END
+
+#endif /* INCLUDE_EMCA_CODEC_H_ */
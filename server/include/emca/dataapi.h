@@ -29,12 +29,14 @@
 #include "stream.h"
 #include "plugin.h"
 #include "pathdata.h"
+#include "pathfilter.h"
 #include "scenedata.h"
 #include "heatmapdata.h"
 
 #include <string>
 #include <vector>
 #include <memory>
+#include <functional>
 #include <unordered_map>
 
 EMCA_NAMESPACE_BEGIN
@@ -102,11 +104,33 @@ public:
     }
 
     void serialize(Stream *stream) const;
+    /// serializes the collected paths as contiguous arrays per field (protocol version 2),
+    /// paths which were already sent by serializeColumnsChunk are skipped
+    void serializeColumns(Stream *stream) const;
+    /// serializes the paths which were not sent yet up to (excluding) the given sample index and releases them,
+    /// used to send completed paths while the pixel is still rendered
+    void serializeColumnsChunk(Stream *stream, uint32_t sampleIdx);
+    /// number of leading sample indices which were already sent in chunks
+    uint32_t getSentPaths() const { return m_sentPaths; }
+    /// paths which do not satisfy the filter of the current pixel request are not sent, they are only counted in the
+    /// filter statistics. The filter is evaluated on the paths when they are serialized and removed by clear()
+    void setPathFilter(std::unique_ptr<PathFilter> filter) { m_pathFilter = std::move(filter); m_filterStatistics = FilterStatistics(); }
+    bool hasPathFilter() const { return m_pathFilter != nullptr; }
+    const FilterStatistics& getFilterStatistics() const { return m_filterStatistics; }
+    /// releases the paths which were not sent yet and do not satisfy the path filter, called before the final response
+    void applyPathFilter() { applyPathFilter(m_sentPaths, m_paths.size()); }
+    /// the callback is invoked with the sample index whenever the renderer starts a new path
+    void setPathCallback(std::function<void(uint32_t)> callback) { m_pathCallback = std::move(callback); }
 
     void enable()  { m_isCollecting = true; }
     void disable() { m_isCollecting = false; }
     bool isCollecting() const { return m_isCollecting; }
 
+    /// returns true if the client has cancelled the pixel request which is currently rendered,
+    /// renderers may poll this between samples to stop rendering early
+    bool isCancelled() const { return m_cancellationCheck && m_cancellationCheck(); }
+    void setCancellationCheck(std::function<bool()> check) { m_cancellationCheck = std::move(check); }
+
     class PluginApi {
     public:
         void addPlugin(std::unique_ptr<Plugin>&& plugin);
@@ -156,7 +180,12 @@ public:
         void exportPLY(const std::string& filename, uint32_t shape_id, bool ascii_mode=true) const;
     } heatmap;
 
-    void clear() { m_paths.clear(); }
+    void clear() {
+        m_paths.clear();
+        m_sentPaths = 0;
+        m_pathFilter.reset();
+        m_filterStatistics = FilterStatistics();
+    }
 
 protected:
     std::vector<PathData> m_paths;
@@ -164,6 +193,16 @@ protected:
     uint32_t m_currentSampleIdx {-1U};
     uint32_t m_currentDepthIdx  {-1U};
     bool m_isCollecting        {false};
+    std::function<bool()> m_cancellationCheck;
+    std::function<void(uint32_t)> m_pathCallback;
+    // paths with a lower sample index were already sent in chunks
+    uint32_t m_sentPaths {0};
+    std::unique_ptr<PathFilter> m_pathFilter;
+    FilterStatistics m_filterStatistics;
+
+private:
+    void serializeColumns(Stream *stream, size_t begin, size_t end) const;
+    void applyPathFilter(size_t begin, size_t end);
 };
 
 EMCA_NAMESPACE_END
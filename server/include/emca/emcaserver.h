@@ -26,13 +26,17 @@
 #define INCLUDE_EMCA_EMCASERVER_H_
 
 #include <memory>
+#include <deque>
+#include <chrono>
+#include <atomic>
 
 #include "platform.h"
 #include "stream.h"
 #include "renderinterface.h"
 #include "dataapi.h"
 #include "plugin.h"
-#include "stream.h"
+#include "messages.h"
+#include "codec.h"
 
 #include <memory>
 
@@ -46,23 +50,73 @@ public:
     /// runs the main TCP server that communicates with the client.
     /// does not return until the server is shut down.
     void run(uint16_t port=50013);
+    /// runs the server on a Unix domain socket for clients on the same host,
+    /// large messages are passed in shared memory if the client supports it.
+    /// does not return until the server is shut down.
+    void runLocal(const std::string& socketPath);
 
     /// disconnect the current client
     void disconnect();
     /// stop the TCP server
     void stop();
 
+    /// messages of at least this size (in bytes) are compressed if the client supports it
+    void setCompressionThreshold(size_t threshold) { m_compressionThreshold = threshold; }
+    /// messages of at least this size (in bytes) are passed in shared memory to local clients which support it
+    void setSharedMemoryThreshold(size_t threshold) { m_sharedMemoryThreshold = threshold; }
+    /// completed paths are sent after this time (in milliseconds) while a pixel is rendered if the client supports it,
+    /// the interval doubles after each chunk
+    void setChunkInterval(uint32_t milliseconds) { m_chunkInterval = std::chrono::milliseconds(milliseconds); }
+    /// informs the client that previously rendered pixels are outdated, e.g. after the scene or the renderer settings changed.
+    /// can be called from any thread, the hint is sent with the next response if the client supports it
+    void invalidatePixelCache() { m_pixelCacheInvalid = true; }
+
 private:
+    /// accepts clients on the bound server socket and handles their requests
+    void serve();
+
     // implementation of the binary protocol between server and client
     // changes made here require similar changes on the client side
     // these functions call into the renderer where necessary to provide the requested data
     void respondSupportedPlugins();
+    void respondProtocolOffer();
     void respondRenderInfo();
     void respondRenderImage();
     void respondCameraData();
     void respondSceneData();
     void respondRenderPixel();
     bool respondPluginRequest(short id);
+    /// hash of the scene content (meshes and camera) reported in the render info so that clients can cache the scene,
+    /// 0 if the scene response contains heatmap data, which changes while rendering
+    uint64_t getSceneHash() const;
+
+    // pipelined pixel requests carry a request identifier and can be cancelled by the client
+    struct PixelRequest {
+        uint32_t id;
+        uint32_t x;
+        uint32_t y;
+        uint32_t sampleCount;
+        std::string predicate; /* serialized path filter, empty if all paths are requested */
+    };
+    PixelRequest readPixelRequest();
+    void cancelPixelRequests();
+    /// consumes pixel requests and cancellations which are already waiting on the socket without blocking,
+    /// other messages are left for the main loop
+    void receivePendingPixelRequests();
+    /// renders all queued pixel requests in order, skipping the cancelled ones
+    void respondPixelRequests();
+    void respondRenderPixel(const PixelRequest& request);
+    bool isCancelled(uint32_t requestId) const { return requestId <= m_cancelledRequestId; }
+
+    /// appends the pixel cache invalidation hint to the buffered messages if the cache was invalidated
+    void respondPixelCacheInvalidation();
+
+    /// marks the start of a new message in the buffer, has to be called before each message is written
+    void beginMessage();
+    /// sends all buffered messages to the client, framed if negotiated and compressed if they exceed the compression threshold
+    void flushMessages();
+    /// copies the messages into a new shared memory segment and sends its name, returns false if that failed
+    bool sendSharedMemory(const BufferStream& messages);
 
     RenderInterface* m_renderer {nullptr};
     DataApi* m_dataApi {nullptr};
@@ -83,8 +137,42 @@ private:
     socket_t m_clientSocket {-1};
     socket_t m_serverSocket {-1};
     std::unique_ptr<SocketStream> m_stream;
+    // path of the Unix domain socket, empty for TCP
+    std::string m_socketPath;
+
+    // negotiated protocol version and capabilities of the current client
+    uint16_t m_protocolVersion {1};
+    uint32_t m_capabilities    {EMCA_CAPABILITY_NONE};
+
+    // responses are assembled in memory and sent by flushMessages()
+    BufferStream m_buffer;
+    std::vector<size_t> m_messageStarts;
+    BufferStream m_framedBuffer;
+    bool m_framed {false};
+    std::vector<char> m_compressed;
+    const Codec* m_codec {nullptr};
+    size_t m_compressionThreshold {1 << 16};
+
+    // shared memory segments which were sent to the client, the client unlinks them after mapping
+    std::vector<std::string> m_sharedMemorySegments;
+    uint32_t m_sharedMemoryCount {0};
+    size_t m_sharedMemoryThreshold {1 << 20};
+
+    // queued pixel requests, all requests up to m_cancelledRequestId (inclusive) are cancelled
+    std::deque<PixelRequest> m_pixelRequests;
+    uint32_t m_currentRequestId   {0};
+    uint32_t m_cancelledRequestId {0};
+    std::chrono::steady_clock::time_point m_lastCancellationPoll;
+
+    // progressive pixel responses
+    std::chrono::milliseconds m_chunkInterval    {25};
+    std::chrono::milliseconds m_maxChunkInterval {1000};
+
+    // set if pixels rendered so far are outdated, the client drops its cached pixels on the hint
+    std::atomic<bool> m_pixelCacheInvalid {false};
 
     std::vector<Mesh> m_mesh_data;
+    uint64_t m_meshHash {0};
 };
 
 EMCA_NAMESPACE_END
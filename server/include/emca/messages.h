@@ -27,13 +27,22 @@
 
 #include "platform.h"
 
+#include <cstdint>
+
 EMCA_NAMESPACE_BEGIN
 
+// highest version of the binary protocol supported by this server
+constexpr uint16_t EMCA_PROTOCOL_VERSION = 2;
+
 // message identifiers for the TCP protocol
 enum Message {
     // connection management (0x000x)
     EMCA_HELLO                 = 0x0001,
     EMCA_SUPPORTED_PLUGINS     = 0x0002,
+    EMCA_PROTOCOL_OFFER        = 0x0003,
+    EMCA_PROTOCOL_ACCEPT       = 0x0004,
+    EMCA_COMPRESSED            = 0x0005,
+    EMCA_SHARED_MEMORY         = 0x0006,
     EMCA_DISCONNECT            = 0x000E,
     EMCA_QUIT                  = 0x000F,
 
@@ -43,6 +52,7 @@ enum Message {
     EMCA_REQUEST_RENDER_PIXEL  = 0x0013,
     EMCA_REQUEST_CAMERA        = 0x0014,
     EMCA_REQUEST_SCENE         = 0x0015,
+    EMCA_CANCEL_RENDER_PIXEL   = 0x0016,
 
     // responses to the client (0x002x)
     EMCA_RESPONSE_RENDER_INFO  = 0x0021,
@@ -50,6 +60,24 @@ enum Message {
     EMCA_RESPONSE_RENDER_PIXEL = 0x0023,
     EMCA_RESPONSE_CAMERA       = 0x0024,
     EMCA_RESPONSE_SCENE        = 0x0025,
+    EMCA_RESPONSE_RENDER_PIXEL_COLUMNS = 0x0026,
+    EMCA_RESPONSE_RENDER_PIXEL_CHUNK   = 0x0027,
+    EMCA_INVALIDATE_PIXEL_CACHE        = 0x0028,
+    EMCA_RESPONSE_FILTER_STATISTICS    = 0x0029,
+};
+
+// optional protocol features, negotiated after the handshake (bitmask)
+enum Capability : uint32_t {
+    EMCA_CAPABILITY_NONE                = 0x0000,
+    EMCA_CAPABILITY_COLUMNAR_PIXEL_DATA = 0x0001,
+    EMCA_CAPABILITY_COMPRESSION_ZLIB    = 0x0002,
+    EMCA_CAPABILITY_FRAMED_MESSAGES     = 0x0004,
+    EMCA_CAPABILITY_PIPELINED_PIXEL_REQUESTS = 0x0008,
+    EMCA_CAPABILITY_PROGRESSIVE_PIXEL_DATA   = 0x0010,
+    EMCA_CAPABILITY_SHARED_MEMORY            = 0x0020,
+    EMCA_CAPABILITY_SCENE_HASH               = 0x0040,
+    EMCA_CAPABILITY_PIXEL_CACHE_INVALIDATION = 0x0080,
+    EMCA_CAPABILITY_FILTER_PUSHDOWN          = 0x0100,
 };
 
 // shape types that can be transferred to the client
@@ -37,6 +37,17 @@
 
 EMCA_NAMESPACE_BEGIN
 
+class PathFilter;
+
+// bits of the per-intersection flags of the columnar pixel response
+enum IntersectionFlag : uint8_t {
+    HasPos          = 0x01,
+    HasNE           = 0x02,
+    VisibleNE       = 0x04,
+    HasEstimate     = 0x08,
+    HasEmission     = 0x10
+};
+
 class UserData
 {
 public:
@@ -70,6 +81,33 @@ protected:
     virtual ~UserData() = default;
 private:
     std::vector<std::pair<std::string, Data>> m_data;
+
+    friend class UserDataColumns;
+    friend class PathFilter;
+};
+
+/// collects the user data of many paths or intersections column-wise (columnar pixel response)
+class UserDataColumns
+{
+public:
+    /// appends the user data of one row, rows have to be added in increasing order
+    void add(uint32_t row, const UserData& userData);
+
+    /// writes the number of columns followed by each column (key, type identifier, validity mask and values of all valid rows),
+    /// string columns are written as dictionary of distinct values followed by the dictionary index of each valid row
+    void serialize(Stream *stream, uint32_t numRows) const;
+
+private:
+    struct Column {
+        std::string key;
+        size_t typeIndex;
+        std::vector<uint32_t> rows;
+        std::vector<char> values;         /* packed values of all fundamental types */
+        std::vector<std::string> strings; /* values of string columns */
+    };
+
+    std::vector<Column> m_columns;
+    std::map<std::pair<std::string, size_t>, size_t> m_columnIds;
 };
 
 class IntersectionData final : public UserData
@@ -96,6 +134,8 @@ private:
     bool m_hasEmission {false};
 
     friend class PathData;
+    friend class DataApi;
+    friend class PathFilter;
 };
 
 class PathData final : public UserData
@@ -125,6 +165,7 @@ private:
     bool m_hasFinalEstimate {false};
 
     friend class DataApi;
+    friend class PathFilter;
 };
 
 EMCA_NAMESPACE_END
@@ -0,0 +1,108 @@
+/*
+    EMCA - Explorer of Monte Carlo based Alorithms (Shared Server Library)
+    comes with an Apache License 2.0
+    (c) Christoph Kreisl 2020
+    (c) Lukas Ruppert 2021
+
+	Licensed to the Apache Software Foundation (ASF) under one
+	or more contributor license agreements.  See the NOTICE file
+	distributed with this work for additional information
+	regarding copyright ownership.  The ASF licenses this file
+	to you under the Apache License, Version 2.0 (the
+	"License"); you may not use this file except in compliance
+	with the License.  You may obtain a copy of the License at
+
+	http://www.apache.org/licenses/LICENSE-2.0
+
+	Unless required by applicable law or agreed to in writing,
+	software distributed under the License is distributed on an
+	"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+	KIND, either express or implied.  See the License for the
+	specific language governing permissions and limitations
+	under the License.
+*/
+
+#ifndef INCLUDE_EMCA_PATHFILTER_H_
+#define INCLUDE_EMCA_PATHFILTER_H_
+
+#include "platform.h"
+#include "pathdata.h"
+#include "stream.h"
+
+#include <string>
+#include <vector>
+
+EMCA_NAMESPACE_BEGIN
+
+// aggregates of the paths which were rejected by the path filter of a pixel request and therefore not sent
+struct FilterStatistics {
+    uint32_t totalPaths            {0};
+    uint32_t rejectedPaths         {0};
+    uint64_t rejectedIntersections {0};
+    uint64_t rejectedPathDepth     {0};
+    double rejectedFinalEstimate[4] {0.0, 0.0, 0.0, 0.0};
+
+    void serialize(Stream *stream) const;
+};
+
+// predicate of a pixel request, only the paths satisfying it are sent to the client (filter pushdown).
+// The predicate is a program of postfix instructions, conditions on intersections yield one value per intersection.
+// Comparisons behave like on the client: scalars are compared as double, float points and colors as float.
+class PathFilter
+{
+public:
+    // parses the serialized predicate, throws std::runtime_error if it is malformed
+    explicit PathFilter(const std::string& predicate);
+
+    bool matches(const PathData& path) const;
+
+private:
+    enum Opcode : uint8_t {
+        Const   = 0x01,
+        Compare = 0x02,
+        Truth   = 0x03,
+        Has     = 0x04,
+        And     = 0x05,
+        Or      = 0x06,
+        Not     = 0x07,
+        Any     = 0x08,
+        All     = 0x09
+    };
+
+    // fields of the path and intersection tables, all other fields are user data
+    enum TableField : uint8_t {
+        UserDataField,
+        SampleIndex,
+        PathDepth,
+        PathOrigin,
+        FinalEstimate,
+        DepthIdx,
+        Pos,
+        PosNE,
+        VisibleNE,
+        Li,
+        Le
+    };
+
+    struct Instruction {
+        Opcode opcode;
+        bool perIntersection   {false};
+        std::string key;
+        TableField tableField  {UserDataField};
+        uint8_t component      {0xFF};
+        uint8_t op             {0};
+        bool isString          {false};
+        double number          {0.0};
+        std::string string;    /* lower case */
+        bool constant          {false};
+    };
+
+    // evaluates a condition on the path (intersection is null) or on one of its intersections
+    bool evaluate(const Instruction& instruction, const PathData& path, const IntersectionData* intersection) const;
+
+    std::vector<Instruction> m_instructions;
+};
+
+EMCA_NAMESPACE_END
+
+#endif /* INCLUDE_EMCA_PATHFILTER_H_ */
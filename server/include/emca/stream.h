@@ -27,7 +27,10 @@
 
 #include "platform.h"
 #include <cinttypes>
+#include <cstring>
+#include <stdexcept>
 #include <type_traits>
+#include <vector>
 
 EMCA_NAMESPACE_BEGIN
 
@@ -104,6 +107,53 @@ private:
     virtual void write(const void *ptr, size_t size) = 0;
 };
 
+// in-memory stream, used to assemble messages before they are sent
+class BufferStream final : public Stream {
+public:
+    const char* data() const { return m_data.data(); }
+    size_t size() const { return m_data.size(); }
+    bool atEnd() const { return m_readPos >= m_data.size(); }
+    // keeps the allocated memory for the next message
+    void clear() { m_data.clear(); m_readPos = 0; }
+
+private:
+    void read(void *ptr, size_t size) override {
+        if (m_readPos+size > m_data.size())
+            throw std::runtime_error("read failed. end of buffer reached.");
+        std::memcpy(ptr, m_data.data()+m_readPos, size);
+        m_readPos += size;
+    }
+
+    void write(const void *ptr, size_t size) override {
+        const char* data = reinterpret_cast<const char*>(ptr);
+        m_data.insert(m_data.end(), data, data+size);
+    }
+
+    std::vector<char> m_data;
+    size_t m_readPos {0};
+};
+
+// write-only stream computing the 64 bit FNV-1a hash of the written data, used to identify the content of a scene
+class HashStream final : public Stream {
+public:
+    uint64_t hash() const { return m_hash; }
+
+private:
+    void read(void *, size_t) override {
+        throw std::logic_error("a hash stream cannot be read");
+    }
+
+    void write(const void *ptr, size_t size) override {
+        const unsigned char* data = reinterpret_cast<const unsigned char*>(ptr);
+        for (size_t i = 0; i < size; ++i) {
+            m_hash ^= data[i];
+            m_hash *= 0x100000001b3ull;
+        }
+    }
+
+    uint64_t m_hash {0xcbf29ce484222325ull};
+};
+
 EMCA_NAMESPACE_END
 
 #endif /* INCLUDE_EMCA_STREAM_H */
@@ -0,0 +1,61 @@
+/*
+    EMCA - Explorer of Monte Carlo based Alorithms (Shared Server Library)
+    comes with an Apache License 2.0
+    (c) Christoph Kreisl 2020
+    (c) Lukas Ruppert 2021
+
+	Licensed to the Apache Software Foundation (ASF) under one
+	or more contributor license agreements.  See the NOTICE file
+	distributed with this work for additional information
+	regarding copyright ownership.  The ASF licenses this file
+	to you under the Apache License, Version 2.0 (the
+	"License"); you may not use this file except in compliance
+	with the License.  You may obtain a copy of the License at
+
+	http://www.apache.org/licenses/LICENSE-2.0
+
+	Unless required by applicable law or agreed to in writing,
+	software distributed under the License is distributed on an
+	"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+	KIND, either express or implied.  See the License for the
+	specific language governing permissions and limitations
+	under the License.
+*/
+
+#include <emca/codec.h>
+#include <emca/messages.h>
+
+#include <stdexcept>
+
+#ifdef EMCA_WITH_ZLIB
+#include <zlib.h>
+#endif
+
+EMCA_NAMESPACE_BEGIN
+
+#ifdef EMCA_WITH_ZLIB
+uint32_t ZlibCodec::getCapability() const {
+    return EMCA_CAPABILITY_COMPRESSION_ZLIB;
+}
+
+void ZlibCodec::compress(const char* data, size_t size, std::vector<char>& out) const {
+    uLongf compressedSize = compressBound(static_cast<uLong>(size));
+    out.resize(compressedSize);
+    if (compress2(reinterpret_cast<Bytef*>(out.data()), &compressedSize,
+                  reinterpret_cast<const Bytef*>(data), static_cast<uLong>(size), m_level) != Z_OK)
+        throw std::runtime_error("zlib compression failed");
+    out.resize(compressedSize);
+}
+#endif
+
+const std::vector<const Codec*>& getAvailableCodecs() {
+#ifdef EMCA_WITH_ZLIB
+    static const ZlibCodec zlibCodec;
+    static const std::vector<const Codec*> codecs {&zlibCodec};
+#else
+    static const std::vector<const Codec*> codecs;
+#endif
+    return codecs;
+}
+
+EMCA_NAMESPACE_END
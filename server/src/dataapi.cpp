@@ -38,6 +38,8 @@ void DataApi::setPathIdx(uint32_t sampleIdx) {
     if (sampleIdx >= m_paths.size())
         m_paths.resize(sampleIdx+1);
     m_paths.at(sampleIdx).m_sampleIdx = sampleIdx; // enable path
+    if (m_pathCallback)
+        m_pathCallback(sampleIdx);
 }
 
 void DataApi::setDepthIdx(uint32_t depthIdx) {
@@ -84,7 +86,7 @@ void DataApi::setFinalEstimate(const Color4f& estimate) {
 }
 
 void DataApi::serialize(Stream *stream) const {
-    uint32_t num_paths = std::count_if(m_paths.begin(), m_paths.end(), [](const auto& path) -> bool { return path.m_sampleIdx >= 0; });
+    uint32_t num_paths = std::count_if(m_paths.begin(), m_paths.end(), [](const auto& path) -> bool { return path.m_sampleIdx != -1U; });
     stream->writeUInt(num_paths);
 	/* serialize path data */
     for (auto& path : m_paths) {
@@ -93,6 +95,114 @@ void DataApi::serialize(Stream *stream) const {
 	}
 }
 
+void DataApi::serializeColumns(Stream *stream) const {
+    serializeColumns(stream, m_sentPaths, m_paths.size());
+}
+
+void DataApi::serializeColumnsChunk(Stream *stream, uint32_t sampleIdx) {
+    const size_t end = std::max<size_t>(m_sentPaths, std::min<size_t>(sampleIdx, m_paths.size()));
+    applyPathFilter(m_sentPaths, end);
+    serializeColumns(stream, m_sentPaths, end);
+    // sent paths are not needed anymore, paths which are recorded again later on are not sent
+    for (size_t i = m_sentPaths; i < end; ++i)
+        m_paths[i] = PathData();
+    m_sentPaths = static_cast<uint32_t>(end);
+}
+
+void DataApi::applyPathFilter(size_t begin, size_t end) {
+    if (!m_pathFilter)
+        return;
+    for (size_t i = begin; i < end; ++i) {
+        PathData& path = m_paths[i];
+        if (path.m_sampleIdx == -1U)
+            continue;
+        ++m_filterStatistics.totalPaths;
+        if (m_pathFilter->matches(path))
+            continue;
+        // rejected paths are disabled, so they are neither sent nor counted again
+        ++m_filterStatistics.rejectedPaths;
+        m_filterStatistics.rejectedIntersections += std::count_if(path.m_intersections.begin(), path.m_intersections.end(),
+                                                                  [](const auto& its) { return its.m_depthIdx != -1U; });
+        if (path.m_pathDepth != -1U)
+            m_filterStatistics.rejectedPathDepth += path.m_pathDepth;
+        if (path.m_hasFinalEstimate)
+            for (size_t c = 0; c < 4; ++c)
+                m_filterStatistics.rejectedFinalEstimate[c] += path.m_finalEstimate.c[c];
+        path = PathData();
+    }
+}
+
+void DataApi::serializeColumns(Stream *stream, size_t begin, size_t end) const {
+    static_assert(sizeof(Point3f) == 3*sizeof(float) && sizeof(Color4f) == 4*sizeof(float), "points and colors are written as packed float arrays");
+
+    std::vector<uint32_t> sampleIdx, pathDepth, intersectionCount;
+    std::vector<Point3f> pathOrigin;
+    std::vector<Color4f> finalEstimate;
+    std::vector<char> hasFinalEstimate;
+
+    std::vector<uint32_t> depthIdx;
+    std::vector<Point3f> pos, posNE;
+    std::vector<Color4f> estimate, emission;
+    std::vector<uint8_t> flags;
+
+    UserDataColumns pathUserData, intersectionUserData;
+
+    for (size_t i = begin; i < end; ++i) {
+        const PathData& path = m_paths[i];
+        if (path.m_sampleIdx == -1U) // only send enabled paths
+            continue;
+        pathUserData.add(static_cast<uint32_t>(sampleIdx.size()), path);
+        sampleIdx.push_back(path.m_sampleIdx);
+        pathDepth.push_back(path.m_pathDepth);
+        pathOrigin.push_back(path.m_pathOrigin);
+        finalEstimate.push_back(path.m_finalEstimate);
+        hasFinalEstimate.push_back(path.m_hasFinalEstimate);
+
+        uint32_t count = 0;
+        for (const auto& its : path.m_intersections) {
+            if (its.m_depthIdx == -1U)
+                continue;
+            intersectionUserData.add(static_cast<uint32_t>(depthIdx.size()), its);
+            depthIdx.push_back(its.m_depthIdx);
+            pos.push_back(its.m_pos);
+            posNE.push_back(its.m_posNE);
+            estimate.push_back(its.m_estimate);
+            emission.push_back(its.m_emission);
+            flags.push_back((its.m_hasPos      ? IntersectionFlag::HasPos      : 0) |
+                            (its.m_hasNE       ? IntersectionFlag::HasNE       : 0) |
+                            (its.m_visibleNE   ? IntersectionFlag::VisibleNE   : 0) |
+                            (its.m_hasEstimate ? IntersectionFlag::HasEstimate : 0) |
+                            (its.m_hasEmission ? IntersectionFlag::HasEmission : 0));
+            ++count;
+        }
+        intersectionCount.push_back(count);
+    }
+
+    const uint32_t numPaths = static_cast<uint32_t>(sampleIdx.size());
+    const uint32_t numIntersections = static_cast<uint32_t>(depthIdx.size());
+    stream->writeUInt(numPaths);
+    stream->writeUInt(numIntersections);
+
+    // 4 byte fields first, so that all arrays stay aligned on the client side
+    stream->writeArray(sampleIdx.data(), numPaths);
+    stream->writeArray(pathDepth.data(), numPaths);
+    stream->writeArray(intersectionCount.data(), numPaths);
+    stream->writeArray(reinterpret_cast<const float*>(pathOrigin.data()), 3*numPaths);
+    stream->writeArray(reinterpret_cast<const float*>(finalEstimate.data()), 4*numPaths);
+
+    stream->writeArray(depthIdx.data(), numIntersections);
+    stream->writeArray(reinterpret_cast<const float*>(pos.data()), 3*numIntersections);
+    stream->writeArray(reinterpret_cast<const float*>(posNE.data()), 3*numIntersections);
+    stream->writeArray(reinterpret_cast<const float*>(estimate.data()), 4*numIntersections);
+    stream->writeArray(reinterpret_cast<const float*>(emission.data()), 4*numIntersections);
+
+    stream->writeArray(hasFinalEstimate.data(), numPaths);
+    stream->writeArray(flags.data(), numIntersections);
+
+    pathUserData.serialize(stream, numPaths);
+    intersectionUserData.serialize(stream, numIntersections);
+}
+
 void DataApi::PluginApi::addPlugin(std::unique_ptr<Plugin>&& plugin) {
     if (getPluginById(plugin->getId())) {
         throw std::logic_error("Plugin ID is already occupied");
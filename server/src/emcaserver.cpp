@@ -28,10 +28,14 @@
 
 #include <string.h>
 #include <unistd.h>
+#include <fcntl.h>
+#include <sys/mman.h>
 #include <sys/socket.h>
+#include <sys/un.h>
 #include <netinet/in.h>
 
 #include <stdexcept>
+#include <algorithm>
 #include <cerrno>
 
 EMCA_NAMESPACE_BEGIN
@@ -44,10 +48,26 @@ EMCAServer::EMCAServer(RenderInterface* renderer, DataApi* dataApi)
     // FIXME: is there a better place to put this? it is a bit hidden here.
     m_mesh_data = m_renderer->getMeshData();
     m_dataApi->heatmap.initialize(m_mesh_data);
+
+    HashStream meshHash;
+    meshHash.writeUInt(static_cast<uint32_t>(m_mesh_data.size()));
+    for (const auto& mesh : m_mesh_data)
+        mesh.serialize(&meshHash);
+    m_meshHash = meshHash.hash();
+
+    // polling the socket for every sample would slow down rendering, check for cancellations every few milliseconds
+    m_dataApi->setCancellationCheck([this]() {
+        const auto now = std::chrono::steady_clock::now();
+        if (now - m_lastCancellationPoll >= std::chrono::milliseconds(10)) {
+            m_lastCancellationPoll = now;
+            receivePendingPixelRequests();
+        }
+        return m_currentRequestId != 0 && isCancelled(m_currentRequestId);
+    });
 }
 
 void EMCAServer::run(uint16_t port) {
-    struct sockaddr_in server_addr, client_addr;
+    struct sockaddr_in server_addr;
     memset(&server_addr, 0, sizeof(server_addr));
 
     server_addr.sin_family = AF_INET;
@@ -71,6 +91,36 @@ void EMCAServer::run(uint16_t port) {
         throw std::runtime_error("failed to bind server to port "+std::to_string(port));
     }
 
+    serve();
+}
+
+void EMCAServer::runLocal(const std::string& socketPath) {
+    struct sockaddr_un server_addr;
+    memset(&server_addr, 0, sizeof(server_addr));
+
+    server_addr.sun_family = AF_UNIX;
+    if (socketPath.size() >= sizeof(server_addr.sun_path))
+        throw std::runtime_error("socket path is too long: "+socketPath);
+    strncpy(server_addr.sun_path, socketPath.c_str(), sizeof(server_addr.sun_path)-1);
+
+    m_serverSocket = socket(AF_UNIX, SOCK_STREAM, 0);
+    if (m_serverSocket < 0)
+        throw std::runtime_error("failed to create Unix domain socket");
+
+    // the socket file of a previous server would prevent binding
+    unlink(socketPath.c_str());
+
+    if (bind(m_serverSocket, reinterpret_cast<struct sockaddr*>(&server_addr), sizeof(server_addr)) < 0) {
+        close(m_serverSocket);
+        m_serverSocket = -1;
+        throw std::runtime_error("failed to bind server to "+socketPath);
+    }
+    m_socketPath = socketPath;
+
+    serve();
+}
+
+void EMCAServer::serve() {
     int16_t lastReceivedMsg = Message::EMCA_DISCONNECT;
 
     while (m_serverSocket >= 0 && lastReceivedMsg == Message::EMCA_DISCONNECT) {
@@ -82,8 +132,7 @@ void EMCAServer::run(uint16_t port) {
         std::cout << "Server is listening for connections ..." << std::endl;
 
         try {
-            socklen_t len = sizeof(client_addr);
-            m_clientSocket = accept(m_serverSocket, reinterpret_cast<struct sockaddr*>(&client_addr), &len);
+            m_clientSocket = accept(m_serverSocket, nullptr, nullptr);
             if (m_clientSocket < 0)
                 throw std::runtime_error("failed to accept client socket");
 
@@ -94,8 +143,22 @@ void EMCAServer::run(uint16_t port) {
             if (lastReceivedMsg != Message::EMCA_HELLO)
                 throw std::runtime_error("Did not recieve hello message.");
 
+            // offer newer protocol versions, clients which do not know the offer ignore it and stay at version 1
+            m_protocolVersion = 1;
+            m_capabilities = EMCA_CAPABILITY_NONE;
+            m_codec = nullptr;
+            m_framed = false;
+            m_buffer.clear();
+            m_messageStarts.clear();
+            m_pixelRequests.clear();
+            m_currentRequestId = 0;
+            m_cancelledRequestId = 0;
+            beginMessage();
+            m_buffer.writeShort(Message::EMCA_PROTOCOL_OFFER);
+
             // send list of plugins
             respondSupportedPlugins();
+            flushMessages();
 
             std::cout << "Handshake complete! Starting data transfer ..." << std::endl;
 
@@ -104,10 +167,16 @@ void EMCAServer::run(uint16_t port) {
                 lastReceivedMsg = m_stream->readShort();
                 std::cout << "Received header msg = " << lastReceivedMsg << std::endl;
 
-                if (respondPluginRequest(lastReceivedMsg))
+                if (respondPluginRequest(lastReceivedMsg)) {
+                    flushMessages();
                     continue;
+                }
 
                 switch(lastReceivedMsg) {
+                case Message::EMCA_PROTOCOL_OFFER:
+                    std::cout << "Protocol offer msg" << std::endl;
+                    respondProtocolOffer();
+                    break;
                 case Message::EMCA_REQUEST_RENDER_INFO:
                     std::cout << "Respond render info msg" << std::endl;
                     respondRenderInfo();
@@ -126,7 +195,17 @@ void EMCAServer::run(uint16_t port) {
                     break;
                 case Message::EMCA_REQUEST_RENDER_PIXEL:
                     std::cout << "Render pixel msg" << std::endl;
-                    respondRenderPixel();
+                    if (m_capabilities & EMCA_CAPABILITY_PIPELINED_PIXEL_REQUESTS) {
+                        m_pixelRequests.push_back(readPixelRequest());
+                        respondPixelRequests();
+                    }
+                    else {
+                        respondRenderPixel();
+                    }
+                    break;
+                case Message::EMCA_CANCEL_RENDER_PIXEL:
+                    std::cout << "Cancel render pixel msg" << std::endl;
+                    cancelPixelRequests();
                     break;
                 case Message::EMCA_DISCONNECT:
                     std::cout << "Disconnect msg" << std::endl;
@@ -140,6 +219,9 @@ void EMCAServer::run(uint16_t port) {
                     std::cout << "Unknown message received!" << std::endl;
                     break;
                 }
+
+                respondPixelCacheInvalidation();
+                flushMessages();
             }
         } catch (std::exception &e) {
             std::cerr << "caught exception: " << e.what() << std::endl;
@@ -155,8 +237,11 @@ void EMCAServer::run(uint16_t port) {
 
 void EMCAServer::disconnect() {
     if (m_clientSocket >= 0) {
-        if (m_stream.get())
+        if (m_stream.get()) {
             m_stream->writeShort(Message::EMCA_DISCONNECT);
+            if (m_framed)
+                m_stream->writeULong(0);
+        }
         m_stream.reset();
         if (close(m_clientSocket) == 0)
             std::cout << "disconnected." << std::endl;
@@ -164,6 +249,11 @@ void EMCAServer::disconnect() {
             std::cout << "disconnect failed: " << errno << std::endl;
     }
     m_clientSocket = -1;
+
+    // segments the client did not map anymore
+    for (const std::string& segment : m_sharedMemorySegments)
+        shm_unlink(segment.c_str());
+    m_sharedMemorySegments.clear();
 }
 
 void EMCAServer::stop() {
@@ -175,6 +265,10 @@ void EMCAServer::stop() {
             std::cout << "stop failed: " << errno << std::endl;
     }
     m_serverSocket = -1;
+    if (!m_socketPath.empty()) {
+        unlink(m_socketPath.c_str());
+        m_socketPath.clear();
+    }
 }
 
 void EMCAServer::respondSupportedPlugins() {
@@ -183,10 +277,11 @@ void EMCAServer::respondSupportedPlugins() {
         std::cout << "Inform Client about supported Plugins" << std::endl;
         m_dataApi->plugins.printPlugins();
         std::vector<int16_t> supportedPlugins = m_dataApi->plugins.getPluginIds();
-        m_stream->writeShort(Message::EMCA_SUPPORTED_PLUGINS);
-        m_stream->writeUInt(static_cast<uint32_t>(supportedPlugins.size()));
+        beginMessage();
+        m_buffer.writeShort(Message::EMCA_SUPPORTED_PLUGINS);
+        m_buffer.writeUInt(static_cast<uint32_t>(supportedPlugins.size()));
         for (short &id : supportedPlugins) {
-            m_stream->writeShort(id);
+            m_buffer.writeShort(id);
         }
     }
     catch (const std::exception& e)
@@ -195,17 +290,74 @@ void EMCAServer::respondSupportedPlugins() {
     }
 }
 
+void EMCAServer::respondProtocolOffer() {
+    const uint16_t clientVersion = m_stream->readUShort();
+    const uint32_t clientCapabilities = m_stream->readUInt();
+
+    uint32_t supportedCapabilities = EMCA_CAPABILITY_COLUMNAR_PIXEL_DATA | EMCA_CAPABILITY_FRAMED_MESSAGES |
+                                     EMCA_CAPABILITY_PIPELINED_PIXEL_REQUESTS | EMCA_CAPABILITY_PROGRESSIVE_PIXEL_DATA |
+                                     EMCA_CAPABILITY_SCENE_HASH | EMCA_CAPABILITY_PIXEL_CACHE_INVALIDATION |
+                                     EMCA_CAPABILITY_FILTER_PUSHDOWN;
+    for (const Codec* codec : getAvailableCodecs())
+        supportedCapabilities |= codec->getCapability();
+    // shared memory is only offered to clients on the same host, i.e. connected via Unix domain socket
+    if (!m_socketPath.empty())
+        supportedCapabilities |= EMCA_CAPABILITY_SHARED_MEMORY;
+
+    m_protocolVersion = std::min(clientVersion, EMCA_PROTOCOL_VERSION);
+    m_capabilities = clientCapabilities & supportedCapabilities;
+    // the client skips responses to cancelled requests by their frame length
+    if (!(m_capabilities & EMCA_CAPABILITY_FRAMED_MESSAGES))
+        m_capabilities &= ~(EMCA_CAPABILITY_PIPELINED_PIXEL_REQUESTS | EMCA_CAPABILITY_SHARED_MEMORY);
+    // chunks and filtered pixels are only available in the columnar format
+    if (!(m_capabilities & EMCA_CAPABILITY_COLUMNAR_PIXEL_DATA))
+        m_capabilities &= ~(EMCA_CAPABILITY_PROGRESSIVE_PIXEL_DATA | EMCA_CAPABILITY_FILTER_PUSHDOWN);
+
+    // use the first codec supported by both sides
+    m_codec = nullptr;
+    for (const Codec* codec : getAvailableCodecs()) {
+        if (m_capabilities & codec->getCapability()) {
+            m_codec = codec;
+            break;
+        }
+    }
+    std::cout << "Negotiated protocol version " << m_protocolVersion << " with capabilities " << m_capabilities << std::endl;
+
+    beginMessage();
+
+    m_buffer.writeShort(Message::EMCA_PROTOCOL_ACCEPT);
+    m_buffer.writeUShort(m_protocolVersion);
+    m_buffer.writeUInt(m_capabilities);
+
+    // the accept message is the last unframed message, all following messages are framed if negotiated
+    flushMessages();
+    m_framed = m_capabilities & EMCA_CAPABILITY_FRAMED_MESSAGES;
+}
+
 void EMCAServer::respondRenderInfo() {
     try {
-        m_stream->writeShort(Message::EMCA_RESPONSE_RENDER_INFO);
-        m_stream->writeString(m_renderer->getRendererName());
-        m_stream->writeString(m_renderer->getSceneName());
-        m_stream->writeUInt(m_renderer->getSampleCount());
+        beginMessage();
+        m_buffer.writeShort(Message::EMCA_RESPONSE_RENDER_INFO);
+        m_buffer.writeString(m_renderer->getRendererName());
+        m_buffer.writeString(m_renderer->getSceneName());
+        m_buffer.writeUInt(m_renderer->getSampleCount());
+        if (m_capabilities & EMCA_CAPABILITY_SCENE_HASH)
+            m_buffer.writeULong(getSceneHash());
     } catch (const std::exception& e) {
         std::cerr << "Render info error: " << e.what() << std::endl;
     }
 }
 
+uint64_t EMCAServer::getSceneHash() const {
+    if (m_dataApi->heatmap.hasData())
+        return 0;
+    HashStream sceneHash;
+    sceneHash.writeULong(m_meshHash);
+    m_renderer->getCameraData().serialize(&sceneHash);
+    // 0 is reserved for scenes which can not be cached
+    return std::max<uint64_t>(sceneHash.hash(), 1);
+}
+
 void EMCAServer::respondRenderImage() {
     try {
         const uint32_t sampleCount = m_stream->readUInt();
@@ -213,14 +365,18 @@ void EMCAServer::respondRenderImage() {
 
         // enabling the heatmap is up to the preprocessing step during rendering
         m_renderer->renderImage();
+        // the renderer might have been reconfigured for the new image, pixels rendered before may differ
+        m_pixelCacheInvalid = true;
         // finalize heatmap data (if there is any)
         if (m_dataApi->heatmap.isCollecting()) {
             m_dataApi->heatmap.finalize();
         }
 
-        m_stream->writeShort(Message::EMCA_RESPONSE_RENDER_IMAGE);
+        beginMessage();
+
+        m_buffer.writeShort(Message::EMCA_RESPONSE_RENDER_IMAGE);
         //TODO: pass through the rendered exr image if the connection is remote
-        m_stream->writeString(m_renderer->getRenderedImagePath());
+        m_buffer.writeString(m_renderer->getRenderedImagePath());
 
         // send heatmap data, if there is any
         if (m_dataApi->heatmap.hasData())
@@ -230,11 +386,22 @@ void EMCAServer::respondRenderImage() {
     }
 }
 
+void EMCAServer::respondPixelCacheInvalidation() {
+    if (!m_pixelCacheInvalid.exchange(false))
+        return;
+    if (!(m_capabilities & EMCA_CAPABILITY_PIXEL_CACHE_INVALIDATION))
+        return;
+
+    beginMessage();
+    m_buffer.writeShort(Message::EMCA_INVALIDATE_PIXEL_CACHE);
+}
+
 void EMCAServer::respondCameraData() {
     try {
         std::cout << "Send Camera Information ... " << std::flush;
-        m_stream->writeShort(Message::EMCA_RESPONSE_CAMERA);
-        m_renderer->getCameraData().serialize(m_stream.get());
+        beginMessage();
+        m_buffer.writeShort(Message::EMCA_RESPONSE_CAMERA);
+        m_renderer->getCameraData().serialize(&m_buffer);
         std::cout << "done" << std::endl;
     } catch (std::exception &e) {
         std::cerr << "Camera data error: " << e.what() << std::endl;
@@ -243,29 +410,30 @@ void EMCAServer::respondCameraData() {
 
 void EMCAServer::respondSceneData() {
     try {
-        m_stream->writeShort(Message::EMCA_RESPONSE_SCENE);
+        beginMessage();
+        m_buffer.writeShort(Message::EMCA_RESPONSE_SCENE);
 
         const bool has_heatmap_data = m_dataApi->heatmap.hasData();
-        m_stream->writeBool(has_heatmap_data);
+        m_buffer.writeBool(has_heatmap_data);
 
         if (has_heatmap_data) {
-            m_stream->writeString(m_dataApi->heatmap.colormap);
-            m_stream->writeBool(m_dataApi->heatmap.show_colorbar);
-            m_stream->writeString(m_dataApi->heatmap.label);
+            m_buffer.writeString(m_dataApi->heatmap.colormap);
+            m_buffer.writeBool(m_dataApi->heatmap.show_colorbar);
+            m_buffer.writeString(m_dataApi->heatmap.label);
 
             const auto& heatmap_data = m_dataApi->heatmap.getHeatmapData();
-            m_stream->writeUInt(static_cast<uint32_t>(heatmap_data.size()));
+            m_buffer.writeUInt(static_cast<uint32_t>(heatmap_data.size()));
             std::cout << "Send Heatmap Information ... " << std::flush;
             for (const auto& heatmap : heatmap_data) {
-                heatmap.serialize(m_stream.get());
+                heatmap.serialize(&m_buffer);
             }
         }
         else {
             std::cout << "Send Mesh Information ... " << std::flush;
-            m_stream->writeUInt(static_cast<uint32_t>(m_mesh_data.size()));
+            m_buffer.writeUInt(static_cast<uint32_t>(m_mesh_data.size()));
             for (const auto& mesh : m_mesh_data) {
                 // send mesh to client
-                mesh.serialize(m_stream.get());
+                mesh.serialize(&m_buffer);
             }
         }
         std::cout << "done" << std::endl;
@@ -276,24 +444,249 @@ void EMCAServer::respondSceneData() {
 
 void EMCAServer::respondRenderPixel() {
     try {
-        m_dataApi->enable();
-        uint32_t x = m_stream->readUInt();
-        uint32_t y = m_stream->readUInt();
-        uint32_t sampleCount = m_stream->readUInt();
-
-        m_renderer->setSampleCount(sampleCount);
+        PixelRequest request;
+        request.id = 0;
+        request.x = m_stream->readUInt();
+        request.y = m_stream->readUInt();
+        request.sampleCount = m_stream->readUInt();
+        if (m_capabilities & EMCA_CAPABILITY_FILTER_PUSHDOWN)
+            request.predicate = m_stream->readString();
+        respondRenderPixel(request);
+    } catch (std::exception &e) {
+        std::cerr << "Render data error: " << e.what() << std::endl;
+    }
+}
 
-        std::cout << "Respond Pathdata of pixel: (" << x << ", " << y << ")" << std::endl;
-        m_renderer->renderPixel(x, y);
+void EMCAServer::respondRenderPixel(const PixelRequest& request) {
+    try {
+        m_currentRequestId = request.id;
+        if (!request.predicate.empty()) {
+            // a predicate which can not be evaluated is ignored, all paths are sent in that case
+            try {
+                m_dataApi->setPathFilter(std::make_unique<PathFilter>(request.predicate));
+            } catch (std::exception &e) {
+                std::cerr << "Ignore predicate of pixel request " << request.id << ": " << e.what() << std::endl;
+            }
+        }
+        m_dataApi->enable();
+        m_renderer->setSampleCount(request.sampleCount);
+
+        std::cout << "Respond Pathdata of pixel: (" << request.x << ", " << request.y << ")" << std::endl;
+        if (m_capabilities & EMCA_CAPABILITY_PROGRESSIVE_PIXEL_DATA) {
+            // send the completed paths in chunks, the final response contains the remaining paths
+            auto lastChunk = std::chrono::steady_clock::now();
+            auto interval = m_chunkInterval;
+            m_dataApi->setPathCallback([&](uint32_t sampleIdx) {
+                if (sampleIdx <= m_dataApi->getSentPaths() || std::chrono::steady_clock::now() - lastChunk < interval ||
+                    (request.id != 0 && isCancelled(request.id)))
+                    return;
+                beginMessage();
+                m_buffer.writeShort(Message::EMCA_RESPONSE_RENDER_PIXEL_CHUNK);
+                if (m_capabilities & EMCA_CAPABILITY_PIPELINED_PIXEL_REQUESTS)
+                    m_buffer.writeUInt(request.id);
+                m_dataApi->serializeColumnsChunk(&m_buffer, sampleIdx);
+                flushMessages();
+                lastChunk = std::chrono::steady_clock::now();
+                interval = std::min(2*interval, m_maxChunkInterval);
+            });
+        }
+        m_renderer->renderPixel(request.x, request.y);
 
-        m_stream->writeShort(Message::EMCA_RESPONSE_RENDER_PIXEL);
-        m_dataApi->serialize(m_stream.get());
-        m_dataApi->disable();
-        // clear the current path data - even when selecting the same pixel again, it will be recomputed
-        m_dataApi->clear();
+        // the request might have been cancelled while rendering, do not send data nobody is waiting for
+        receivePendingPixelRequests();
+        if (request.id != 0 && isCancelled(request.id)) {
+            std::cout << "Pixel request " << request.id << " was cancelled" << std::endl;
+        }
+        else {
+            if (m_dataApi->hasPathFilter()) {
+                // the statistics of the rejected paths precede the final response
+                m_dataApi->applyPathFilter();
+                beginMessage();
+                m_buffer.writeShort(Message::EMCA_RESPONSE_FILTER_STATISTICS);
+                if (m_capabilities & EMCA_CAPABILITY_PIPELINED_PIXEL_REQUESTS)
+                    m_buffer.writeUInt(request.id);
+                m_dataApi->getFilterStatistics().serialize(&m_buffer);
+            }
+            beginMessage();
+            const bool columns = m_capabilities & EMCA_CAPABILITY_COLUMNAR_PIXEL_DATA;
+            m_buffer.writeShort(columns ? Message::EMCA_RESPONSE_RENDER_PIXEL_COLUMNS : Message::EMCA_RESPONSE_RENDER_PIXEL);
+            if (m_capabilities & EMCA_CAPABILITY_PIPELINED_PIXEL_REQUESTS)
+                m_buffer.writeUInt(request.id);
+            if (columns)
+                m_dataApi->serializeColumns(&m_buffer);
+            else
+                m_dataApi->serialize(&m_buffer);
+        }
     } catch (std::exception &e) {
         std::cerr << "Render data error: " << e.what() << std::endl;
     }
+    m_dataApi->setPathCallback(nullptr);
+    m_dataApi->disable();
+    // clear the current path data - even when selecting the same pixel again, it will be recomputed
+    m_dataApi->clear();
+    m_currentRequestId = 0;
+}
+
+EMCAServer::PixelRequest EMCAServer::readPixelRequest() {
+    PixelRequest request;
+    request.id = m_stream->readUInt();
+    request.x = m_stream->readUInt();
+    request.y = m_stream->readUInt();
+    request.sampleCount = m_stream->readUInt();
+    if (m_capabilities & EMCA_CAPABILITY_FILTER_PUSHDOWN)
+        request.predicate = m_stream->readString();
+    return request;
+}
+
+void EMCAServer::cancelPixelRequests() {
+    // cancels all requests up to the given identifier, identifiers are increasing per connection
+    const uint32_t requestId = m_stream->readUInt();
+    m_cancelledRequestId = std::max(m_cancelledRequestId, requestId);
+    m_pixelRequests.erase(std::remove_if(m_pixelRequests.begin(), m_pixelRequests.end(),
+                                         [this](const PixelRequest& request) { return isCancelled(request.id); }),
+                          m_pixelRequests.end());
+}
+
+void EMCAServer::receivePendingPixelRequests() {
+    if (m_clientSocket < 0 || !m_stream.get() || !(m_capabilities & EMCA_CAPABILITY_PIPELINED_PIXEL_REQUESTS))
+        return;
+
+    std::vector<char> header(sizeof(int16_t));
+    while (true) {
+        ssize_t n = recv(m_clientSocket, header.data(), sizeof(int16_t), MSG_PEEK | MSG_DONTWAIT);
+        if (n < static_cast<ssize_t>(sizeof(int16_t)))
+            return;
+
+        int16_t msg;
+        memcpy(&msg, header.data(), sizeof(int16_t));
+        size_t size;
+        if (msg == Message::EMCA_REQUEST_RENDER_PIXEL)
+            size = sizeof(int16_t)+4*sizeof(uint32_t);
+        else if (msg == Message::EMCA_CANCEL_RENDER_PIXEL)
+            size = sizeof(int16_t)+sizeof(uint32_t);
+        else
+            return;
+
+        if (msg == Message::EMCA_REQUEST_RENDER_PIXEL && (m_capabilities & EMCA_CAPABILITY_FILTER_PUSHDOWN)) {
+            // the length of the predicate follows the fixed size part of the request
+            header.resize(size+sizeof(uint64_t));
+            n = recv(m_clientSocket, header.data(), header.size(), MSG_PEEK | MSG_DONTWAIT);
+            if (n < static_cast<ssize_t>(header.size()))
+                return;
+            uint64_t length;
+            memcpy(&length, header.data()+size, sizeof(uint64_t));
+            size += sizeof(uint64_t)+length;
+        }
+
+        // only consume complete messages, anything else is handled by the main loop
+        header.resize(size);
+        n = recv(m_clientSocket, header.data(), size, MSG_PEEK | MSG_DONTWAIT);
+        if (n < static_cast<ssize_t>(size))
+            return;
+
+        m_stream->readShort();
+        if (msg == Message::EMCA_REQUEST_RENDER_PIXEL)
+            m_pixelRequests.push_back(readPixelRequest());
+        else
+            cancelPixelRequests();
+    }
+}
+
+void EMCAServer::respondPixelRequests() {
+    while (!m_pixelRequests.empty()) {
+        const PixelRequest request = m_pixelRequests.front();
+        m_pixelRequests.pop_front();
+        respondRenderPixel(request);
+        flushMessages();
+        receivePendingPixelRequests();
+    }
+}
+
+void EMCAServer::beginMessage() {
+    m_messageStarts.push_back(m_buffer.size());
+}
+
+void EMCAServer::flushMessages() {
+    if (!m_stream.get() || m_buffer.size() == 0) {
+        m_buffer.clear();
+        m_messageStarts.clear();
+        return;
+    }
+
+    // framed messages: message identifier, length of the message body (uint64), message body
+    const BufferStream* messages = &m_buffer;
+    if (m_framed) {
+        m_framedBuffer.clear();
+        for (size_t i = 0; i < m_messageStarts.size(); ++i) {
+            const size_t begin = m_messageStarts[i];
+            const size_t end = i+1 < m_messageStarts.size() ? m_messageStarts[i+1] : m_buffer.size();
+            m_framedBuffer.writeArray(m_buffer.data()+begin, sizeof(int16_t));
+            m_framedBuffer.writeULong(end-begin-sizeof(int16_t));
+            m_framedBuffer.writeArray(m_buffer.data()+begin+sizeof(int16_t), end-begin-sizeof(int16_t));
+        }
+        messages = &m_framedBuffer;
+    }
+
+    // large messages for local clients are passed in shared memory instead of being copied through the socket
+    if ((m_capabilities & EMCA_CAPABILITY_SHARED_MEMORY) && messages->size() >= m_sharedMemoryThreshold) {
+        if (sendSharedMemory(*messages))
+            messages = nullptr;
+    }
+
+    if (messages && m_codec && messages->size() >= m_compressionThreshold) {
+        m_codec->compress(messages->data(), messages->size(), m_compressed);
+        // incompressible data is sent as it is
+        if (m_compressed.size() < messages->size()) {
+            BufferStream header;
+            header.writeShort(Message::EMCA_COMPRESSED);
+            if (m_framed)
+                header.writeULong(sizeof(uint8_t)+2*sizeof(uint64_t)+m_compressed.size());
+            header.writeUChar(m_codec->getId());
+            header.writeULong(messages->size());
+            header.writeULong(m_compressed.size());
+            m_stream->writeArray(header.data(), header.size());
+            m_stream->writeArray(m_compressed.data(), m_compressed.size());
+            messages = nullptr;
+        }
+    }
+
+    if (messages)
+        m_stream->writeArray(messages->data(), messages->size());
+    m_buffer.clear();
+    m_messageStarts.clear();
+}
+
+bool EMCAServer::sendSharedMemory(const BufferStream& messages) {
+    const std::string name = "emca-"+std::to_string(getpid())+"-"+std::to_string(m_sharedMemoryCount++);
+    const std::string path = "/"+name;
+
+    const int fd = shm_open(path.c_str(), O_CREAT | O_EXCL | O_RDWR, 0600);
+    if (fd < 0) {
+        std::cerr << "failed to create shared memory segment " << name << ": " << errno << std::endl;
+        return false;
+    }
+    void* data = MAP_FAILED;
+    if (ftruncate(fd, static_cast<off_t>(messages.size())) == 0)
+        data = mmap(nullptr, messages.size(), PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    close(fd);
+    if (data == MAP_FAILED) {
+        std::cerr << "failed to map shared memory segment " << name << ": " << errno << std::endl;
+        shm_unlink(path.c_str());
+        return false;
+    }
+    memcpy(data, messages.data(), messages.size());
+    munmap(data, messages.size());
+    m_sharedMemorySegments.push_back(path);
+
+    // shared memory message: segment name, size of the messages within the segment
+    BufferStream header;
+    header.writeShort(Message::EMCA_SHARED_MEMORY);
+    if (m_framed)
+        header.writeULong(sizeof(uint64_t)+name.size()+sizeof(uint64_t));
+    header.writeString(name);
+    header.writeULong(messages.size());
+    m_stream->writeArray(header.data(), header.size());
+    return true;
 }
 
 bool EMCAServer::respondPluginRequest(short id) {
@@ -303,7 +696,8 @@ bool EMCAServer::respondPluginRequest(short id) {
     try {
         plugin->deserialize(m_stream.get());
         plugin->run();
-        plugin->serialize(m_stream.get());
+        beginMessage();
+        plugin->serialize(&m_buffer);
         return true;
     } catch (std::exception &e) {
         std::cerr << "Plugin error: " << e.what() << std::endl;
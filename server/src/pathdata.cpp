@@ -25,9 +25,26 @@
 #include <emca/pathdata.h>
 
 #include <algorithm>
+#include <tuple>
+#include <unordered_map>
 
 EMCA_NAMESPACE_BEGIN
 
+namespace {
+// type identifiers (https://docs.python.org/3/library/struct.html#format-characters) indexed by the alternative of UserData::Data
+const char* const typeIdentifiers[] = {"?", "f", "d", "i", "2i", "2f", "3i", "3f", "4f", "s"};
+static_assert(sizeof(typeIdentifiers)/sizeof(typeIdentifiers[0]) == std::variant_size_v<UserData::Data>);
+
+constexpr size_t stringTypeIndex = std::variant_size_v<UserData::Data>-1;
+static_assert(std::is_same_v<std::variant_alternative_t<stringTypeIndex, UserData::Data>, std::string>);
+
+template <typename T>
+void appendValue(std::vector<char>& values, const T& value) {
+    const char* data = reinterpret_cast<const char*>(&value);
+    values.insert(values.end(), data, data+sizeof(T));
+}
+}
+
 void UserData::serialize(Stream *stream) const
 {
     // write number of elements
@@ -98,6 +115,72 @@ void UserData::serialize(Stream *stream) const
     }
 }
 
+void UserDataColumns::add(uint32_t row, const UserData& userData)
+{
+    for (const auto& [key, value] : userData.m_data) {
+        const auto [it, inserted] = m_columnIds.try_emplace(std::make_pair(key, value.index()), m_columns.size());
+        if (inserted)
+            m_columns.push_back(Column{key, value.index(), {}, {}, {}});
+        Column& column = m_columns[it->second];
+
+        // a key set twice on the same row keeps its last value
+        if (!column.rows.empty() && column.rows.back() == row) {
+            if (column.typeIndex == stringTypeIndex)
+                column.strings.pop_back();
+            else
+                column.values.resize(column.values.size()-column.values.size()/column.rows.size());
+        }
+        else
+            column.rows.push_back(row);
+
+        std::visit([&column](const auto& v) {
+            using T = std::decay_t<decltype(v)>;
+            if constexpr (std::is_same_v<T, std::string>)
+                column.strings.push_back(v);
+            else if constexpr (std::is_same_v<T, bool>)
+                appendValue(column.values, char(v));
+            else if constexpr (std::is_fundamental_v<T>)
+                appendValue(column.values, v);
+            else // std::pair and std::tuple
+                std::apply([&column](const auto&... elements) { (appendValue(column.values, elements), ...); }, v);
+        }, value);
+    }
+}
+
+void UserDataColumns::serialize(Stream *stream, uint32_t numRows) const
+{
+    stream->writeUInt(static_cast<uint32_t>(m_columns.size()));
+    for (const auto& column : m_columns) {
+        stream->writeString(column.key);
+        stream->writeString(typeIdentifiers[column.typeIndex]);
+
+        std::vector<char> valid(numRows, 0);
+        for (uint32_t row : column.rows)
+            valid.at(row) = 1;
+        stream->writeArray(valid.data(), valid.size());
+
+        if (column.typeIndex == stringTypeIndex) {
+            // string values are dictionary encoded, most keys only take a few distinct values
+            std::unordered_map<std::string, uint32_t> codes;
+            std::vector<const std::string*> dictionary;
+            std::vector<uint32_t> indices;
+            indices.reserve(column.strings.size());
+            for (const auto& value : column.strings) {
+                const auto [it, inserted] = codes.try_emplace(value, static_cast<uint32_t>(dictionary.size()));
+                if (inserted)
+                    dictionary.push_back(&it->first);
+                indices.push_back(it->second);
+            }
+            stream->writeUInt(static_cast<uint32_t>(dictionary.size()));
+            for (const std::string* value : dictionary)
+                stream->writeString(*value);
+            stream->writeArray(indices.data(), indices.size());
+        }
+        else
+            stream->writeArray(column.values.data(), column.values.size());
+    }
+}
+
 void IntersectionData::setIntersectionPos(Point3f pos)
 {
     m_hasPos = true;
@@ -0,0 +1,347 @@
+/*
+    EMCA - Explorer of Monte Carlo based Alorithms (Shared Server Library)
+    comes with an Apache License 2.0
+    (c) Christoph Kreisl 2020
+    (c) Lukas Ruppert 2021
+
+	Licensed to the Apache Software Foundation (ASF) under one
+	or more contributor license agreements.  See the NOTICE file
+	distributed with this work for additional information
+	regarding copyright ownership.  The ASF licenses this file
+	to you under the Apache License, Version 2.0 (the
+	"License"); you may not use this file except in compliance
+	with the License.  You may obtain a copy of the License at
+
+	http://www.apache.org/licenses/LICENSE-2.0
+
+	Unless required by applicable law or agreed to in writing,
+	software distributed under the License is distributed on an
+	"AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+	KIND, either express or implied.  See the License for the
+	specific language governing permissions and limitations
+	under the License.
+*/
+
+#include <emca/pathfilter.h>
+
+#include <algorithm>
+#include <cctype>
+#include <stdexcept>
+#include <tuple>
+#include <type_traits>
+
+EMCA_NAMESPACE_BEGIN
+
+namespace {
+
+constexpr uint8_t PathLevel         = 0;
+constexpr uint8_t IntersectionLevel = 1;
+constexpr uint8_t NoComponent       = 0xFF;
+constexpr uint8_t NumberLiteral     = 0;
+constexpr uint8_t StringLiteral     = 1;
+
+enum Operator : uint8_t { Equal, NotEqual, Less, LessEqual, Greater, GreaterEqual };
+
+// value of a field in one path or intersection, points and colors keep the precision of their components
+struct Value {
+    enum Kind : uint8_t { Scalar, Point, Color, String } kind {Scalar};
+    bool isFloat {false};
+    uint8_t size {1};
+    double v[4] {0.0, 0.0, 0.0, 0.0};
+    const std::string* string {nullptr};
+};
+
+Value scalar(double value) {
+    Value result;
+    result.v[0] = value;
+    return result;
+}
+
+template <typename... T>
+Value vector(Value::Kind kind, T... components) {
+    Value result;
+    result.kind = kind;
+    result.isFloat = (std::is_floating_point_v<T> && ...);
+    result.size = sizeof...(T);
+    size_t i = 0;
+    ((result.v[i++] = static_cast<double>(components)), ...);
+    return result;
+}
+
+Value point(const Point3f& p) { return vector(Value::Point, p.x(), p.y(), p.z()); }
+Value color(const Color4f& c) { return vector(Value::Color, c.r(), c.g(), c.b(), c.a()); }
+
+Value userDataValue(const UserData::Data& data) {
+    return std::visit([](const auto& value) -> Value {
+        using T = std::decay_t<decltype(value)>;
+        if constexpr (std::is_same_v<T, std::string>) {
+            Value result;
+            result.kind = Value::String;
+            result.string = &value;
+            return result;
+        } else if constexpr (std::is_arithmetic_v<T>) {
+            return scalar(static_cast<double>(value));
+        } else {
+            // 2 or 3 components are points, 4 floats are colors
+            return std::apply([](auto... components) {
+                return vector(sizeof...(components) == 4 ? Value::Color : Value::Point, components...);
+            }, value);
+        }
+    }, data);
+}
+
+// restricts the value to the selected point or color component, returns false if it has no such component
+bool selectComponent(Value& value, uint8_t component) {
+    if (component == NoComponent)
+        return true;
+    size_t index;
+    if (value.kind == Value::Point && component < value.size)
+        index = component;
+    else if (value.kind == Value::Color && component >= 3 && component < 7)
+        index = component-3;
+    else
+        return false;
+    value.v[0] = value.v[index];
+    value.size = 1;
+    return true;
+}
+
+template <typename T>
+bool compare(uint8_t op, T a, T b) {
+    switch (op) {
+    case Equal:        return a == b;
+    case NotEqual:     return a != b;
+    case Less:         return a < b;
+    case LessEqual:    return a <= b;
+    case Greater:      return a > b;
+    case GreaterEqual: return a >= b;
+    }
+    return false;
+}
+
+std::string toLower(std::string value) {
+    std::transform(value.begin(), value.end(), value.begin(), [](unsigned char c) { return std::tolower(c); });
+    return value;
+}
+
+// numbers compare against all components of points and colors, strings only compare for (in)equality
+bool compareValue(const Value& value, uint8_t op, bool isString, double number, const std::string& string) {
+    if (isString != (value.kind == Value::String))
+        return op == NotEqual;
+    if (isString)
+        return (toLower(*value.string) == string) == (op == Equal);
+    if (value.kind == Value::Scalar)
+        return compare(op, value.v[0], number);
+    for (size_t i = 0; i < value.size; ++i) {
+        const bool result = value.isFloat ? compare(op, static_cast<float>(value.v[i]), static_cast<float>(number))
+                                          : compare(op, value.v[i], number);
+        if (!result)
+            return false;
+    }
+    return true;
+}
+
+bool isTrue(const Value& value) {
+    if (value.kind == Value::String)
+        return !value.string->empty();
+    return std::any_of(value.v, value.v+value.size, [](double v) { return v != 0.0; });
+}
+
+} // namespace
+
+void FilterStatistics::serialize(Stream *stream) const {
+    stream->writeUInt(totalPaths);
+    stream->writeUInt(rejectedPaths);
+    stream->writeULong(rejectedIntersections);
+    stream->writeULong(rejectedPathDepth);
+    stream->writeArray(rejectedFinalEstimate);
+}
+
+PathFilter::PathFilter(const std::string& predicate) {
+    BufferStream stream;
+    stream.writeArray(predicate.data(), predicate.size());
+
+    // depth of the value stack, validated here so that matches() can rely on it
+    size_t depth = 0;
+    auto pop = [&depth](size_t count) {
+        if (depth < count)
+            throw std::runtime_error("invalid predicate: missing operand");
+        depth -= count;
+    };
+
+    while (!stream.atEnd()) {
+        Instruction instruction;
+        instruction.opcode = static_cast<Opcode>(stream.readUChar());
+        switch (instruction.opcode) {
+        case Const:
+            instruction.constant = stream.readBool();
+            break;
+        case Compare:
+        case Truth:
+        case Has: {
+            const uint8_t level = stream.readUChar();
+            if (level != PathLevel && level != IntersectionLevel)
+                throw std::runtime_error("invalid predicate: unknown level " + std::to_string(level));
+            instruction.perIntersection = level == IntersectionLevel;
+            instruction.key = stream.readString();
+            instruction.component = stream.readUChar();
+            if (instruction.component >= 7 && instruction.component != NoComponent)
+                throw std::runtime_error("invalid predicate: unknown component " + std::to_string(instruction.component));
+            if (instruction.opcode == Compare) {
+                instruction.op = stream.readUChar();
+                const uint8_t literal = stream.readUChar();
+                if (instruction.op > GreaterEqual)
+                    throw std::runtime_error("invalid predicate: unknown operator " + std::to_string(instruction.op));
+                if (literal == NumberLiteral) {
+                    instruction.number = stream.readDouble();
+                } else if (literal == StringLiteral) {
+                    if (instruction.op != Equal && instruction.op != NotEqual)
+                        throw std::runtime_error("invalid predicate: strings can only be compared for equality");
+                    instruction.isString = true;
+                    instruction.string = toLower(stream.readString());
+                } else {
+                    throw std::runtime_error("invalid predicate: unknown literal " + std::to_string(literal));
+                }
+            }
+            const std::string& key = instruction.key;
+            if (!instruction.perIntersection) {
+                if (key == "sampleIndex")        instruction.tableField = SampleIndex;
+                else if (key == "pathDepth")     instruction.tableField = PathDepth;
+                else if (key == "pathOrigin")    instruction.tableField = PathOrigin;
+                else if (key == "finalEstimate") instruction.tableField = FinalEstimate;
+            } else {
+                if (key == "depthIdx")           instruction.tableField = DepthIdx;
+                else if (key == "pos")           instruction.tableField = Pos;
+                else if (key == "posNE")         instruction.tableField = PosNE;
+                else if (key == "visibleNE")     instruction.tableField = VisibleNE;
+                else if (key == "li")            instruction.tableField = Li;
+                else if (key == "le")            instruction.tableField = Le;
+            }
+            break;
+        }
+        case And:
+        case Or:
+            pop(2);
+            break;
+        case Not:
+        case Any:
+        case All:
+            pop(1);
+            break;
+        default:
+            throw std::runtime_error("invalid predicate: unknown opcode " + std::to_string(instruction.opcode));
+        }
+        ++depth;
+        m_instructions.push_back(std::move(instruction));
+    }
+    if (depth != 1)
+        throw std::runtime_error("invalid predicate: expected a single result");
+}
+
+bool PathFilter::matches(const PathData& path) const {
+    // only intersections with a depth index are sent, the others are not evaluated either
+    std::vector<const IntersectionData*> intersections;
+    for (const IntersectionData& intersection : path.m_intersections)
+        if (intersection.m_depthIdx != -1U)
+            intersections.push_back(&intersection);
+
+    // values of path conditions have a single element, values of intersection conditions one per intersection
+    struct Result {
+        bool perIntersection;
+        std::vector<char> values;
+    };
+    std::vector<Result> stack;
+    for (const Instruction& instruction : m_instructions) {
+        switch (instruction.opcode) {
+        case Const:
+            stack.push_back({false, {instruction.constant}});
+            break;
+        case Compare:
+        case Truth:
+        case Has:
+            if (instruction.perIntersection) {
+                Result result {true, {}};
+                result.values.reserve(intersections.size());
+                for (const IntersectionData* intersection : intersections)
+                    result.values.push_back(evaluate(instruction, path, intersection));
+                stack.push_back(std::move(result));
+            } else {
+                stack.push_back({false, {evaluate(instruction, path, nullptr)}});
+            }
+            break;
+        case And:
+        case Or: {
+            Result b = std::move(stack.back());
+            stack.pop_back();
+            Result& a = stack.back();
+            // path values apply to each intersection
+            if (a.perIntersection && !b.perIntersection)
+                b.values.assign(a.values.size(), b.values.front());
+            else if (!a.perIntersection && b.perIntersection)
+                a.values.assign(b.values.size(), a.values.front());
+            a.perIntersection |= b.perIntersection;
+            for (size_t i = 0; i < a.values.size(); ++i)
+                a.values[i] = instruction.opcode == And ? (a.values[i] && b.values[i]) : (a.values[i] || b.values[i]);
+            break;
+        }
+        case Not:
+            for (char& value : stack.back().values)
+                value = !value;
+            break;
+        case Any:
+        case All: {
+            Result& a = stack.back();
+            if (!a.perIntersection)
+                break;
+            const bool value = instruction.opcode == Any ? std::any_of(a.values.begin(), a.values.end(), [](char v) { return v; })
+                                                         : std::all_of(a.values.begin(), a.values.end(), [](char v) { return v; });
+            a = {false, {value}};
+            break;
+        }
+        }
+    }
+    // a path satisfies a condition on intersections if any of its intersections does
+    const std::vector<char>& values = stack.back().values;
+    return std::any_of(values.begin(), values.end(), [](char v) { return v; });
+}
+
+bool PathFilter::evaluate(const Instruction& instruction, const PathData& path, const IntersectionData* intersection) const {
+    bool result = false;
+    auto apply = [&](Value value) {
+        if (!selectComponent(value, instruction.component))
+            return;
+        if (instruction.opcode == Has)
+            result = true;
+        else if (instruction.opcode == Truth)
+            result |= isTrue(value);
+        else
+            result |= compareValue(value, instruction.op, instruction.isString, instruction.number, instruction.string);
+    };
+
+    switch (instruction.tableField) {
+    case SampleIndex:   apply(scalar(path.m_sampleIdx)); return result;
+    case PathDepth:     apply(scalar(path.m_pathDepth)); return result;
+    case PathOrigin:    apply(point(path.m_pathOrigin)); return result;
+    case FinalEstimate: if (path.m_hasFinalEstimate) apply(color(path.m_finalEstimate)); return result;
+    case DepthIdx:      apply(scalar(intersection->m_depthIdx)); return result;
+    case Pos:           if (intersection->m_hasPos) apply(point(intersection->m_pos)); return result;
+    case PosNE:         if (intersection->m_hasNE) apply(point(intersection->m_posNE)); return result;
+    case VisibleNE:     if (intersection->m_hasNE) apply(scalar(intersection->m_visibleNE)); return result;
+    case Li:            if (intersection->m_hasEstimate) apply(color(intersection->m_estimate)); return result;
+    case Le:            if (intersection->m_hasEmission) apply(color(intersection->m_emission)); return result;
+    case UserDataField: break;
+    }
+
+    // a key set twice with the same type keeps its last value, values of different types are alternatives
+    const UserData& userData = intersection ? static_cast<const UserData&>(*intersection) : static_cast<const UserData&>(path);
+    uint32_t seenTypes = 0;
+    for (auto it = userData.m_data.rbegin(); it != userData.m_data.rend(); ++it) {
+        if (it->first != instruction.key || (seenTypes & (1u << it->second.index())))
+            continue;
+        seenTypes |= 1u << it->second.index();
+        apply(userDataValue(it->second));
+    }
+    return result;
+}
+
+EMCA_NAMESPACE_END
@@ -0,0 +1,278 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from PySide2.QtCore import QPoint, QThread
+from PySide2.QtCore import Signal
+from stream.stream import Stream
+from stream.socket_stream import SocketStream
+from stream.async_stream_client import AsyncStreamClient
+from stream.reconnect import backoff_delays
+from core.messages import ServerMsg
+from core.messages import StateMsg
+from core.messages import Capability
+import asyncio
+import socket
+import logging
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from model.model import Model
+else:
+    from typing import Any as Model
+
+
+class _RequestStream(Stream):
+
+    """
+    Write-only stream handing all written data to the event loop of the bridge (used by plugin requests)
+    """
+
+    def __init__(self, bridge : 'AsyncStreamBridge'):
+        self._bridge = bridge
+
+    def read(self, size : int) -> bytes:
+        raise RuntimeError('Data is received by the event loop of the AsyncStreamBridge')
+
+    def write(self, data : bytes, size : int):
+        self._bridge.send(bytes(data[:size]))
+
+
+class AsyncStreamBridge(QThread):
+
+    """
+    Async Stream Bridge (QThread)
+
+    Runs an AsyncStreamClient within an asyncio event loop of this thread,
+    provides the same interface as the SocketStreamClient to the controller.
+    Requests are handed to the event loop and the model informs the controller via Qt signals.
+    Requires a server supporting protocol version 2.
+    """
+
+    # maximum number of reconnect attempts after the connection was lost
+    RECONNECT_ATTEMPTS = 10
+
+    _sendStateMsgSig = Signal(tuple)
+
+    def __init__(self, hostname : str, port : int, auto_reconnect : bool = False):
+        QThread.__init__(self)
+        self._client = AsyncStreamClient(hostname, port, callback=self._sendStateMsgSig.emit)
+        self._stream = _RequestStream(self)
+        # socket connected by the gui thread, handed to the event loop when the thread is started
+        self._socket = None
+        self._loop = None
+        # reconnect with backoff if the connection is lost, until the reconnect is cancelled
+        self._auto_reconnect = auto_reconnect
+        self._reconnect_cancelled = None
+
+    def set_model(self, model : Model):
+        """
+        Set Model / Dataset
+        :param model: Model
+        """
+        self._client.model = model
+
+    def set_callback(self, callback):
+        """
+        Connects Qt Signal to a Qt Slot callback function
+        :param callback: QtSlot callback function
+        """
+        self._sendStateMsgSig.connect(callback)
+
+    @property
+    def stream(self) -> Stream:
+        """
+        Return write-only stream for plugin requests
+        """
+        return self._stream
+
+    @property
+    def protocol_version(self) -> int:
+        """
+        Returns the negotiated protocol version of the current connection
+        """
+        return self._client.protocol_version
+
+    @property
+    def capabilities(self) -> Capability:
+        """
+        Returns the negotiated protocol capabilities of the current connection
+        """
+        return self._client.capabilities
+
+    def _call(self, function, *args):
+        """
+        Calls the function within the event loop
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            logging.error('AsyncStreamBridge is not running')
+            return
+        loop.call_soon_threadsafe(function, *args)
+
+    def send(self, data : bytes):
+        """
+        Sends data to the server
+        """
+        self._call(self._client.write, data)
+
+    def request_render_info(self):
+        """
+        Requests the render info data package from the server
+        """
+        self._call(self._client.send_request, ServerMsg.EMCA_REQUEST_RENDER_INFO)
+
+    def request_render_image(self, sample_count : int):
+        """
+        Requests the render image from the server (starts the rendering process)
+        """
+        self._call(self._client.send_request, ServerMsg.EMCA_REQUEST_RENDER_IMAGE, int(sample_count))
+
+    def request_camera_data(self):
+        """
+        Requests the camera data from the server
+        """
+        self._call(self._client.send_request, ServerMsg.EMCA_REQUEST_CAMERA)
+
+    def request_scene_data(self):
+        """
+        Requests the three-dimensional scene data from the server
+        """
+        self._call(self._client.send_request, ServerMsg.EMCA_REQUEST_SCENE)
+
+    def request_render_pixel(self, pixel : QPoint, sample_count : int, cancel_pending : bool = True,
+                             predicate : bytes = b''):
+        """
+        Requests the render data of the selected pixel,
+        the previous requests which are not answered yet are cancelled unless cancel_pending is False.
+        If the server supports filter pushdown, only the paths satisfying the serialized predicate are sent
+        """
+        logging.info('Request pixel=({},{})'.format(pixel.x(), pixel.y()))
+        self._call(self._client.send_render_pixel, int(pixel.x()), int(pixel.y()), int(sample_count), cancel_pending,
+                   predicate)
+
+    def cancel_render_pixel(self):
+        """
+        Cancels all pixel requests which are not answered yet
+        """
+        self._call(self._client.cancel_render_pixel)
+
+    def request_disconnect(self):
+        """
+        Sends disconnect signal to server
+        """
+        self.cancel_reconnect()
+        self._call(self._client.send_request, ServerMsg.EMCA_DISCONNECT)
+
+    def cancel_reconnect(self):
+        """
+        Stops reconnecting after a lost connection
+        """
+        if self._reconnect_cancelled is not None:
+            self._call(self._reconnect_cancelled.set)
+
+    def is_connected(self) -> bool:
+        """
+        Returns true when there is a open socket connection
+        """
+        if self._loop is None:
+            return self._socket is not None
+        return self._client.is_connected()
+
+    def connect_socket_stream(self, hostname : str, port : int):
+        """
+        Connects the socket and returns if successful, the event loop takes it over when the thread is started
+        :return: True|False, None|ErrorMsg
+        """
+        # a previous session may still be reconnecting
+        self.cancel_reconnect()
+        self.wait()
+        self._client.hostname = hostname
+        self._client.port = port
+        path = SocketStream.unix_socket_path(hostname)
+        try:
+            if path is not None:
+                logging.info("Connecting to {}".format(path))
+                self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._socket.connect(path)
+            else:
+                logging.info("Connecting to {}:{}".format(hostname, port))
+                self._socket = socket.create_connection((hostname, port))
+        except Exception as e:
+            logging.error("Socket error {}".format(e))
+            return False, str(e)
+        return True, None
+
+    def close(self):
+        """
+        Sends hard disconnect to server (client is closed)
+        """
+        self.cancel_reconnect()
+        self._call(self._client.send_request, ServerMsg.EMCA_QUIT)
+
+    async def _reconnect(self) -> bool:
+        """
+        Tries to reconnect with backoff, returns if successful
+        """
+        for delay in backoff_delays(attempts=self.RECONNECT_ATTEMPTS):
+            try:
+                await asyncio.wait_for(self._reconnect_cancelled.wait(), delay)
+                return False
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self._client.connect()
+                return True
+            except Exception as e:
+                logging.info('Reconnect failed: {}'.format(e))
+        return False
+
+    async def _serve(self):
+        self._reconnect_cancelled = asyncio.Event()
+        await self._client.connect(sock=self._socket)
+        await self._client.wait_closed()
+        while self._auto_reconnect and self._client.connection_lost:
+            self._sendStateMsgSig.emit((StateMsg.DISCONNECT, None))
+            if not await self._reconnect():
+                break
+            await self._client.wait_closed()
+
+    def run(self):
+        """
+        Runs the event loop until the connection is closed
+        """
+        logging.info('Start AsyncStreamBridge ...')
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except Exception as e:
+            logging.error(e)
+        finally:
+            self._loop.close()
+            self._loop = None
+            self._reconnect_cancelled = None
+            if self._socket is not None:
+                self._socket.close()
+            self._socket = None
+        logging.info("Shutdown AsyncStreamBridge Thread ...")
@@ -0,0 +1,468 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+import asyncio
+import socket
+import collections
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from stream.stream import Layout
+from stream.buffer_stream import BufferStream
+from stream.socket_stream import SocketStream
+from stream.client_protocol import ClientProtocol
+from model.headless_model import HeadlessModel
+from model.render_info import RenderInfo
+from model.camera_data import CameraData
+from model.mesh_data import ShapeData
+from model.pixel_data import PixelData
+from core.messages import ServerMsg
+from core.messages import StateMsg
+from core.messages import Capability
+
+
+class AsyncStreamClient(object):
+
+    """
+    Async Stream Client
+
+    asyncio based client transport implementing the same protocol and message dispatch as the SocketStreamClient.
+    Requests are coroutines which return the deserialized data, several requests and several clients
+    can be awaited concurrently, e.g. asyncio.gather(*[client.request_render_pixel(x, y, 256) for x in range(16)]).
+    Messages are deserialized in a decode thread (one per client) while the event loop keeps receiving.
+    Requires a server supporting framed messages and pipelined pixel requests (protocol version 2).
+
+        async with AsyncStreamClient('localhost', 50013) as client:
+            render_info = await client.request_render_info()
+            pixel_data = await client.request_render_pixel(10, 20, render_info.sample_count)
+    """
+
+    # maximum number of received messages waiting for the decode thread
+    MAX_PENDING_FRAMES = 8
+    # received data of cancelled responses is discarded in blocks of this size
+    SKIP_BLOCK_SIZE = 1 << 20
+
+    # responses which are returned by the request coroutines
+    _RESPONSES = {
+        ServerMsg.EMCA_RESPONSE_RENDER_INFO: lambda client: client.model.render_info,
+        ServerMsg.EMCA_RESPONSE_CAMERA: lambda client: client.model.camera_data,
+        ServerMsg.EMCA_RESPONSE_SCENE: lambda client: client.model.mesh_data,
+        ServerMsg.EMCA_RESPONSE_RENDER_IMAGE: lambda client: client._image_path,
+    }
+
+    def __init__(self, hostname : str, port : int,
+                 model : typing.Any = None,
+                 callback : typing.Optional[typing.Callable[[tuple], None]] = None):
+        self._hostname = hostname
+        self._port = port
+        # headless model if no model is given, the model is filled by the decode thread
+        self._model = model if model is not None else HeadlessModel()
+        # informed about all state messages (called from the event loop and from the decode thread)
+        self._callback = callback
+        self._protocol = ClientProtocol(self._model, self._send_state_msg, self.write, self._on_response)
+
+        self._loop = None
+        self._reader = None
+        self._writer = None
+        self._executor = None
+        self._frames = None
+        self._tasks = []
+        self._closed = None
+        # set if the connection was closed without a disconnect message from the server
+        self._connection_lost = False
+
+        # futures of the pending requests, pixel requests are identified by their request identifier
+        self._waiters = collections.defaultdict(collections.deque)
+        self._pixel_waiters = {}
+        self._image_path = None
+
+    @property
+    def hostname(self) -> str:
+        return self._hostname
+
+    @hostname.setter
+    def hostname(self, hostname : str):
+        self._hostname = hostname
+
+    @property
+    def port(self) -> int:
+        return self._port
+
+    @port.setter
+    def port(self, port : int):
+        self._port = port
+
+    @property
+    def model(self) -> typing.Any:
+        """
+        Returns the model the received data is deserialized into
+        """
+        return self._model
+
+    @model.setter
+    def model(self, model : typing.Any):
+        """
+        Sets the model the received data is deserialized into
+        """
+        self._model = model
+        self._protocol.model = model
+
+    @property
+    def protocol_version(self) -> int:
+        """
+        Returns the negotiated protocol version of the current connection
+        """
+        return self._protocol.protocol_version
+
+    @property
+    def capabilities(self) -> Capability:
+        """
+        Returns the negotiated protocol capabilities of the current connection
+        """
+        return self._protocol.capabilities
+
+    def is_connected(self) -> bool:
+        """
+        Returns true while the connection is open
+        """
+        return self._closed is not None and not self._closed.done()
+
+    @property
+    def connection_lost(self) -> bool:
+        """
+        Returns true if the last connection was closed without a disconnect message from the server
+        """
+        return self._connection_lost
+
+    async def __aenter__(self) -> 'AsyncStreamClient':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.disconnect()
+
+    def _send_state_msg(self, tpl : tuple):
+        if tpl[0] is StateMsg.DATA_IMAGE:
+            self._image_path = tpl[1]
+        if self._callback is not None:
+            self._callback(tpl)
+
+    def write(self, data : bytes):
+        """
+        Sends data to the server, has to be called from the event loop
+        """
+        self._writer.write(data)
+
+    async def connect(self, sock = None):
+        """
+        Connects to hostname:port or to the Unix domain socket unix:path (or uses the given connected socket),
+        handles the handshake and starts receiving messages
+        """
+        self._loop = asyncio.get_running_loop()
+        path = SocketStream.unix_socket_path(self._hostname)
+        if sock is None and path is not None:
+            logging.info("Connecting to {}".format(path))
+            self._reader, self._writer = await asyncio.open_unix_connection(path)
+        elif sock is None:
+            logging.info("Connecting to {}:{}".format(self._hostname, self._port))
+            self._reader, self._writer = await asyncio.open_connection(self._hostname, self._port)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(sock=sock)
+        try:
+            await self._handshake()
+        except Exception:
+            self._writer.close()
+            raise
+
+        self._closed = self._loop.create_future()
+        self._connection_lost = False
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='AsyncStreamDecoder')
+        self._frames = asyncio.Queue(self.MAX_PENDING_FRAMES)
+        self._tasks = [self._loop.create_task(self._receive_frames()),
+                       self._loop.create_task(self._decode_frames())]
+
+    async def _read_layout(self, layout) -> tuple:
+        return layout.unpack(await self._reader.readexactly(layout.size))
+
+    async def _handshake(self):
+        """
+        Handles the handshake and the protocol negotiation, all following messages are framed
+        """
+        msg, = await self._read_layout(Layout.SHORT)
+        if ServerMsg.get_server_msg(msg) is not ServerMsg.EMCA_HELLO:
+            self.write(Layout.SHORT.pack(ServerMsg.EMCA_QUIT.value))
+            raise ConnectionError('Received wrong handshake message from server')
+        self.write(Layout.SHORT.pack(ServerMsg.EMCA_HELLO.value))
+        # shared memory is offered to servers connected via Unix domain socket
+        family = self._writer.get_extra_info('socket').family
+        # the protocol sends StateMsg.CONNECT once the protocol accept is received
+        self._protocol.reset(local=family == getattr(socket, 'AF_UNIX', None))
+
+        # the messages until the protocol accept are not framed, their length is read explicitly
+        while not self._protocol.framed:
+            msg, = await self._read_layout(Layout.SHORT)
+            state = ServerMsg.get_server_msg(msg)
+            if state is ServerMsg.EMCA_PROTOCOL_OFFER:
+                data = b''
+            elif state is ServerMsg.EMCA_SUPPORTED_PLUGINS:
+                data = await self._reader.readexactly(Layout.UNSIGNED_INT.size)
+                num_plugins, = Layout.UNSIGNED_INT.unpack(data)
+                data += await self._reader.readexactly(num_plugins * Layout.SHORT.size)
+            elif state is ServerMsg.EMCA_PROTOCOL_ACCEPT:
+                data = await self._reader.readexactly(Layout.PROTOCOL_ACCEPT.size)
+            else:
+                raise ConnectionError('Server does not support framed messages (protocol version 2)')
+            self._protocol.handle_message(msg, BufferStream(bytearray(data)))
+
+        if not self._protocol.pipelined:
+            raise ConnectionError('Server does not support pipelined pixel requests (protocol version 2)')
+
+    async def _skip(self, size : int):
+        """
+        Discards the next size bytes of the connection
+        """
+        while size > 0:
+            block = await self._reader.read(min(size, self.SKIP_BLOCK_SIZE))
+            if not block:
+                raise asyncio.IncompleteReadError(b'', size)
+            size -= len(block)
+
+    async def _receive_frames(self):
+        """
+        Receives whole framed messages and hands them to the decode task
+        """
+        try:
+            while True:
+                msg, size = await self._read_layout(Layout.FRAME_HEADER)
+                state = ServerMsg.get_server_msg(msg)
+                request_id = None
+                if self._protocol.is_pixel_response(state):
+                    # responses to cancelled requests are skipped without being decoded
+                    request_id, = await self._read_layout(Layout.UNSIGNED_INT)
+                    size -= Layout.UNSIGNED_INT.size
+                    if self._protocol.is_stale(request_id):
+                        logging.info('Skip response to cancelled pixel request {}'.format(request_id))
+                        await self._skip(size)
+                        continue
+                data = bytearray(await self._reader.readexactly(size))
+                await self._frames.put((msg, data, request_id))
+                if state is ServerMsg.EMCA_DISCONNECT or state is ServerMsg.EMCA_QUIT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            logging.error(e)
+            self._connection_lost = True
+        finally:
+            await self._frames.put(None)
+
+    async def _decode_frames(self):
+        """
+        Deserializes the received messages in order within the decode thread
+        """
+        try:
+            while True:
+                frame = await self._frames.get()
+                if frame is None:
+                    break
+                msg, data, request_id = frame
+                try:
+                    connected = await self._loop.run_in_executor(self._executor, self._protocol.handle_message,
+                                                                 msg, BufferStream(data), request_id)
+                except Exception as e:
+                    # the message boundaries are known, so a broken message does not affect the following ones
+                    logging.exception('Failed to decode message {}: {}'.format(msg, e))
+                    continue
+                if not connected:
+                    break
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        """
+        Closes the connection and fails all pending requests
+        """
+        for task in self._tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        self._writer.close()
+        self._executor.shutdown(wait=False)
+        error = ConnectionError('Connection to {}:{} closed'.format(self._hostname, self._port))
+        for waiters in self._waiters.values():
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(error)
+        for waiter in self._pixel_waiters.values():
+            if not waiter.done():
+                waiter.set_exception(error)
+        self._waiters.clear()
+        self._pixel_waiters.clear()
+        if not self._closed.done():
+            self._closed.set_result(None)
+        logging.info('Disconnected from {}:{}'.format(self._hostname, self._port))
+
+    def _on_response(self, state : ServerMsg, request_id : int):
+        """
+        Called by the decode thread after a complete response was deserialized,
+        hands the result to the future of the request
+        """
+        if self._protocol.is_pixel_response(state):
+            if request_id not in self._pixel_waiters:
+                return
+            # the next response is deserialized into a new object, the returned one is not modified anymore
+            result = self._model.pixel_data
+            self._model.pixel_data = PixelData()
+        elif state in self._RESPONSES:
+            result = self._RESPONSES[state](self)
+        else:
+            return
+        self._loop.call_soon_threadsafe(self._resolve, state, request_id, result)
+
+    def _resolve(self, state : ServerMsg, request_id : int, result : typing.Any):
+        if self._protocol.is_pixel_response(state):
+            waiter = self._pixel_waiters.pop(request_id, None)
+        else:
+            waiters = self._waiters[state]
+            waiter = waiters.popleft() if waiters else None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(result)
+
+    async def _request(self, response : ServerMsg, data : bytes) -> typing.Any:
+        if not self.is_connected():
+            raise ConnectionError('Not connected')
+        waiter = self._loop.create_future()
+        self._waiters[response].append(waiter)
+        self.write(data)
+        await self._writer.drain()
+        return await waiter
+
+    def send_request(self, msg : ServerMsg, *values : int):
+        """
+        Sends a request without waiting for its response (the model and the callback are informed)
+        """
+        self.write(self._protocol.encode_request(msg, *values))
+
+    def send_render_pixel(self, x : int, y : int, sample_count : int, cancel_pending : bool = True,
+                          predicate : bytes = b'') -> int:
+        """
+        Sends a pixel request without waiting for its response, returns the request identifier.
+        Previous requests which are not answered yet are cancelled unless cancel_pending is False.
+        If the server supports filter pushdown, only the paths satisfying the serialized predicate are sent
+        """
+        data, request_id = self._protocol.encode_render_pixel(x, y, sample_count, cancel_pending, predicate)
+        if cancel_pending:
+            self._cancel_pixel_waiters(request_id)
+        self.write(data)
+        return request_id
+
+    def cancel_render_pixel(self):
+        """
+        Cancels all pixel requests which are not answered yet, their coroutines raise asyncio.CancelledError
+        """
+        data = self._protocol.encode_cancel_render_pixel()
+        if data:
+            self.write(data)
+        self._cancel_pixel_waiters(None)
+
+    def _cancel_pixel_waiters(self, request_id : typing.Optional[int]):
+        """
+        Cancels the futures of all pixel requests except the given one
+        """
+        for waiter_id in [waiter_id for waiter_id in self._pixel_waiters if waiter_id != request_id]:
+            self._pixel_waiters.pop(waiter_id).cancel()
+
+    async def request_render_info(self) -> RenderInfo:
+        """
+        Requests the render info data package from the server
+        """
+        return await self._request(ServerMsg.EMCA_RESPONSE_RENDER_INFO,
+                                   self._protocol.encode_request(ServerMsg.EMCA_REQUEST_RENDER_INFO))
+
+    async def request_render_image(self, sample_count : int) -> str:
+        """
+        Requests the render image from the server (starts the rendering process), returns the path of the image
+        """
+        return await self._request(ServerMsg.EMCA_RESPONSE_RENDER_IMAGE,
+                                   self._protocol.encode_request(ServerMsg.EMCA_REQUEST_RENDER_IMAGE, sample_count))
+
+    async def request_camera_data(self) -> CameraData:
+        """
+        Requests the camera data from the server
+        """
+        return await self._request(ServerMsg.EMCA_RESPONSE_CAMERA,
+                                   self._protocol.encode_request(ServerMsg.EMCA_REQUEST_CAMERA))
+
+    async def request_scene_data(self) -> ShapeData:
+        """
+        Requests the three-dimensional scene data from the server
+        """
+        return await self._request(ServerMsg.EMCA_RESPONSE_SCENE,
+                                   self._protocol.encode_request(ServerMsg.EMCA_REQUEST_SCENE))
+
+    async def request_render_pixel(self, x : int, y : int, sample_count : int,
+                                   cancel_pending : bool = False, predicate : bytes = b'') -> PixelData:
+        """
+        Requests the render data of the given pixel and returns it once it is complete.
+        Several pixel requests are pipelined, if cancel_pending is set the previous ones are cancelled.
+        If the server supports filter pushdown, only the paths satisfying the serialized predicate are returned
+        """
+        if not self.is_connected():
+            raise ConnectionError('Not connected')
+        waiter = self._loop.create_future()
+        request_id = self.send_render_pixel(x, y, sample_count, cancel_pending, predicate)
+        self._pixel_waiters[request_id] = waiter
+        await self._writer.drain()
+        return await waiter
+
+    async def request_render_pixels(self, pixels : typing.Iterable[typing.Tuple[int, int]],
+                                    sample_count : int) -> typing.List[PixelData]:
+        """
+        Requests the render data of all given pixels (pipelined) and returns it in the same order
+        """
+        return await asyncio.gather(*[self.request_render_pixel(x, y, sample_count) for x, y in pixels])
+
+    async def disconnect(self):
+        """
+        Sends disconnect signal to the server and waits until the connection is closed
+        """
+        if self.is_connected():
+            self.send_request(ServerMsg.EMCA_DISCONNECT)
+            await self._writer.drain()
+        await self.wait_closed()
+
+    async def close(self):
+        """
+        Sends hard disconnect to server (the server is stopped) and waits until the connection is closed
+        """
+        if self.is_connected():
+            self.send_request(ServerMsg.EMCA_QUIT)
+            await self._writer.drain()
+        await self.wait_closed()
+
+    async def wait_closed(self):
+        """
+        Waits until the connection is closed
+        """
+        if self._closed is not None:
+            await self._closed
+            await asyncio.gather(*self._tasks, return_exceptions=True)
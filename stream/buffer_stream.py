@@ -0,0 +1,96 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from stream.stream import Stream
+import struct
+
+
+class BufferStream(Stream):
+    """
+    Buffer Stream inherits from Stream
+
+    Reads from and writes to a reusable in-memory buffer.
+    Used to deserialize messages which were received as a whole, e.g. framed or decompressed messages.
+    """
+
+    def __init__(self, data : bytearray = None):
+        Stream.__init__(self)
+        # valid data is located in [self._begin, self._end), given data is used without copying it
+        self._buffer = data if data is not None else bytearray()
+        self._view = memoryview(self._buffer)
+        self._begin = 0
+        self._end = len(self._buffer)
+
+    @property
+    def remaining(self) -> int:
+        """
+        Returns the number of bytes which were not read yet
+        """
+        return self._end - self._begin
+
+    def reset(self, size : int) -> memoryview:
+        """
+        Discards the content of the buffer and returns a writable view of size bytes,
+        the buffer is only reallocated if it is too small
+        """
+        if size > len(self._buffer):
+            self._view.release()
+            self._buffer = bytearray(size)
+            self._view = memoryview(self._buffer)
+        self._begin = 0
+        self._end = size
+        return self._view[:size]
+
+    def read(self, size : int) -> bytes:
+        """
+        Reads size bytes from the buffer
+        """
+        if self._end - self._begin < size:
+            raise RuntimeError('Read beyond the end of the buffer')
+        begin = self._begin
+        self._begin += size
+        return self._buffer[begin:self._begin]
+
+    def read_layout(self, layout : struct.Struct) -> tuple:
+        """
+        Decodes one record of the given layout directly from the buffer
+        """
+        if self._end - self._begin < layout.size:
+            raise RuntimeError('Read beyond the end of the buffer')
+        values = layout.unpack_from(self._buffer, self._begin)
+        self._begin += layout.size
+        return values
+
+    def write(self, data : bytes, size : int):
+        """
+        Appends data to the buffer
+        """
+        end = self._end + size
+        if end > len(self._buffer):
+            self._view.release()
+            self._buffer.extend(bytes(max(end, 2 * len(self._buffer)) - len(self._buffer)))
+            self._view = memoryview(self._buffer)
+        self._buffer[self._end:end] = data[:size]
+        self._end = end
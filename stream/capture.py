@@ -0,0 +1,141 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from enum import IntEnum
+import struct
+import threading
+import time
+import typing
+
+
+class RecordType(IntEnum):
+    RECEIVED = 0
+    SENT = 1
+    MESSAGE = 2
+
+
+class Capture(object):
+
+    """
+    Binary file format of a captured session.
+    The file starts with the magic and version, followed by records consisting of
+    the record type, the time since the start of the capture in seconds and the size of the payload.
+    Received and sent records hold the data as passed to the socket,
+    message records mark the start of a message in the received data (message identifier, offset)
+    """
+
+    MAGIC = b'EMCACAP\0'
+    VERSION = 1
+
+    # magic, version
+    HEADER = struct.Struct('=8sI')
+    # record type, timestamp, payload size
+    RECORD = struct.Struct('=BdQ')
+    # message identifier, offset in the received data
+    MESSAGE = struct.Struct('=hQ')
+
+
+class CaptureWriter(object):
+
+    """
+    Records the data exchanged with the server, used by the SocketStream in capture mode.
+    Data is received and sent from different threads, records are written under a lock
+    """
+
+    def __init__(self, filepath : str):
+        self._file = open(filepath, 'wb')
+        self._file.write(Capture.HEADER.pack(Capture.MAGIC, Capture.VERSION))
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def _write(self, record_type : RecordType, data : typing.Union[bytes, memoryview]):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(Capture.RECORD.pack(record_type, time.perf_counter() - self._start, len(data)))
+            self._file.write(data)
+
+    def record_received(self, data : typing.Union[bytes, memoryview]):
+        """
+        Records data received from the server
+        """
+        self._write(RecordType.RECEIVED, data)
+
+    def record_sent(self, data : typing.Union[bytes, memoryview]):
+        """
+        Records data sent to the server
+        """
+        self._write(RecordType.SENT, data)
+
+    def record_message(self, msg : int, offset : int):
+        """
+        Records the start of a message at the given offset of the received data
+        """
+        self._write(RecordType.MESSAGE, Capture.MESSAGE.pack(msg, offset))
+
+    def close(self):
+        """
+        Flushes and closes the capture file
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CaptureReader(object):
+
+    """
+    Reads the records of a captured session
+    """
+
+    def __init__(self, filepath : str):
+        self._filepath = filepath
+
+    def records(self) -> typing.Iterator[typing.Tuple[RecordType, float, bytes]]:
+        """
+        Yields record type, timestamp and payload of all records
+        """
+        with open(self._filepath, 'rb') as f:
+            magic, version = Capture.HEADER.unpack(f.read(Capture.HEADER.size))
+            if magic != Capture.MAGIC or version != Capture.VERSION:
+                raise ValueError('{} is not an EMCA capture of version {}'.format(self._filepath, Capture.VERSION))
+            while True:
+                header = f.read(Capture.RECORD.size)
+                if len(header) < Capture.RECORD.size:
+                    return
+                record_type, timestamp, size = Capture.RECORD.unpack(header)
+                payload = f.read(size)
+                if len(payload) < size:
+                    # the capture was not closed properly, the last record is incomplete
+                    return
+                yield RecordType(record_type), timestamp, payload
+
+    def messages(self) -> typing.List[typing.Tuple[float, int, int]]:
+        """
+        Returns timestamp, message identifier and offset in the received data of all marked messages
+        """
+        return [(timestamp,) + Capture.MESSAGE.unpack(payload)
+                for record_type, timestamp, payload in self.records() if record_type is RecordType.MESSAGE]
@@ -0,0 +1,366 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+import collections
+import struct
+import logging
+from stream.stream import Stream, Layout
+from stream.buffer_stream import BufferStream
+from stream.codec import get_codec, codec_capabilities
+from stream.shared_memory import SharedMemoryReader
+from core.profiler import profiler
+from core.messages import ServerMsg, StateMsg
+from core.messages import Capability, PROTOCOL_VERSION
+
+
+class ClientProtocol(object):
+
+    """
+    Client Protocol
+
+    Transport independent client side of the binary protocol.
+    Keeps track of the negotiated protocol version and capabilities and of the pipelined pixel requests,
+    encodes requests and deserializes incoming messages into the model.
+    The transport provides a function to send data and receives state messages via the given callback.
+    """
+
+    def __init__(self,
+                 model : typing.Any,
+                 send_state_msg : typing.Callable[[tuple], None],
+                 write : typing.Callable[[bytes], None],
+                 on_response : typing.Optional[typing.Callable[[ServerMsg, int], None]] = None):
+        # model used to deserialize the data, None until it is set
+        self._model = model
+        self._send_state_msg = send_state_msg
+        self._write = write
+        # called after a complete response was deserialized with its message type and request identifier
+        self._on_response = on_response
+        # reusable buffer for decompressed messages
+        self._decompressed = BufferStream()
+        # segments of messages passed in shared memory by a server on the same host
+        self._shared_memory = SharedMemoryReader()
+        # precompiled layouts of requests consisting of a message identifier followed by uint values
+        self._request_layouts = {}
+        self.reset()
+
+    def reset(self, local : bool = False):
+        """
+        Resets the state of the protocol for a new connection (protocol version 1 without capabilities).
+        Local connections (Unix domain socket) additionally offer shared memory
+        """
+        self._local = local
+        self._shared_memory.release()
+        self._protocol_version = 1
+        self._capabilities = Capability.NONE
+        # servers offering newer protocol versions complete the handshake with the protocol accept
+        self._offered = False
+        # identifiers of pipelined pixel requests, all requests up to the cancelled identifier are stale
+        self._pixel_request_id = 0
+        self._answered_request_id = 0
+        self._cancelled_request_id = 0
+        # request of the progressive pixel response which is currently received
+        self._partial_request_id = None
+        # requested pixels (x, y, sample count) by request identifier, used as key of the pixel cache,
+        # responses of protocol version 1 arrive in the order of the requests
+        self._pixel_requests = {}
+        self._unnumbered_pixel_requests = collections.deque()
+
+    @property
+    def model(self) -> typing.Any:
+        """
+        Returns the model the messages are deserialized into
+        """
+        return self._model
+
+    @model.setter
+    def model(self, model : typing.Any):
+        """
+        Sets the model the messages are deserialized into
+        """
+        self._model = model
+
+    @property
+    def protocol_version(self) -> int:
+        """
+        Returns the negotiated protocol version of the current connection
+        """
+        return self._protocol_version
+
+    @property
+    def capabilities(self) -> Capability:
+        """
+        Returns the negotiated protocol capabilities of the current connection
+        """
+        return self._capabilities
+
+    @property
+    def framed(self) -> bool:
+        """
+        Returns true if all following messages of the server are framed
+        """
+        return bool(self._capabilities & Capability.FRAMED_MESSAGES)
+
+    @property
+    def pipelined(self) -> bool:
+        """
+        Returns true if pixel requests and responses carry a request identifier
+        """
+        return bool(self._capabilities & Capability.PIPELINED_PIXEL_REQUESTS)
+
+    @staticmethod
+    def supported_capabilities(local : bool = False) -> Capability:
+        """
+        Returns all capabilities supported by this client, shared memory is only supported for local connections
+        """
+        capabilities = Capability.COLUMNAR_PIXEL_DATA | Capability.FRAMED_MESSAGES | \
+                       Capability.PIPELINED_PIXEL_REQUESTS | Capability.PROGRESSIVE_PIXEL_DATA | \
+                       Capability.SCENE_HASH | Capability.PIXEL_CACHE_INVALIDATION | Capability.FILTER_PUSHDOWN | \
+                       codec_capabilities()
+        if local and SharedMemoryReader.is_available():
+            capabilities |= Capability.SHARED_MEMORY
+        return capabilities
+
+    def encode_request(self, msg : ServerMsg, *values : int) -> bytes:
+        """
+        Encodes a request consisting of the message identifier followed by uint values
+        """
+        layout = self._request_layouts.get(len(values), None)
+        if layout is None:
+            layout = self._request_layouts.setdefault(len(values), struct.Struct('=h' + 'I' * len(values)))
+        return layout.pack(msg.value, *values)
+
+    @property
+    def filter_pushdown(self) -> bool:
+        """
+        Returns true if pixel requests carry a predicate which the server evaluates before sending the paths
+        """
+        return bool(self._capabilities & Capability.FILTER_PUSHDOWN)
+
+    def encode_render_pixel(self, x : int, y : int, sample_count : int,
+                            cancel_pending : bool = True, predicate : bytes = b'') -> typing.Tuple[bytes, int]:
+        """
+        Encodes a pixel request, returns the request and its identifier (0 if requests are not pipelined).
+        Previous requests which are not answered yet are cancelled within the same request unless cancel_pending is False.
+        If the server supports filter pushdown, only the paths satisfying the serialized predicate are sent,
+        the predicate is ignored otherwise
+        """
+        if not self.filter_pushdown:
+            predicate = b''
+        # the predicate is part of the requested pixel, filtered pixels are cached separately
+        pixel = (x, y, sample_count, predicate)
+        suffix = Layout.UNSIGNED_LONG.pack(len(predicate)) + predicate if self.filter_pushdown else b''
+
+        if not self.pipelined:
+            profiler.mark((id(self), 0))
+            self._unnumbered_pixel_requests.append(pixel)
+            return self.encode_request(ServerMsg.EMCA_REQUEST_RENDER_PIXEL, x, y, sample_count) + suffix, 0
+
+        self._pixel_request_id += 1
+        self._pixel_requests[self._pixel_request_id] = pixel
+        # the pixel latency is measured from encoding the request until its response is deserialized
+        profiler.mark((id(self), self._pixel_request_id))
+        data = Layout.PIXEL_REQUEST.pack(ServerMsg.EMCA_REQUEST_RENDER_PIXEL.value, self._pixel_request_id,
+                                         x, y, sample_count) + suffix
+        if cancel_pending and self._has_pending_pixel_requests(self._pixel_request_id - 1):
+            data = self._cancel_pixel_requests(self._pixel_request_id - 1) + data
+        return data, self._pixel_request_id
+
+    def encode_cancel_render_pixel(self) -> bytes:
+        """
+        Encodes the cancellation of all pixel requests which are not answered yet, empty if there are none
+        """
+        if not self._has_pending_pixel_requests(self._pixel_request_id):
+            return b''
+        return self._cancel_pixel_requests(self._pixel_request_id)
+
+    def _has_pending_pixel_requests(self, request_id : int) -> bool:
+        """
+        Returns true if requests up to the given identifier are neither answered nor cancelled
+        """
+        return request_id > max(self._answered_request_id, self._cancelled_request_id)
+
+    def _cancel_pixel_requests(self, request_id : int) -> bytes:
+        """
+        Marks all requests up to the given identifier as stale and returns the cancel message for the server
+        """
+        self._cancelled_request_id = request_id
+        for cancelled in [r for r in list(self._pixel_requests) if r <= request_id]:
+            self._pixel_requests.pop(cancelled, None)
+        return Layout.CANCEL_REQUEST.pack(ServerMsg.EMCA_CANCEL_RENDER_PIXEL.value, request_id)
+
+    def _pop_pixel_request(self, request_id : int) -> typing.Optional[typing.Tuple[int, int, int, bytes]]:
+        """
+        Returns the requested pixel (x, y, sample count, predicate) of a complete response, None if it is unknown
+        """
+        if self.pipelined:
+            return self._pixel_requests.pop(request_id, None)
+        if self._unnumbered_pixel_requests:
+            return self._unnumbered_pixel_requests.popleft()
+        return None
+
+    @staticmethod
+    def is_pixel_response(state : ServerMsg) -> bool:
+        """
+        Returns true if the message contains (a part of) the render data of a pixel
+        """
+        return state is ServerMsg.EMCA_RESPONSE_RENDER_PIXEL or \
+               state is ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_COLUMNS or \
+               state is ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_CHUNK
+
+    def is_stale(self, request_id : int) -> bool:
+        """
+        Returns true if the response to the given request is not needed anymore
+        """
+        return request_id <= self._cancelled_request_id
+
+    def _decompress(self, stream : Stream) -> BufferStream:
+        """
+        Reads a compressed block from the stream and decompresses it into the reusable buffer stream
+        """
+        codec_id, raw_size, compressed_size = stream.read_layout(Layout.COMPRESSED_HEADER)
+        codec = get_codec(codec_id)
+        if codec is None:
+            raise RuntimeError('Unknown compression codec {}'.format(codec_id))
+        data = stream.read(compressed_size)
+        size = codec.decompress_into(data, self._decompressed.reset(raw_size))
+        if size != raw_size:
+            raise RuntimeError('Decompressed {} bytes, expected {} bytes'.format(size, raw_size))
+        return self._decompressed
+
+    def _handle_messages(self, block : BufferStream) -> bool:
+        """
+        Deserializes all complete messages contained in the block, returns False if the connection is closed
+        """
+        while block.remaining > 0:
+            if self.framed:
+                msg, size = block.read_layout(Layout.FRAME_HEADER)
+                connected = self.handle_message(msg, BufferStream(block.read(size)))
+            else:
+                connected = self.handle_message(block.read_short(), block)
+            if not connected:
+                return False
+        return True
+
+    def handle_message(self, msg : int, stream : Stream, request_id : int = None) -> bool:
+        """
+        Deserializes the message with the given identifier from the stream.
+        The request identifier of pipelined pixel responses is read from the stream if it is not given.
+        Returns False if the connection is closed by the server
+        """
+        if not profiler.enabled:
+            return self._handle_message(msg, stream, request_id)
+        state = ServerMsg.get_server_msg(msg)
+        with profiler.span('decode {}'.format(state.name if state is not None else msg), 'protocol'):
+            return self._handle_message(msg, stream, request_id)
+
+    def _handle_message(self, msg : int, stream : Stream, request_id : int = None) -> bool:
+        # check if message is a plugin
+        plugins_handler = self._model.plugins_handler
+        plugin = plugins_handler.get_plugin_by_id(msg) if plugins_handler else None
+        state = ServerMsg.get_server_msg(msg)
+
+        #logging.info('msg={} is state={} or plugin={}'.format(msg, state, plugin))
+
+        if plugin:
+            plugin.deserialize(stream)
+            self._send_state_msg((StateMsg.UPDATE_PLUGIN, plugin.flag))
+        elif state is ServerMsg.EMCA_COMPRESSED:
+            # a compressed block contains one or more complete messages
+            return self._handle_messages(self._decompress(stream))
+        elif state is ServerMsg.EMCA_SHARED_MEMORY:
+            # a shared memory segment contains one or more complete framed messages, which are used without copying
+            name = stream.read_string()
+            size = stream.read_ulong()
+            return self._handle_messages(BufferStream(self._shared_memory.open(name, size)))
+        elif state is ServerMsg.EMCA_PROTOCOL_OFFER:
+            # reply with the supported version and capabilities (single write, requests are sent from other threads)
+            self._write(Layout.PROTOCOL_OFFER.pack(ServerMsg.EMCA_PROTOCOL_OFFER.value, PROTOCOL_VERSION,
+                                                   int(self.supported_capabilities(self._local))))
+            self._offered = True
+            return True
+        elif state is ServerMsg.EMCA_PROTOCOL_ACCEPT:
+            version, capabilities = stream.read_layout(Layout.PROTOCOL_ACCEPT)
+            self._protocol_version = version
+            self._capabilities = Capability(capabilities)
+            logging.info('Negotiated protocol version {} with capabilities {}'.format(version, self._capabilities))
+            # handshake complete, requests are answered with the negotiated capabilities
+            self._send_state_msg((StateMsg.CONNECT, None))
+        elif state is ServerMsg.EMCA_SUPPORTED_PLUGINS:
+            self._model.deserialize_supported_plugins(stream)
+            # servers without protocol offer complete the handshake with the list of plugins
+            if not self._offered:
+                self._send_state_msg((StateMsg.CONNECT, None))
+        elif state is ServerMsg.EMCA_RESPONSE_RENDER_INFO:
+            self._model.deserialize_render_info(stream, scene_hash=bool(self._capabilities & Capability.SCENE_HASH))
+        elif state is ServerMsg.EMCA_RESPONSE_RENDER_IMAGE:
+            path = stream.read_string()
+            self._send_state_msg((StateMsg.DATA_IMAGE, path))
+        elif self.is_pixel_response(state):
+            chunk = state is ServerMsg.EMCA_RESPONSE_RENDER_PIXEL_CHUNK
+            if self.pipelined:
+                if request_id is None:
+                    request_id = stream.read_uint()
+                # the request might have been cancelled while the response was waiting to be decoded
+                if self.is_stale(request_id):
+                    logging.info('Discard response to cancelled pixel request {}'.format(request_id))
+                    return True
+                if not chunk:
+                    self._answered_request_id = request_id
+            else:
+                request_id = 0
+            # chunks and the final response of a progressive response are added to the data of the first chunk
+            append = self._partial_request_id == request_id
+            self._partial_request_id = request_id if chunk else None
+            columns = state is not ServerMsg.EMCA_RESPONSE_RENDER_PIXEL
+            self._model.deserialize_pixel_data(stream, columns=columns, append=append,
+                                               pixel=None if chunk else self._pop_pixel_request(request_id))
+            if chunk:
+                return True
+            profiler.span_since((id(self), request_id), 'pixel_latency', 'pixel', request_id=request_id)
+        elif state is ServerMsg.EMCA_RESPONSE_FILTER_STATISTICS:
+            # statistics of the paths rejected by the predicate precede the final response of a filtered pixel request
+            if self.pipelined:
+                if request_id is None:
+                    request_id = stream.read_uint()
+                if self.is_stale(request_id):
+                    return True
+            self._model.deserialize_filter_statistics(stream)
+        elif state is ServerMsg.EMCA_INVALIDATE_PIXEL_CACHE:
+            self._model.invalidate_pixel_cache()
+        elif state is ServerMsg.EMCA_RESPONSE_CAMERA:
+            self._model.deserialize_camera(stream)
+        elif state is ServerMsg.EMCA_RESPONSE_SCENE:
+            self._model.deserialize_scene_objects(stream)
+        elif state is ServerMsg.EMCA_DISCONNECT:
+            self._send_state_msg((StateMsg.DISCONNECT, None))
+            return False
+        elif state is ServerMsg.EMCA_QUIT:
+            self._send_state_msg((StateMsg.QUIT, None))
+            return False
+
+        if state is not None and self._on_response is not None:
+            self._on_response(state, request_id)
+        return True
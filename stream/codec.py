@@ -0,0 +1,118 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from core.messages import Capability
+import abc
+import typing
+import zlib
+
+
+class Codec(object):
+
+    """
+        Codec
+        Interface of compression codecs for large protocol messages.
+        Each codec has an identifier (sent in the header of compressed messages) and a capability bit,
+        which announces the support of the codec during the protocol negotiation.
+    """
+
+    ID = 0
+    CAPABILITY = Capability.NONE
+
+    @abc.abstractmethod
+    def compress(self, data : bytes) -> bytes:
+        return
+
+    @abc.abstractmethod
+    def decompress_into(self, data : bytes, out : memoryview) -> int:
+        """
+        Decompresses data into the given buffer and returns the number of written bytes
+        """
+        return
+
+
+class ZlibCodec(Codec):
+
+    """
+        ZlibCodec
+        Codec based on zlib of the standard library
+    """
+
+    ID = 1
+    CAPABILITY = Capability.COMPRESSION_ZLIB
+
+    # size of the chunks which are decompressed at once before they are copied into the output buffer
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, level : int = 1):
+        self._level = level
+
+    def compress(self, data : bytes) -> bytes:
+        return zlib.compress(data, self._level)
+
+    def decompress_into(self, data : bytes, out : memoryview) -> int:
+        decompressor = zlib.decompressobj()
+        offset = 0
+        while not decompressor.eof:
+            chunk = decompressor.decompress(data, self.CHUNK_SIZE)
+            if offset + len(chunk) > len(out):
+                raise RuntimeError('Decompressed data exceeds the announced size')
+            out[offset:offset+len(chunk)] = chunk
+            offset += len(chunk)
+            data = decompressor.unconsumed_tail
+            if not chunk and not data:
+                raise RuntimeError('Truncated compressed data')
+        return offset
+
+
+# registered codecs, identifier -> codec
+CODECS = {}
+
+
+def register_codec(codec : Codec):
+    """
+    Registers a codec, which is then offered to the server during the protocol negotiation
+    """
+    CODECS[codec.ID] = codec
+
+
+def get_codec(codec_id : int) -> typing.Optional[Codec]:
+    """
+    Returns the codec with the given identifier or None if there is no such codec
+    """
+    return CODECS.get(codec_id, None)
+
+
+def codec_capabilities() -> Capability:
+    """
+    Returns the capability bits of all registered codecs
+    """
+    capabilities = Capability.NONE
+    for codec in CODECS.values():
+        capabilities |= codec.CAPABILITY
+    return capabilities
+
+
+register_codec(ZlibCodec())
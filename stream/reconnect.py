@@ -0,0 +1,43 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import random
+import typing
+
+
+def backoff_delays(initial : float = 0.5, maximum : float = 30.0,
+                   attempts : typing.Optional[int] = None) -> typing.Iterator[float]:
+    """
+    Yields the delays in seconds between reconnect attempts,
+    the delay doubles after each attempt up to the maximum.
+    Each delay is jittered, so that clients losing the connection at once do not retry at once.
+    Yields infinitely if attempts is None
+    """
+    delay = initial
+    attempt = 0
+    while attempts is None or attempt < attempts:
+        yield delay * random.uniform(0.5, 1.0)
+        delay = min(2.0 * delay, maximum)
+        attempt += 1
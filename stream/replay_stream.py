@@ -0,0 +1,129 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from stream.socket_stream import SocketStream
+from stream.capture import CaptureReader, RecordType
+import time
+import logging
+
+
+class ReplayStream(SocketStream):
+    """
+    Replay Stream inherits from SocketStream
+
+    Feeds the received data of a captured session (see SocketStream.start_capture) to the client
+    instead of a server, so that the whole client pipeline can be benchmarked without a renderer.
+    Data is replayed at full speed or in real time (scaled by speed),
+    sent data is discarded since the captured responses do not depend on it.
+    """
+
+    def __init__(self, filepath : str, real_time : bool = False, speed : float = 1.0,
+                 buffer_size : int = SocketStream.DEFAULT_BUFFER_SIZE):
+        SocketStream.__init__(self, 'replay', 0, buffer_size)
+        self._filepath = filepath
+        self._real_time = real_time
+        self._speed = speed
+        self._records = None
+        self._pending = memoryview(b'')
+        self._start = None
+
+    @property
+    def filepath(self) -> str:
+        """
+        Returns the path of the replayed capture
+        """
+        return self._filepath
+
+    @property
+    def is_local(self) -> bool:
+        """
+        Shared memory segments of the captured server do not exist any more, the data is always sent inline
+        """
+        return False
+
+    def connect(self):
+        """
+        Starts replaying the capture from the beginning
+        :return: True|False, ErrorMsg|None
+        """
+        logging.info("Replaying {}".format(self._filepath))
+        try:
+            self._records = CaptureReader(self._filepath).records()
+            # check the header of the capture
+            self._pending = memoryview(b'')
+            self._next_received()
+        except Exception as e:
+            logging.error("Exception {}".format(e))
+            return False, str(e)
+        self._begin = self._end = 0
+        self._received = 0
+        self._start = time.perf_counter()
+        self._is_connected = True
+        return True, None
+
+    def disconnect(self):
+        """
+        Stops replaying
+        :return: True|False, ErrorMsg|None
+        """
+        if self._records is not None:
+            self._records.close()
+            self._records = None
+        self._begin = self._end = 0
+        self._is_connected = False
+        return True, None
+
+    def _next_received(self) -> bool:
+        """
+        Advances to the next received record, waits until its time is due when replaying in real time.
+        Returns false at the end of the capture
+        """
+        for record_type, timestamp, payload in self._records:
+            if record_type is RecordType.RECEIVED:
+                if self._real_time and self._start is not None:
+                    delay = self._start + timestamp / self._speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                self._pending = memoryview(payload)
+                return True
+        return False
+
+    def _receive(self, view : memoryview) -> int:
+        """
+        Copies the next captured data into the given view, returns the amount of copied bytes
+        """
+        if len(self._pending) == 0 and (self._records is None or not self._next_received()):
+            raise RuntimeError('End of captured session')
+        n = min(len(view), len(self._pending))
+        view[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        self._received += n
+        return n
+
+    def write(self, data : bytes, size : int):
+        """
+        Discards the data sent by the client
+        """
+        pass
@@ -0,0 +1,95 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import logging
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    SharedMemory = None
+
+
+if SharedMemory is not None:
+    class _SharedMemorySegment(SharedMemory):
+
+        def __del__(self):
+            # segments which are still referenced when the interpreter exits are unmapped by the operating system
+            try:
+                self.close()
+            except BufferError:
+                pass
+
+
+class SharedMemoryReader(object):
+
+    """
+        SharedMemoryReader
+        Maps the shared memory segments in which a server on the same host passes large messages.
+        The messages are deserialized without copying them, so arrays of the model point into the segments.
+        The server does not access a segment after sending it, so it is unlinked right after mapping
+        and stays mapped as long as it is referenced.
+    """
+
+    def __init__(self):
+        self._segments = []
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Returns true if shared memory is supported on this platform
+        """
+        return SharedMemory is not None
+
+    @property
+    def num_mapped_segments(self) -> int:
+        """
+        Returns the number of segments which are still mapped
+        """
+        return len(self._segments)
+
+    def open(self, name : str, size : int) -> memoryview:
+        """
+        Maps the segment with the given name and returns a view of its first size bytes
+        """
+        self.release()
+        segment = _SharedMemorySegment(name=name)
+        segment.unlink()
+        self._segments.append(segment)
+        return segment.buf[:size]
+
+    def release(self):
+        """
+        Unmaps all segments which are not referenced anymore
+        """
+        segments = []
+        for segment in self._segments:
+            try:
+                segment.close()
+            except BufferError:
+                # data of the segment is still in use
+                segments.append(segment)
+        if len(segments) < len(self._segments):
+            logging.debug('Unmapped {} shared memory segments'.format(len(self._segments) - len(segments)))
+        self._segments = segments
@@ -24,7 +24,10 @@
 """
 
 from stream.stream import Stream
+from stream.capture import CaptureWriter
+import typing
 import socket
+import struct
 import logging
 
 
@@ -33,10 +36,18 @@ class SocketStream(Stream):
     Socket Stream inherits from Stream
 
     Handles Port, Hostname and Socket.
-    Handles read and write from Socket Stream pipeline
+    Handles read and write from Socket Stream pipeline.
+    Incoming data is received in large blocks into a reusable buffer,
+    read operations are served from this buffer until it is drained.
+    In capture mode all exchanged data is recorded with timestamps, see stream.capture
     """
 
-    def __init__(self, hostname : str = None, port : int = None):
+    # default size of the receive buffer (1 MiB)
+    DEFAULT_BUFFER_SIZE = 1 << 20
+    # hostnames with this prefix address a Unix domain socket of a server on the same host, e.g. unix:/tmp/emca.sock
+    UNIX_SOCKET_PREFIX = 'unix:'
+
+    def __init__(self, hostname : str = None, port : int = None, buffer_size : int = DEFAULT_BUFFER_SIZE):
         Stream.__init__(self)
         logging.info("Init SocketStream ...")
         self._hostname = hostname or socket.gethostname()
@@ -44,6 +55,16 @@ class SocketStream(Stream):
         self._socket = None
         self._is_connected = False
 
+        # receive buffer, valid data is located in [self._begin, self._end)
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._begin = 0
+        self._end = 0
+        # total amount of received bytes of the connection
+        self._received = 0
+
+        self._capture = None
+
     @property
     def port(self) -> int:
         """
@@ -80,6 +101,22 @@ class SocketStream(Stream):
         """
         return self._socket
 
+    @staticmethod
+    def unix_socket_path(hostname : str) -> typing.Optional[str]:
+        """
+        Returns the path of the Unix domain socket if the hostname addresses one, otherwise None
+        """
+        if hostname and hostname.startswith(SocketStream.UNIX_SOCKET_PREFIX):
+            return hostname[len(SocketStream.UNIX_SOCKET_PREFIX):]
+        return None
+
+    @property
+    def is_local(self) -> bool:
+        """
+        Returns true if the stream is connected via a Unix domain socket (the server runs on the same host)
+        """
+        return self._socket is not None and self._socket.family == getattr(socket, 'AF_UNIX', None)
+
     def is_connected(self):
         """
         Holds a boolean about whether the a socket connection is open or not
@@ -92,16 +129,24 @@ class SocketStream(Stream):
         Connect to host:port
         :return: True|False, ErrorMsg|None
         """
-        logging.info("Connecting to {}:{}".format(self._hostname, self._port))
+        path = self.unix_socket_path(self._hostname)
         try:
-            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self._socket.connect((self._hostname, self._port))
+            if path is not None:
+                logging.info("Connecting to {}".format(path))
+                self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._socket.connect(path)
+            else:
+                logging.info("Connecting to {}:{}".format(self._hostname, self._port))
+                self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self._socket.connect((self._hostname, self._port))
         except socket.error as e:
             logging.error("Socket error {}".format(e))
             return False, str(e)
         except Exception as e:
             logging.error("Exception {}".format(e))
             return False, str(e)
+        self._begin = self._end = 0
+        self._received = 0
         self._is_connected = True
         return True, None
 
@@ -114,6 +159,7 @@ class SocketStream(Stream):
         try:
             self._socket.close()
             self._socket = None
+            self._begin = self._end = 0
         except socket.error as e:
             logging.error("Socket error {}".format(e))
             return False, str(e)
@@ -123,26 +169,147 @@ class SocketStream(Stream):
         self._is_connected = False
         return True, None
 
+    @property
+    def buffered(self) -> int:
+        """
+        Returns the amount of received bytes which have not been read yet
+        """
+        return self._end - self._begin
+
+    @property
+    def position(self) -> int:
+        """
+        Returns the amount of bytes read since the connection was established
+        """
+        return self._received - (self._end - self._begin)
+
+    @property
+    def capturing(self) -> bool:
+        """
+        Returns true if the exchanged data is recorded
+        """
+        return self._capture is not None
+
+    def start_capture(self, filepath : str):
+        """
+        Records all data exchanged from now on into the capture file,
+        captures should start before connecting so that they can be replayed by the ReplayStream
+        """
+        self.stop_capture()
+        logging.info('Capturing session to {}'.format(filepath))
+        self._capture = CaptureWriter(filepath)
+
+    def stop_capture(self):
+        """
+        Stops recording and closes the capture file
+        """
+        if self._capture is not None:
+            self._capture.close()
+            self._capture = None
+
+    def mark_message(self, msg : int, offset : int):
+        """
+        Marks the start of a message at the given read position in the capture
+        """
+        if self._capture is not None:
+            self._capture.record_message(msg, offset)
+
+    def _receive(self, view : memoryview) -> int:
+        """
+        Receives data from the socket into the given view, returns the amount of received bytes
+        """
+        n = self._socket.recv_into(view)
+        if n == 0:
+            raise RuntimeError('Socket connection broken')
+        self._received += n
+        if self._capture is not None:
+            self._capture.record_received(view[:n])
+        return n
+
+    def _fill(self, size : int):
+        """
+        Receives data from the socket until at least size bytes are buffered.
+        size must not exceed the capacity of the receive buffer.
+        """
+        if self._begin + size > len(self._buffer):
+            # move the remaining bytes to the front of the buffer to make room
+            remaining = self._end - self._begin
+            self._view[:remaining] = self._view[self._begin:self._end]
+            self._begin = 0
+            self._end = remaining
+        while self._end - self._begin < size:
+            self._end += self._receive(self._view[self._end:])
+
     def read(self, size : int) -> bytes:
         """
         Reads size bytes from the socket stream pipeline
         """
         try:
-            data = b''
-            while len(data) < size:
-                chunk = self._socket.recv(size - len(data))
-                if chunk == b'':
-                    raise RuntimeError('Socket connection broken')
-                data += chunk
-            return data
+            if self._end - self._begin < size:
+                if size > len(self._buffer):
+                    return self._read_large(size)
+                self._fill(size)
+            begin = self._begin
+            self._begin += size
+            return self._buffer[begin:self._begin]
         except ConnectionResetError as e:
             logging.error(e)
             raise ConnectionResetError(e)
 
+    def read_layout(self, layout : struct.Struct) -> tuple:
+        """
+        Decodes one record of the given layout directly from the receive buffer
+        """
+        size = layout.size
+        try:
+            if self._end - self._begin < size:
+                if size > len(self._buffer):
+                    return layout.unpack(self._read_large(size))
+                self._fill(size)
+            values = layout.unpack_from(self._buffer, self._begin)
+            self._begin += size
+            return values
+        except ConnectionResetError as e:
+            logging.error(e)
+            raise ConnectionResetError(e)
+
+    def skip(self, size : int):
+        """
+        Discards the next size bytes, the data is received into the receive buffer without allocating it
+        """
+        try:
+            while True:
+                buffered = min(self._end - self._begin, size)
+                self._begin += buffered
+                size -= buffered
+                if size == 0:
+                    return
+                self._begin = 0
+                self._end = self._receive(self._view)
+        except ConnectionResetError as e:
+            logging.error(e)
+            raise ConnectionResetError(e)
+
+    def _read_large(self, size : int) -> bytearray:
+        """
+        Reads a block which does not fit into the receive buffer.
+        The buffered bytes are copied, the rest is received directly into the returned block.
+        """
+        data = bytearray(size)
+        view = memoryview(data)
+        offset = self._end - self._begin
+        view[:offset] = self._view[self._begin:self._end]
+        self._begin = self._end = 0
+        while offset < size:
+            offset += self._receive(view[offset:])
+        return data
+
     def write(self, data : bytes, size : int):
         """
         Writes data onto the socket stream
         """
+        if self._capture is not None:
+            self._capture.record_sent(memoryview(data)[:size])
         try:
             total_sent = 0
             while total_sent < size:
@@ -25,9 +25,18 @@
 
 from PySide2.QtCore import QPoint, QThread
 from stream.socket_stream import SocketStream
+from stream.stream import Layout
+from stream.buffer_stream import BufferStream
+from stream.client_protocol import ClientProtocol
+from stream.reconnect import backoff_delays
+from core.profiler import profiler
 from core.messages import ServerMsg
 from core.messages import StateMsg
+from core.messages import Capability
 from PySide2.QtCore import Signal
+import threading
+import typing
+import queue
 import logging
 
 from typing import TYPE_CHECKING
@@ -43,26 +52,37 @@ class SocketStreamClient(QThread):
     Socket Stream Client (QThread)
 
     Handles all incoming messages from the server and sends them via a Qt Signal to the controller.
-    Incoming data is deserialized within this thread.
+    Incoming data is deserialized within this thread until framed messages are negotiated,
+    afterwards this thread only receives whole messages and a decode thread deserializes them.
     """
 
+    # maximum number of received messages waiting for the decode thread
+    MAX_PENDING_FRAMES = 8
+    # maximum number of reconnect attempts after the connection was lost
+    RECONNECT_ATTEMPTS = 10
+
     _sendStateMsgSig = Signal(tuple)
 
-    def __init__(self, hostname : str, port : int):
+    def __init__(self, hostname : str, port : int, auto_reconnect : bool = False, stream : SocketStream = None):
         QThread.__init__(self)
-        # init socket stream
-        self._stream = SocketStream(hostname, port)
-        # model will be used to deserialize data within this thread
-        self._model = None
+        # init socket stream, a ReplayStream can be given to replay a captured session
+        self._stream = stream if stream is not None else SocketStream(hostname, port)
+        # the session is captured to this file if set
+        self._capture_filepath = None
         # bool to check an open socket connection
         self._is_connected = False
+        # reconnect with backoff if the connection is lost, until the reconnect is cancelled
+        self._auto_reconnect = auto_reconnect
+        self._reconnect_cancelled = threading.Event()
+        # protocol state and message dispatch, the model will be used to deserialize data within this thread
+        self._protocol = ClientProtocol(None, self._sendStateMsgSig.emit, self._write)
 
     def set_model(self, model : Model):
         """
         Set Model / Dataset
         :param model: Model
         """
-        self._model = model
+        self._protocol.model = model
 
     def set_callback(self, callback):
         """
@@ -79,6 +99,32 @@ class SocketStreamClient(QThread):
         """
         return self._stream
 
+    @property
+    def protocol_version(self) -> int:
+        """
+        Returns the negotiated protocol version of the current connection
+        """
+        return self._protocol.protocol_version
+
+    @property
+    def capabilities(self) -> Capability:
+        """
+        Returns the negotiated protocol capabilities of the current connection
+        """
+        return self._protocol.capabilities
+
+    def set_capture_filepath(self, filepath : typing.Optional[str]):
+        """
+        Captures the next session to the given file (replayable by the ReplayStream), None disables capturing
+        """
+        self._capture_filepath = filepath
+
+    def _write(self, data : bytes):
+        """
+        Sends data with a single write
+        """
+        self._stream.write(data, len(data))
+
     def request_render_info(self):
         """
         Requests the render info data package from the server
@@ -104,22 +150,42 @@ class SocketStreamClient(QThread):
         """
         self._stream.write_short(ServerMsg.EMCA_REQUEST_SCENE.value)
 
-    def request_render_pixel(self, pixel : QPoint, sample_count : int):
+    def request_render_pixel(self, pixel : QPoint, sample_count : int, cancel_pending : bool = True,
+                             predicate : bytes = b'') -> int:
         """
-        Requests the render data of the selected pixel
+        Requests the render data of the selected pixel.
+        If the server supports pipelined requests, the previous requests which are not answered yet are cancelled
+        unless cancel_pending is False. If the server supports filter pushdown, only the paths satisfying
+        the serialized predicate are sent. Returns the request identifier (0 if requests are not pipelined)
         """
         logging.info('Request pixel=({},{})'.format(pixel.x(), pixel.y()))
-        self._stream.write_short(ServerMsg.EMCA_REQUEST_RENDER_PIXEL.value)
-        self._stream.write_uint(int(pixel.x()))
-        self._stream.write_uint(int(pixel.y()))
-        self._stream.write_uint(int(sample_count))
+        data, request_id = self._protocol.encode_render_pixel(int(pixel.x()), int(pixel.y()), int(sample_count),
+                                                              cancel_pending, predicate)
+        with profiler.span('request_send', 'stream', request_id=request_id):
+            self._write(data)
+        return request_id
+
+    def cancel_render_pixel(self):
+        """
+        Cancels all pixel requests which are not answered yet
+        """
+        data = self._protocol.encode_cancel_render_pixel()
+        if data:
+            self._write(data)
 
     def request_disconnect(self):
         """
         Sends disconnect signal to server
         """
+        self.cancel_reconnect()
         self._stream.write_short(ServerMsg.EMCA_DISCONNECT.value)
 
+    def cancel_reconnect(self):
+        """
+        Stops reconnecting after a lost connection
+        """
+        self._reconnect_cancelled.set()
+
     def is_connected(self) -> bool:
         """
         Returns true when there is a open socket connection
@@ -131,8 +197,14 @@ class SocketStreamClient(QThread):
         Connects the socket stream and returns if successful
         :return: True|False, None|ErrorMsg
         """
+        # a previous session may still be reconnecting
+        self.cancel_reconnect()
+        self.wait()
+        self._reconnect_cancelled.clear()
         self._stream.hostname = hostname
         self._stream.port = port
+        if self._capture_filepath:
+            self._stream.start_capture(self._capture_filepath)
         return self._stream.connect()
 
     def close(self):
@@ -140,73 +212,147 @@ class SocketStreamClient(QThread):
         Sends hard disconnect to server (client is closed)
         :return:
         """
+        self.cancel_reconnect()
         self._stream.write_short(ServerMsg.EMCA_QUIT.value)
 
-    def run(self):
+    def _receive_frames(self) -> bool:
         """
-        Handles handshake and incoming messages from the server,
-        moreover all incoming data packages are called to deserialize.
-        The model will inform the controller via a Qt signal after data package deserialization.
-        :return:
+        Receives whole framed messages and hands them to the decode thread,
+        so that receiving the next message overlaps with decoding the previous one.
+        Returns true if the connection was lost without a disconnect message from the server
         """
-        logging.info('Start SocketStreamClient ...')
+        frames = queue.Queue(self.MAX_PENDING_FRAMES)
+        decoder = threading.Thread(target=self._decode_frames, args=(frames,), name='SocketStreamDecoder')
+        decoder.start()
+        try:
+            pipelined = self._protocol.pipelined
+            while True:
+                offset = self._stream.position
+                msg, size = self._stream.read_layout(Layout.FRAME_HEADER)
+                # the frame header arrived, receiving the message lasts until its last byte arrived
+                first_byte = profiler.now() if profiler.enabled else 0
+                self._stream.mark_message(msg, offset)
+                state = ServerMsg.get_server_msg(msg)
+                request_id = None
+                if pipelined and self._protocol.is_pixel_response(state):
+                    # responses to cancelled requests are skipped without being decoded
+                    request_id = self._stream.read_uint()
+                    size -= Layout.UNSIGNED_INT.size
+                    if self._protocol.is_stale(request_id):
+                        logging.info('Skip response to cancelled pixel request {}'.format(request_id))
+                        self._stream.skip(size)
+                        continue
+                data = self._stream.read(size)
+                if first_byte:
+                    profiler.add_span('receive', 'stream', first_byte, profiler.now(), msg=msg, size=size)
+                frames.put((msg, data, request_id))
+                if state is ServerMsg.EMCA_DISCONNECT or state is ServerMsg.EMCA_QUIT:
+                    return False
+        except Exception as e:
+            logging.error(e)
+        finally:
+            frames.put(None)
+            decoder.join()
+        return True
+
+    def _decode_frames(self, frames : queue.Queue):
+        """
+        Decode thread, deserializes the received messages in order
+        """
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+            msg, data, request_id = frame
+            try:
+                if not self._protocol.handle_message(msg, BufferStream(data), request_id):
+                    break
+            except Exception as e:
+                # the message boundaries are known, so a broken message does not affect the following ones
+                logging.exception('Failed to decode message {}: {}'.format(msg, e))
+        # drain the queue so the receiving thread is never blocked
+        while frame is not None:
+            frame = frames.get()
 
+    def _run_session(self) -> bool:
+        """
+        Handles handshake and incoming messages of one connection.
+        Returns true if the connection was lost without a disconnect message from the server
+        """
         # Next few lines handle the handshake protocol with the server
-        msg = self._stream.read_short()
+        try:
+            msg = self._stream.read_short()
+            self._stream.mark_message(msg, 0)
+        except Exception as e:
+            logging.error(e)
+            return True
 
         state = ServerMsg.get_server_msg(msg)
 
         if state is not ServerMsg.EMCA_HELLO:
             logging.error('Received wrong handshake message from server')
             self._stream.write_short(ServerMsg.EMCA_QUIT.value)
-            return None
+            return False
 
         self._stream.write_short(ServerMsg.EMCA_HELLO.value)
 
-        # Handshake complete, set StateMsg to controller to enable views
-        self._sendStateMsgSig.emit((StateMsg.CONNECT, None))
-
-        while True:
+        # servers supporting newer protocol versions follow up with a protocol offer,
+        # older servers never send it and the connection stays at protocol version 1
+        # the protocol informs the controller with StateMsg.CONNECT once the handshake is complete,
+        # shared memory is not used while capturing since the segments can not be replayed
+        self._protocol.reset(local=self._stream.is_local and not self._stream.capturing)
 
+        # messages are decoded in this thread until the server switches to framed messages
+        connected = True
+        while connected and not self._protocol.framed:
             try:
                 # read header of message (message identifier)
+                offset = self._stream.position
                 msg = self._stream.read_short()
-            except RuntimeError as e:
-                logging.error(e)
-                break
+                self._stream.mark_message(msg, offset)
             except Exception as e:
                 logging.error(e)
-                break
+                return True
+
+            connected = self._protocol.handle_message(msg, self._stream)
+
+        if connected and self._protocol.framed:
+            return self._receive_frames()
+        return False
 
-            # check if message is a plugin
-            plugin = self._model.plugins_handler.get_plugin_by_id(msg)
-            state = ServerMsg.get_server_msg(msg)
-
-            #logging.info('msg={} is state={} or plugin={}'.format(msg, state, plugin))
-
-            if plugin:
-                plugin.deserialize(self._stream)
-                self._sendStateMsgSig.emit((StateMsg.UPDATE_PLUGIN, plugin.flag))
-            elif state is ServerMsg.EMCA_SUPPORTED_PLUGINS:
-                self._model.deserialize_supported_plugins(self._stream)
-            elif state is ServerMsg.EMCA_RESPONSE_RENDER_INFO:
-                self._model.deserialize_render_info(self._stream)
-            elif state is ServerMsg.EMCA_RESPONSE_RENDER_IMAGE:
-                path = self._stream.read_string()
-                self._sendStateMsgSig.emit((StateMsg.DATA_IMAGE, path))
-            elif state is ServerMsg.EMCA_RESPONSE_RENDER_PIXEL:
-                self._model.deserialize_pixel_data(self._stream)
-            elif state is ServerMsg.EMCA_RESPONSE_CAMERA:
-                self._model.deserialize_camera(self._stream)
-            elif state is ServerMsg.EMCA_RESPONSE_SCENE:
-                self._model.deserialize_scene_objects(self._stream)
-            elif state is ServerMsg.EMCA_DISCONNECT:
-                self._sendStateMsgSig.emit((StateMsg.DISCONNECT, None))
+    def _reconnect(self) -> bool:
+        """
+        Tries to reconnect with backoff, returns if successful
+        """
+        for delay in backoff_delays(attempts=self.RECONNECT_ATTEMPTS):
+            if self._reconnect_cancelled.wait(delay):
+                return False
+            is_connected, error_msg = self._stream.connect()
+            if is_connected:
+                return True
+        return False
+
+    def run(self):
+        """
+        Handles handshake and incoming messages from the server,
+        moreover all incoming data packages are called to deserialize.
+        The model will inform the controller via a Qt signal after data package deserialization.
+        If the connection is lost, the client reconnects and the session is restored
+        by the usual handshake (the scene is loaded from the scene cache if unchanged).
+        :return:
+        """
+        logging.info('Start SocketStreamClient ...')
+
+        while True:
+            connection_lost = self._run_session()
+            self._stream.disconnect()
+            # a capture holds a single session, sessions after a reconnect are not captured
+            self._stream.stop_capture()
+            if not connection_lost or not self._auto_reconnect:
                 break
-            elif state is ServerMsg.EMCA_QUIT:
-                self._sendStateMsgSig.emit((StateMsg.QUIT, None))
+            self._sendStateMsgSig.emit((StateMsg.DISCONNECT, None))
+            logging.info('Connection lost, reconnecting ...')
+            if not self._reconnect():
                 break
 
-        self._stream.disconnect()
-
         logging.info("Shutdown SocketStreamClient Thread ...")
@@ -28,6 +28,7 @@ from core.point import Point2f, Point2i, Point3f, Point3i
 from core.vector import Vec3f, Vec3i, Vec3u
 
 import abc
+import typing
 import struct
 import numpy as np
 from enum import Enum
@@ -70,6 +71,63 @@ class SizeOf(Enum):
     DOUBLE              = struct.calcsize(Format.DOUBLE.value)
 
 
+class Layout(object):
+
+    """
+    Precompiled struct layouts of the binary protocol.
+    The server writes all values packed (without padding) in its native byte order,
+    records can therefore be decoded with a single unpack call.
+    """
+
+    CHAR                = struct.Struct('=c')
+    UNSIGNED_CHAR       = struct.Struct('=B')
+    BOOL                = struct.Struct('=?')
+    SHORT               = struct.Struct('=h')
+    UNSIGNED_SHORT      = struct.Struct('=H')
+    INT                 = struct.Struct('=i')
+    UNSIGNED_INT        = struct.Struct('=I')
+    LONG                = struct.Struct('=q')
+    UNSIGNED_LONG       = struct.Struct('=Q')
+    FLOAT               = struct.Struct('=f')
+    DOUBLE              = struct.Struct('=d')
+
+    POINT2I             = struct.Struct('=2i')
+    POINT2F             = struct.Struct('=2f')
+    POINT3I             = struct.Struct('=3i')
+    POINT3F             = struct.Struct('=3f')
+    VEC3U               = struct.Struct('=3I')
+    COLOR4F             = struct.Struct('=4f')
+
+    # records which are followed by a bool flag announcing the next optional field
+    POINT3F_FLAG        = struct.Struct('=3f?')
+    COLOR4F_FLAG        = struct.Struct('=4f?')
+
+    # sample_idx, path_depth, path_origin (x, y, z), has_final_estimate
+    PATH_HEADER         = struct.Struct('=II3f?')
+    # depth_idx, has_pos
+    INTERSECTION_HEADER = struct.Struct('=I?')
+    # pos_ne (x, y, z), visible_ne, has_li
+    NEXT_EVENT          = struct.Struct('=3f??')
+
+    # message identifier, protocol version, capabilities
+    PROTOCOL_OFFER      = struct.Struct('=hHI')
+    # protocol version, capabilities
+    PROTOCOL_ACCEPT     = struct.Struct('=HI')
+    # number of paths, number of intersections
+    PIXEL_COLUMNS       = struct.Struct('=II')
+    # codec identifier, raw size, compressed size
+    COMPRESSED_HEADER   = struct.Struct('=BQQ')
+    # message identifier, length of the message body
+    FRAME_HEADER        = struct.Struct('=hQ')
+    # message identifier, request identifier, pixel x, pixel y, sample count
+    PIXEL_REQUEST       = struct.Struct('=hIIII')
+    # message identifier, request identifier
+    CANCEL_REQUEST      = struct.Struct('=hI')
+    # paths of the pixel, rejected paths, rejected intersections,
+    # sum of the path depths and of the final estimates (r, g, b, a) of the rejected paths
+    FILTER_STATISTICS   = struct.Struct('=IIQQ4d')
+
+
 class Stream(object):
 
     """
@@ -87,8 +145,20 @@ class Stream(object):
     def write(self, data : bytes, size : int):
         return
 
+    def skip(self, size : int):
+        """
+        Discards the next size bytes of the stream
+        """
+        self.read(size)
+
     """ Write operations """
 
+    def write_layout(self, layout : struct.Struct, *values):
+        """
+        Encodes and writes one record of the given precompiled layout with a single write
+        """
+        self.write(layout.pack(*values), layout.size)
+
     def write_char(self, value : bytes):
         data = struct.pack(Format.CHAR.value, value)
         self.write(data, SizeOf.CHAR.value)
@@ -144,60 +214,64 @@ class Stream(object):
 
     """ Read operations """
 
+    def read_layout(self, layout : struct.Struct) -> tuple:
+        """
+        Reads and decodes one record of the given precompiled layout
+        """
+        return layout.unpack(self.read(layout.size))
+
     def read_char(self) -> bytes:
-        data = self.read(SizeOf.CHAR.value)
-        return struct.unpack(Format.CHAR.value, data)[0]
+        return self.read_layout(Layout.CHAR)[0]
 
     def read_uchar(self) -> int:
-        data = self.read(SizeOf.UNSIGNED_CHAR.value)
-        return struct.unpack(Format.UNSIGNED_CHAR.value, data)[0]
+        return self.read_layout(Layout.UNSIGNED_CHAR)[0]
 
     def read_bool(self) -> bool:
-        data = self.read(SizeOf.BOOL.value)
-        return struct.unpack(Format.BOOL.value, data)[0]
+        return self.read_layout(Layout.BOOL)[0]
 
     def read_ushort(self) -> int:
-        data = self.read(SizeOf.UNSIGNED_SHORT.value)
-        return struct.unpack(Format.UNSIGNED_SHORT.value, data)[0]
+        return self.read_layout(Layout.UNSIGNED_SHORT)[0]
 
     def read_short(self) -> int:
-        data = self.read(SizeOf.SHORT.value)
-        return struct.unpack(Format.SHORT.value, data)[0]
+        return self.read_layout(Layout.SHORT)[0]
 
     def read_int(self) -> int:
-        data = self.read(SizeOf.INT.value)
-        return struct.unpack(Format.INT.value, data)[0]
+        return self.read_layout(Layout.INT)[0]
 
     def read_uint(self) -> int:
-        data = self.read(SizeOf.UNSIGNED_INT.value)
-        return struct.unpack(Format.UNSIGNED_INT.value, data)[0]
+        return self.read_layout(Layout.UNSIGNED_INT)[0]
 
     def read_long(self) -> int:
-        data = self.read(SizeOf.LONG.value)
-        return struct.unpack(Format.LONG.value, data)[0]
+        return self.read_layout(Layout.LONG)[0]
 
     def read_ulong(self) -> int:
-        data = self.read(SizeOf.UNSIGNED_LONG.value)
-        return struct.unpack(Format.UNSIGNED_LONG.value, data)[0]
+        return self.read_layout(Layout.UNSIGNED_LONG)[0]
 
     def read_float(self) -> float:
-        data = self.read(SizeOf.FLOAT.value)
-        return struct.unpack(Format.FLOAT.value, data)[0]
+        return self.read_layout(Layout.FLOAT)[0]
 
     def read_double(self) -> float:
-        data = self.read(SizeOf.DOUBLE.value)
-        return struct.unpack(Format.DOUBLE.value, data)[0]
+        return self.read_layout(Layout.DOUBLE)[0]
 
     """ Specific read and write functions """
     def read_string(self) -> str:
         string_len = self.read_ulong()
         data = self.read(string_len)
-        return data.decode("utf-8")
+        return str(data, "utf-8")
 
     def read_float_array(self, size) -> np.ndarray:
         data = self.read(size * SizeOf.FLOAT.value)
         return np.frombuffer(data, np.float32, size)
 
+    def read_array(self, dtype : np.dtype, shape : typing.Union[int, tuple]) -> np.ndarray:
+        """
+        Reads a contiguous array of the given dtype and shape
+        """
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        data = self.read(count * dtype.itemsize)
+        return np.frombuffer(data, dtype, count).reshape(shape)
+
     def read_int_array(self, size) -> np.ndarray:
         data = self.read(size * SizeOf.INT.value)
         return np.frombuffer(data, np.int32, size)
@@ -207,30 +281,23 @@ class Stream(object):
         return np.frombuffer(data, np.uint32, size)
 
     def read_point2f(self) -> Point2f:
-        xs = self.read_float_array(2)
-        return Point2f(xs[0], xs[1])
+        return Point2f(*self.read_layout(Layout.POINT2F))
 
     def read_point2i(self) -> Point2i:
-        xs = self.read_int_array(2)
-        return Point2i(xs[0], xs[1])
+        return Point2i(*self.read_layout(Layout.POINT2I))
 
     def read_point3f(self) -> Point3f:
-        xs = self.read_float_array(3)
-        return Point3f(xs[0], xs[1], xs[2])
+        return Point3f(*self.read_layout(Layout.POINT3F))
 
     def read_point3i(self) -> Point3i:
-        xs = self.read_int_array(3)
-        return Point3i(xs[0], xs[1], xs[2])
+        return Point3i(*self.read_layout(Layout.POINT3I))
 
     def read_vec3f(self) -> Vec3f:
-        xs = self.read_float_array(3)
-        return Vec3f(xs[0], xs[1], xs[2])
+        return Vec3f(*self.read_layout(Layout.POINT3F))
 
     def read_vec3u(self) -> Vec3i:
-        xs = self.read_uint_array(3)
-        return Vec3u(xs[0], xs[1], xs[2])
+        return Vec3u(*self.read_layout(Layout.VEC3U))
 
     def read_color4f(self) -> Color4f:
-        xs = self.read_float_array(4)
-        return Color4f(xs[0], xs[1], xs[2], xs[3])
+        return Color4f(*self.read_layout(Layout.COLOR4F))
 
@@ -0,0 +1,216 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+import typing
+import asyncio
+import itertools
+import logging
+from enum import Enum
+from stream.async_stream_client import AsyncStreamClient
+from model.headless_model import HeadlessModel
+from model.render_info import RenderInfo
+from model.camera_data import CameraData
+from model.mesh_data import ShapeData
+from model.pixel_data import PixelData
+
+
+class SchedulingPolicy(Enum):
+    # servers take turns
+    ROUND_ROBIN     = 0
+    # the server with the fewest samples in flight is chosen
+    LEAST_LOADED    = 1
+
+
+class StreamClientPool(object):
+
+    """
+    Stream Client Pool
+
+    Connects to several servers rendering the same scene and spreads pixel requests across them.
+    Each server has at most max_pending requests in flight, so faster servers receive more requests.
+    Scene and camera data are requested from the first server, the pixel data of all servers is merged into the model.
+
+        async with StreamClientPool([('node1', 50013), ('node2', 50013)]) as pool:
+            pixels = await pool.request_render_region(0, 0, 16, 16, 1024)
+    """
+
+    def __init__(self, addresses : typing.List[typing.Tuple[str, int]],
+                 policy : SchedulingPolicy = SchedulingPolicy.LEAST_LOADED,
+                 max_pending : int = 2,
+                 model : typing.Optional[HeadlessModel] = None):
+        self._clients = [AsyncStreamClient(hostname, port) for hostname, port in addresses]
+        self._policy = policy
+        self._max_pending = max_pending
+        self._model = model if model is not None else HeadlessModel()
+        # number of requests and samples in flight per client
+        self._pending = {client: 0 for client in self._clients}
+        self._pending_samples = {client: 0 for client in self._clients}
+        self._round_robin = itertools.cycle(self._clients)
+        self._condition = None
+        self._render_info = None
+
+    @property
+    def clients(self) -> typing.List[AsyncStreamClient]:
+        return self._clients
+
+    @property
+    def model(self) -> HeadlessModel:
+        """
+        Returns the model the results of all servers are merged into
+        """
+        return self._model
+
+    @property
+    def render_info(self) -> typing.Optional[RenderInfo]:
+        """
+        Returns the render info of the servers (requested while connecting)
+        """
+        return self._render_info
+
+    @property
+    def policy(self) -> SchedulingPolicy:
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy : SchedulingPolicy):
+        self._policy = policy
+
+    def connected_clients(self) -> typing.List[AsyncStreamClient]:
+        """
+        Returns the clients with an open connection
+        """
+        return [client for client in self._clients if client.is_connected()]
+
+    async def __aenter__(self) -> 'StreamClientPool':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.disconnect()
+
+    async def connect(self):
+        """
+        Connects to all servers and checks that they render the same scene.
+        Servers which are not reachable are skipped, raises ConnectionError if none is reachable
+        """
+        self._condition = asyncio.Condition()
+        results = await asyncio.gather(*[client.connect() for client in self._clients], return_exceptions=True)
+        for client, result in zip(self._clients, results):
+            if isinstance(result, Exception):
+                logging.error('Could not connect to {}:{}: {}'.format(client.hostname, client.port, result))
+        clients = self.connected_clients()
+        if not clients:
+            raise ConnectionError('Could not connect to any server')
+
+        render_infos = await asyncio.gather(*[client.request_render_info() for client in clients])
+        scenes = {(render_info.renderer_name, render_info.scene_name) for render_info in render_infos}
+        if len(scenes) > 1:
+            await self.disconnect()
+            raise ValueError('The servers render different scenes: {}'.format(sorted(scenes)))
+        self._render_info = render_infos[0]
+        logging.info('Connected to {} of {} servers'.format(len(clients), len(self._clients)))
+
+    async def disconnect(self):
+        """
+        Disconnects from all servers
+        """
+        await asyncio.gather(*[client.disconnect() for client in self._clients if client.is_connected()],
+                             return_exceptions=True)
+
+    async def request_camera_data(self) -> CameraData:
+        """
+        Requests the camera data from the first server
+        """
+        return await self.connected_clients()[0].request_camera_data()
+
+    async def request_scene_data(self) -> ShapeData:
+        """
+        Requests the three-dimensional scene data from the first server
+        """
+        return await self.connected_clients()[0].request_scene_data()
+
+    def _available_clients(self) -> typing.List[AsyncStreamClient]:
+        return [client for client in self.connected_clients() if self._pending[client] < self._max_pending]
+
+    def _select_client(self, clients : typing.List[AsyncStreamClient]) -> AsyncStreamClient:
+        """
+        Selects one of the available clients according to the scheduling policy
+        """
+        if self._policy is SchedulingPolicy.LEAST_LOADED:
+            return min(clients, key=lambda client: self._pending_samples[client])
+        while True:
+            client = next(self._round_robin)
+            if client in clients:
+                return client
+
+    async def _acquire(self, sample_count : int) -> AsyncStreamClient:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._available_clients() or not self.connected_clients())
+            clients = self._available_clients()
+            if not clients:
+                raise ConnectionError('Lost the connection to all servers')
+            client = self._select_client(clients)
+            self._pending[client] += 1
+            self._pending_samples[client] += sample_count
+            return client
+
+    async def _release(self, client : AsyncStreamClient, sample_count : int):
+        async with self._condition:
+            self._pending[client] -= 1
+            self._pending_samples[client] -= sample_count
+            self._condition.notify_all()
+
+    async def request_render_pixel(self, x : int, y : int, sample_count : int) -> PixelData:
+        """
+        Requests the render data of one pixel from the next server and merges it into the model.
+        The request is repeated on another server if the connection is lost
+        """
+        while True:
+            client = await self._acquire(sample_count)
+            try:
+                pixel_data = await client.request_render_pixel(x, y, sample_count)
+            except ConnectionError as e:
+                logging.error('Request of pixel ({},{}) failed on {}:{}: {}'.format(x, y, client.hostname,
+                                                                                 client.port, e))
+                continue
+            finally:
+                await self._release(client, sample_count)
+            self._model.add_pixel_data(x, y, pixel_data)
+            return pixel_data
+
+    async def request_render_pixels(self, pixels : typing.Iterable[typing.Tuple[int, int]],
+                                    sample_count : int) -> typing.List[PixelData]:
+        """
+        Requests the render data of all given pixels spread across the servers and returns it in the same order
+        """
+        return await asyncio.gather(*[self.request_render_pixel(x, y, sample_count) for x, y in pixels])
+
+    async def request_render_region(self, x : int, y : int, width : int, height : int,
+                                    sample_count : int) -> typing.Dict[typing.Tuple[int, int], PixelData]:
+        """
+        Requests the render data of all pixels of the given image region, keyed by pixel position
+        """
+        pixels = [(i, j) for j in range(y, y + height) for i in range(x, x + width)]
+        return dict(zip(pixels, await self.request_render_pixels(pixels, sample_count)))
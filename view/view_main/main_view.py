@@ -31,6 +31,7 @@ from view.view_main.view_connect_settings import ViewConnectSettings
 from view.view_main.view_detector_settings import ViewDetectorSettings
 from view.view_main.view_emca import ViewEMCA
 from view.view_main.view_about import ViewAbout
+from view.view_main.view_diagnostics import ViewDiagnostics
 from view.view_main.popup_messages import PopupMessages
 from view.view_main.view_filter_settings import ViewFilterSettings
 from view.view_main.view_options_settings import ViewOptions
@@ -71,6 +72,8 @@ class MainView(QMainWindow):
         self._view_popup = PopupMessages()
         # About information
         self._view_about = ViewAbout()
+        # Profiling statistics of the pipeline stages
+        self._view_diagnostics = ViewDiagnostics()
         self.setCentralWidget(self._view_emca)
         self.setWindowTitle('Explorer of Monte Carlo based Algorithms (EMCA)')
         # Accept drops for Drag n drop events
@@ -88,6 +91,11 @@ class MainView(QMainWindow):
         load_image.setToolTip('Load .exr')
         load_image.triggered.connect(self.load_image_dialog)
 
+        diagnostics = QAction('Diagnostics', self)
+        diagnostics.setShortcut('Ctrl+D')
+        diagnostics.setToolTip('Profiling of the pipeline stages')
+        diagnostics.triggered.connect(self.open_diagnostics)
+
         exit_action = QAction("Quit", self)
         exit_action.setShortcut("Ctrl+Q")
         exit_action.setToolTip("Closes the Application")
@@ -101,6 +109,7 @@ class MainView(QMainWindow):
         menu = main_menu.addMenu("&Menu")
         menu.addAction(load_image)
         menu.addAction(options)
+        menu.addAction(diagnostics)
         menu.addAction(exit_action)
         about = main_menu.addMenu("&About")
         about.addAction(about_action)
@@ -126,6 +135,16 @@ class MainView(QMainWindow):
         """
         self._view_emca.btnFilter.setEnabled(enable)
 
+    @Slot(bool, name='open_diagnostics')
+    def open_diagnostics(self, clicked : bool):
+        """
+        Opens the diagnostics window
+        """
+        if self._view_diagnostics.isVisible():
+            self._view_diagnostics.activateWindow()
+        else:
+            self._view_diagnostics.show()
+
     @Slot(bool, name='open_options')
     def open_options(self, clicked : bool):
         """
@@ -245,3 +264,10 @@ class MainView(QMainWindow):
         """
         return self._view_emca.view_options
 
+    @property
+    def view_diagnostics(self) -> ViewDiagnostics:
+        """
+        Returns the view showing the profiling statistics
+        """
+        return self._view_diagnostics
+
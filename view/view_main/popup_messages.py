@@ -180,3 +180,17 @@ class PopupMessages(QObject):
 
 
 
+
+    def error_invalid_filter_expression(self, msg):
+        """
+        Popup error message if a filter expression can not be parsed
+        :param msg: string
+        :return:
+        """
+        self._msgBox.setIcon(QMessageBox.Warning)
+        self._msgBox.setWindowTitle("Filter Error")
+        self._msgBox.setText("Invalid filter expression")
+        self._msgBox.setInformativeText(msg)
+        self._msgBox.setDetailedText(msg)
+        self._msgBox.setStandardButtons(QMessageBox.Ok)
+        self._msgBox.exec_()
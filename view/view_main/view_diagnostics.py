@@ -0,0 +1,141 @@
+"""
+    MIT License
+
+    Copyright (c) 2020 Christoph Kreisl
+    Copyright (c) 2021 Lukas Ruppert
+
+    Permission is hereby granted, free of charge, to any person obtaining a copy
+    of this software and associated documentation files (the "Software"), to deal
+    in the Software without restriction, including without limitation the rights
+    to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+    copies of the Software, and to permit persons to whom the Software is
+    furnished to do so, subject to the following conditions:
+
+    The above copyright notice and this permission notice shall be included in all
+    copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+    SOFTWARE.
+"""
+
+from core.pyside2_uic import loadUi
+from core.profiler import profiler
+from core.memory import memory_budget, format_size
+from PySide2.QtWidgets import QWidget
+from PySide2.QtWidgets import QApplication
+from PySide2.QtWidgets import QFileDialog
+from PySide2.QtWidgets import QTableWidgetItem
+from PySide2.QtCore import Slot
+from PySide2.QtCore import Qt
+from PySide2.QtCore import QTimer
+import logging
+import os
+
+
+class ViewDiagnostics(QWidget):
+
+    """
+        ViewDiagnostics
+        Shows the statistics of the profiled pipeline stages, toggles profiling and exports the spans as Chrome trace.
+        Furthermore shows the memory of the loaded data
+    """
+
+    # interval in which the statistics are refreshed while the view is visible (ms)
+    REFRESH_INTERVAL = 1000
+
+    def __init__(self, parent=None):
+        QWidget.__init__(self, parent=None)
+        ui_filepath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ui', 'diagnostics.ui'))
+        loadUi(ui_filepath, self)
+
+        # center widget depending on screen size
+        desktop_widget = QApplication.desktop()
+        screen_rect = desktop_widget.availableGeometry(self)
+        self.move(screen_rect.center() - self.rect().center())
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.REFRESH_INTERVAL)
+        self._timer.timeout.connect(self.refresh)
+
+        self.cbProfiling.toggled.connect(self.enable_profiling)
+        self.btnClear.clicked.connect(self.clear)
+        self.btnExport.clicked.connect(self.export_chrome_trace)
+        self.btnClose.clicked.connect(self.close)
+
+    def showEvent(self, event):
+        self.cbProfiling.setChecked(profiler.enabled)
+        self.refresh()
+        self._timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    @Slot(bool, name='enable_profiling')
+    def enable_profiling(self, enabled : bool):
+        """
+        Enables or disables the profiling of the pipeline stages
+        """
+        profiler.enabled = enabled
+
+    @Slot(bool, name='clear')
+    def clear(self, clicked : bool = False):
+        """
+        Discards all recorded spans
+        """
+        profiler.clear()
+        self.refresh()
+
+    @Slot(name='refresh')
+    def refresh(self):
+        """
+        Shows the statistics of all recorded stages and the memory usage
+        """
+        stages = profiler.statistics()
+        self.labelSpans.setText('{} spans'.format(sum(stage.count for stage in stages)))
+        self.tableStages.setSortingEnabled(False)
+        self.tableStages.setRowCount(len(stages))
+        for row, stage in enumerate(stages):
+            values = [stage.name, stage.category, stage.count,
+                      stage.last * 1e3, stage.mean * 1e3, stage.max * 1e3, stage.total * 1e3]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, float):
+                    item.setData(Qt.DisplayRole, round(value, 3))
+                else:
+                    item.setData(Qt.DisplayRole, value)
+                self.tableStages.setItem(row, column, item)
+        self.tableStages.setSortingEnabled(True)
+
+        usage = memory_budget.usage()
+        total = sum(usage.values())
+        if memory_budget.budget > 0:
+            self.labelMemory.setText('Memory: {} of {}'.format(format_size(total), format_size(memory_budget.budget)))
+        else:
+            self.labelMemory.setText('Memory: {}'.format(format_size(total)))
+        self.tableMemory.setRowCount(len(usage))
+        for row, (name, nbytes) in enumerate(usage.items()):
+            self.tableMemory.setItem(row, 0, QTableWidgetItem(name))
+            item = QTableWidgetItem()
+            item.setData(Qt.DisplayRole, round(nbytes / (1 << 20), 3))
+            self.tableMemory.setItem(row, 1, item)
+
+    @Slot(bool, name='export_chrome_trace')
+    def export_chrome_trace(self, clicked : bool = False):
+        """
+        Opens a dialog and saves the recorded spans as Chrome trace (chrome://tracing or Perfetto)
+        """
+        filepath = QFileDialog.getSaveFileName(self, 'Export Chrome Trace', 'emca_trace.json', 'Trace (*.json)')[0]
+        if not filepath:
+            return
+        try:
+            profiler.export_chrome_trace(filepath)
+            logging.info('Exported {} spans to {}'.format(len(profiler.spans()), filepath))
+        except OSError as e:
+            logging.error('Failed to export the trace: {}'.format(e))
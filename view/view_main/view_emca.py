@@ -402,7 +402,8 @@ class ViewEMCA(QWidget):
     @Slot(int, name='request_history_pixel')
     def request_history_pixel(self, index):
         """
-        Informs the controller to request an old data set from the pixel history
+        Informs the controller to request an old data set from the pixel history,
+        recently received pixels are served from the pixel cache
         :param index: integer
         :return:
         """
@@ -411,4 +412,4 @@ class ViewEMCA(QWidget):
         values = text.split(",")
         x, y = int(values[0]), int(values[1])
         logging.info('Request pixel=({},{})'.format(x, y))
-        self._controller.stream.request_render_pixel(QPoint(x, y))
+        self._controller.stream.request_render_pixel(QPoint(x, y), use_cache=True)
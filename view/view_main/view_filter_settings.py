@@ -26,14 +26,16 @@
 from PySide2.QtGui import QKeyEvent
 from core.pyside2_uic import loadUi
 from PySide2.QtCore import Slot
-from PySide2.QtWidgets import QFormLayout, QLabel, QWidget
+from PySide2.QtWidgets import QFormLayout, QLabel, QWidget, QCheckBox
 from PySide2.QtWidgets import QApplication
 from PySide2.QtWidgets import QListWidgetItem
 from PySide2.QtCore import Qt
 from core.point import Point2f, Point2i, Point3f, Point3i
 from core.color import Color4f
 import os
+import numpy as np
 from filter.filter_settings import FilterType
+from filter.filter_expression import settings_expression
 
 from model.pixel_data import PixelData
 
@@ -44,6 +46,10 @@ else:
     from typing import Any as Controller
 
 
+# entry of the filter items combobox selecting the filter expression input
+EXPRESSION_ITEM = 'Filter Expression'
+
+
 class FilterListItem(QWidget):
 
     """
@@ -78,8 +84,22 @@ class FilterListItem(QWidget):
             layout.addRow("r: ", QLabel(str(constraint[0])))
             layout.addRow("g: ", QLabel(str(constraint[1])))
             layout.addRow("b: ", QLabel(str(constraint[2])))
+        elif d_type is FilterType.EXPRESSION:
+            layout.addRow("Expression:", QLabel(""))
+            layout.addRow("", QLabel(str(constraint[0])))
+        self._cb_enabled = QCheckBox("enabled")
+        self._cb_enabled.setChecked(True)
+        layout.addRow("", self._cb_enabled)
+        self.setToolTip(settings_expression(filter_settings))
         self.setLayout(layout)
 
+    @property
+    def cb_enabled(self) -> QCheckBox:
+        """
+        Returns the checkbox enabling or disabling the filter
+        """
+        return self._cb_enabled
+
     def get_idx(self):
         """
         Returns an index referencing the filter settings index
@@ -150,38 +170,28 @@ class ViewFilterSettings(QWidget):
         """
         Initialise the view
         """
-        # iterate through all paths and their vertices
-        for _, path in pixel_data.dict_paths.items():
-
+        paths = pixel_data.paths
+        if len(paths) > 0:
             # pathinfo stuff sample_idx, final_estimate, path_depth
-            if path.sample_idx:
-                if not self._filter_items.get('sampleIndex', None):
-                    self._filter_items['sampleIndex'] = path.sample_idx
-
-            if path.valid_depth:
-                if not self._filter_items.get('pathDepth', None):
-                    self._filter_items['pathDepth'] = path.path_depth
-
-            if path.final_estimate is not None:
-                if not self._filter_items.get('finalEstimate', None) is not None:
-                    self._filter_items['finalEstimate'] = path.final_estimate
-
-            # add path user data
-            for key_user, value_user in path.data.items():
-                # add item if not in list
-                if self._filter_items.get(key_user, None) is not None:
-                    self._filter_items[key_user] = value_user
-
-            # iterate over intersection points
-            for _, its in path.intersections.items():
-                for key_user, value_user in its.data.items():
-                    # add item if not in list
-                    if not self._filter_items.get(key_user, None) is None:
-                        self._filter_items[key_user] = value_user
+            path = pixel_data.path(0)
+            self._filter_items.setdefault('sampleIndex', path.sample_idx)
+            self._filter_items.setdefault('pathDepth', path.path_depth)
+
+            rows = np.flatnonzero(paths.has_final_estimate)
+            if len(rows) > 0:
+                self._filter_items.setdefault('finalEstimate', pixel_data.path(int(rows[0])).final_estimate)
+
+        # add path and intersection user data from the index, one example value per key determines its type
+        index = pixel_data.user_data_index
+        for key in index.keys():
+            example = index.entry(key).example
+            if example is not None:
+                self._filter_items.setdefault(key, example)
 
         # add all values to combBox
         for key, _ in self._filter_items.items():
             self.combItems.addItem(key)
+        self.combItems.addItem(EXPRESSION_ITEM)
 
         # update expression view on current item
         if self.combItems.count() > 0:
@@ -194,6 +204,13 @@ class ViewFilterSettings(QWidget):
         """
         return self.cbFilterEnabled.isChecked()
 
+    def is_server_side(self):
+        """
+        Returns if the enabled filters are evaluated by the server when the next pixel is requested
+        :return: boolean
+        """
+        return self.cbServerSide.isChecked()
+
     def keyPressEvent(self, event : QKeyEvent):
         """
         Handles key press enter events.
@@ -209,6 +226,9 @@ class ViewFilterSettings(QWidget):
         :param text: string
         :return:
         """
+        if text == EXPRESSION_ITEM:
+            self.stackedWidget.setCurrentIndex(4)
+            return
         item = self._filter_items.get(text, None)
         if item is not None:
             """
@@ -217,6 +237,7 @@ class ViewFilterSettings(QWidget):
                 1       - Point2
                 2       - Point3
                 3       - Color3
+                4       - Filter expression
             """
             if isinstance(item, bool) or isinstance(item, float) or isinstance(item, int) or isinstance(item, str):
                 self.stackedWidget.setCurrentIndex(0)
@@ -322,6 +343,8 @@ class ViewFilterSettings(QWidget):
         :return:
         """
         fi = FilterListItem(filter_settings)
+        filter_idx = filter_settings.get_idx()
+        fi.cb_enabled.toggled.connect(lambda enabled: self._controller.filter.toggle_filter(filter_idx, enabled))
         item = QListWidgetItem()
         item.setSizeHint(fi.sizeHint())
         idx = self.stackedWidget.currentIndex()
@@ -349,6 +372,8 @@ class ViewFilterSettings(QWidget):
             if self.cbColor.isChecked():
                 return self.leExpR.text() == ""
             return self.leExpR.text() == "" and self.leExpG.text() == "" and self.leExpB.text() == ""
+        elif index == 4:
+            return self.leExpression.text().strip() == ""
 
     def clear_line_edit_entries(self, index):
         """
@@ -369,3 +394,5 @@ class ViewFilterSettings(QWidget):
             self.leExpR.clear()
             self.leExpG.clear()
             self.leExpB.clear()
+        elif index == 4:
+            self.leExpression.clear()
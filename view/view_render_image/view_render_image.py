@@ -25,6 +25,7 @@
 
 import typing
 from view.view_render_image.hdr_graphics_view import HDRGraphicsView
+from core.hdr_image import HDRImage
 from PySide2.QtWidgets import QWidget
 from PySide2.QtCore import QPoint, Slot
 from PySide2.QtCore import Qt
@@ -155,6 +156,13 @@ class ViewRenderImage(QWidget):
         """
         return self._graphics_view.load_hdr_image(filepath, is_reference)
 
+    @property
+    def hdr_image(self) -> HDRImage:
+        """
+        Returns the rendered image
+        """
+        return self._graphics_view.hdr_image
+
     def save_last_rendered_image_filepath(self):
         hdr_image = self._graphics_view.hdr_image
         if hdr_image: